@@ -1,7 +1,17 @@
 # gunicorn.conf.py
+import os
 
 bind = '0.0.0.0:9527'  # 绑定到所有接口的8000端口
 workers = 3  # 工作进程数
+# 工作进程类型：配合 xadmin.asgi 入口使用 uvicorn worker，用例编辑器的文件树、下载、上传等
+# async 接口在等待磁盘和慢速客户端时不再独占进程；改用 xadmin.wsgi 入口时设为 sync
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
 timeout = 120  # 请求超时时间
 reload = False  # 当代码变化时自动重新加载
 
+
+
+def post_worker_init(worker):
+    """worker 启动后预热进程内索引（测试用例自动完成）"""
+    from tpgen.case_index import case_search_index
+    case_search_index.warm()
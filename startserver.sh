@@ -1,4 +1,4 @@
 #!/bin/bash
 
 
-gunicorn xadmin.wsgi:application -c gunicorn.conf.py
+gunicorn xadmin.asgi:application -c gunicorn.conf.py
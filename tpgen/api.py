@@ -5,8 +5,12 @@ Test Plan Generator API Routers
 from django.http import HttpRequest
 from ninja_extra import Router
 from typing import List
-from . import models, schemas
+from . import bulk_delete, models, schemas
+from .plan_matrix import MatrixSelection, PlanMatrix, EXPORT_FORMATS
+from .case_config_filter import apply_config_filter, ConfigFilterError
+from .case_index import case_search_index
 from xutils import utils
+from xcase.aio import streaming_response
 
 
 # ============================================================================
@@ -270,15 +274,34 @@ def update_sut_device(request: HttpRequest, device_id: int, payload: schemas.Sut
         return resp.as_dict()
 
 
-@sut_device_router.delete('/{device_ids}')
-def delete_sut_devices(request: HttpRequest, device_ids: str):
-    """删除测试设备（支持批量）"""
+@sut_device_router.get('/delete-jobs/{job_id}')
+def get_sut_device_delete_job(request: HttpRequest, job_id: str):
+    """查询后台级联删除任务进度"""
+    job = bulk_delete.get_job(job_id)
+    if job is None:
+        resp = utils.RespFailedTempl()
+        resp.data = '删除任务不存在或已过期'
+        return resp.as_dict()
+    
+    resp = utils.RespSuccessTempl()
+    resp.data = job
+    return resp.as_dict()
+
+
+@sut_device_router.delete('/{device_id}')
+def delete_sut_devices(request: HttpRequest, device_id: str):
+    """
+    删除测试设备（支持批量，device_id 为逗号分隔的设备ID）
+
+    与 GET/PUT /{device_id} 共用同一路径，否则 DELETE 请求会被先注册的路由以 405 拒绝。
+    级联的测试计划用例较多时转为后台任务，返回 jobId，
+    通过 GET /sut-device/delete-jobs/{job_id} 查询进度
+    """
     try:
-        id_list = device_ids.split(',')
-        deleted_count = models.SutDevice.objects.filter(id__in=id_list).delete()[0]
+        id_list = [int(i) for i in device_id.split(',')]
         
         resp = utils.RespSuccessTempl()
-        resp.data = {'deleted': deleted_count}
+        resp.data = bulk_delete.delete(bulk_delete.CascadeDelete.for_devices(id_list))
         return resp.as_dict()
     except Exception as e:
         resp = utils.RespFailedTempl()
@@ -533,8 +556,18 @@ test_case_router = Router(tags=['Test Case'])
 
 
 @test_case_router.get('/search')
-def search_test_cases(request: HttpRequest, keyword: str = ''):
-    """搜索所有测试用例（用于搜索框自动完成）"""
+def search_test_cases(request: HttpRequest, keyword: str = '', config: str = None):
+    """
+    搜索所有测试用例（用于搜索框自动完成）
+
+    未指定 config 时直接查询进程内的自动完成索引（不访问数据库）；
+    config 为用例配置过滤表达式，如 ``config.env=gpu;config.timeout>300``
+    """
+    if not config:
+        resp = utils.RespSuccessTempl()
+        resp.data = case_search_index.search(keyword, limit=50)
+        return resp.as_dict()
+    
     queryset = models.TestCase.objects.select_related(
         'test_component',
         'test_component__test_type'
@@ -543,6 +576,13 @@ def search_test_cases(request: HttpRequest, keyword: str = ''):
     if keyword:
         queryset = queryset.filter(case_name__icontains=keyword)
     
+    try:
+        queryset = apply_config_filter(queryset, config)
+    except ConfigFilterError as e:
+        resp = utils.RespFailedTempl()
+        resp.data = f'配置过滤表达式无效: {str(e)}'
+        return resp.as_dict()
+    
     # 限制返回数量，避免数据过多
     cases = queryset.order_by('case_name')[:50]
     
@@ -567,14 +607,27 @@ def search_test_cases(request: HttpRequest, keyword: str = ''):
 @test_case_router.get('/list')
 def list_test_cases(request: HttpRequest,
                    test_component_id: int = None,
+                   config: str = None,
                    page: int = 1,
                    size: int = 10):
-    """获取测试用例列表"""
+    """
+    获取测试用例列表
+
+    config 为用例配置过滤表达式，如 ``config.env=gpu;config.timeout>300``
+    """
     queryset = models.TestCase.objects.all()
     
     if test_component_id:
         queryset = queryset.filter(test_component_id=test_component_id)
     
+    if config:
+        try:
+            queryset = apply_config_filter(queryset, config)
+        except ConfigFilterError as e:
+            resp = utils.RespFailedTempl()
+            resp.data = f'配置过滤表达式无效: {str(e)}'
+            return resp.as_dict()
+    
     total = queryset.count()
     cases = queryset.order_by('-created_at')[(page-1)*size:page*size]
     
@@ -628,29 +681,35 @@ def list_test_plans(request: HttpRequest,
                    plan_name: str = None,
                    page: int = 1,
                    size: int = 10):
-    """获取测试计划列表"""
-    queryset = models.TestPlan.objects.all()
+    """获取测试计划列表（读取 test_plan_summaries 摘要表，单次索引查询）"""
+    queryset = models.TestPlanSummary.objects.all()
     
     if plan_name:
         queryset = queryset.filter(plan_name__icontains=plan_name)
     
     total = queryset.count()
-    plans = queryset.order_by('-created_at')[(page-1)*size:page*size]
+    summaries = queryset.order_by('-created_at')[(page-1)*size:page*size]
     
     data = {
         'total': total,
         'list': [
             {
-                'id': p.id,
-                'planName': p.plan_name,
-                'planDescription': p.plan_description,
-                'sutDeviceId': p.sut_device_id,
-                'osConfigId': p.os_config_id,
-                'createdBy': p.created_by,
-                'createdAt': utils.dateformat(p.created_at),
-                'updatedAt': utils.dateformat(p.updated_at),
+                'id': s.test_plan_id,
+                'planName': s.plan_name,
+                'planDescription': s.plan_description,
+                'sutDeviceId': s.sut_device_id,
+                'hostname': s.hostname,
+                'asicName': s.asic_name,
+                'osConfigId': s.os_config_id,
+                'osFamily': s.os_family,
+                'osVersion': s.os_version,
+                'caseCount': s.case_count,
+                'totalTimeout': s.total_timeout,
+                'createdBy': s.created_by,
+                'createdAt': utils.dateformat(s.created_at),
+                'updatedAt': utils.dateformat(s.updated_at),
             }
-            for p in plans
+            for s in summaries
         ]
     }
     
@@ -659,11 +718,58 @@ def list_test_plans(request: HttpRequest,
     return resp.as_dict()
 
 
+def _build_plan_matrix(payload: schemas.PlanMatrixIn) -> PlanMatrix:
+    """根据请求参数构建测试计划矩阵"""
+    return PlanMatrix(MatrixSelection(
+        sut_device_ids=payload.sut_device_ids,
+        product_name=payload.product_name,
+        asic_name=payload.asic_name,
+        os_config_ids=payload.os_config_ids,
+        kernel_versions=payload.kernel_versions,
+        test_type_ids=payload.test_type_ids,
+        test_component_ids=payload.test_component_ids,
+        test_case_ids=payload.test_case_ids,
+    ))
+
+
+@test_plan_router.post('/matrix/preview')
+def preview_plan_matrix(request: HttpRequest, payload: schemas.PlanMatrixIn):
+    """预览测试计划矩阵（返回组合统计和部分作业，不整体展开）"""
+    matrix = _build_plan_matrix(payload)
+    limit = max(0, min(payload.limit, 1000))
+    offset = max(0, payload.offset)
+
+    resp = utils.RespSuccessTempl()
+    resp.data = {
+        'summary': matrix.summary(),
+        'list': list(matrix.iter_jobs(offset=offset, limit=limit)),
+    }
+    return resp.as_dict()
+
+
+@test_plan_router.post('/matrix/export')
+def export_plan_matrix(request: HttpRequest, payload: schemas.PlanMatrixIn):
+    """流式导出测试计划矩阵（JSONL / YAML）"""
+    if payload.format not in EXPORT_FORMATS:
+        resp = utils.RespFailedTempl()
+        resp.data = f'不支持的导出格式: {payload.format}，可选: {", ".join(EXPORT_FORMATS)}'
+        return resp.as_dict()
+
+    matrix = _build_plan_matrix(payload)
+    # 先在请求线程中查询各维度：ASGI 下数据块在 I/O 线程池中生成，展开过程不再访问数据库
+    total = matrix.count()
+    content_type = 'application/x-yaml' if payload.format == 'yaml' else 'application/x-ndjson'
+    response = streaming_response(request, matrix.stream(payload.format), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="test_plan_matrix.{payload.format}"'
+    response['X-Total-Count'] = str(total)
+    return response
+
+
 @test_plan_router.get('/{plan_id}')
 def get_test_plan(request: HttpRequest, plan_id: int):
     """获取测试计划详情（包含关联的测试用例）"""
     try:
-        plan = models.TestPlan.objects.get(id=plan_id)
+        plan = models.TestPlan.objects.select_related('sut_device', 'os_config').get(id=plan_id)
         
         # 获取关联的测试用例
         plan_cases = models.TestPlanCase.objects.filter(test_plan=plan).select_related('test_case')
@@ -681,7 +787,13 @@ def get_test_plan(request: HttpRequest, plan_id: int):
             'planName': plan.plan_name,
             'planDescription': plan.plan_description,
             'sutDeviceId': plan.sut_device_id,
+            'hostname': plan.sut_device.hostname,
+            'asicName': plan.sut_device.asic_name,
             'osConfigId': plan.os_config_id,
+            'osFamily': plan.os_config.os_family,
+            'osVersion': plan.os_config.version,
+            'caseCount': len(cases),
+            'totalTimeout': sum(c['timeout'] or 0 for c in cases),
             'createdBy': plan.created_by,
             'createdAt': utils.dateformat(plan.created_at),
             'updatedAt': utils.dateformat(plan.updated_at),
@@ -717,15 +829,34 @@ def create_test_plan(request: HttpRequest, payload: schemas.TestPlanIn):
         return resp.as_dict()
 
 
-@test_plan_router.delete('/{plan_ids}')
-def delete_test_plans(request: HttpRequest, plan_ids: str):
-    """删除测试计划（支持批量）"""
+@test_plan_router.get('/delete-jobs/{job_id}')
+def get_test_plan_delete_job(request: HttpRequest, job_id: str):
+    """查询后台级联删除任务进度"""
+    job = bulk_delete.get_job(job_id)
+    if job is None:
+        resp = utils.RespFailedTempl()
+        resp.data = '删除任务不存在或已过期'
+        return resp.as_dict()
+    
+    resp = utils.RespSuccessTempl()
+    resp.data = job
+    return resp.as_dict()
+
+
+@test_plan_router.delete('/{plan_id}')
+def delete_test_plans(request: HttpRequest, plan_id: str):
+    """
+    删除测试计划（支持批量，plan_id 为逗号分隔的计划ID）
+
+    与 GET /{plan_id} 共用同一路径，否则 DELETE 请求会被先注册的路由以 405 拒绝。
+    级联的测试计划用例较多时转为后台任务，返回 jobId，
+    通过 GET /test-plan/delete-jobs/{job_id} 查询进度
+    """
     try:
-        id_list = plan_ids.split(',')
-        deleted_count = models.TestPlan.objects.filter(id__in=id_list).delete()[0]
+        id_list = [int(i) for i in plan_id.split(',')]
         
         resp = utils.RespSuccessTempl()
-        resp.data = {'deleted': deleted_count}
+        resp.data = bulk_delete.delete(bulk_delete.CascadeDelete.for_plans(id_list))
         return resp.as_dict()
     except Exception as e:
         resp = utils.RespFailedTempl()
@@ -14,5 +14,4 @@ class TpgenConfig(AppConfig):
     
     def ready(self):
         """应用就绪时的初始化"""
-        # 可以在这里导入信号处理器等
-        pass
+        from tpgen import signals  # 启用信号处理（用例自动完成索引刷新、测试计划摘要维护）
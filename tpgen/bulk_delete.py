@@ -0,0 +1,253 @@
+"""
+Set-based Cascade Delete
+测试设备 / 测试计划的集合式级联删除
+
+ORM 的 ``QuerySet.delete()`` 会先把所有级联对象（TestPlan、TestPlanCase、
+TestPlanSummary）加载到内存再逐个触发信号。这里改为按依赖顺序直接执行
+``DELETE ... WHERE ... IN (SELECT ...)``：
+
+- 测试计划用例按 DELETE_BATCH_SIZE 分批删除，每批只读取一批主键；
+- 绕过信号的同时显式删除对应的摘要行（test_plan_summaries）；
+- 级联行数超过 ASYNC_THRESHOLD 时转为后台线程执行，进度写入缓存，
+  任何 worker 都可以通过 job_id 查询。
+
+后台线程随 worker 进程结束（重启、超时被终止）而中断：任务每批完成时更新心跳，
+查询时心跳超过 JOB_STALE_TIMEOUT 的 pending / running 任务标记为 failed。
+删除按批提交且可重复执行，重新发起同样的删除即可从中断处继续。
+同步删除和后台任务返回相同的字段（jobId / status / total / progress / deleted / details）。
+"""
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from loguru import logger
+
+from . import models
+
+
+# 每批删除的测试计划用例行数
+DELETE_BATCH_SIZE = 5000
+
+# 级联的测试计划用例行数超过该值时转为后台任务
+ASYNC_THRESHOLD = 20000
+
+# 后台任务进度在缓存中的键前缀及保留时长（秒）
+JOB_CACHE_PREFIX = 'tpgen_delete_job:'
+JOB_CACHE_TIMEOUT = 3600
+
+# 后台任务心跳超过该时长（秒）未更新时视为已中断
+JOB_STALE_TIMEOUT = 300
+
+# 任务状态
+JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED = 'pending', 'running', 'done', 'failed'
+
+
+def _raw_delete(queryset) -> int:
+    """不加载对象、不触发信号，直接执行集合式 DELETE"""
+    return queryset._raw_delete(router.db_for_write(queryset.model))
+
+
+class CascadeDelete:
+    """
+    单次级联删除
+
+    用法:
+        CascadeDelete.for_devices([1, 2]).run()
+        CascadeDelete.for_plans([10, 11]).run()
+    """
+
+    def __init__(self, target: str, ids: List[int], root_queryset, plan_queryset):
+        self.target = target
+        self.ids = ids
+        self.root_queryset = root_queryset
+        self.plan_queryset = plan_queryset
+
+    @classmethod
+    def for_devices(cls, device_ids: List[int]) -> 'CascadeDelete':
+        return cls(
+            'sut_device', device_ids,
+            models.SutDevice.objects.filter(id__in=device_ids),
+            models.TestPlan.objects.filter(sut_device_id__in=device_ids),
+        )
+
+    @classmethod
+    def for_plans(cls, plan_ids: List[int]) -> 'CascadeDelete':
+        return cls(
+            'test_plan', plan_ids,
+            models.TestPlan.objects.filter(id__in=plan_ids),
+            models.TestPlan.objects.filter(id__in=plan_ids),
+        )
+
+    @property
+    def plan_cases(self):
+        return models.TestPlanCase.objects.filter(test_plan__in=self.plan_queryset.values('id'))
+
+    def count_cases(self) -> int:
+        """需要级联删除的测试计划用例行数"""
+        return self.plan_cases.count()
+
+    def run(self, batch_size: int = DELETE_BATCH_SIZE,
+            progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        按依赖顺序删除，返回各模型删除行数（与 QuerySet.delete() 的明细格式一致）
+
+        Args:
+            batch_size: 每批删除的测试计划用例数量
+            progress: 每批完成后回调，参数为已删除的用例行数
+        """
+        deleted = {}
+        cases_deleted = 0
+        while True:
+            batch = list(self.plan_cases.values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                cases_deleted += _raw_delete(models.TestPlanCase.objects.filter(id__in=batch))
+            if progress:
+                progress(cases_deleted)
+        deleted[models.TestPlanCase._meta.label] = cases_deleted
+
+        with transaction.atomic():
+            deleted[models.TestPlanSummary._meta.label] = _raw_delete(
+                models.TestPlanSummary.objects.filter(test_plan__in=self.plan_queryset.values('id'))
+            )
+            if self.target == 'sut_device':
+                deleted[models.TestPlan._meta.label] = _raw_delete(self.plan_queryset)
+            deleted[self.root_queryset.model._meta.label] = _raw_delete(self.root_queryset)
+        return {label: count for label, count in deleted.items() if count}
+
+
+def purge_all(batch_size: int = DELETE_BATCH_SIZE,
+              progress: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+    按依赖顺序清空全部 TPGen 数据表
+
+    Args:
+        batch_size: 每批删除的测试计划用例数量
+        progress: 每个模型删除完成后回调，参数为 (模型标签, 删除行数)
+    """
+    deleted = {}
+
+    def report(model, count):
+        deleted[model._meta.label] = count
+        if progress:
+            progress(model._meta.label, count)
+
+    cases_deleted = 0
+    while True:
+        batch = list(models.TestPlanCase.objects.values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+        cases_deleted += _raw_delete(models.TestPlanCase.objects.filter(id__in=batch))
+    report(models.TestPlanCase, cases_deleted)
+
+    for model in (models.TestPlanSummary, models.TestPlan, models.TestCase,
+                  models.TestComponent, models.TestType, models.OsSupportedKernel,
+                  models.SutDevice, models.OsConfig):
+        report(model, _raw_delete(model.objects.all()))
+
+    # 集合式删除不触发信号，手动通知用例索引重建
+    from .case_index import case_search_index
+    case_search_index.invalidate()
+    case_search_index.publish()
+    return deleted
+
+
+# ============================================================================
+# 后台任务
+# ============================================================================
+
+def _job_key(job_id: str) -> str:
+    return f'{JOB_CACHE_PREFIX}{job_id}'
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """查询后台删除任务进度（心跳超时的未完成任务标记为 failed）"""
+    job = cache.get(_job_key(job_id))
+    if (job is not None and job['status'] in (JOB_PENDING, JOB_RUNNING)
+            and time.time() - job.get('heartbeat', 0) > JOB_STALE_TIMEOUT):
+        job['status'] = JOB_FAILED
+        job['error'] = '删除任务已中断（worker 重启或被终止），已删除的部分不会恢复，可重新发起删除继续'
+        _save_job(job)
+    return job
+
+
+def _save_job(job: Dict) -> None:
+    job['heartbeat'] = time.time()
+    cache.set(_job_key(job['jobId']), job, timeout=JOB_CACHE_TIMEOUT)
+
+
+def _result(job: Dict) -> Dict:
+    """删除接口的返回字段（同步删除与后台任务一致）"""
+    return {key: job[key] for key in ('jobId', 'status', 'total', 'progress', 'deleted', 'details')}
+
+
+def run_job(job: Dict, cascade: CascadeDelete, batch_size: int = DELETE_BATCH_SIZE) -> Dict:
+    """执行后台删除任务并持续更新进度"""
+    job['status'] = JOB_RUNNING
+    _save_job(job)
+
+    def on_progress(cases_deleted: int) -> None:
+        job['progress'] = cases_deleted
+        _save_job(job)
+
+    try:
+        job['details'] = cascade.run(batch_size=batch_size, progress=on_progress)
+        job['deleted'] = sum(job['details'].values())
+        job['status'] = JOB_DONE
+    except Exception as e:
+        logger.exception(f"Cascade delete job {job['jobId']} failed")
+        job['status'] = JOB_FAILED
+        job['error'] = str(e)
+    finally:
+        _save_job(job)
+    return job
+
+
+def _run_in_thread(job: Dict, cascade: CascadeDelete) -> None:
+    try:
+        run_job(job, cascade)
+    finally:
+        # 后台线程持有独立的数据库连接，结束时关闭
+        connections.close_all()
+
+
+def delete(cascade: CascadeDelete, threshold: int = ASYNC_THRESHOLD) -> Dict:
+    """
+    执行级联删除；级联行数超过阈值时启动后台线程
+
+    Returns:
+        {'jobId', 'status', 'total': 用例行数, 'progress': 已删除用例行数, 'deleted': 总行数, 'details': {...}}
+        同步删除时 jobId 为 None、status 为 done；后台任务的 status 为 pending，deleted / details 完成后才有值
+    """
+    total = cascade.count_cases()
+    if total <= threshold:
+        with transaction.atomic():
+            details = cascade.run()
+        return _result({
+            'jobId': None,
+            'status': JOB_DONE,
+            'total': total,
+            'progress': details.get(models.TestPlanCase._meta.label, 0),
+            'deleted': sum(details.values()),
+            'details': details,
+        })
+
+    job = {
+        'jobId': uuid.uuid4().hex,
+        'target': cascade.target,
+        'ids': cascade.ids,
+        'status': JOB_PENDING,
+        'total': total,
+        'progress': 0,
+        'deleted': 0,
+        'details': {},
+    }
+    _save_job(job)
+    threading.Thread(target=_run_in_thread, args=(job, cascade), daemon=True,
+                     name=f"tpgen-delete-{job['jobId'][:8]}").start()
+    logger.info(f"Cascade delete job {job['jobId']} started: {cascade.target} {cascade.ids}, {total} plan cases")
+    return _result(job)
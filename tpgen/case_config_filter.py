@@ -0,0 +1,180 @@
+"""
+TestCase.case_config Filter DSL
+测试用例配置过滤表达式
+
+将形如 ``config.env=gpu;config.timeout>300`` 的表达式编译为 PostgreSQL 查询：
+
+- ``config.a.b=value``   -> ``case_config @> '{"a": {"b": value}}'``
+- ``config.a!=value``    -> ``NOT (case_config @> ...)``
+- ``config.a>300`` 等    -> ``case_config @@ '$."a" > 300'``
+- ``config.a``           -> ``case_config @? '$."a"'``（键存在）
+
+多个条件以 ``;`` 分隔，按 AND 组合。
+
+索引说明：GIN(jsonb_path_ops) 只能支撑等值条件（``@>`` 以及等值形式的 ``@@``）。
+范围比较和键存在条件逐行求值，不走索引；``!=`` 同样无法使用索引。
+case_config 的键不固定，因此没有为具体键建立 btree 表达式索引，
+大表上应与至少一个等值条件组合使用。
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+from django.db import NotSupportedError
+from django.db.models import JSONField, Lookup
+
+
+# 条件之间的分隔符
+CLAUSE_SEPARATOR = ';'
+
+# 键路径前缀
+KEY_PREFIX = 'config.'
+
+# 需要走 jsonpath 的范围比较运算符
+RANGE_OPERATORS = ('>=', '<=', '>', '<')
+
+_KEY_SEGMENT = re.compile(r'^[A-Za-z0-9_\-]+$')
+_CLAUSE = re.compile(
+    r'^(?P<path>[^<>=!]+?)\s*(?:(?P<op>>=|<=|!=|=|>|<)\s*(?P<value>.*))?$'
+)
+
+
+class ConfigFilterError(ValueError):
+    """配置过滤表达式无效"""
+    pass
+
+
+# ============================================================================
+# JSONPath Lookups（@@ 范围比较与 @? 不走 jsonb_path_ops 索引）
+# ============================================================================
+
+class _JsonPathLookup(Lookup):
+    """jsonpath 查询基类，仅支持 PostgreSQL"""
+    prepare_rhs = False
+    operator = None
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(f"'{self.lookup_name}' lookup is only supported on PostgreSQL")
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} {self.operator} {rhs}::jsonpath', (*lhs_params, *rhs_params)
+
+
+@JSONField.register_lookup
+class JsonPathMatch(_JsonPathLookup):
+    """jsonpath 谓词匹配: ``field @@ path``"""
+    lookup_name = 'jsonpath_match'
+    operator = '@@'
+
+
+@JSONField.register_lookup
+class JsonPathExists(_JsonPathLookup):
+    """jsonpath 存在匹配: ``field @? path``"""
+    lookup_name = 'jsonpath_exists'
+    operator = '@?'
+
+
+# ============================================================================
+# 表达式解析
+# ============================================================================
+
+@dataclass(frozen=True)
+class ConfigClause:
+    """单个过滤条件"""
+    path: Tuple[str, ...]
+    op: str = None
+    value: Any = None
+
+    @property
+    def jsonpath(self) -> str:
+        """键路径对应的 jsonpath（键名统一加引号）"""
+        return '$' + ''.join(f'.{_quote(segment)}' for segment in self.path)
+
+    def as_containment(self) -> dict:
+        """构造 @> 使用的嵌套字典"""
+        document = self.value
+        for segment in reversed(self.path):
+            document = {segment: document}
+        return document
+
+    def apply(self, queryset, field: str = 'case_config'):
+        """将条件应用到 QuerySet"""
+        if self.op is None:
+            return queryset.filter(**{f'{field}__jsonpath_exists': self.jsonpath})
+        if self.op == '=':
+            return queryset.filter(**{f'{field}__contains': self.as_containment()})
+        if self.op == '!=':
+            return queryset.exclude(**{f'{field}__contains': self.as_containment()})
+        literal = json.dumps(self.value, ensure_ascii=False)
+        return queryset.filter(**{f'{field}__jsonpath_match': f'{self.jsonpath} {self.op} {literal}'})
+
+
+def _quote(segment: str) -> str:
+    return '"' + segment.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _parse_value(raw: str) -> Any:
+    """解析值：JSON 字面量（数字、true/false/null、带引号字符串），否则视为字符串"""
+    raw = raw.strip()
+    if not raw:
+        raise ConfigFilterError('Missing value')
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def parse_config_filter(expression: str) -> List[ConfigClause]:
+    """
+    解析配置过滤表达式
+
+    Args:
+        expression: 如 ``config.env=gpu;config.timeout>300``
+
+    Returns:
+        ConfigClause 列表
+
+    Raises:
+        ConfigFilterError: 表达式无效
+    """
+    clauses = []
+    for part in (expression or '').split(CLAUSE_SEPARATOR):
+        part = part.strip()
+        if not part:
+            continue
+
+        match = _CLAUSE.match(part)
+        if not match:
+            raise ConfigFilterError(f"Invalid filter clause: '{part}'")
+
+        path = match.group('path').strip()
+        if not path.startswith(KEY_PREFIX):
+            raise ConfigFilterError(f"Filter key must start with '{KEY_PREFIX}': '{part}'")
+        segments = tuple(path[len(KEY_PREFIX):].split('.'))
+        if not all(_KEY_SEGMENT.match(s) for s in segments):
+            raise ConfigFilterError(f"Invalid filter key: '{path}'")
+
+        op = match.group('op')
+        if op is None:
+            clauses.append(ConfigClause(path=segments))
+            continue
+
+        try:
+            value = _parse_value(match.group('value'))
+        except ConfigFilterError as e:
+            raise ConfigFilterError(f"{e} in clause '{part}'")
+        if op in RANGE_OPERATORS and (value is None or isinstance(value, (dict, list, bool))):
+            raise ConfigFilterError(f"Operator '{op}' requires a number or string: '{part}'")
+        clauses.append(ConfigClause(path=segments, op=op, value=value))
+
+    return clauses
+
+
+def apply_config_filter(queryset, expression: str, field: str = 'case_config'):
+    """解析表达式并应用到 QuerySet（按 AND 组合）"""
+    for clause in parse_config_filter(expression):
+        queryset = clause.apply(queryset, field)
+    return queryset
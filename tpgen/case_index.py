@@ -0,0 +1,244 @@
+"""
+Test Case Autocomplete Index
+测试用例自动完成索引
+
+每个 worker 进程在内存中维护一份 TestCase.case_name / TestComponent.component_name /
+TestType.type_name 的三元组（trigram）索引，搜索框每次按键都直接在内存中完成排序匹配，
+不再访问 PostgreSQL。
+
+数据变更时由信号（tpgen.signals）在 Redis 缓存中递增版本号；各 worker 按
+VERSION_CHECK_INTERVAL 节流检查版本号，发现变化后重建索引。
+"""
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from loguru import logger
+
+from . import models
+
+
+# Redis 中保存索引版本号的键
+VERSION_CACHE_KEY = 'tpgen_case_index_version'
+
+# 两次检查 Redis 版本号的最小间隔（秒）
+VERSION_CHECK_INTERVAL = 1.0
+
+# 默认返回数量（与原 ILIKE 查询保持一致）
+DEFAULT_LIMIT = 50
+
+# 三元组长度；更短的关键字退化为扫描词表
+GRAM_SIZE = 3
+
+# 视为单词边界的字符（用于"单词前缀"排序）
+WORD_SEPARATORS = frozenset(' -_./:()[]')
+
+# 匹配字段（数值越小排序越靠前）
+FIELD_CASE, FIELD_COMPONENT, FIELD_TYPE = 0, 1, 2
+
+# 匹配方式（数值越小排序越靠前）
+MATCH_EXACT, MATCH_PREFIX, MATCH_WORD_PREFIX, MATCH_CONTAINS = 0, 1, 2, 3
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _match_kind(text: str, keyword: str) -> int:
+    if text == keyword:
+        return MATCH_EXACT
+    if text.startswith(keyword):
+        return MATCH_PREFIX
+    start = text.find(keyword)
+    while start > 0:
+        if text[start - 1] in WORD_SEPARATORS:
+            return MATCH_WORD_PREFIX
+        start = text.find(keyword, start + 1)
+    return MATCH_CONTAINS
+
+
+class _Snapshot:
+    """一次构建出的只读索引快照（整体替换，读取无需加锁）"""
+    __slots__ = ('version', 'entries', 'sort_keys', 'vocab', 'owners', 'grams')
+
+    def __init__(self, version):
+        self.version = version
+        self.entries: List[Dict] = []
+        self.sort_keys: List[str] = []
+        self.vocab: List[str] = []
+        self.owners: List[List[Tuple[int, int]]] = []
+        self.grams: Dict[str, List[int]] = {}
+
+
+class CaseSearchIndex:
+    """测试用例自动完成索引"""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._known_version = None
+        self._checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # 版本管理
+    # ------------------------------------------------------------------
+
+    def _remote_version(self):
+        """读取 Redis 中的版本号（节流）"""
+        now = time.monotonic()
+        if now - self._checked_at >= VERSION_CHECK_INTERVAL:
+            try:
+                self._known_version = cache.get(VERSION_CACHE_KEY, 0)
+            except Exception as e:
+                logger.warning(f"Failed to read case index version: {e}")
+            self._checked_at = now
+        return self._known_version
+
+    def invalidate(self) -> None:
+        """使本 worker 的索引在下次查询时重建"""
+        self._snapshot = None
+
+    def publish(self) -> None:
+        """递增 Redis 中的版本号，通知所有 worker 重建"""
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"Failed to publish case index version: {e}")
+        self._checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    def _get_snapshot(self) -> _Snapshot:
+        version = self._remote_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._build(version)
+                self._snapshot = snapshot
+        return snapshot
+
+    def warm(self) -> None:
+        """预先构建索引（worker 启动时调用）"""
+        try:
+            self._get_snapshot()
+        except Exception as e:
+            logger.warning(f"Failed to warm case index: {e}")
+
+    def _build(self, version) -> _Snapshot:
+        started = time.perf_counter()
+        snapshot = _Snapshot(version)
+        vocab_ids: Dict[str, int] = {}
+
+        def add_term(text: str, entry_idx: int, field: int) -> None:
+            if not text:
+                return
+            term = text.lower()
+            term_id = vocab_ids.get(term)
+            if term_id is None:
+                term_id = vocab_ids[term] = len(snapshot.vocab)
+                snapshot.vocab.append(term)
+                snapshot.owners.append([])
+                for gram in _grams(term):
+                    snapshot.grams.setdefault(gram, []).append(term_id)
+            snapshot.owners[term_id].append((entry_idx, field))
+
+        rows = (
+            models.TestCase.objects
+            .order_by('case_name', 'id')
+            .values_list(
+                'id', 'case_name', 'test_component_id',
+                'test_component__component_name', 'test_component__component_category',
+                'test_component__test_type_id', 'test_component__test_type__type_name',
+            )
+            .iterator(chunk_size=5000)
+        )
+        for case_id, case_name, component_id, component_name, category, type_id, type_name in rows:
+            entry_idx = len(snapshot.entries)
+            snapshot.entries.append({
+                'id': case_id,
+                'caseName': case_name,
+                'componentId': component_id,
+                'componentName': component_name or '',
+                'category': category or '',
+                'testTypeId': type_id,
+                'testTypeName': type_name or '',
+            })
+            snapshot.sort_keys.append(case_name.lower())
+            add_term(case_name, entry_idx, FIELD_CASE)
+            add_term(component_name, entry_idx, FIELD_COMPONENT)
+            add_term(type_name, entry_idx, FIELD_TYPE)
+
+        logger.info(
+            f"Case index built: {len(snapshot.entries)} cases, {len(snapshot.vocab)} terms, "
+            f"{len(snapshot.grams)} grams in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def _candidate_terms(self, snapshot: _Snapshot, keyword: str) -> List[int]:
+        if len(keyword) < GRAM_SIZE:
+            return [i for i, term in enumerate(snapshot.vocab) if keyword in term]
+
+        postings = []
+        for gram in _grams(keyword):
+            posting = snapshot.grams.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        # 三元组命中只是必要条件，最终以子串校验为准
+        return [i for i in candidates if keyword in snapshot.vocab[i]]
+
+    def search(self, keyword: str = '', limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """
+        搜索测试用例
+
+        Args:
+            keyword: 关键字（大小写不敏感，匹配用例名、组件名、测试类型名）
+            limit: 最大返回数量
+
+        Returns:
+            按相关度排序的用例字典列表（格式与 /test-case/search 一致）
+        """
+        snapshot = self._get_snapshot()
+        keyword = (keyword or '').strip().lower()
+        if not keyword:
+            return snapshot.entries[:limit]
+
+        best: Dict[int, Tuple[int, int]] = {}
+        for term_id in self._candidate_terms(snapshot, keyword):
+            kind = _match_kind(snapshot.vocab[term_id], keyword)
+            for entry_idx, field in snapshot.owners[term_id]:
+                rank = (kind, field)
+                current = best.get(entry_idx)
+                if current is None or rank < current:
+                    best[entry_idx] = rank
+
+        ranked = heapq.nsmallest(
+            limit,
+            best.items(),
+            key=lambda item: (item[1], snapshot.sort_keys[item[0]], item[0]),
+        )
+        return [snapshot.entries[entry_idx] for entry_idx, _ in ranked]
+
+
+# 每个 worker 进程一份的全局索引实例
+case_search_index = CaseSearchIndex()
@@ -2,7 +2,7 @@
 清理 TPGen 示例数据 Management Command
 """
 from django.core.management.base import BaseCommand
-from tpgen import models
+from tpgen import bulk_delete, models
 
 
 class Command(BaseCommand):
@@ -46,10 +46,11 @@ class Command(BaseCommand):
                 "test-gpu-001", "test-gpu-002", "test-gpu-003",
                 "test-gpu-004", "test-gpu-005"
             ]
-            deleted_devices = models.SutDevice.objects.filter(
+            device_ids = list(models.SutDevice.objects.filter(
                 hostname__in=sample_devices
-            ).delete()
-            self.stdout.write(f"  ✓ 删除了 {deleted_devices[0]} 条 SutDevice 记录")
+            ).values_list('id', flat=True))
+            deleted_devices = bulk_delete.CascadeDelete.for_devices(device_ids).run()
+            self.stdout.write(f"  ✓ 删除了 {deleted_devices.get('tpgen.SutDevice', 0)} 条 SutDevice 记录")
             
             # 删除示例 TestType 及相关数据
             self.stdout.write("\n🗑️  删除示例 TestType...")
@@ -92,29 +93,10 @@ class Command(BaseCommand):
         self.stdout.write("=" * 80)
         
         try:
-            # 删除所有 TestCase
-            count = models.TestCase.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 TestCase 记录")
-            
-            # 删除所有 TestComponent
-            count = models.TestComponent.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 TestComponent 记录")
-            
-            # 删除所有 TestType
-            count = models.TestType.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 TestType 记录")
-            
-            # 删除所有 OsSupportedKernel
-            count = models.OsSupportedKernel.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 OsSupportedKernel 记录")
-            
-            # 删除所有 OsConfig
-            count = models.OsConfig.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 OsConfig 记录")
-            
-            # 删除所有 SutDevice
-            count = models.SutDevice.objects.all().delete()[0]
-            self.stdout.write(f"  ✓ 删除了 {count} 条 SutDevice 记录")
+            # 集合式删除，不把级联对象加载到内存
+            bulk_delete.purge_all(
+                progress=lambda label, count: self.stdout.write(f"  ✓ 删除了 {count} 条 {label.split('.')[-1]} 记录")
+            )
             
             self.stdout.write("\n" + "=" * 80)
             self.stdout.write(self.style.SUCCESS("✅ 所有数据清理完成！"))
@@ -0,0 +1,53 @@
+"""
+重建测试计划摘要表 Management Command
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from tpgen import models
+
+
+class Command(BaseCommand):
+    help = '重建测试计划摘要表（test_plan_summaries）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plan-id',
+            type=int,
+            action='append',
+            dest='plan_ids',
+            help='只重建指定的测试计划（可重复指定）',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='只为没有摘要行的测试计划补建摘要（批量导入等绕过信号的写入）',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='配合 --missing 周期性执行的间隔秒数（默认 0：只执行一次）',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] if options['missing'] else 0
+        while True:
+            try:
+                if options['missing']:
+                    written = models.TestPlanSummary.build_missing()
+                    self.stdout.write(self.style.SUCCESS(f"✅ 已补建 {written} 条测试计划摘要"))
+                else:
+                    written = models.TestPlanSummary.rebuild(plan_ids=options.get('plan_ids'))
+                    self.stdout.write(self.style.SUCCESS(f"✅ 已重建 {written} 条测试计划摘要"))
+            except Exception as e:
+                if interval <= 0:
+                    raise
+                # 周期运行时单次失败（例如数据库暂时不可用）不退出
+                self.stderr.write(self.style.ERROR(f"❌ 补建失败: {e}"))
+            if interval <= 0:
+                break
+            time.sleep(interval)
+            # 长时间运行时丢弃已超时或失效的数据库连接
+            close_old_connections()
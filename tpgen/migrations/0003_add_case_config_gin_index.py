@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tpgen', '0002_add_product_name_to_sut_device'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testcase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['case_config'], name='idx_test_cases_config_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
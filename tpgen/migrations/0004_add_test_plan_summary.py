@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# 初始化摘要数据（集合操作一次写入）
+POPULATE_SUMMARIES_SQL = """
+INSERT INTO test_plan_summaries (
+    test_plan_id, plan_name, plan_description,
+    sut_device_id, hostname, asic_name,
+    os_config_id, os_family, os_version,
+    case_count, total_timeout, created_by, created_at, updated_at
+)
+SELECT p.id, p.plan_name, p.plan_description,
+       d.id, d.hostname, d.asic_name,
+       o.id, o.os_family, o.version,
+       COUNT(pc.id), COALESCE(SUM(pc.timeout), 0), p.created_by, p.created_at, p.updated_at
+FROM test_plans p
+JOIN sut_devices d ON d.id = p.sut_device_id
+JOIN os_configs o ON o.id = p.os_config_id
+LEFT JOIN test_plan_cases pc ON pc.test_plan_id = p.id
+GROUP BY p.id, p.plan_name, p.plan_description,
+         d.id, d.hostname, d.asic_name,
+         o.id, o.os_family, o.version,
+         p.created_by, p.created_at, p.updated_at
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tpgen', '0003_add_case_config_gin_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestPlanSummary',
+            fields=[
+                ('test_plan', models.OneToOneField(db_comment='关联的测试计划ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='tpgen.testplan')),
+                ('plan_name', models.CharField(db_comment='测试计划名称', max_length=255)),
+                ('plan_description', models.TextField(blank=True, db_comment='测试计划描述', null=True)),
+                ('sut_device_id', models.BigIntegerField(db_comment='测试设备ID')),
+                ('hostname', models.CharField(db_comment='设备主机名', max_length=255)),
+                ('asic_name', models.CharField(blank=True, db_comment='ASIC名称', max_length=255, null=True)),
+                ('os_config_id', models.BigIntegerField(db_comment='操作系统配置ID')),
+                ('os_family', models.CharField(db_comment='操作系统家族', max_length=100)),
+                ('os_version', models.CharField(db_comment='操作系统版本', max_length=50)),
+                ('case_count', models.IntegerField(db_comment='用例数量', default=0)),
+                ('total_timeout', models.BigIntegerField(db_comment='用例超时时长合计（秒）', default=0)),
+                ('created_by', models.CharField(blank=True, db_comment='创建者', max_length=100, null=True)),
+                ('created_at', models.DateTimeField(db_comment='测试计划创建时间')),
+                ('updated_at', models.DateTimeField(db_comment='测试计划更新时间')),
+            ],
+            options={
+                'db_table': 'test_plan_summaries',
+                'db_table_comment': '测试计划摘要表（反规范化读模型）',
+                'indexes': [models.Index(fields=['-created_at'], name='idx_plan_summaries_created'), models.Index(fields=['plan_name'], name='idx_plan_summaries_name'), models.Index(fields=['sut_device_id'], name='idx_plan_summaries_device'), models.Index(fields=['os_config_id'], name='idx_plan_summaries_os')],
+            },
+        ),
+        migrations.RunSQL(POPULATE_SUMMARIES_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
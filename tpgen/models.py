@@ -2,6 +2,7 @@
 Test Plan Generator Models
 测试计划生成器模型
 """
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -160,6 +161,7 @@ class TestCase(ModelSaveMixin, models.Model):
         indexes = [
             models.Index(fields=['test_component'], name='idx_test_cases_component'),
             models.Index(fields=['case_name'], name='idx_test_cases_case_name'),
+            GinIndex(fields=['case_config'], name='idx_test_cases_config_gin', opclasses=['jsonb_path_ops']),
         ]
 
     def __str__(self):
@@ -227,3 +229,143 @@ class TestPlanCase(models.Model):
 
     def __str__(self):
         return f'<Plan: {self.test_plan.plan_name}, Case: {self.test_case.case_name}>'
+
+
+class TestPlanSummary(models.Model):
+    """
+    测试计划摘要表 - 测试计划列表的反规范化读模型
+
+    冗余保存设备、操作系统信息以及用例数量/总超时，测试计划列表只需一次索引查询。
+    由 tpgen.signals 在 TestPlan / TestPlanCase / SutDevice / OsConfig 变更时增量维护，
+    缺失的摘要行在读取列表时补建；绕过信号修改已有计划的场景可执行
+    ``python manage.py rebuild_plan_summaries`` 重建。
+    """
+    test_plan = models.OneToOneField(
+        TestPlan,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+        db_comment='关联的测试计划ID'
+    )
+    plan_name = models.CharField(max_length=255, db_comment='测试计划名称')
+    plan_description = models.TextField(blank=True, null=True, db_comment='测试计划描述')
+    sut_device_id = models.BigIntegerField(db_comment='测试设备ID')
+    hostname = models.CharField(max_length=255, db_comment='设备主机名')
+    asic_name = models.CharField(max_length=255, blank=True, null=True, db_comment='ASIC名称')
+    os_config_id = models.BigIntegerField(db_comment='操作系统配置ID')
+    os_family = models.CharField(max_length=100, db_comment='操作系统家族')
+    os_version = models.CharField(max_length=50, db_comment='操作系统版本')
+    case_count = models.IntegerField(default=0, db_comment='用例数量')
+    total_timeout = models.BigIntegerField(default=0, db_comment='用例超时时长合计（秒）')
+    created_by = models.CharField(max_length=100, blank=True, null=True, db_comment='创建者')
+    created_at = models.DateTimeField(db_comment='测试计划创建时间')
+    updated_at = models.DateTimeField(db_comment='测试计划更新时间')
+
+    class Meta:
+        db_table = 'test_plan_summaries'
+        db_table_comment = '测试计划摘要表（反规范化读模型）'
+        indexes = [
+            models.Index(fields=['-created_at'], name='idx_plan_summaries_created'),
+            models.Index(fields=['plan_name'], name='idx_plan_summaries_name'),
+            models.Index(fields=['sut_device_id'], name='idx_plan_summaries_device'),
+            models.Index(fields=['os_config_id'], name='idx_plan_summaries_os'),
+        ]
+
+    def __str__(self):
+        return f'<{self.test_plan_id}, {self.plan_name}, cases={self.case_count}>'
+
+    @staticmethod
+    def _plan_fields(plan) -> dict:
+        """从测试计划（已 select_related 设备和 OS）提取冗余字段"""
+        return {
+            'plan_name': plan.plan_name,
+            'plan_description': plan.plan_description,
+            'sut_device_id': plan.sut_device_id,
+            'hostname': plan.sut_device.hostname,
+            'asic_name': plan.sut_device.asic_name,
+            'os_config_id': plan.os_config_id,
+            'os_family': plan.os_config.os_family,
+            'os_version': plan.os_config.version,
+            'created_by': plan.created_by,
+            'created_at': plan.created_at,
+            'updated_at': plan.updated_at,
+        }
+
+    @classmethod
+    def sync_plan(cls, plan):
+        """测试计划新增/修改时同步冗余字段（不重新统计用例）"""
+        plan = TestPlan.objects.select_related('sut_device', 'os_config').get(pk=plan.pk)
+        summary, created = cls.objects.update_or_create(
+            test_plan_id=plan.pk,
+            defaults=cls._plan_fields(plan),
+        )
+        if created:
+            cls.recount(plan.pk)
+        return summary
+
+    @classmethod
+    def apply_case_delta(cls, plan_id: int, count: int, timeout: int):
+        """用例关联增删时增量调整计数"""
+        cls.objects.filter(test_plan_id=plan_id).update(
+            case_count=models.F('case_count') + count,
+            total_timeout=models.F('total_timeout') + timeout,
+        )
+
+    @classmethod
+    def recount(cls, plan_id: int):
+        """重新统计单个测试计划的用例数量和总超时"""
+        stats = TestPlanCase.objects.filter(test_plan_id=plan_id).aggregate(
+            count=models.Count('id'),
+            timeout=models.Sum('timeout'),
+        )
+        cls.objects.filter(test_plan_id=plan_id).update(
+            case_count=stats['count'] or 0,
+            total_timeout=stats['timeout'] or 0,
+        )
+
+    @classmethod
+    def build_missing(cls) -> int:
+        """为没有摘要行的测试计划（批量导入、绕过信号写入等）补建摘要，返回写入行数"""
+        missing = list(TestPlan.objects.filter(summary__isnull=True).values_list('pk', flat=True))
+        if not missing:
+            return 0
+        return cls.rebuild(plan_ids=missing)
+
+    @classmethod
+    def rebuild(cls, plan_ids=None, batch_size: int = 1000) -> int:
+        """全量（或按计划ID）重建摘要，返回写入行数"""
+        plans = (
+            TestPlan.objects.select_related('sut_device', 'os_config')
+            .annotate(
+                _case_count=models.Count('plan_cases'),
+                _total_timeout=models.Sum('plan_cases__timeout'),
+            )
+            .order_by('pk')
+        )
+        if plan_ids is not None:
+            plans = plans.filter(pk__in=plan_ids)
+
+        written = 0
+        batch = []
+        update_fields = [
+            'plan_name', 'plan_description', 'sut_device_id', 'hostname', 'asic_name',
+            'os_config_id', 'os_family', 'os_version', 'case_count', 'total_timeout',
+            'created_by', 'created_at', 'updated_at',
+        ]
+        for plan in plans.iterator(chunk_size=batch_size):
+            batch.append(cls(
+                test_plan_id=plan.pk,
+                case_count=plan._case_count or 0,
+                total_timeout=plan._total_timeout or 0,
+                **cls._plan_fields(plan),
+            ))
+            if len(batch) >= batch_size:
+                cls.objects.bulk_create(batch, update_conflicts=True,
+                                        unique_fields=['test_plan'], update_fields=update_fields)
+                written += len(batch)
+                batch = []
+        if batch:
+            cls.objects.bulk_create(batch, update_conflicts=True,
+                                    unique_fields=['test_plan'], update_fields=update_fields)
+            written += len(batch)
+        return written
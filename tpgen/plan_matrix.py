@@ -0,0 +1,254 @@
+"""
+Test Plan Matrix Expansion
+测试计划矩阵展开引擎
+
+根据选择条件在服务端展开 设备 × OS 配置 × 内核 × 测试用例 的笛卡尔积。
+各维度只加载一次（紧凑元组），组合本身通过生成器惰性产生，
+无论组合数量多大都不会整体驻留内存。
+"""
+import itertools
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from django.db.models import Q
+
+from . import models
+
+
+# 每批输出的作业数量（流式输出时合并为一个数据块）
+STREAM_BATCH_SIZE = 500
+
+# 数据库迭代时的分块大小
+QUERY_CHUNK_SIZE = 2000
+
+# 支持的导出格式
+EXPORT_FORMATS = ('jsonl', 'yaml')
+
+
+def _unique(values) -> list:
+    """保持顺序去重"""
+    return list(dict.fromkeys(v for v in (values or []) if v not in (None, '')))
+
+
+@dataclass
+class MatrixSelection:
+    """矩阵展开的选择条件"""
+    sut_device_ids: List[int] = field(default_factory=list)
+    product_name: Optional[str] = None
+    asic_name: Optional[str] = None
+    os_config_ids: List[int] = field(default_factory=list)
+    kernel_versions: List[str] = field(default_factory=list)
+    test_type_ids: List[int] = field(default_factory=list)
+    test_component_ids: List[int] = field(default_factory=list)
+    test_case_ids: List[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.sut_device_ids = _unique(self.sut_device_ids)
+        self.os_config_ids = _unique(self.os_config_ids)
+        self.kernel_versions = _unique(self.kernel_versions)
+        self.test_type_ids = _unique(self.test_type_ids)
+        self.test_component_ids = _unique(self.test_component_ids)
+        self.test_case_ids = _unique(self.test_case_ids)
+
+
+class PlanMatrix:
+    """
+    测试计划矩阵
+
+    用法:
+        matrix = PlanMatrix(selection)
+        matrix.count()          # 组合总数（不展开）
+        for job in matrix:      # 惰性展开
+            ...
+        matrix.iter_jsonl()     # 流式 JSONL 数据块
+    """
+
+    def __init__(self, selection: MatrixSelection):
+        self.selection = selection
+        self._devices: Optional[List[Tuple]] = None
+        self._environments: Optional[List[Tuple]] = None
+        self._cases: Optional[List[Tuple]] = None
+        self.pruned = 0
+
+    # ------------------------------------------------------------------
+    # 维度解析
+    # ------------------------------------------------------------------
+
+    @property
+    def devices(self) -> List[Tuple]:
+        """设备维度: (id, hostname, asic_name, product_name)"""
+        if self._devices is None:
+            sel = self.selection
+            if not (sel.sut_device_ids or sel.product_name or sel.asic_name):
+                self._devices = []
+            else:
+                queryset = models.SutDevice.objects.all()
+                if sel.sut_device_ids:
+                    queryset = queryset.filter(id__in=sel.sut_device_ids)
+                if sel.product_name:
+                    queryset = queryset.filter(product_name=sel.product_name)
+                if sel.asic_name:
+                    queryset = queryset.filter(asic_name=sel.asic_name)
+                self._devices = list(
+                    queryset.order_by('hostname')
+                    .values_list('id', 'hostname', 'asic_name', 'product_name')
+                    .iterator(chunk_size=QUERY_CHUNK_SIZE)
+                )
+        return self._devices
+
+    @property
+    def environments(self) -> List[Tuple]:
+        """
+        OS/内核维度: (os_config_id, os_family, version, kernel_version)
+
+        约束剪枝：内核必须属于对应的 OS 配置（OsSupportedKernel）。
+        未指定内核过滤时，没有登记内核的 OS 以 kernel_version=None 参与组合。
+        """
+        if self._environments is None:
+            sel = self.selection
+            if not sel.os_config_ids:
+                self._environments = []
+                return self._environments
+
+            os_configs = {
+                c[0]: c
+                for c in models.OsConfig.objects.filter(id__in=sel.os_config_ids)
+                .values_list('id', 'os_family', 'version')
+            }
+            kernels = models.OsSupportedKernel.objects.filter(os_config_id__in=list(os_configs))
+            if sel.kernel_versions:
+                kernels = kernels.filter(kernel_version__in=sel.kernel_versions)
+
+            supported: Dict[int, List[str]] = {}
+            for os_id, kernel_version in kernels.order_by('kernel_version').values_list(
+                'os_config_id', 'kernel_version'
+            ):
+                supported.setdefault(os_id, []).append(kernel_version)
+
+            environments = []
+            for os_id in sel.os_config_ids:
+                config = os_configs.get(os_id)
+                if config is None:
+                    continue
+                versions = supported.get(os_id)
+                if versions:
+                    environments.extend((os_id, config[1], config[2], kv) for kv in versions)
+                elif not sel.kernel_versions:
+                    environments.append((os_id, config[1], config[2], None))
+
+            if sel.kernel_versions:
+                self.pruned = len(os_configs) * len(sel.kernel_versions) - len(environments)
+            self._environments = environments
+        return self._environments
+
+    @property
+    def cases(self) -> List[Tuple]:
+        """
+        用例维度: (id, case_name, component_id, component_name, test_type_id, type_name)
+
+        用例 ID、组件、测试类型三种条件取并集，由单条 SQL 去重。
+        """
+        if self._cases is None:
+            sel = self.selection
+            condition = Q()
+            if sel.test_case_ids:
+                condition |= Q(id__in=sel.test_case_ids)
+            if sel.test_component_ids:
+                condition |= Q(test_component_id__in=sel.test_component_ids)
+            if sel.test_type_ids:
+                condition |= Q(test_component__test_type_id__in=sel.test_type_ids)
+
+            if not condition:
+                self._cases = []
+            else:
+                self._cases = list(
+                    models.TestCase.objects.filter(condition)
+                    .order_by('test_component__test_type__type_name',
+                              'test_component__component_name',
+                              'case_name')
+                    .values_list(
+                        'id', 'case_name',
+                        'test_component_id', 'test_component__component_name',
+                        'test_component__test_type_id', 'test_component__test_type__type_name',
+                    )
+                    .distinct()
+                    .iterator(chunk_size=QUERY_CHUNK_SIZE)
+                )
+        return self._cases
+
+    # ------------------------------------------------------------------
+    # 展开
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        """组合总数（按维度相乘，不展开）"""
+        return len(self.devices) * len(self.environments) * len(self.cases)
+
+    def summary(self) -> Dict[str, int]:
+        """各维度规模统计"""
+        return {
+            'devices': len(self.devices),
+            'environments': len(self.environments),
+            'cases': len(self.cases),
+            'pruned': self.pruned,
+            'total': self.count(),
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        product = itertools.product(self.devices, self.environments, self.cases)
+        for index, (device, env, case) in enumerate(product, start=1):
+            yield {
+                'index': index,
+                'sutDeviceId': device[0],
+                'hostname': device[1],
+                'asicName': device[2],
+                'productName': device[3],
+                'osConfigId': env[0],
+                'osFamily': env[1],
+                'osVersion': env[2],
+                'kernelVersion': env[3],
+                'testCaseId': case[0],
+                'caseName': case[1],
+                'testComponentId': case[2],
+                'componentName': case[3],
+                'testTypeId': case[4],
+                'testTypeName': case[5],
+            }
+
+    def iter_jobs(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Dict]:
+        """按偏移和数量截取作业（用于预览）"""
+        stop = None if limit is None else offset + limit
+        return itertools.islice(iter(self), offset, stop)
+
+    def iter_jsonl(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+        """以 JSONL 数据块流式输出"""
+        return self._iter_batches(
+            lambda job: json.dumps(job, ensure_ascii=False) + '\n',
+            batch_size,
+        )
+
+    def iter_yaml(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+        """以 YAML 序列流式输出（jobs: 下逐项追加）"""
+        yield 'jobs:\n'
+        yield from self._iter_batches(
+            lambda job: yaml.safe_dump([job], allow_unicode=True, sort_keys=False, indent=2),
+            batch_size,
+        )
+
+    def stream(self, fmt: str = 'jsonl') -> Iterator[str]:
+        """按格式选择流式输出"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        return self.iter_yaml() if fmt == 'yaml' else self.iter_jsonl()
+
+    def _iter_batches(self, render, batch_size: int) -> Iterator[str]:
+        buffer = []
+        for job in self:
+            buffer.append(render(job))
+            if len(buffer) >= batch_size:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
@@ -3,7 +3,7 @@ Test Plan Generator Schemas
 测试计划生成器API模式定义
 """
 from ninja import Schema, Field
-from typing import Optional
+from typing import List, Optional
 
 
 # ============================================================================
@@ -156,3 +156,19 @@ class TestPlanCaseOut(Schema):
     test_case_id: int = Field(..., alias='testCaseId')
     timeout: Optional[int] = None
 
+
+
+# PlanMatrix (测试计划矩阵展开)
+class PlanMatrixIn(Schema):
+    """测试计划矩阵展开输入模式"""
+    sut_device_ids: List[int] = Field(default_factory=list, alias='sutDeviceIds')
+    product_name: Optional[str] = Field(None, alias='productName')
+    asic_name: Optional[str] = Field(None, alias='asicName')
+    os_config_ids: List[int] = Field(default_factory=list, alias='osConfigIds')
+    kernel_versions: List[str] = Field(default_factory=list, alias='kernelVersions')
+    test_type_ids: List[int] = Field(default_factory=list, alias='testTypeIds')
+    test_component_ids: List[int] = Field(default_factory=list, alias='testComponentIds')
+    test_case_ids: List[int] = Field(default_factory=list, alias='testCaseIds')
+    format: str = 'jsonl'
+    offset: int = 0
+    limit: int = 20
@@ -0,0 +1,59 @@
+"""
+Test Plan Generator Signals
+测试计划生成器信号处理
+"""
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from tpgen import models
+from tpgen.case_index import case_search_index
+
+
+@receiver(signals.post_save, sender=models.TestCase)
+@receiver(signals.post_save, sender=models.TestComponent)
+@receiver(signals.post_save, sender=models.TestType)
+@receiver(signals.post_delete, sender=models.TestCase)
+@receiver(signals.post_delete, sender=models.TestComponent)
+@receiver(signals.post_delete, sender=models.TestType)
+def refresh_case_index(sender, instance, **kwargs):
+    # 本 worker 立即失效；事务提交后再通知其他 worker
+    case_search_index.invalidate()
+    transaction.on_commit(case_search_index.publish)
+
+
+@receiver(signals.post_save, sender=models.TestPlan)
+def sync_plan_summary(sender, instance, **kwargs):
+    models.TestPlanSummary.sync_plan(instance)
+
+
+@receiver(signals.post_save, sender=models.TestPlanCase)
+def update_summary_after_plan_case_save(sender, instance, created, **kwargs):
+    if created:
+        models.TestPlanSummary.apply_case_delta(instance.test_plan_id, 1, instance.timeout or 0)
+    else:
+        # 修改超时较少见，直接重新统计该计划
+        models.TestPlanSummary.recount(instance.test_plan_id)
+
+
+@receiver(signals.post_delete, sender=models.TestPlanCase)
+def update_summary_after_plan_case_delete(sender, instance, **kwargs):
+    models.TestPlanSummary.apply_case_delta(instance.test_plan_id, -1, -(instance.timeout or 0))
+
+
+@receiver(signals.post_save, sender=models.SutDevice)
+def update_summary_after_device_save(sender, instance, created, **kwargs):
+    if not created:
+        models.TestPlanSummary.objects.filter(sut_device_id=instance.id).update(
+            hostname=instance.hostname,
+            asic_name=instance.asic_name,
+        )
+
+
+@receiver(signals.post_save, sender=models.OsConfig)
+def update_summary_after_os_config_save(sender, instance, created, **kwargs):
+    if not created:
+        models.TestPlanSummary.objects.filter(os_config_id=instance.id).update(
+            os_family=instance.os_family,
+            os_version=instance.version,
+        )
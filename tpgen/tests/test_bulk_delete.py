@@ -0,0 +1,154 @@
+"""
+TPGEN 集合式级联删除测试
+测试 CascadeDelete 的级联顺序、分批删除、后台任务进度和删除接口
+"""
+import time
+
+import pytest
+from django.test import Client
+
+from tpgen import bulk_delete
+from tpgen.models import (
+    SutDevice, OsConfig, TestType, TestComponent, TestCase,
+    TestPlan, TestPlanCase, TestPlanSummary
+)
+
+
+@pytest.fixture
+def api_client():
+    """创建测试客户端（无需认证）"""
+    return Client()
+
+
+@pytest.fixture
+def cascade_data(db):
+    """创建一台设备、两个测试计划以及关联用例"""
+    ts = str(int(time.time() * 1000000))[-8:]
+    device = SutDevice.objects.create(hostname=f'del-host-{ts}', asic_name='Navi31')
+    os_config = OsConfig.objects.create(os_family=f'DelUbuntu-{ts}', version='22.04')
+    test_type = TestType.objects.create(type_name=f'DelType-{ts}')
+    component = TestComponent.objects.create(test_type=test_type, component_name=f'del-comp-{ts}')
+    cases = [
+        TestCase.objects.create(test_component=component, case_name=f'del-case-{i}')
+        for i in range(5)
+    ]
+    plans = [
+        TestPlan.objects.create(plan_name=f'del-plan-{i}-{ts}', sut_device=device, os_config=os_config)
+        for i in range(2)
+    ]
+    TestPlanCase.objects.bulk_create([
+        TestPlanCase(test_plan=plan, test_case=case, timeout=10)
+        for plan in plans for case in cases
+    ])
+    return {'device': device, 'plans': plans, 'cases': cases}
+
+
+@pytest.mark.django_db
+class TestCascadeDelete:
+    """测试集合式级联删除"""
+
+    def test_device_cascade(self, cascade_data):
+        """删除设备时按顺序删除计划用例、摘要和计划"""
+        device = cascade_data['device']
+        progress = []
+        details = bulk_delete.CascadeDelete.for_devices([device.id]).run(
+            batch_size=3, progress=progress.append
+        )
+        assert details == {
+            'tpgen.TestPlanCase': 10,
+            'tpgen.TestPlanSummary': 2,
+            'tpgen.TestPlan': 2,
+            'tpgen.SutDevice': 1,
+        }
+        assert progress == [3, 6, 9, 10]
+        assert not TestPlan.objects.filter(sut_device_id=device.id).exists()
+        assert TestCase.objects.filter(id__in=[c.id for c in cascade_data['cases']]).count() == 5
+
+    def test_plan_cascade_keeps_other_plans(self, cascade_data):
+        """删除单个计划不影响同设备的其他计划"""
+        deleted_plan, kept_plan = cascade_data['plans']
+        details = bulk_delete.CascadeDelete.for_plans([deleted_plan.id]).run()
+        assert details['tpgen.TestPlan'] == 1
+        assert TestPlanCase.objects.filter(test_plan=kept_plan).count() == 5
+        assert TestPlanSummary.objects.filter(test_plan=kept_plan).exists()
+        assert not TestPlanSummary.objects.filter(test_plan_id=deleted_plan.id).exists()
+
+    def test_large_cascade_runs_as_job(self, cascade_data, monkeypatch):
+        """超过阈值时返回任务 ID，任务完成后可查询进度"""
+        started = []
+        monkeypatch.setattr(bulk_delete.threading, 'Thread',
+                            lambda target, args, **kwargs: started.append(args) or _NoopThread())
+        cascade = bulk_delete.CascadeDelete.for_devices([cascade_data['device'].id])
+        result = bulk_delete.delete(cascade, threshold=5)
+        assert result['status'] == bulk_delete.JOB_PENDING
+        assert result['total'] == 10
+
+        job, job_cascade = started[0]
+        bulk_delete.run_job(job, job_cascade, batch_size=4)
+        job = bulk_delete.get_job(result['jobId'])
+        assert job['status'] == bulk_delete.JOB_DONE
+        assert job['progress'] == 10
+        assert job['deleted'] == 15
+
+    def test_stale_job_marked_failed(self, cascade_data, monkeypatch):
+        """worker 中断后心跳不再更新，查询时标记为 failed"""
+        monkeypatch.setattr(bulk_delete.threading, 'Thread', lambda *args, **kwargs: _NoopThread())
+        cascade = bulk_delete.CascadeDelete.for_devices([cascade_data['device'].id])
+        result = bulk_delete.delete(cascade, threshold=5)
+        assert bulk_delete.get_job(result['jobId'])['status'] == bulk_delete.JOB_PENDING
+
+        now = time.time()
+        monkeypatch.setattr(bulk_delete.time, 'time', lambda: now + bulk_delete.JOB_STALE_TIMEOUT + 1)
+        job = bulk_delete.get_job(result['jobId'])
+        assert job['status'] == bulk_delete.JOB_FAILED
+        assert job['error']
+
+    def test_sync_and_job_responses_match(self, cascade_data, monkeypatch):
+        """同步删除和后台任务返回相同的字段"""
+        monkeypatch.setattr(bulk_delete.threading, 'Thread', lambda *args, **kwargs: _NoopThread())
+        plans = cascade_data['plans']
+        job = bulk_delete.delete(bulk_delete.CascadeDelete.for_plans([plans[0].id]), threshold=0)
+        done = bulk_delete.delete(bulk_delete.CascadeDelete.for_plans([plans[1].id]))
+        assert set(job) == set(done)
+        assert job['jobId'] and job['deleted'] == 0
+        assert done['jobId'] is None and done['status'] == bulk_delete.JOB_DONE and done['deleted'] > 0
+
+    def test_purge_all(self, cascade_data):
+        """清空全部数据时按依赖顺序删除"""
+        deleted = bulk_delete.purge_all(batch_size=4)
+        assert deleted['tpgen.TestPlanCase'] >= 10
+        assert not TestCase.objects.exists()
+        assert not SutDevice.objects.exists()
+        assert not OsConfig.objects.exists()
+
+
+class _NoopThread:
+    def start(self):
+        pass
+
+
+@pytest.mark.django_db
+class TestDeleteAPI:
+    """测试删除接口"""
+
+    def test_delete_device(self, api_client, cascade_data):
+        """批量删除设备接口返回级联删除总数"""
+        spare = SutDevice.objects.create(hostname=f"{cascade_data['device'].hostname}-spare")
+        response = api_client.delete(f"/tp/api/sut-device/{cascade_data['device'].id},{spare.id}")
+        data = response.json()
+        assert data['code'] == 200
+        assert data['data']['deleted'] == 16
+        assert data['data']['details']['tpgen.SutDevice'] == 2
+
+    def test_delete_job_not_found(self, api_client):
+        """查询不存在的任务返回失败"""
+        response = api_client.get('/tp/api/test-plan/delete-jobs/missing')
+        assert response.json()['success'] is False
+
+    def test_delete_single_plan(self, api_client, cascade_data):
+        """单个计划 ID 的删除请求不会被 GET 路由拦截"""
+        plan = cascade_data['plans'][0]
+        response = api_client.delete(f'/tp/api/test-plan/{plan.id}')
+        data = response.json()
+        assert data['code'] == 200
+        assert data['data']['details']['tpgen.TestPlan'] == 1
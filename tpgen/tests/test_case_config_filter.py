@@ -0,0 +1,77 @@
+"""
+TPGEN 用例配置过滤表达式测试
+测试 config.* 过滤 DSL 的解析和基于 JSONB 的查询
+"""
+import pytest
+from django.db import connection
+
+from tpgen.case_config_filter import (
+    ConfigClause, ConfigFilterError, apply_config_filter, parse_config_filter
+)
+from tpgen.models import TestType, TestComponent, TestCase
+
+
+class TestParseConfigFilter:
+    """测试表达式解析"""
+
+    def test_parse_equality_and_range(self):
+        """解析等值和范围比较"""
+        clauses = parse_config_filter('config.env=gpu; config.timeout>300')
+        assert clauses == [
+            ConfigClause(path=('env',), op='=', value='gpu'),
+            ConfigClause(path=('timeout',), op='>', value=300),
+        ]
+
+    def test_parse_nested_key_and_exists(self):
+        """解析嵌套键和键存在条件"""
+        clauses = parse_config_filter('config.gpu.arch="gfx1100";config.resolution')
+        assert clauses[0].as_containment() == {'gpu': {'arch': 'gfx1100'}}
+        assert clauses[1].op is None
+        assert clauses[1].jsonpath == '$."resolution"'
+
+    @pytest.mark.parametrize('expression', [
+        'timeout>300',
+        'config.time out=1',
+        'config.timeout>',
+        'config.flags>[1]',
+        'config.enabled<true',
+    ])
+    def test_parse_invalid(self, expression):
+        """无效表达式抛出 ConfigFilterError"""
+        with pytest.raises(ConfigFilterError):
+            parse_config_filter(expression)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='JSONB 查询需要 PostgreSQL')
+class TestApplyConfigFilter:
+    """测试过滤表达式在 PostgreSQL 上的查询结果"""
+
+    @pytest.fixture
+    def config_cases(self):
+        test_type = TestType.objects.create(type_name='CfgFilterType')
+        component = TestComponent.objects.create(test_type=test_type, component_name='cfg-filter')
+        cases = {
+            'gpu_long': TestCase.objects.create(test_component=component, case_name='gpu-long',
+                                                case_config={'env': 'gpu', 'timeout': 600}),
+            'gpu_short': TestCase.objects.create(test_component=component, case_name='gpu-short',
+                                                 case_config={'env': 'gpu', 'timeout': 60}),
+            'cpu': TestCase.objects.create(test_component=component, case_name='cpu',
+                                           case_config={'env': 'cpu'}),
+        }
+        yield cases
+        TestType.objects.filter(type_name='CfgFilterType').delete()
+
+    def _names(self, expression):
+        queryset = TestCase.objects.filter(test_component__component_name='cfg-filter')
+        return set(apply_config_filter(queryset, expression).values_list('case_name', flat=True))
+
+    def test_containment(self, config_cases):
+        assert self._names('config.env=gpu') == {'gpu-long', 'gpu-short'}
+
+    def test_range(self, config_cases):
+        assert self._names('config.env=gpu;config.timeout>300') == {'gpu-long'}
+
+    def test_exists_and_not_equal(self, config_cases):
+        assert self._names('config.timeout') == {'gpu-long', 'gpu-short'}
+        assert self._names('config.env!=gpu') == {'cpu'}
@@ -0,0 +1,89 @@
+"""
+TPGEN 测试用例自动完成索引测试
+测试 CaseSearchIndex 的匹配、排序和失效刷新
+"""
+import pytest
+from django.core.cache import cache
+
+from tpgen.case_index import CaseSearchIndex, VERSION_CACHE_KEY
+from tpgen.models import TestType, TestComponent, TestCase
+
+
+@pytest.fixture
+def index_data(db):
+    """创建索引测试数据"""
+    benchmark = TestType.objects.create(type_name='IdxBenchmark')
+    clpeak = TestComponent.objects.create(test_type=benchmark, component_category='Compute',
+                                          component_name='idx-clpeak')
+    ffmpeg = TestComponent.objects.create(test_type=benchmark, component_category='Media',
+                                          component_name='idx-ffmpeg')
+    cases = {
+        'sp': TestCase.objects.create(test_component=clpeak, case_name='IdxOpenCL SP'),
+        'dp': TestCase.objects.create(test_component=clpeak, case_name='IdxOpenCL DP'),
+        'h264': TestCase.objects.create(test_component=ffmpeg, case_name='IdxEncode h264'),
+        'exact': TestCase.objects.create(test_component=ffmpeg, case_name='idxopencl'),
+    }
+    yield cases
+    TestType.objects.filter(type_name='IdxBenchmark').delete()
+
+
+@pytest.mark.django_db
+class TestCaseSearchIndex:
+    """测试 CaseSearchIndex"""
+
+    def test_ranking(self, index_data):
+        """完全匹配 > 前缀匹配 > 子串匹配"""
+        index = CaseSearchIndex()
+        names = [c['caseName'] for c in index.search('idxopencl')]
+        assert names[0] == 'idxopencl'
+        assert set(names[1:3]) == {'IdxOpenCL DP', 'IdxOpenCL SP'}
+
+    def test_short_keyword_and_word_prefix(self, index_data):
+        """短关键字走词表扫描，单词前缀优先于普通子串"""
+        index = CaseSearchIndex()
+        names = [c['caseName'] for c in index.search('sp', limit=1000)]
+        assert 'IdxOpenCL SP' in names
+
+        ranked = [c['caseName'] for c in index.search('h2', limit=1000)]
+        assert 'IdxEncode h264' in ranked
+
+    def test_matches_component_and_type(self, index_data):
+        """组件名和测试类型名同样可以命中"""
+        index = CaseSearchIndex()
+        names = {c['caseName'] for c in index.search('idx-ffmpeg')}
+        assert names == {'IdxEncode h264', 'idxopencl'}
+        assert len(index.search('IdxBenchmark')) == 4
+
+    def test_result_format(self, index_data):
+        """返回字段与 /test-case/search 一致"""
+        index = CaseSearchIndex()
+        result = index.search('IdxEncode')[0]
+        assert result['id'] == index_data['h264'].id
+        assert result['componentName'] == 'idx-ffmpeg'
+        assert result['category'] == 'Media'
+        assert result['testTypeName'] == 'IdxBenchmark'
+
+    def test_rebuild_on_version_change(self, index_data):
+        """Redis 中版本号变化后重建索引"""
+        index = CaseSearchIndex()
+        assert index.search('IdxNewCase') == []
+
+        TestCase.objects.bulk_create([
+            TestCase(test_component=index_data['sp'].test_component, case_name='IdxNewCase')
+        ])
+        assert index.search('IdxNewCase') == []  # bulk_create 不触发信号，索引仍是旧快照
+
+        cache.set(VERSION_CACHE_KEY, (cache.get(VERSION_CACHE_KEY) or 0) + 1, timeout=None)
+        index._checked_at = 0.0
+        assert [c['caseName'] for c in index.search('IdxNewCase')] == ['IdxNewCase']
+
+    def test_search_api_uses_index(self, client, index_data):
+        """搜索接口在未指定 config 时走内存索引"""
+        from tpgen.case_index import case_search_index
+
+        TestCase.objects.create(test_component=index_data['sp'].test_component, case_name='IdxViaSignal')
+        response = client.get('/tp/api/test-case/search?keyword=IdxViaSignal')
+        data = response.json()
+        assert data['code'] == 200
+        assert [c['caseName'] for c in data['data']] == ['IdxViaSignal']
+        assert case_search_index._snapshot is not None
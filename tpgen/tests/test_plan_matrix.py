@@ -0,0 +1,179 @@
+"""
+TPGEN 测试计划矩阵展开测试
+测试 PlanMatrix 的维度解析、约束剪枝、去重和流式输出
+"""
+import json
+import time
+
+import pytest
+import yaml
+from django.test import Client
+
+from tpgen.models import (
+    SutDevice, OsConfig, OsSupportedKernel,
+    TestType, TestComponent, TestCase
+)
+from tpgen.plan_matrix import MatrixSelection, PlanMatrix
+
+
+@pytest.fixture
+def api_client():
+    """创建测试客户端（无需认证）"""
+    return Client()
+
+
+@pytest.fixture
+def matrix_data(db):
+    """创建矩阵展开所需的示例数据"""
+    ts = str(int(time.time() * 1000000))[-8:]
+    devices = [
+        SutDevice.objects.create(hostname=f'mx-host-{i}-{ts}', asic_name='Navi31', product_name=f'mx-{ts}')
+        for i in range(3)
+    ]
+    ubuntu = OsConfig.objects.create(os_family=f'MxUbuntu-{ts}', version='22.04')
+    rhel = OsConfig.objects.create(os_family=f'MxRHEL-{ts}', version='9')
+    OsSupportedKernel.objects.create(os_config=ubuntu, kernel_version='6.5.0')
+    OsSupportedKernel.objects.create(os_config=ubuntu, kernel_version='6.8.0')
+    OsSupportedKernel.objects.create(os_config=rhel, kernel_version='5.14.0')
+
+    test_type = TestType.objects.create(type_name=f'MxBenchmark-{ts}')
+    component = TestComponent.objects.create(test_type=test_type, component_name=f'mx-clpeak-{ts}')
+    cases = [
+        TestCase.objects.create(test_component=component, case_name=f'mx-case-{i}')
+        for i in range(4)
+    ]
+    return {
+        'product_name': f'mx-{ts}',
+        'devices': devices,
+        'os_configs': [ubuntu, rhel],
+        'test_type': test_type,
+        'component': component,
+        'cases': cases,
+    }
+
+
+@pytest.mark.django_db
+class TestPlanMatrix:
+    """测试 PlanMatrix 展开逻辑"""
+
+    def test_count_matches_expansion(self, matrix_data):
+        """组合数等于实际展开数量"""
+        matrix = PlanMatrix(MatrixSelection(
+            product_name=matrix_data['product_name'],
+            os_config_ids=[c.id for c in matrix_data['os_configs']],
+            test_component_ids=[matrix_data['component'].id],
+        ))
+        # 3 台设备 × (2 + 1) 个 OS/内核 × 4 个用例
+        assert matrix.count() == 36
+        assert sum(1 for _ in matrix) == 36
+
+    def test_kernel_must_belong_to_os(self, matrix_data):
+        """不属于 OS 的内核被剪枝"""
+        ubuntu, rhel = matrix_data['os_configs']
+        matrix = PlanMatrix(MatrixSelection(
+            sut_device_ids=[matrix_data['devices'][0].id],
+            os_config_ids=[ubuntu.id, rhel.id],
+            kernel_versions=['6.5.0'],
+            test_case_ids=[matrix_data['cases'][0].id],
+        ))
+        jobs = list(matrix)
+        assert len(jobs) == 1
+        assert jobs[0]['osConfigId'] == ubuntu.id
+        assert jobs[0]['kernelVersion'] == '6.5.0'
+        assert matrix.summary()['pruned'] == 1
+
+    def test_overlapping_case_selection_is_deduplicated(self, matrix_data):
+        """用例 ID、组件、类型重叠选择时去重"""
+        matrix = PlanMatrix(MatrixSelection(
+            sut_device_ids=[matrix_data['devices'][0].id, matrix_data['devices'][0].id],
+            os_config_ids=[matrix_data['os_configs'][1].id],
+            test_type_ids=[matrix_data['test_type'].id],
+            test_component_ids=[matrix_data['component'].id],
+            test_case_ids=[c.id for c in matrix_data['cases']],
+        ))
+        jobs = list(matrix)
+        assert len(jobs) == 4
+        assert len({job['testCaseId'] for job in jobs}) == 4
+
+    def test_empty_dimension_yields_nothing(self, matrix_data):
+        """缺少任一维度时不产生组合"""
+        matrix = PlanMatrix(MatrixSelection(
+            product_name=matrix_data['product_name'],
+            test_component_ids=[matrix_data['component'].id],
+        ))
+        assert matrix.count() == 0
+        assert list(matrix) == []
+
+    def test_stream_formats(self, matrix_data):
+        """JSONL 与 YAML 流式输出可被完整解析"""
+        selection = MatrixSelection(
+            product_name=matrix_data['product_name'],
+            os_config_ids=[matrix_data['os_configs'][0].id],
+            test_component_ids=[matrix_data['component'].id],
+        )
+        lines = ''.join(PlanMatrix(selection).iter_jsonl(batch_size=5)).splitlines()
+        assert len(lines) == 24
+        assert json.loads(lines[0])['index'] == 1
+
+        document = yaml.safe_load(''.join(PlanMatrix(selection).iter_yaml(batch_size=5)))
+        assert len(document['jobs']) == 24
+
+
+@pytest.mark.django_db
+class TestPlanMatrixAPI:
+    """测试矩阵展开 API"""
+
+    def test_preview(self, api_client, matrix_data):
+        """预览接口返回统计和截取的作业"""
+        payload = {
+            'productName': matrix_data['product_name'],
+            'osConfigIds': [c.id for c in matrix_data['os_configs']],
+            'testTypeIds': [matrix_data['test_type'].id],
+            'limit': 5,
+        }
+        response = api_client.post('/tp/api/test-plan/matrix/preview',
+                                   data=json.dumps(payload), content_type='application/json')
+        data = response.json()
+        assert data['code'] == 200
+        assert data['data']['summary']['total'] == 36
+        assert len(data['data']['list']) == 5
+
+    def test_export_jsonl(self, api_client, matrix_data):
+        """导出接口以流式响应返回 JSONL"""
+        payload = {
+            'sutDeviceIds': [matrix_data['devices'][0].id],
+            'osConfigIds': [matrix_data['os_configs'][1].id],
+            'testCaseIds': [c.id for c in matrix_data['cases']],
+        }
+        response = api_client.post('/tp/api/test-plan/matrix/export',
+                                   data=json.dumps(payload), content_type='application/json')
+        assert response.streaming
+        assert response['X-Total-Count'] == '4'
+        body = b''.join(response.streaming_content).decode('utf-8')
+        assert len(body.splitlines()) == 4
+
+    def test_export_streams_async_under_asgi(self, matrix_data):
+        """ASGI 下导出使用异步迭代器逐块输出，不整体读入内存"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        payload = {
+            'sutDeviceIds': [d.id for d in matrix_data['devices']],
+            'osConfigIds': [c.id for c in matrix_data['os_configs']],
+            'testCaseIds': [c.id for c in matrix_data['cases']],
+        }
+
+        async def export():
+            response = await AsyncClient().post('/tp/api/test-plan/matrix/export',
+                                                data=json.dumps(payload), content_type='application/json')
+            assert response.is_async
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        body = async_to_sync(export)().decode('utf-8')
+        assert len(body.splitlines()) == 36
+
+    def test_export_invalid_format(self, api_client, matrix_data):
+        """不支持的导出格式返回失败"""
+        response = api_client.post('/tp/api/test-plan/matrix/export',
+                                   data=json.dumps({'format': 'xml'}), content_type='application/json')
+        assert response.json()['success'] is False
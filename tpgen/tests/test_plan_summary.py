@@ -0,0 +1,130 @@
+"""
+TPGEN 测试计划摘要表测试
+测试 TestPlanSummary 的信号维护、重建和列表接口
+"""
+import time
+
+import pytest
+from django.test import Client
+
+from tpgen.models import (
+    SutDevice, OsConfig, TestType, TestComponent, TestCase,
+    TestPlan, TestPlanCase, TestPlanSummary
+)
+
+
+@pytest.fixture
+def api_client():
+    """创建测试客户端（无需认证）"""
+    return Client()
+
+
+@pytest.fixture
+def plan_data(db):
+    """创建测试计划及其依赖数据"""
+    ts = str(int(time.time() * 1000000))[-8:]
+    device = SutDevice.objects.create(hostname=f'sum-host-{ts}', asic_name='Navi31')
+    os_config = OsConfig.objects.create(os_family=f'SumUbuntu-{ts}', version='22.04')
+    test_type = TestType.objects.create(type_name=f'SumType-{ts}')
+    component = TestComponent.objects.create(test_type=test_type, component_name=f'sum-comp-{ts}')
+    cases = [
+        TestCase.objects.create(test_component=component, case_name=f'sum-case-{i}')
+        for i in range(3)
+    ]
+    plan = TestPlan.objects.create(
+        plan_name=f'sum-plan-{ts}', sut_device=device, os_config=os_config, created_by='tester'
+    )
+    return {'device': device, 'os_config': os_config, 'cases': cases, 'plan': plan}
+
+
+@pytest.mark.django_db
+class TestPlanSummaryMaintenance:
+    """测试摘要表的增量维护"""
+
+    def test_created_with_plan(self, plan_data):
+        """创建测试计划时生成摘要"""
+        summary = TestPlanSummary.objects.get(test_plan=plan_data['plan'])
+        assert summary.plan_name == plan_data['plan'].plan_name
+        assert summary.hostname == plan_data['device'].hostname
+        assert summary.os_version == '22.04'
+        assert summary.case_count == 0
+
+    def test_case_count_and_timeout(self, plan_data):
+        """关联用例增删时更新数量和总超时"""
+        plan = plan_data['plan']
+        links = [
+            TestPlanCase.objects.create(test_plan=plan, test_case=case, timeout=100)
+            for case in plan_data['cases']
+        ]
+        summary = TestPlanSummary.objects.get(test_plan=plan)
+        assert (summary.case_count, summary.total_timeout) == (3, 300)
+
+        links[0].timeout = 250
+        links[0].save()
+        links[1].delete()
+        summary.refresh_from_db()
+        assert (summary.case_count, summary.total_timeout) == (2, 350)
+
+    def test_device_and_os_changes_propagate(self, plan_data):
+        """设备和操作系统修改同步到摘要"""
+        device = plan_data['device']
+        device.hostname = f'{device.hostname}-renamed'
+        device.save()
+        os_config = plan_data['os_config']
+        os_config.version = '24.04'
+        os_config.save()
+
+        summary = TestPlanSummary.objects.get(test_plan=plan_data['plan'])
+        assert summary.hostname == device.hostname
+        assert summary.os_version == '24.04'
+
+    def test_rebuild(self, plan_data):
+        """rebuild 修复绕过信号的批量写入"""
+        plan = plan_data['plan']
+        TestPlanCase.objects.bulk_create([
+            TestPlanCase(test_plan=plan, test_case=case, timeout=60)
+            for case in plan_data['cases']
+        ])
+        assert TestPlanSummary.objects.get(test_plan=plan).case_count == 0
+
+        assert TestPlanSummary.rebuild(plan_ids=[plan.id]) == 1
+        summary = TestPlanSummary.objects.get(test_plan=plan)
+        assert (summary.case_count, summary.total_timeout) == (3, 180)
+
+
+@pytest.mark.django_db
+class TestPlanListAPI:
+    """测试测试计划列表接口"""
+
+    def test_list_returns_summary_fields(self, api_client, plan_data):
+        """列表接口返回设备、OS 和用例统计"""
+        plan = plan_data['plan']
+        TestPlanCase.objects.create(test_plan=plan, test_case=plan_data['cases'][0], timeout=30)
+
+        response = api_client.get('/tp/api/test-plan/list', {'plan_name': plan.plan_name})
+        data = response.json()
+        assert data['code'] == 200
+        assert data['data']['total'] == 1
+        item = data['data']['list'][0]
+        assert item['id'] == plan.id
+        assert item['hostname'] == plan_data['device'].hostname
+        assert item['osFamily'] == plan_data['os_config'].os_family
+        assert item['caseCount'] == 1
+        assert item['totalTimeout'] == 30
+
+    def test_missing_summaries_built_by_command(self, api_client, plan_data):
+        """读取列表不写入摘要表；绕过信号写入的测试计划由 rebuild_plan_summaries --missing 补建"""
+        from django.core.management import call_command
+
+        plan = plan_data['plan']
+        TestPlanCase.objects.create(test_plan=plan, test_case=plan_data['cases'][0], timeout=30)
+        TestPlanSummary.objects.filter(test_plan=plan).delete()
+
+        response = api_client.get('/tp/api/test-plan/list', {'plan_name': plan.plan_name})
+        assert response.json()['data']['total'] == 0
+        assert not TestPlanSummary.objects.filter(test_plan=plan).exists()
+
+        call_command('rebuild_plan_summaries', missing=True)
+        data = api_client.get('/tp/api/test-plan/list', {'plan_name': plan.plan_name}).json()
+        assert data['data']['total'] == 1
+        assert data['data']['list'][0]['caseCount'] == 1
@@ -37,3 +37,44 @@ export interface UpdateOptionRequest {
   value: string
 }
 
+
+/**
+ * Case 查询表达式
+ * - { tag }：有该标签
+ * - { option, op?, value? }：选项比较，op 为 eq（默认）/ ne / in / contains / exists
+ * - { and: [...] } / { or: [...] } / { not: expr }
+ */
+export type CaseQueryExpr =
+  | { tag: string }
+  | { option: string, op?: 'eq' | 'ne' | 'in' | 'contains' | 'exists', value?: string | string[] }
+  | { and: CaseQueryExpr[] }
+  | { or: CaseQueryExpr[] }
+  | { not: CaseQueryExpr }
+
+export interface CaseQueryRequest {
+  where?: CaseQueryExpr
+}
+
+export interface CaseRef {
+  casespace: string
+  caseName: string
+}
+
+export type BulkCaseOperation =
+  | { action: 'addTag' | 'deleteTag', tag: string }
+  | { action: 'setOption', key: string, value: string }
+  | { action: 'deleteOption', key: string }
+
+export interface BulkCaseMutationRequest {
+  cases: CaseRef[]
+  operations: BulkCaseOperation[]
+}
+
+export interface BulkCaseMutationResult {
+  cases: number
+  tagsAdded: number
+  tagsDeleted: number
+  optionsCreated: number
+  optionsUpdated: number
+  optionsDeleted: number
+}
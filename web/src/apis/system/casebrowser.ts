@@ -8,6 +8,9 @@ import type {
   AddTagRequest,
   AddOptionRequest,
   UpdateOptionRequest,
+  CaseQueryRequest,
+  BulkCaseMutationRequest,
+  BulkCaseMutationResult,
 } from './casebrowser-type'
 
 export * from './casebrowser-type'
@@ -21,6 +24,13 @@ export function getCasesMetadata(casespace: string) {
   return http.get<CaseMetadata[]>(`${BASE_URL}/casespaces/${casespace}/cases`)
 }
 
+/**
+ * 按标签 / 选项表达式筛选 case
+ */
+export function queryCases(casespace: string, data: CaseQueryRequest) {
+  return http.post<CaseMetadata[]>(`${BASE_URL}/casespaces/${casespace}/cases/query`, data)
+}
+
 /**
  * 获取单个 case 的详细信息，包含 tags 和 options
  */
@@ -28,6 +38,13 @@ export function getCaseDetail(casespace: string, caseName: string) {
   return http.get<CaseDetail>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}`)
 }
 
+/**
+ * 批量修改多个 case 的 tags 和 options（一个事务）
+ */
+export function bulkMutateCases(data: BulkCaseMutationRequest) {
+  return http.post<BulkCaseMutationResult>(`${BASE_URL}/cases/bulk`, data)
+}
+
 /**
  * 添加 tag 到 case
  */
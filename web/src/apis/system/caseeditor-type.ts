@@ -8,6 +8,25 @@ export interface FileNode {
   name: string
   type: 'file' | 'folder'
   children?: FileNode[]
+  /** 懒加载模式下目录的直接子节点数量 */
+  childCount?: number
+  hasChildren?: boolean
+  size?: number
+  /** 前端状态：是否展开、子节点是否已加载、是否加载中、是否还有下一页 */
+  expanded?: boolean
+  loaded?: boolean
+  loading?: boolean
+  hasMore?: boolean
+}
+
+/** 懒加载文件树的一页（单层目录） */
+export interface FileTreePage {
+  path: string
+  total: number
+  offset: number
+  limit: number
+  hasMore: boolean
+  children: FileNode[]
 }
 
 /** 文件内容 */
@@ -15,6 +34,26 @@ export interface FileContent {
   path: string
   content: string
   language?: string
+  encoding?: string
+  size?: number
+  /** 文件过大时只返回开头部分，其余通过 getFileChunk 分块读取 */
+  truncated?: boolean
+  /** 文件内容的 SHA-256（truncated 时为 null） */
+  etag?: string | null
+}
+
+/** 文件分块 */
+export interface FileChunk {
+  path: string
+  content: string
+  encoding: string
+  offset: number
+  nextOffset: number
+  size: number
+  eof: boolean
+  startLine?: number
+  lineCount?: number
+  nextLine?: number
 }
 
 /** Casespace 项 */
@@ -38,12 +77,38 @@ export interface EditorTab {
   language?: string
   isModified: boolean
   originalContent: string
+  /** 只加载了部分内容（大文件），只读 */
+  truncated?: boolean
+  /** 加载时的 etag，保存时用于检测冲突 */
+  etag?: string
 }
 
 /** 保存文件请求 */
 export interface SaveFileRequest {
   path: string
   content: string
+  etag?: string
+}
+
+/** 增量保存的行块（行号从 0 开始，相对于原文件） */
+export interface PatchHunk {
+  start: number
+  delete: number
+  lines: string[]
+}
+
+/** 增量保存请求 */
+export interface PatchFileRequest {
+  path: string
+  etag: string
+  hunks: PatchHunk[]
+}
+
+/** 保存结果 */
+export interface SaveFileResult {
+  path: string
+  etag: string
+  size: number
 }
 
 /** 创建文件请求 */
@@ -76,6 +141,77 @@ export interface UploadFilesRequest {
   files: UploadFileItem[]
 }
 
+/** 批量上传结果 */
+export interface UploadBatchResult {
+  files: {
+    path: string
+    status: 'created' | 'updated' | 'unchanged' | 'error'
+    size?: number
+    sha256?: string
+    error?: string
+  }[]
+  created: number
+  updated: number
+  unchanged: number
+  failed: number
+}
+
+/** 复制 case 请求 */
+export interface ForkCaseRequest {
+  newCase: string
+  targetCasespace?: string
+}
+
+/** case 快照 */
+export interface CaseSnapshot {
+  id: string
+  message: string
+  created: string
+  files: number
+  bytes: number
+}
+
+/** 快照比较结果（相对 case 目录的路径） */
+export interface SnapshotDiff {
+  added: string[]
+  removed: string[]
+  modified: string[]
+}
+
+/** 快照恢复结果 */
+export interface RestoreSnapshotResult {
+  restored: string
+  /** 恢复前自动创建的快照 */
+  backup: CaseSnapshot | null
+}
+
+/** case 清单 */
+export interface CaseManifest {
+  files: Record<string, string>
+}
+
+/** 文件内容搜索参数 */
+export interface SearchCodeParams {
+  q: string
+  /** 语言过滤，多个用逗号分隔 */
+  lang?: string
+  casespace?: string
+  case?: string
+  ignore_case?: boolean
+  limit?: number
+}
+
+/** 文件内容搜索结果 */
+export interface SearchCodeResult {
+  results: {
+    path: string
+    language: string | null
+    matches: { line: number, text: string }[]
+  }[]
+  candidates: number
+  truncated: boolean
+}
+
 /** 对话框类型 */
 export type DialogType = 'createFile' | 'createFolder' | 'rename' | 'delete' | 'upload' | 'uploadCase' | 'deleteCase' | null
 
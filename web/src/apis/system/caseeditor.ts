@@ -6,12 +6,24 @@ import type {
   CasespaceItem,
   CaseItem,
   FileNode,
+  FileTreePage,
   FileContent,
+  FileChunk,
   SaveFileRequest,
+  PatchFileRequest,
+  SaveFileResult,
   CreateFileRequest,
   CreateFolderRequest,
   RenameRequest,
   UploadFilesRequest,
+  UploadBatchResult,
+  ForkCaseRequest,
+  CaseManifest,
+  CaseSnapshot,
+  SnapshotDiff,
+  RestoreSnapshotResult,
+  SearchCodeParams,
+  SearchCodeResult,
 } from './caseeditor-type'
 
 export * from './caseeditor-type'
@@ -43,6 +55,19 @@ export function getFileTree(params: {
   return http.get<FileNode[]>(`${BASE_URL}/files`, params)
 }
 
+/**
+ * 懒加载文件树：只获取一层目录，按 offset/limit 分页（path 相对于 case 根目录）
+ */
+export function getFileTreePage(params: {
+  casespace: string
+  case: string
+  path?: string
+  offset?: number
+  limit?: number
+}) {
+  return http.get<FileTreePage>(`${BASE_URL}/files`, { ...params, lazy: true })
+}
+
 /**
  * 获取文件内容
  */
@@ -50,6 +75,26 @@ export function getFileContent(path: string) {
   return http.get<FileContent>(`${BASE_URL}/files/content`, { path })
 }
 
+/**
+ * 分块读取文件（按字节偏移，或指定 start_line 按行读取）
+ */
+export function getFileChunk(params: {
+  path: string
+  offset?: number
+  length?: number
+  start_line?: number
+  line_count?: number
+}) {
+  return http.get<FileChunk>(`${BASE_URL}/files/chunk`, params)
+}
+
+/**
+ * 原始文件地址（支持 HTTP Range）
+ */
+export function getFileRawUrl(path: string) {
+  return `${BASE_URL}/files/raw?path=${encodeURIComponent(path)}`
+}
+
 /**
  * 保存文件
  */
@@ -57,6 +102,13 @@ export function saveFile(data: SaveFileRequest) {
   return http.post(`${BASE_URL}/files/save`, data)
 }
 
+/**
+ * 增量保存文件（只提交修改的行块）
+ */
+export function patchFile(data: PatchFileRequest) {
+  return http.post<SaveFileResult>(`${BASE_URL}/files/patch`, data)
+}
+
 /**
  * 创建文件
  */
@@ -99,6 +151,18 @@ export function deleteCase(casespace: string, caseName: string) {
   return http.del(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}`)
 }
 
+/**
+ * 批量上传二进制文件（paths 为各文件相对 path 的路径，默认使用文件名）
+ */
+export function uploadBatch(path: string, files: File[], paths?: string[]) {
+  const formData = new FormData()
+  files.forEach((file, i) => {
+    formData.append('files', file)
+    if (paths) formData.append('paths', paths[i])
+  })
+  return http.post<UploadBatchResult>(`${BASE_URL}/files/upload-batch?path=${encodeURIComponent(path)}`, formData)
+}
+
 /**
  * 上传 case 压缩包
  */
@@ -118,3 +182,58 @@ export function downloadCase(casespace: string, caseName: string) {
   return http.download(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/download`)
 }
 
+/**
+ * 复制 case
+ */
+export function forkCase(casespace: string, caseName: string, data: ForkCaseRequest) {
+  return http.post(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/fork`, data)
+}
+
+/**
+ * 获取 case 清单（各文件的 SHA-256）
+ */
+export function getCaseManifest(casespace: string, caseName: string) {
+  return http.get<CaseManifest>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/manifest`)
+}
+
+/**
+ * 获取 case 快照列表（从新到旧）
+ */
+export function getSnapshots(casespace: string, caseName: string) {
+  return http.get<CaseSnapshot[]>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/snapshots`)
+}
+
+/**
+ * 创建 case 快照
+ */
+export function createSnapshot(casespace: string, caseName: string, message?: string) {
+  return http.post<CaseSnapshot>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/snapshots`, { message })
+}
+
+/**
+ * 比较快照（target 默认为 case 当前内容）
+ */
+export function diffSnapshots(casespace: string, caseName: string, base: string, target = 'current') {
+  return http.get<SnapshotDiff>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/snapshots/diff`, { base, target })
+}
+
+/**
+ * 恢复 case 到快照
+ */
+export function restoreSnapshot(casespace: string, caseName: string, snapshotId: string) {
+  return http.post<RestoreSnapshotResult>(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/snapshots/${snapshotId}/restore`)
+}
+
+/**
+ * 删除快照
+ */
+export function deleteSnapshot(casespace: string, caseName: string, snapshotId: string) {
+  return http.del(`${BASE_URL}/casespaces/${casespace}/cases/${caseName}/snapshots/${snapshotId}`)
+}
+
+/**
+ * 按正则表达式搜索文件内容
+ */
+export function searchCode(params: SearchCodeParams) {
+  return http.get<SearchCodeResult>(`${BASE_URL}/search`, params)
+}
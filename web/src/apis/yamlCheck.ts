@@ -1,28 +1,50 @@
 import http from '@/utils/http'
 
+/**
+ * 单个验证错误
+ */
+export interface ValidationError {
+  code: string
+  message: string
+  key?: string
+  lineNumber?: number
+}
+
+/**
+ * 按规则分组的验证错误（collectAll 模式）
+ */
+export interface ValidationErrorGroup {
+  code: string
+  rule: string
+  /** 该规则的错误总数（含超出上限未列出的） */
+  count: number
+  errors: ValidationError[]
+}
+
 /**
  * 验证响应接口
  */
 export interface ValidationResponse {
   success: boolean
-  error?: {
-    code: string
-    message: string
-    key?: string
-    lineNumber?: number
-  }
+  error?: ValidationError
+  /** 以下字段仅在 collectAll 模式下返回 */
+  errorCount?: number
+  truncated?: boolean
+  errorGroups?: ValidationErrorGroup[]
 }
 
 /**
  * YAML 兼容性验证
  * @param yamlData YAML 数据对象
  * @param yamlText 原始 YAML 文本（可选，用于准确的行号查找）
+ * @param collectAll 是否一次返回全部错误（按规则分组，有数量上限）
  * @returns ValidationResponse 验证结果
  */
-export async function validateYaml(yamlData: any, yamlText?: string): Promise<ValidationResponse> {
+export async function validateYaml(yamlData: any, yamlText?: string, collectAll?: boolean): Promise<ValidationResponse> {
   const response = await http.post<ValidationResponse>('/system/yaml/validate', { 
     yamlData,
-    yamlText 
+    yamlText,
+    collectAll
   })
   return response.data // ← 关键：提取 data 字段
 }
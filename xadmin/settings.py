@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     # 'django.contrib.admin',
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "django.contrib.postgres",  # GinIndex / JSONB 查询支持
     # 'django.contrib.sessions',
     # 'django.contrib.messages',
     # 'django.contrib.staticfiles',
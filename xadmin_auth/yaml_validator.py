@@ -6,7 +6,11 @@ YAML 测试计划验证器
 """
 
 import yaml
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from yaml_check.config import MAX_REPORTED_ERRORS, MAX_REPORTED_ERRORS_PER_RULE
+from yaml_check.line_finder import YamlLineIndex
+from yaml_check.rule_engine import MODE_NESTED, Violation, compile_rules
 
 
 # ============================================================================
@@ -239,6 +243,56 @@ def get_friendly_field_name(field_path: str) -> str:
     return FIELD_NAMES.get(field_path, field_path)
 
 
+# 类型映射
+TYPE_MAP = {
+    'string': ['string'],
+    'int': ['number'],
+    'number': ['number'],
+    'boolean': ['boolean'],
+    'array': ['array'],
+    'object': ['object']
+}
+
+
+def check_value_type(expected_type: str, value: Any) -> Optional[str]:
+    """E101 类型检查：符合时返回 None，否则返回实际类型"""
+    actual_type = get_value_type(value)
+    return None if actual_type in TYPE_MAP.get(expected_type, [expected_type]) else actual_type
+
+
+# E001 / E002 / E101 / E102 规则只在模块加载时编译一次，验证时只遍历一次文档
+RULES = compile_rules(
+    REQUIRED_ROOT_KEYS,
+    value_types=VALUE_TYPE_CONFIG,
+    value_ranges=VALUE_RANGE_CONFIG,
+    non_empty_keys=MANDATORY_NON_EMPTY_KEYS,
+    type_checker=check_value_type,
+    mode=MODE_NESTED,
+)
+
+
+def format_violation(violation: Violation) -> str:
+    """把规则引擎返回的 Violation 转换为错误消息"""
+    key = violation.rule
+    friendly_name = get_friendly_field_name(key)
+    if violation.code == 'E001':
+        return f"E001 Unsupported: missing mandatory field \"{friendly_name}\" [{key}]"
+    if violation.code == 'E002':
+        return f"E002 Unsupported: empty value for \"{friendly_name}\" [{key}]"
+    if violation.code == 'E101':
+        return (f"E101 Unsupported: value type error for \"{friendly_name}\" [{key}]. "
+                f"Expected {violation.expected}, got {violation.actual}")
+    return (f"E102 Unsupported: invalid value \"{violation.value}\" for \"{friendly_name}\" [{key}]. "
+            f"Must be one of: {', '.join(map(str, violation.expected))}")
+
+
+def _first_violation(yaml_data: Any, code: str) -> Tuple[bool, Optional[str]]:
+    violations = RULES.validate(yaml_data, codes=(code,))
+    if violations:
+        return False, format_violation(violations[0])
+    return True, None
+
+
 def find_line_number_in_yaml(yaml_content: str, field_path: str) -> Optional[int]:
     """
     在 YAML 文本中查找字段所在的行号
@@ -289,33 +343,43 @@ def validate_required_root_keys(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
     """
     E001: 验证必需的根键
     """
-    for key in REQUIRED_ROOT_KEYS:
-        value = get_nested_value(yaml_data, key)
-        if value is None:
-            friendly_name = get_friendly_field_name(key)
-            return False, f"E001 Unsupported: missing mandatory field \"{friendly_name}\" [{key}]"
-    
-    # 条件必需字段
+    valid, error_msg = _first_violation(yaml_data, 'E001')
+    if not valid:
+        return valid, error_msg
+    return validate_conditional_keys(yaml_data)
+
+
+def iter_conditional_errors(yaml_data: Dict) -> Iterator[str]:
+    """
+    E001: 按配置方式（same / individual）必需的字段，按检查顺序产出全部错误
+    """
     os_method = get_nested_value(yaml_data, 'environment.os.method')
     if os_method == 'same':
         if get_nested_value(yaml_data, 'environment.os.os') is None:
-            return False, "E001 Unsupported: missing mandatory field \"Operating System\" [environment.os.os] when method is 'same'"
+            yield "E001 Unsupported: missing mandatory field \"Operating System\" [environment.os.os] when method is 'same'"
         if get_nested_value(yaml_data, 'environment.os.deployment') is None:
-            return False, "E001 Unsupported: missing mandatory field \"Deployment Method\" [environment.os.deployment] when method is 'same'"
+            yield "E001 Unsupported: missing mandatory field \"Deployment Method\" [environment.os.deployment] when method is 'same'"
     elif os_method == 'individual':
         if get_nested_value(yaml_data, 'environment.os.machines') is None:
-            return False, "E001 Unsupported: missing mandatory field \"OS Machines Configuration\" [environment.os.machines] when method is 'individual'"
+            yield "E001 Unsupported: missing mandatory field \"OS Machines Configuration\" [environment.os.machines] when method is 'individual'"
     
     kernel_method = get_nested_value(yaml_data, 'environment.kernel.method')
     if kernel_method == 'same':
         if get_nested_value(yaml_data, 'environment.kernel.type') is None:
-            return False, "E001 Unsupported: missing mandatory field \"Kernel Type\" [environment.kernel.type] when method is 'same'"
+            yield "E001 Unsupported: missing mandatory field \"Kernel Type\" [environment.kernel.type] when method is 'same'"
         if get_nested_value(yaml_data, 'environment.kernel.version') is None:
-            return False, "E001 Unsupported: missing mandatory field \"Kernel Version\" [environment.kernel.version] when method is 'same'"
+            yield "E001 Unsupported: missing mandatory field \"Kernel Version\" [environment.kernel.version] when method is 'same'"
     elif kernel_method == 'individual':
         if get_nested_value(yaml_data, 'environment.kernel.machines') is None:
-            return False, "E001 Unsupported: missing mandatory field \"Kernel Machines Configuration\" [environment.kernel.machines] when method is 'individual'"
-    
+            yield "E001 Unsupported: missing mandatory field \"Kernel Machines Configuration\" [environment.kernel.machines] when method is 'individual'"
+
+
+def validate_conditional_keys(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
+    """
+    E001: 按配置方式（same / individual）必需的字段
+    """
+    for error_msg in iter_conditional_errors(yaml_data):
+        return False, error_msg
     return True, None
 
 
@@ -323,70 +387,26 @@ def validate_mandatory_non_empty_keys(yaml_data: Dict) -> Tuple[bool, Optional[s
     """
     E002: 验证必需非空的键
     """
-    for key in MANDATORY_NON_EMPTY_KEYS:
-        value = get_nested_value(yaml_data, key)
-        friendly_name = get_friendly_field_name(key)
-        
-        if value is None:
-            return False, f"E002 Unsupported: empty value for \"{friendly_name}\" [{key}]"
-        
-        if is_empty(value):
-            return False, f"E002 Unsupported: empty value for \"{friendly_name}\" [{key}]"
-    
-    return True, None
+    return _first_violation(yaml_data, 'E002')
 
 
 def validate_value_types(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
     """
     E101: 验证值类型
     """
-    for key, expected_type in VALUE_TYPE_CONFIG.items():
-        value = get_nested_value(yaml_data, key)
-        
-        if value is None:
-            continue
-        
-        actual_type = get_value_type(value)
-        
-        # 类型映射
-        type_map = {
-            'string': ['string'],
-            'int': ['number'],
-            'number': ['number'],
-            'boolean': ['boolean'],
-            'array': ['array'],
-            'object': ['object']
-        }
-        
-        valid_types = type_map.get(expected_type, [expected_type])
-        
-        if actual_type not in valid_types:
-            friendly_name = get_friendly_field_name(key)
-            return False, f"E101 Unsupported: value type error for \"{friendly_name}\" [{key}]. Expected {expected_type}, got {actual_type}"
-    
-    return True, None
+    return _first_violation(yaml_data, 'E101')
 
 
 def validate_value_ranges(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
     """
     E102: 验证值范围（白名单）
     """
-    for key, allowed_values in VALUE_RANGE_CONFIG.items():
-        value = get_nested_value(yaml_data, key)
-        
-        if value is None:
-            continue
-        
-        if value not in allowed_values:
-            friendly_name = get_friendly_field_name(key)
-            return False, f"E102 Unsupported: invalid value \"{value}\" for \"{friendly_name}\" [{key}]. Must be one of: {', '.join(map(str, allowed_values))}"
-    
-    return True, None
+    return _first_violation(yaml_data, 'E102')
 
 
-def validate_invalid_combinations(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
+def iter_invalid_combinations(yaml_data: Dict) -> Iterator[Tuple[str, str]]:
     """
-    E300: 验证无效组合
+    E300: 按配置顺序产出全部无效组合 (组合名称, 错误消息)
     """
     for combo in INVALID_COMBO_CONFIG:
         all_conditions_met = True
@@ -409,8 +429,15 @@ def validate_invalid_combinations(yaml_data: Dict) -> Tuple[bool, Optional[str]]
                 matched_conditions.append(f"[{key_path}]=\"{actual_value}\"")
         
         if all_conditions_met and combo['action'] == 'report_error':
-            return False, f"E300 Unsupported: invalid combination detected {' with '.join(matched_conditions)}"
-    
+            yield combo['name'], f"E300 Unsupported: invalid combination detected {' with '.join(matched_conditions)}"
+
+
+def validate_invalid_combinations(yaml_data: Dict) -> Tuple[bool, Optional[str]]:
+    """
+    E300: 验证无效组合
+    """
+    for _, error_msg in iter_invalid_combinations(yaml_data):
+        return False, error_msg
     return True, None
 
 
@@ -418,7 +445,46 @@ def validate_invalid_combinations(yaml_data: Dict) -> Tuple[bool, Optional[str]]
 # 主验证函数
 # ============================================================================
 
-def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
+def collect_errors(yaml_content: str, yaml_data: Any, violations: List[Violation]) -> Dict[str, Any]:
+    """
+    收集全部兼容性错误，按规则分组并限制数量（上限与 yaml_check 的 collectAll 模式相同）
+    
+    顺序与逐条检查一致：E001 → 条件必需字段 E001 → E002 → E101 → E102 → E300；
+    行号通过一次解析 YAML 文本得到的节点树查找
+    """
+    entries = [(v.rule, format_violation(v)) for v in violations if v.code == 'E001']
+    entries += [(msg.split('[')[-1].split(']')[0], msg) for msg in iter_conditional_errors(yaml_data)]
+    entries += [(v.rule, format_violation(v)) for v in violations if v.code != 'E001']
+    entries += list(iter_invalid_combinations(yaml_data))
+    
+    line_index = YamlLineIndex(yaml_content)
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    reported = 0
+    for rule, error_msg in entries:
+        error_code = error_msg.split()[0]
+        group = groups.setdefault(
+            (error_code, rule), {'error_code': error_code, 'rule': rule, 'count': 0, 'errors': []}
+        )
+        group['count'] += 1
+        if reported >= MAX_REPORTED_ERRORS or len(group['errors']) >= MAX_REPORTED_ERRORS_PER_RULE:
+            continue
+        # 组合错误没有明确的行号
+        line_num = None if error_code == 'E300' else line_index.find_line_number(rule.split('.'))
+        group['errors'].append({
+            'error_code': error_code,
+            'error_message': error_msg,
+            'line_number': line_num if line_num != -1 else None
+        })
+        reported += 1
+    
+    return {
+        'error_count': len(entries),
+        'truncated': reported < len(entries),
+        'error_groups': [group for group in groups.values() if group['errors']]
+    }
+
+
+def validate_yaml_full(yaml_content: str, collect_all: bool = False) -> Dict[str, Any]:
     """
     完整的 YAML 验证（包括语法和兼容性）
     
@@ -429,6 +495,8 @@ def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
         'error_message': str,
         'line_number': int  # 错误所在行号（如果可用）
     }
+    
+    collect_all 为 True 且语法正确时，额外返回 error_count / truncated / error_groups（见 collect_errors）
     """
     # 步骤 1: 语法验证
     syntax_valid, syntax_error, line_number = validate_yaml_syntax(yaml_content)
@@ -451,11 +519,18 @@ def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
             'line_number': None
         }
     
-    # 步骤 2: 必需键验证 (E001)
-    valid, error_msg = validate_required_root_keys(yaml_data)
-    if not valid:
-        # 提取错误代码
-        error_code = error_msg.split()[0] if error_msg else 'E001'
+    # 步骤 2-5: E001 → E002 → E101 → E102，编译后的规则只遍历一次文档
+    violations = RULES.validate(yaml_data)
+    collected = collect_errors(yaml_content, yaml_data, violations) if collect_all else {}
+    if violations and violations[0].code == 'E001':
+        error_msg = format_violation(violations[0])
+    else:
+        # 条件必需字段排在基础 E001 之后、E002 之前
+        valid, error_msg = validate_conditional_keys(yaml_data)
+        if valid and violations:
+            error_msg = format_violation(violations[0])
+    if error_msg:
+        error_code = error_msg.split()[0]
         # 查找行号
         field_match = error_msg.split('[')[-1].split(']')[0] if '[' in error_msg else None
         line_num = find_line_number_in_yaml(yaml_content, field_match) if field_match else None
@@ -464,49 +539,8 @@ def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
             'valid': False,
             'error_code': error_code,
             'error_message': error_msg,
-            'line_number': line_num
-        }
-    
-    # 步骤 3: 非空键验证 (E002)
-    valid, error_msg = validate_mandatory_non_empty_keys(yaml_data)
-    if not valid:
-        error_code = error_msg.split()[0] if error_msg else 'E002'
-        field_match = error_msg.split('[')[-1].split(']')[0] if '[' in error_msg else None
-        line_num = find_line_number_in_yaml(yaml_content, field_match) if field_match else None
-        
-        return {
-            'valid': False,
-            'error_code': error_code,
-            'error_message': error_msg,
-            'line_number': line_num
-        }
-    
-    # 步骤 4: 值类型验证 (E101)
-    valid, error_msg = validate_value_types(yaml_data)
-    if not valid:
-        error_code = error_msg.split()[0] if error_msg else 'E101'
-        field_match = error_msg.split('[')[-1].split(']')[0] if '[' in error_msg else None
-        line_num = find_line_number_in_yaml(yaml_content, field_match) if field_match else None
-        
-        return {
-            'valid': False,
-            'error_code': error_code,
-            'error_message': error_msg,
-            'line_number': line_num
-        }
-    
-    # 步骤 5: 值范围验证 (E102)
-    valid, error_msg = validate_value_ranges(yaml_data)
-    if not valid:
-        error_code = error_msg.split()[0] if error_msg else 'E102'
-        field_match = error_msg.split('[')[-1].split(']')[0] if '[' in error_msg else None
-        line_num = find_line_number_in_yaml(yaml_content, field_match) if field_match else None
-        
-        return {
-            'valid': False,
-            'error_code': error_code,
-            'error_message': error_msg,
-            'line_number': line_num
+            'line_number': line_num,
+            **collected
         }
     
     # 步骤 6: 无效组合验证 (E300)
@@ -519,7 +553,8 @@ def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
             'valid': False,
             'error_code': error_code,
             'error_message': error_msg,
-            'line_number': None
+            'line_number': None,
+            **collected
         }
     
     # 所有验证通过
@@ -527,6 +562,7 @@ def validate_yaml_full(yaml_content: str) -> Dict[str, Any]:
         'valid': True,
         'error_code': '0',
         'error_message': 'OK',
-        'line_number': None
+        'line_number': None,
+        **collected
     }
 
@@ -0,0 +1,67 @@
+"""
+异步接口的阻塞 I/O 卸载
+
+Case Editor 中读写磁盘较多的接口（文件树、文件内容、下载、上传）是 async 视图：
+
+- 在 ASGI（uvicorn worker）下，阻塞的 FileManager 调用通过 run_io 交给专用线程池执行，
+  事件循环在等待磁盘期间继续处理其他请求；
+- 流式响应（zip 下载、原始文件，以及 tpgen 的测试计划矩阵导出）在 ASGI 下包装为异步迭代器，
+  每个数据块在线程池中生成，慢速客户端只占用一个协程而不占用 worker；项目中的流式响应都应通过
+  streaming_response 创建，否则 ASGI 下会被整体读入内存；
+- 在 WSGI（sync worker）下 Django 为每个请求运行一次事件循环，行为与原来的同步视图相同，
+  流式响应直接使用同步迭代器。
+
+线程池使用 thread_sensitive=False：FileManager 不访问数据库，多个请求的磁盘操作可以并行。
+线程池大小由 XCASE_ASYNC_IO_THREADS 控制，大量并发下载时下载之外的请求仍有空闲线程可用。
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, StreamingHttpResponse
+
+
+ASYNC_IO_THREADS = getattr(settings, 'XCASE_ASYNC_IO_THREADS', 16)
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_IO_THREADS, thread_name_prefix='xcase-io')
+
+T = TypeVar('T')
+
+_END = object()
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在 I/O 线程池中执行阻塞调用"""
+    return await sync_to_async(
+        functools.partial(func, *args, **kwargs), thread_sensitive=False, executor=_executor
+    )()
+
+
+async def aiter_blocking(iterable: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """把同步迭代器包装为异步迭代器，每次 next() 在 I/O 线程池中执行；结束或客户端断开时关闭原迭代器"""
+    iterator = iter(iterable)
+    try:
+        while True:
+            chunk = await run_io(next, iterator, _END)
+            if chunk is _END:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await run_io(close)
+
+
+def streaming_response(request: HttpRequest, stream: Iterable[bytes], **kwargs: Any) -> StreamingHttpResponse:
+    """
+    创建流式响应
+
+    ASGI 下 Django 会把同步迭代器整个读入内存再发送，因此包装为异步迭代器；
+    WSGI 下 Django 无法逐块发送异步迭代器，保持同步迭代器。
+    """
+    if isinstance(request, ASGIRequest):
+        stream = aiter_blocking(stream)
+    return StreamingHttpResponse(stream, **kwargs)
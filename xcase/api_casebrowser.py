@@ -14,6 +14,7 @@ from xutils import utils
 from . import schemas
 from .models import CaseMetadata, CaseTag, CaseOption
 from .file_manager import file_manager
+from .metadata import get_cases_with_tags, load_case_detail, query_cases, bulk_mutate
 
 
 router = Router(tags=["Case Browser"])
@@ -34,24 +35,8 @@ def get_cases_metadata(request: HttpRequest, casespace: str):
         # Get all cases from file system
         cases = file_manager.get_cases(casespace)
         
-        result = []
-        for case_info in cases:
-            case_name = case_info['name']
-            
-            # Get or create metadata
-            metadata, created = CaseMetadata.objects.get_or_create(
-                casespace=casespace,
-                case_name=case_name
-            )
-            
-            # Get tags
-            tags = list(metadata.tags.values_list('tag', flat=True))
-            
-            result.append({
-                'casespace': casespace,
-                'caseName': case_name,
-                'tags': tags
-            })
+        # Resolve metadata and tags for all cases in a constant number of queries
+        result = get_cases_with_tags(casespace, [case_info['name'] for case_info in cases])
         
         resp = utils.RespSuccessTempl()
         resp.data = result
@@ -63,6 +48,41 @@ def get_cases_metadata(request: HttpRequest, casespace: str):
         return resp.as_dict()
 
 
+@router.post("/casespaces/{casespace}/cases/query", url_name="query_cases")
+def query_cases_metadata(request: HttpRequest, casespace: str, data: schemas.CaseQueryRequest):
+    """
+    按标签 / 选项表达式筛选 Case
+    
+    Path Parameters:
+        casespace: Casespace 名称
+        
+    Body:
+        where: 查询表达式，例如
+            {"and": [{"tag": "性能测试"}, {"option": "priority", "value": "P0"},
+                     {"or": [{"option": "os", "value": "Linux"}, {"option": "os", "value": "Ubuntu"}]}]}
+        
+    Returns:
+        满足条件的 Case 元数据列表，包含 casespace, caseName, tags
+    """
+    try:
+        case_names = [case_info['name'] for case_info in file_manager.get_cases(casespace)]
+        
+        resp = utils.RespSuccessTempl()
+        resp.data = query_cases(casespace, case_names, data.where)
+        return resp.as_dict()
+    except ValueError as e:
+        logger.warning(f"Invalid case query: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 400
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error querying cases: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.get("/casespaces/{casespace}/cases/{case_name}", url_name="get_case_detail")
 def get_case_detail(request: HttpRequest, casespace: str, case_name: str):
     """
@@ -76,27 +96,7 @@ def get_case_detail(request: HttpRequest, casespace: str, case_name: str):
         Case 详情，包含 casespace, caseName, tags, options
     """
     try:
-        # Get or create metadata
-        metadata, created = CaseMetadata.objects.get_or_create(
-            casespace=casespace,
-            case_name=case_name
-        )
-        
-        # Get tags
-        tags = list(metadata.tags.values_list('tag', flat=True))
-        
-        # Get options
-        options = [
-            {'key': opt.key, 'value': opt.value}
-            for opt in metadata.options.all()
-        ]
-        
-        result = {
-            'casespace': casespace,
-            'caseName': case_name,
-            'tags': tags,
-            'options': options
-        }
+        result = load_case_detail(casespace, case_name)
         
         resp = utils.RespSuccessTempl()
         resp.data = result
@@ -108,6 +108,42 @@ def get_case_detail(request: HttpRequest, casespace: str, case_name: str):
         return resp.as_dict()
 
 
+@router.post("/cases/bulk", url_name="bulk_mutate_cases")
+def bulk_mutate_cases(request: HttpRequest, data: schemas.BulkCaseMutationRequest):
+    """
+    在一个事务中批量修改多个 case 的标签和选项
+    
+    Body:
+        cases: [{casespace, caseName}]
+        operations: [{action: addTag | deleteTag, tag} | {action: setOption, key, value}
+                     | {action: deleteOption, key}]
+        
+    Returns:
+        cases, tagsAdded, tagsDeleted, optionsCreated, optionsUpdated, optionsDeleted
+    """
+    try:
+        stats = bulk_mutate(
+            [(c.casespace, c.case_name) for c in data.cases],
+            [{'action': op.action, 'tag': op.tag, 'key': op.key, 'value': op.value} for op in data.operations]
+        )
+        logger.info(f"Bulk case mutation: {stats}")
+        
+        resp = utils.RespSuccessTempl()
+        resp.data = stats
+        return resp.as_dict()
+    except ValueError as e:
+        logger.warning(f"Invalid bulk mutation: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 400
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error applying bulk mutation: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.post("/cases/tags", url_name="add_tag")
 def add_tag(request: HttpRequest, data: schemas.AddTagRequest):
     """
@@ -8,26 +8,42 @@ Case Editor API 端点
 - 文件和目录的增删改查
 - Case 的上传下载
 """
+import mimetypes
+import tarfile
 from typing import Optional
 from django.http import HttpRequest, HttpResponse
 from ninja_extra import Router
 from loguru import logger
 
 from xutils import utils
-from . import schemas
+from . import schemas, batch_upload
+from .metadata import move_metadata, drop_metadata
+from .aio import run_io, streaming_response
 from .file_manager import file_manager
+from .constants import TREE_PAGE_SIZE, MAX_ARCHIVE_SIZE, FILE_CHUNK_SIZE, FILE_CHUNK_LINES, SEARCH_DEFAULT_RESULTS
 from .exceptions import (
     CaseNotFoundException,
     CasespaceNotFoundException,
+    RangeNotSatisfiableException,
     PathTraversalException,
     InvalidCaseNameException,
     FileOperationException,
+    FileSizeLimitException,
+    ArchiveLimitException,
+    DuplicateCaseException,
+    StaleFileException,
+    SnapshotNotFoundException,
 )
 
 
 router = Router(tags=["Case Editor"])
 
 
+def _case_parts(path: str) -> tuple:
+    """返回路径相对存储根目录的各级名称，前两级为 (casespace, case)"""
+    return tuple(file_manager.get_relative_path(file_manager.get_abs_path(path)).strip('/').split('/'))
+
+
 @router.get("/casespaces", url_name="get_casespaces")
 def get_casespaces(request: HttpRequest):
     """
@@ -77,11 +93,14 @@ def get_cases(request: HttpRequest, casespace: str):
 
 
 @router.get("/files", url_name="get_file_tree")
-def get_file_tree(
+async def get_file_tree(
     request: HttpRequest,
     casespace: Optional[str] = None,
     case: Optional[str] = None,
-    path: str = "/"
+    path: str = "/",
+    lazy: bool = False,
+    offset: int = 0,
+    limit: int = TREE_PAGE_SIZE
 ):
     """
     获取文件树结构
@@ -90,9 +109,12 @@ def get_file_tree(
         casespace: Casespace 名称（可选）
         case: Case 名称（可选）
         path: 路径（默认为根目录）
+        lazy: 是否懒加载（只返回一层，目录展开时再请求）
+        offset: 懒加载模式下跳过的节点数量
+        limit: 懒加载模式下每页节点数量
         
     Returns:
-        文件树节点列表
+        文件树节点列表；懒加载模式下返回 {path, total, offset, limit, hasMore, children}
     """
     try:
         # 必须同时提供 casespace 和 case
@@ -101,10 +123,19 @@ def get_file_tree(
             resp.data = []  # 返回空数组而不是所有 casespace
             return resp.as_dict()
         
-        file_tree = file_manager.get_file_tree(path, casespace, case)
+        if lazy:
+            file_tree = await run_io(file_manager.get_file_tree_page, path, casespace, case, offset, limit)
+        else:
+            file_tree = await run_io(file_manager.get_file_tree, path, casespace, case)
         resp = utils.RespSuccessTempl()
         resp.data = file_tree
         return resp.as_dict()
+    except FileNotFoundError as e:
+        logger.warning(f"Directory not found: {path}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = f"目录未找到: {str(e)}"
+        return resp.as_dict()
     except PathTraversalException as e:
         logger.warning(f"Path traversal attempt: {e}")
         resp = utils.RespFailedTempl()
@@ -119,7 +150,7 @@ def get_file_tree(
 
 
 @router.get("/files/content", url_name="get_file_content")
-def get_file_content(request: HttpRequest, path: str):
+async def get_file_content(request: HttpRequest, path: str):
     """
     获取文件内容
     
@@ -130,7 +161,7 @@ def get_file_content(request: HttpRequest, path: str):
         文件内容，包含 path, content, language
     """
     try:
-        content = file_manager.get_file_content(path)
+        content = await run_io(file_manager.get_file_content, path)
         resp = utils.RespSuccessTempl()
         resp.data = content
         return resp.as_dict()
@@ -153,6 +184,99 @@ def get_file_content(request: HttpRequest, path: str):
         return resp.as_dict()
 
 
+@router.get("/files/chunk", url_name="get_file_chunk")
+async def get_file_chunk(
+    request: HttpRequest,
+    path: str,
+    offset: int = 0,
+    length: int = FILE_CHUNK_SIZE,
+    start_line: Optional[int] = None,
+    line_count: int = FILE_CHUNK_LINES
+):
+    """
+    分块读取文件内容（用于大文件的增量查看）
+    
+    Query Parameters:
+        path: 文件路径
+        offset: 字节偏移（默认 0）
+        length: 读取的字节数（默认 256KB，最大 4MB）
+        start_line: 起始行号（从 1 开始；指定时按行读取，忽略 offset/length）
+        line_count: 读取的行数（默认 1000）
+        
+    Returns:
+        content, encoding, offset, nextOffset, size, eof；按行读取时另含 startLine, lineCount, nextLine
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = await run_io(file_manager.get_file_chunk, path, offset, length, start_line, line_count)
+        return resp.as_dict()
+    except FileNotFoundError as e:
+        logger.warning(f"File not found: {path}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = f"文件未找到: {str(e)}"
+        return resp.as_dict()
+    except PathTraversalException as e:
+        logger.warning(f"Path traversal attempt: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 403
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error getting file chunk: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
+@router.get("/files/raw", url_name="get_file_raw")
+async def get_file_raw(request: HttpRequest, path: str):
+    """
+    下载原始文件，支持 HTTP Range（单区间）
+    
+    Query Parameters:
+        path: 文件路径
+        
+    Headers:
+        Range: bytes=start-end / bytes=start- / bytes=-suffix
+        
+    Returns:
+        200 完整文件或 206 部分内容；区间无法满足时返回 416
+    """
+    try:
+        result = await run_io(file_manager.open_file_range, path, request.headers.get('Range'))
+        
+        content_type = mimetypes.guess_type(result['name'])[0] or 'application/octet-stream'
+        response = streaming_response(request, result['stream'], content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Length'] = str(result['end'] - result['start'] + 1)
+        if result['partial']:
+            response.status_code = 206
+            response['Content-Range'] = f"bytes {result['start']}-{result['end']}/{result['size']}"
+        return response
+    except RangeNotSatisfiableException as e:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{e.size}"
+        return response
+    except FileNotFoundError as e:
+        logger.warning(f"File not found: {path}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = f"文件未找到: {str(e)}"
+        return resp.as_dict()
+    except PathTraversalException as e:
+        logger.warning(f"Path traversal attempt: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 403
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error downloading file: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.post("/files/save", url_name="save_file")
 def save_file(request: HttpRequest, data: schemas.SaveFileRequest):
     """
@@ -161,14 +285,21 @@ def save_file(request: HttpRequest, data: schemas.SaveFileRequest):
     Body:
         path: 文件路径
         content: 文件内容
+        etag: 加载文件时的 etag（可选；文件已被修改时返回 409）
         
     Returns:
-        成功消息
+        成功消息和新的 etag
     """
     try:
-        file_manager.save_file(data.path, data.content)
+        etag = file_manager.save_file(data.path, data.content, data.etag)
         resp = utils.RespSuccessTempl()
-        resp.data = {"success": True, "message": "文件保存成功"}
+        resp.data = {"success": True, "message": "文件保存成功", "etag": etag}
+        return resp.as_dict()
+    except StaleFileException as e:
+        logger.warning(f"Stale save rejected: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 409
+        resp.data = f"文件已被修改，请重新加载: {str(e)}"
         return resp.as_dict()
     except FileNotFoundError as e:
         logger.warning(f"File not found: {data.path}")
@@ -188,6 +319,52 @@ def save_file(request: HttpRequest, data: schemas.SaveFileRequest):
         return resp.as_dict()
 
 
+@router.post("/files/patch", url_name="patch_file")
+def patch_file(request: HttpRequest, data: schemas.PatchFileRequest):
+    """
+    增量保存文件：只提交修改的行块，服务端应用后原子替换
+    
+    Body:
+        path: 文件路径
+        etag: 加载文件时的 etag
+        hunks: [{start: 起始行（从 0 开始）, delete: 删除的行数, lines: 插入的行（含换行符）}]
+        
+    Returns:
+        path, etag, size；文件已被修改时返回 409
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.patch_file(
+            data.path,
+            data.etag,
+            [{'start': h.start, 'delete': h.delete, 'lines': h.lines} for h in data.hunks]
+        )
+        return resp.as_dict()
+    except StaleFileException as e:
+        logger.warning(f"Stale patch rejected: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 409
+        resp.data = f"文件已被修改，请重新加载: {str(e)}"
+        return resp.as_dict()
+    except FileNotFoundError as e:
+        logger.warning(f"File not found: {data.path}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = f"文件未找到: {str(e)}"
+        return resp.as_dict()
+    except PathTraversalException as e:
+        logger.warning(f"Path traversal attempt: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 403
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error patching file: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.post("/files/create", url_name="create_file")
 def create_file(request: HttpRequest, data: schemas.CreateFileRequest):
     """
@@ -269,7 +446,11 @@ def rename_item(request: HttpRequest, data: schemas.RenameRequest):
         重命名后的节点信息
     """
     try:
+        old_parts = _case_parts(data.old_path)
         renamed_item = file_manager.rename_item(data.old_path, data.new_name)
+        # Casespace / Case 目录重命名时元数据随之移动
+        if len(old_parts) <= 2 and renamed_item['type'] == 'folder':
+            move_metadata(old_parts, old_parts[:-1] + (data.new_name,))
         resp = utils.RespSuccessTempl()
         resp.data = renamed_item
         return resp.as_dict()
@@ -302,7 +483,10 @@ def delete_item(request: HttpRequest, path: str):
         成功消息
     """
     try:
+        parts = _case_parts(path)
         file_manager.delete_item(path)
+        if len(parts) <= 2:
+            drop_metadata(*parts)
         resp = utils.RespSuccessTempl()
         resp.data = {"success": True, "message": "删除成功"}
         return resp.as_dict()
@@ -325,7 +509,7 @@ def delete_item(request: HttpRequest, path: str):
 
 
 @router.post("/files/upload", url_name="upload_files")
-def upload_files(request: HttpRequest, data: schemas.UploadFilesRequest):
+async def upload_files(request: HttpRequest, data: schemas.UploadFilesRequest):
     """
     批量上传文件
     
@@ -337,7 +521,8 @@ def upload_files(request: HttpRequest, data: schemas.UploadFilesRequest):
         上传结果，包含成功文件数量
     """
     try:
-        uploaded_count = file_manager.upload_files(
+        uploaded_count = await run_io(
+            file_manager.upload_files,
             data.parent_path,
             [{'name': f.name, 'content': f.content} for f in data.files]
         )
@@ -365,6 +550,61 @@ def upload_files(request: HttpRequest, data: schemas.UploadFilesRequest):
         return resp.as_dict()
 
 
+@router.post("/files/upload-batch", url_name="upload_batch")
+async def upload_batch(request: HttpRequest, path: str):
+    """
+    批量上传二进制文件（不经过 JSON / base64）
+    
+    Query Parameters:
+        path: 目标目录（Casespace 内的目录）
+    
+    Body（二选一）:
+        multipart/form-data: 多个 files 文件字段，可选同样数量的 paths 字段指定相对路径
+            （文件数量受 DATA_UPLOAD_MAX_NUMBER_FILES 限制）
+        application/x-tar: 请求体为 tar 流（可为 gzip 压缩），其中的相对路径即目标路径；
+            流式处理，适合大量文件
+        
+    Returns:
+        files: 每个文件的结果 [{path, status, size, sha256, error}]，status 为 created / updated / unchanged / error
+        created, updated, unchanged, failed: 各状态的文件数量
+    """
+    def upload():
+        # multipart 解析和 tar 流读取都是阻塞 I/O，与写盘一起在线程池中执行
+        if request.content_type.startswith('multipart/'):
+            entries = batch_upload.iter_multipart(request.FILES.getlist('files'), request.POST.getlist('paths'))
+        else:
+            entries = batch_upload.iter_tar_stream(request)
+        return file_manager.upload_batch(path, entries)
+    
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = await run_io(upload)
+        return resp.as_dict()
+    except (ValueError, tarfile.TarError) as e:
+        logger.warning(f"Invalid upload request: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 400
+        resp.data = str(e)
+        return resp.as_dict()
+    except PathTraversalException as e:
+        logger.warning(f"Path traversal attempt: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 403
+        resp.data = str(e)
+        return resp.as_dict()
+    except ArchiveLimitException as e:
+        logger.warning(f"Batch upload rejected: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 413
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Unexpected error uploading files: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.delete("/casespaces/{casespace}/cases/{case}", url_name="delete_case")
 def delete_case(request: HttpRequest, casespace: str, case: str):
     """
@@ -379,6 +619,7 @@ def delete_case(request: HttpRequest, casespace: str, case: str):
     """
     try:
         file_manager.delete_case(casespace, case)
+        drop_metadata(casespace, case)
         resp = utils.RespSuccessTempl()
         resp.data = {"success": True, "message": f"成功删除 case: {case}"}
         return resp.as_dict()
@@ -400,24 +641,248 @@ def delete_case(request: HttpRequest, casespace: str, case: str):
         return resp.as_dict()
 
 
+@router.post("/casespaces/{casespace}/cases/{case}/fork", url_name="fork_case")
+def fork_case(request: HttpRequest, casespace: str, case: str, data: schemas.ForkCaseRequest):
+    """
+    复制 Case（启用内容寻址存储时只创建硬链接，不复制数据）
+    
+    Path Parameters:
+        casespace: 源 Casespace 名称
+        case: 源 Case 名称
+    
+    Body:
+        newCase: 新 Case 名称
+        targetCasespace: 目标 Casespace（可选，默认与源相同）
+        
+    Returns:
+        新 Case 的 casespace 和名称
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.fork_case(casespace, case, data.new_case, data.target_casespace)
+        return resp.as_dict()
+    except CaseNotFoundException as e:
+        logger.warning(f"Case not found: {casespace}/{case}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = str(e)
+        return resp.as_dict()
+    except DuplicateCaseException as e:
+        logger.warning(f"Fork target exists: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 409
+        resp.data = str(e)
+        return resp.as_dict()
+    except (InvalidCaseNameException, PathTraversalException) as e:
+        logger.warning(f"Invalid fork request: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error forking case: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
+@router.get("/casespaces/{casespace}/cases/{case}/manifest", url_name="get_case_manifest")
+def get_case_manifest(request: HttpRequest, casespace: str, case: str):
+    """
+    获取 Case 清单（各文件内容的 SHA-256）
+    
+    客户端可与本地文件比较，只上传内容有变化的文件。
+    
+    Path Parameters:
+        casespace: Casespace 名称
+        case: Case 名称
+        
+    Returns:
+        {files: {相对路径: sha256}}
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = {"files": file_manager.get_case_manifest(casespace, case)}
+        return resp.as_dict()
+    except CaseNotFoundException as e:
+        logger.warning(f"Case not found: {casespace}/{case}")
+        resp = utils.RespFailedTempl()
+        resp.code = 404
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error getting case manifest: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
+def _snapshot_failed(e: Exception, action: str):
+    """快照接口的统一错误响应"""
+    resp = utils.RespFailedTempl()
+    if isinstance(e, (CaseNotFoundException, SnapshotNotFoundException)):
+        logger.warning(f"Snapshot {action}: {e}")
+        resp.code = 404
+    elif isinstance(e, PathTraversalException):
+        logger.warning(f"Snapshot {action}: {e}")
+    else:
+        logger.error(f"Error in snapshot {action}: {e}")
+    resp.data = str(e)
+    return resp.as_dict()
+
+
+@router.get("/casespaces/{casespace}/cases/{case}/snapshots", url_name="list_snapshots")
+def list_snapshots(request: HttpRequest, casespace: str, case: str):
+    """
+    获取 Case 的快照列表（从新到旧）
+    
+    Returns:
+        [{id, message, created, files, bytes}]
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.list_snapshots(casespace, case)
+        return resp.as_dict()
+    except Exception as e:
+        return _snapshot_failed(e, "list")
+
+
+@router.post("/casespaces/{casespace}/cases/{case}/snapshots", url_name="create_snapshot")
+def create_snapshot(request: HttpRequest, casespace: str, case: str, data: schemas.CreateSnapshotRequest):
+    """
+    为 Case 创建快照（文件为硬链接，耗时与文件大小无关）
+    
+    Body:
+        message: 快照说明（可选）
+        
+    Returns:
+        快照信息 {id, message, created, files, bytes}
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.create_snapshot(casespace, case, data.message or '')
+        return resp.as_dict()
+    except Exception as e:
+        return _snapshot_failed(e, "create")
+
+
+@router.get("/casespaces/{casespace}/cases/{case}/snapshots/diff", url_name="diff_snapshots")
+def diff_snapshots(request: HttpRequest, casespace: str, case: str, base: str, target: str = 'current'):
+    """
+    比较两个快照，或快照与 Case 当前内容
+    
+    Query Parameters:
+        base: 基准快照 ID
+        target: 目标快照 ID，默认 current（Case 当前内容）
+        
+    Returns:
+        {added, removed, modified}（相对 Case 目录的路径）
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.diff_snapshots(casespace, case, base, target)
+        return resp.as_dict()
+    except Exception as e:
+        return _snapshot_failed(e, "diff")
+
+
+@router.post("/casespaces/{casespace}/cases/{case}/snapshots/{snapshot_id}/restore", url_name="restore_snapshot")
+def restore_snapshot(request: HttpRequest, casespace: str, case: str, snapshot_id: str):
+    """
+    把 Case 恢复为快照的内容（恢复前自动为当前内容创建快照）
+    
+    Returns:
+        {restored: 快照 ID, backup: 自动创建的快照信息}
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.restore_snapshot(casespace, case, snapshot_id)
+        return resp.as_dict()
+    except Exception as e:
+        return _snapshot_failed(e, "restore")
+
+
+@router.delete("/casespaces/{casespace}/cases/{case}/snapshots/{snapshot_id}", url_name="delete_snapshot")
+def delete_snapshot(request: HttpRequest, casespace: str, case: str, snapshot_id: str):
+    """
+    删除快照
+    """
+    try:
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.delete_snapshot(casespace, case, snapshot_id)
+        return resp.as_dict()
+    except Exception as e:
+        return _snapshot_failed(e, "delete")
+
+
+@router.get("/search", url_name="search_code")
+def search_code(
+    request: HttpRequest,
+    q: str,
+    lang: Optional[str] = None,
+    casespace: Optional[str] = None,
+    case: Optional[str] = None,
+    ignore_case: bool = False,
+    limit: int = SEARCH_DEFAULT_RESULTS
+):
+    """
+    按正则表达式搜索文件内容
+    
+    Query Parameters:
+        q: 正则表达式（按行匹配，至少包含 3 个字符的字面量，不能有嵌套的重复）
+        lang: 语言过滤，多个用逗号分隔（如 python,yaml）
+        casespace: 只搜索该 Casespace
+        case: 只搜索该 Case（需同时指定 casespace）
+        ignore_case: 忽略大小写（默认 false）
+        limit: 最多返回的文件数量（默认 100，最大 1000）
+        
+    Returns:
+        results: [{path, language, matches: [{line, text}]}]
+        candidates: 索引筛选出的候选文件数量
+        truncated: 是否因达到 limit 或扫描上限（候选数量、读取字节数、耗时）提前结束
+    """
+    try:
+        languages = [item.strip() for item in lang.split(',') if item.strip()] if lang else None
+        resp = utils.RespSuccessTempl()
+        resp.data = file_manager.search_code(q, languages, casespace, case, ignore_case, limit)
+        return resp.as_dict()
+    except ValueError as e:
+        logger.warning(f"Invalid search request: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 400
+        resp.data = str(e)
+        return resp.as_dict()
+    except PathTraversalException as e:
+        logger.warning(f"Path traversal attempt: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 403
+        resp.data = str(e)
+        return resp.as_dict()
+    except Exception as e:
+        logger.error(f"Error searching files: {e}")
+        resp = utils.RespFailedTempl()
+        resp.data = str(e)
+        return resp.as_dict()
+
+
 @router.get("/casespaces/{casespace}/cases/{case}/download", url_name="download_case")
-def download_case(request: HttpRequest, casespace: str, case: str):
+async def download_case(request: HttpRequest, casespace: str, case: str, store_compressed: bool = True):
     """
-    下载指定的 Case 为 zip 文件
+    下载指定的 Case 为 zip 文件（边打包边发送）
     
     Path Parameters:
         casespace: Casespace 名称
         case: Case 名称
+    
+    Query Parameters:
+        store_compressed: 已压缩的文件（图片、压缩包等）直接存储，不再重新压缩（默认 true）
         
     Returns:
-        zip 文件下载响应
+        zip 文件流式下载响应
     """
     try:
-        # Get zip data from file manager
-        zip_data = file_manager.download_case(casespace, case)
+        zip_stream = await run_io(file_manager.iter_case_zip, casespace, case, store_compressed=store_compressed)
         
-        # Create HTTP response with zip file
-        response = HttpResponse(zip_data, content_type='application/zip')
+        response = streaming_response(request, zip_stream, content_type='application/zip')
         response['Content-Disposition'] = f'attachment; filename="{case}.zip"'
         return response
     except CaseNotFoundException as e:
@@ -439,7 +904,7 @@ def download_case(request: HttpRequest, casespace: str, case: str):
 
 
 @router.post("/casespaces/{casespace}/upload-case", url_name="upload_case")
-def upload_case(request: HttpRequest, casespace: str):
+async def upload_case(request: HttpRequest, casespace: str):
     """
     上传并解压 Case 压缩包
     
@@ -448,7 +913,7 @@ def upload_case(request: HttpRequest, casespace: str):
     
     Form Data:
         case_name: 新 Case 的名称
-        file: 压缩包文件 (.tar.gz, .tgz, 或 .zip)
+        file: 压缩包文件 (.tar.gz, .tgz, .tar.zst, .tzst 或 .zip；zstd 需安装 zstandard)
         
     Returns:
         上传结果，包含新 Case 名称
@@ -456,7 +921,8 @@ def upload_case(request: HttpRequest, casespace: str):
     try:
         logger.info(f"Upload case request received: casespace={casespace}")
         
-        # Get form data from request
+        # Get form data from request（解析 multipart 会读取请求体并落盘）
+        await run_io(lambda: request.FILES)
         case_name = request.POST.get('case_name')
         if not case_name:
             raise ValueError("case_name is required")
@@ -466,13 +932,14 @@ def upload_case(request: HttpRequest, casespace: str):
             raise ValueError("file is required")
         
         uploaded_file = request.FILES['file']
-        file_data = uploaded_file.read()
         filename = uploaded_file.name
+        if uploaded_file.size > MAX_ARCHIVE_SIZE:
+            raise FileSizeLimitException(filename, uploaded_file.size, MAX_ARCHIVE_SIZE)
         
-        logger.info(f"Processing upload: case_name={case_name}, filename={filename}, size={len(file_data)} bytes")
+        logger.info(f"Processing upload: case_name={case_name}, filename={filename}, size={uploaded_file.size} bytes")
         
-        # Upload and extract
-        file_manager.upload_case(casespace, case_name, file_data, filename)
+        # 直接从上传文件（超过内存阈值时已由 Django 落盘）流式解压，不读入内存
+        await run_io(file_manager.upload_case, casespace, case_name, uploaded_file, filename)
         
         resp = utils.RespSuccessTempl()
         resp.data = {
@@ -497,6 +964,18 @@ def upload_case(request: HttpRequest, casespace: str):
         resp.code = 403
         resp.data = str(e)
         return resp.as_dict()
+    except (FileSizeLimitException, ArchiveLimitException) as e:
+        logger.warning(f"Archive rejected: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 413
+        resp.data = str(e)
+        return resp.as_dict()
+    except DuplicateCaseException as e:
+        logger.warning(f"Duplicate case: {e}")
+        resp = utils.RespFailedTempl()
+        resp.code = 409
+        resp.data = str(e)
+        return resp.as_dict()
     except Exception as e:
         logger.error(f"Error uploading case: {e}")
         resp = utils.RespFailedTempl()
@@ -0,0 +1,544 @@
+"""
+Case 压缩包流式解压与并行压缩
+
+解压直接从（Django 已落盘的）上传文件对象中逐个成员进行，不再整体读入内存：
+
+- zip 读取中央目录后，由线程池并发解压各成员（zlib 解压时释放 GIL）；
+- tar.gz / tar.zst 以流模式顺序读取，主线程解压数据流，小文件交给线程池写盘，
+  大文件直接在主线程流式写出；
+- 解压过程中按实际写出的字节数检查单文件大小、总大小、成员数量和压缩比，
+  超出限制立即中止（压缩炸弹防护）；
+- 只允许普通文件和目录，拒绝绝对路径、``..``、符号链接、硬链接和设备文件。
+
+打包下载时由线程池并发读取并压缩不超过 ARCHIVE_INLINE_MEMBER_SIZE 的小文件（结果暂存在
+内存中），再由 ZipStreamWriter 按原顺序把已压缩的数据写入不可 seek 的输出流；大文件不预先
+压缩，写入时边读边压缩边输出（使用数据描述符），不落盘，首字节也不必等待整个文件压缩完成。
+"""
+import os
+import struct
+import tarfile
+import tempfile
+import threading
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from .constants import (
+    SUPPORTED_ARCHIVE_FORMATS,
+    MAX_FILE_SIZE,
+    MAX_EXTRACTED_SIZE,
+    MAX_ARCHIVE_MEMBERS,
+    MAX_COMPRESSION_RATIO,
+    COMPRESSION_RATIO_FLOOR,
+    ARCHIVE_CHUNK_SIZE,
+    ARCHIVE_WORKERS,
+    ARCHIVE_INLINE_MEMBER_SIZE,
+    ARCHIVE_SPOOL_SIZE,
+    DOWNLOAD_CHUNK_SIZE,
+)
+from .exceptions import ArchiveLimitException, PathTraversalException
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+def detect_archive_format(filename: str) -> str:
+    """
+    根据文件名判断压缩包格式
+
+    Returns:
+        'zip'、'tar.gz' 或 'tar.zst'
+
+    Raises:
+        ValueError: 不支持的格式
+    """
+    name = filename.lower()
+    if name.endswith('.tar.gz') or name.endswith('.tgz'):
+        return 'tar.gz'
+    if name.endswith('.tar.zst') or name.endswith('.tzst'):
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd archives require the 'zstandard' package")
+        return 'tar.zst'
+    if name.endswith('.zip'):
+        return 'zip'
+    raise ValueError(f"Unsupported file format. Supported formats: {', '.join(SUPPORTED_ARCHIVE_FORMATS)}")
+
+
+def run_ordered(func: Callable, items: Iterable, workers: int) -> Iterator:
+    """
+    用线程池执行 func(item)，按 items 的顺序产出结果
+
+    同时在途的任务数不超过 workers * 2，因此 items 可以是惰性生成器。
+    生成器被提前关闭或任务抛出异常时，取消尚未开始的任务并等待正在运行的任务结束。
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='xcase-archive')
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _CountingReader:
+    """记录已读取的（压缩）字节数"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class ArchiveExtractor:
+    """
+    带限制检查的压缩包解压器
+
+    用法:
+        ArchiveExtractor(uploaded_file, 'case.zip', staging_dir).extract()
+    """
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        dest: Path,
+        max_member_size: int = MAX_FILE_SIZE,
+        max_total_size: int = MAX_EXTRACTED_SIZE,
+        max_members: int = MAX_ARCHIVE_MEMBERS,
+        max_ratio: int = MAX_COMPRESSION_RATIO,
+        workers: int = ARCHIVE_WORKERS,
+    ):
+        self.fileobj = fileobj
+        self.filename = filename
+        self.format = detect_archive_format(filename)
+        self.dest = Path(dest)
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+        self.max_members = max_members
+        self.max_ratio = max_ratio
+        self.workers = workers
+        self.members = 0
+        self.total_size = 0
+        self._compressed_read = lambda: 0
+        self._lock = threading.Lock()
+        self._aborted = threading.Event()
+
+    def extract(self) -> Dict[str, int]:
+        """
+        解压到 dest 目录
+
+        Returns:
+            {'files': 文件数量, 'bytes': 解压后的总字节数}
+
+        Raises:
+            PathTraversalException: 成员路径不安全
+            ArchiveLimitException: 超出解压限制
+        """
+        self.dest.mkdir(parents=True, exist_ok=True)
+        if self.format == 'zip':
+            self._extract_zip()
+        else:
+            self._extract_tar()
+        return {'files': self.members, 'bytes': self.total_size}
+
+    def _run_parallel(self, func: Callable, items: Iterable) -> None:
+        def guarded(item):
+            try:
+                func(item)
+            except BaseException:
+                # 通知其他仍在写盘的任务尽快退出
+                self._aborted.set()
+                raise
+
+        for _ in run_ordered(guarded, items, self.workers):
+            pass
+
+    # ------------------------------------------------------------------
+    # 格式实现
+    # ------------------------------------------------------------------
+
+    def _extract_zip(self) -> None:
+        with zipfile.ZipFile(self.fileobj) as zf:
+            infos = zf.infolist()
+            compressed_size = sum(i.compress_size for i in infos)
+            self._compressed_read = lambda: compressed_size
+
+            # 路径和头部检查、目录创建在主线程完成，线程池只负责解压写盘
+            files: List[Tuple[zipfile.ZipInfo, Path]] = []
+            for info in infos:
+                target = self._target_path(info.filename)
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                # 先按头部声明的大小快速拒绝，解压时再按实际字节数校验
+                if info.file_size > self.max_member_size:
+                    self._member_too_large(info.filename)
+                if info.file_size > self.max_ratio * max(info.compress_size, COMPRESSION_RATIO_FLOOR):
+                    raise ArchiveLimitException(self.filename, f"'{info.filename}' compression ratio too high")
+                if len(files) >= self.max_members:
+                    self._too_many_members()
+                target.parent.mkdir(parents=True, exist_ok=True)
+                files.append((info, target))
+
+            def extract_one(item):
+                info, target = item
+                with zf.open(info) as src:
+                    self._write_member(info.filename, src, target, info.external_attr >> 16)
+
+            self._run_parallel(extract_one, files)
+
+    def _extract_tar(self) -> None:
+        reader = _CountingReader(self.fileobj)
+        self._compressed_read = lambda: reader.bytes_read
+        if self.format == 'tar.zst':
+            stream = zstandard.ZstdDecompressor().stream_reader(reader)
+            mode = 'r|'
+        else:
+            stream = reader
+            mode = 'r|gz'
+        try:
+            with tarfile.open(fileobj=stream, mode=mode) as tar:
+                self._run_parallel(lambda item: self._write_member(*item), self._iter_tar_members(tar))
+        finally:
+            if stream is not reader:
+                stream.close()
+
+    def _iter_tar_members(self, tar: tarfile.TarFile) -> Iterator[Tuple[str, BinaryIO, Path, int]]:
+        """
+        顺序读取 tar 流，产出待写盘的小文件
+
+        流模式下成员数据必须在读取下一个成员之前取走：小文件读入内存交给线程池，
+        大文件直接在当前线程流式写出。
+        """
+        for member in tar:
+            target = self._target_path(member.name)
+            if member.isdir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            if not member.isfile():
+                raise PathTraversalException(member.name)
+            if member.size > self.max_member_size:
+                self._member_too_large(member.name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            src = tar.extractfile(member)
+            if member.size > ARCHIVE_INLINE_MEMBER_SIZE:
+                self._write_member(member.name, src, target, member.mode)
+            else:
+                yield member.name, BytesIO(src.read()), target, member.mode
+
+    # ------------------------------------------------------------------
+    # 公共检查
+    # ------------------------------------------------------------------
+
+    def _target_path(self, name: str) -> Path:
+        """校验成员路径并返回解压目标"""
+        path = PurePosixPath(name.replace('\\', '/'))
+        if path.is_absolute() or '..' in path.parts or not path.parts:
+            raise PathTraversalException(name)
+        return self.dest.joinpath(*path.parts)
+
+    def _member_too_large(self, name: str) -> None:
+        raise ArchiveLimitException(self.filename, f"'{name}' is larger than {self.max_member_size} bytes")
+
+    def _too_many_members(self) -> None:
+        raise ArchiveLimitException(self.filename, f"more than {self.max_members} members")
+
+    def _write_member(self, name: str, src: BinaryIO, target: Path, mode: int = 0) -> None:
+        """
+        写出一个成员（可能在线程池中并发执行，计数在锁内更新）
+
+        只保留成员权限中的可执行位，其余权限由 umask 决定。
+        """
+        with self._lock:
+            self.members += 1
+            if self.members > self.max_members:
+                self._too_many_members()
+
+        written = 0
+        with open(target, 'wb') as dst:
+            while not self._aborted.is_set():
+                data = src.read(ARCHIVE_CHUNK_SIZE)
+                if not data:
+                    break
+                written += len(data)
+                if written > self.max_member_size:
+                    self._member_too_large(name)
+                with self._lock:
+                    self.total_size += len(data)
+                    total_size = self.total_size
+                if total_size > self.max_total_size:
+                    raise ArchiveLimitException(self.filename, f"extracted size exceeds {self.max_total_size} bytes")
+                if total_size > self.max_ratio * max(self._compressed_read(), COMPRESSION_RATIO_FLOOR):
+                    raise ArchiveLimitException(self.filename, "compression ratio too high")
+                dst.write(data)
+        if mode & 0o111:
+            os.chmod(target, os.stat(target).st_mode | 0o111)
+
+
+# ----------------------------------------------------------------------
+# 并行压缩
+# ----------------------------------------------------------------------
+
+def _new_compressor(compress_type: int):
+    if compress_type == zipfile.ZIP_DEFLATED:
+        # 与 zipfile 默认参数一致：raw deflate，默认压缩级别
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return None
+
+
+class CompressedMember:
+    """已压缩完成、等待写入 zip 流的成员"""
+    __slots__ = ('zinfo', 'data')
+
+    def __init__(self, zinfo: zipfile.ZipInfo, data: BinaryIO):
+        self.zinfo = zinfo
+        self.data = data
+
+    def header(self) -> bytes:
+        return self.zinfo.FileHeader()
+
+    def trailer(self) -> bytes:
+        return b''
+
+    def iter_data(self, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            while True:
+                data = self.data.read(chunk_size)
+                if not data:
+                    break
+                yield data
+        finally:
+            self.data.close()
+
+
+class StreamedMember:
+    """
+    较大的文件：不预先压缩，写入 zip 流时边读边压缩
+
+    本地文件头中不含 CRC 和压缩后大小，写完数据后以数据描述符给出。
+    """
+    __slots__ = ('zinfo', 'file_path', 'zip64')
+
+    def __init__(self, zinfo: zipfile.ZipInfo, file_path: Path):
+        self.zinfo = zinfo
+        self.file_path = file_path
+        self.zinfo.flag_bits |= _DATA_DESCRIPTOR_FLAG
+        # 与 zipfile 相同的估算：压缩后可能略大于原文件
+        self.zip64 = zinfo.file_size * 1.05 > _ZIP64_LIMIT
+
+    def header(self) -> bytes:
+        return self.zinfo.FileHeader(self.zip64)
+
+    def trailer(self) -> bytes:
+        zinfo = self.zinfo
+        if not self.zip64 and max(zinfo.file_size, zinfo.compress_size) > _ZIP64_LIMIT:
+            raise RuntimeError(f"{zinfo.filename} grew beyond 2GB while being archived")
+        fmt = '<4L' if not self.zip64 else '<2L2Q'
+        return struct.pack(fmt, _DATA_DESCRIPTOR_SIGNATURE, zinfo.CRC, zinfo.compress_size, zinfo.file_size)
+
+    def iter_data(self, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        compressor = _new_compressor(self.zinfo.compress_type)
+        crc = 0
+        file_size = 0
+        compress_size = 0
+        with open(self.file_path, 'rb') as src:
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                file_size += len(data)
+                if compressor:
+                    data = compressor.compress(data)
+                if data:
+                    compress_size += len(data)
+                    yield data
+        if compressor:
+            data = compressor.flush()
+            compress_size += len(data)
+            yield data
+        self.zinfo.CRC = crc
+        self.zinfo.file_size = file_size
+        self.zinfo.compress_size = compress_size
+
+
+def compress_file(
+    file_path: Path,
+    arcname: str,
+    compress_type: int = zipfile.ZIP_DEFLATED,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> CompressedMember:
+    """
+    读取并压缩单个文件，计算 CRC 和大小
+
+    压缩结果不超过 ARCHIVE_SPOOL_SIZE 时保存在内存中，否则落到临时文件。
+    """
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = compress_type
+    compressor = _new_compressor(compress_type)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+    crc = 0
+    file_size = 0
+    try:
+        with open(file_path, 'rb') as src:
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                file_size += len(data)
+                spool.write(compressor.compress(data) if compressor else data)
+        if compressor:
+            spool.write(compressor.flush())
+    except BaseException:
+        spool.close()
+        raise
+
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = spool.tell()
+    spool.seek(0)
+    return CompressedMember(zinfo, spool)
+
+
+def compress_files(
+    files: Iterable[Tuple[Path, str, int]],
+    workers: int = ARCHIVE_WORKERS,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    inline_size: int = ARCHIVE_INLINE_MEMBER_SIZE
+) -> Iterator[Union[CompressedMember, StreamedMember]]:
+    """
+    并发压缩 (文件路径, 归档名, 压缩方式) 序列，按原顺序产出成员
+
+    不超过 inline_size 的文件由线程池预先压缩为 CompressedMember；
+    更大的文件产出 StreamedMember，由 ZipStreamWriter 写入时再流式压缩。
+    """
+    def compress_one(item):
+        file_path, arcname, compress_type = item
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        if zinfo.file_size > inline_size:
+            zinfo.compress_type = compress_type
+            return StreamedMember(zinfo, file_path)
+        return compress_file(file_path, arcname, compress_type, chunk_size)
+
+    return run_ordered(compress_one, files, workers)
+
+
+_ZIP64_LIMIT = (1 << 31) - 1
+_ZIP_MAX = 0xFFFFFFFF
+_DATA_DESCRIPTOR_FLAG = 0x08
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+_CENTRAL_DIR = struct.Struct('<4s4B4HL2L5H2L')
+_END_RECORD = struct.Struct('<4s4H2LH')
+_END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+_END_LOCATOR64 = struct.Struct('<4sLQL')
+
+
+class ZipStreamWriter:
+    """
+    把已压缩的成员顺序写入只写输出流
+
+    预先压缩的成员写入前 CRC 和大小都已知，本地文件头直接携带这些信息；流式成员在数据
+    之后写出数据描述符。超过 4GB 的成员、偏移量和成员数量按 zip64 格式写出。
+    """
+
+    def __init__(self, sink: BinaryIO):
+        self._sink = sink
+        self._offset = 0
+        self._members: List[zipfile.ZipInfo] = []
+
+    def _write(self, data: bytes) -> None:
+        self._sink.write(data)
+        self._offset += len(data)
+
+    def add(
+        self,
+        member: Union[CompressedMember, StreamedMember],
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE
+    ) -> Iterator[int]:
+        """
+        写入一个成员；每写出一块数据产出一次当前偏移量，调用方可借此及时取走输出
+        """
+        zinfo = member.zinfo
+        zinfo.header_offset = self._offset
+        self._write(member.header())
+        for data in member.iter_data(chunk_size):
+            self._write(data)
+            yield self._offset
+        self._write(member.trailer())
+        self._members.append(zinfo)
+
+    def close(self) -> None:
+        """写入中央目录和结束记录"""
+        start = self._offset
+        for zinfo in self._members:
+            self._write(self._central_dir_record(zinfo))
+        count = len(self._members)
+        size = self._offset - start
+
+        if count > 0xFFFF or size > _ZIP64_LIMIT or start > _ZIP64_LIMIT:
+            end64 = self._offset
+            self._write(_END_RECORD64.pack(
+                b'PK\x06\x06', 44, 45, 45, 0, 0, count, count, size, start
+            ))
+            self._write(_END_LOCATOR64.pack(b'PK\x06\x07', 0, end64, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, _ZIP_MAX)
+            start = min(start, _ZIP_MAX)
+        self._write(_END_RECORD.pack(b'PK\x05\x06', 0, 0, count, count, size, start, 0))
+
+    @staticmethod
+    def _central_dir_record(zinfo: zipfile.ZipInfo) -> bytes:
+        extra = []
+        file_size, compress_size, header_offset = zinfo.file_size, zinfo.compress_size, zinfo.header_offset
+        if file_size > _ZIP64_LIMIT:
+            extra.append(file_size)
+            file_size = _ZIP_MAX
+        if compress_size > _ZIP64_LIMIT:
+            extra.append(compress_size)
+            compress_size = _ZIP_MAX
+        if header_offset > _ZIP64_LIMIT:
+            extra.append(header_offset)
+            header_offset = _ZIP_MAX
+        extra_data = zinfo.extra
+        if extra:
+            extra_data = struct.pack(f'<HH{len(extra)}Q', 1, 8 * len(extra), *extra) + extra_data
+            zinfo.extract_version = max(zinfo.extract_version, 45)
+
+        dt = zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        try:
+            filename = zinfo.filename.encode('ascii')
+            flag_bits = zinfo.flag_bits
+        except UnicodeEncodeError:
+            filename = zinfo.filename.encode('utf-8')
+            flag_bits = zinfo.flag_bits | 0x800
+        return _CENTRAL_DIR.pack(
+            b'PK\x01\x02', zinfo.create_version, zinfo.create_system, zinfo.extract_version, zinfo.reserved,
+            flag_bits, zinfo.compress_type, dostime, dosdate, zinfo.CRC, compress_size, file_size,
+            len(filename), len(extra_data), 0, 0, zinfo.internal_attr, zinfo.external_attr, header_offset
+        ) + filename + extra_data
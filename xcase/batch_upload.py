@@ -0,0 +1,241 @@
+"""
+批量上传文件
+
+JSON 上传接口（upload_files）只能传文本内容，整个请求体驻留内存。批量上传直接接收原始字节：
+
+- multipart：多个 ``files`` 文件字段，可用同样数量的 ``paths`` 字段指定相对路径
+  （Django 会去掉文件名中的目录部分）；
+- tar 流：请求体即 tar（可为 gzip / bz2 / xz 压缩），按流模式顺序读取，不落盘整个请求。
+
+每个文件先写到目标目录下的隐藏临时文件并计算 SHA-256，与已有文件大小和内容都相同时丢弃临时文件
+（不修改已有文件），否则原子替换。写盘、比较和替换由线程池并发执行，在途文件数量有上限；
+tar 流中的小文件读入内存交给线程池，大文件在读取线程中直接写出，因此内存占用与批量大小无关。
+
+相对路径不能包含 ``.`` / ``..``，路径中已存在的各级组成部分不能是符号链接（外部创建的符号链接
+可能指向存储根目录之外）。
+
+``XCASE_UPLOAD_FSYNC = True`` 时替换前 fsync 临时文件，全部完成后 fsync 涉及的目录。
+"""
+import hashlib
+import os
+import tarfile
+import threading
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .archive import run_ordered
+from .blob_store import hash_file, temp_path
+from .constants import (
+    ARCHIVE_CHUNK_SIZE,
+    ARCHIVE_INLINE_MEMBER_SIZE,
+    ARCHIVE_WORKERS,
+    MAX_ARCHIVE_MEMBERS,
+    MAX_EXTRACTED_SIZE,
+    MAX_FILE_SIZE,
+)
+from .exceptions import ArchiveLimitException, FileSizeLimitException, PathTraversalException
+from .path_cache import is_symlink
+
+
+# 上传的文件是否 fsync 后再替换（默认关闭，依赖文件系统自身的回写）
+UPLOAD_FSYNC = getattr(settings, 'XCASE_UPLOAD_FSYNC', False)
+
+_BATCH_LABEL = 'batch upload'
+
+# (相对路径, 数据源, 权限位, 是否必须在读取线程中写出)
+UploadEntry = Tuple[str, BinaryIO, int, bool]
+
+
+def iter_multipart(files: List[BinaryIO], paths: Optional[List[str]] = None) -> Iterator[UploadEntry]:
+    """
+    multipart 上传的文件（Django UploadedFile）
+
+    Raises:
+        ValueError: paths 与 files 数量不一致
+    """
+    if paths and len(paths) != len(files):
+        raise ValueError(f"Got {len(paths)} paths for {len(files)} files")
+    for i, uploaded in enumerate(files):
+        yield (paths[i] if paths else uploaded.name), uploaded, 0, False
+
+
+def iter_tar_stream(fileobj: BinaryIO) -> Iterator[UploadEntry]:
+    """
+    顺序读取 tar 流中的普通文件（跳过目录）
+
+    流模式下成员数据必须在读取下一个成员之前取走：小文件读入内存，大文件标记为在读取线程中写出。
+
+    Raises:
+        PathTraversalException: 包含符号链接、硬链接或设备文件
+    """
+    with tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+        for member in tar:
+            if member.isdir():
+                continue
+            if not member.isfile():
+                raise PathTraversalException(member.name)
+            src = tar.extractfile(member)
+            if member.size > ARCHIVE_INLINE_MEMBER_SIZE:
+                yield member.name, src, member.mode, True
+            else:
+                yield member.name, BytesIO(src.read()), member.mode, False
+
+
+class BatchUploader:
+    """
+    把一批文件并发写入 dest 目录
+
+    用法:
+        BatchUploader(parent_abs, replace).upload(iter_tar_stream(request))
+    """
+
+    def __init__(
+        self,
+        dest: Path,
+        replace: Callable[[Path, Path], None],
+        workers: int = ARCHIVE_WORKERS,
+        max_file_size: int = MAX_FILE_SIZE,
+        max_total_size: int = MAX_EXTRACTED_SIZE,
+        max_files: int = MAX_ARCHIVE_MEMBERS,
+        fsync: bool = UPLOAD_FSYNC,
+    ):
+        """
+        Args:
+            dest: 目标目录
+            replace: replace(target, tmp) 用写好的临时文件原子替换目标
+        """
+        self.dest = Path(dest)
+        self.replace = replace
+        self.workers = workers
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.max_files = max_files
+        self.fsync = fsync
+        self.files = 0
+        self.total_size = 0
+        self.created_dirs: List[Path] = []
+        self.written: List[Path] = []
+        self._dirs = set()
+        self._lock = threading.Lock()
+
+    def upload(self, entries: Iterable[UploadEntry]) -> List[Dict[str, Any]]:
+        """
+        写入所有文件
+
+        Returns:
+            按输入顺序的每个文件的结果 {'path', 'status', 'size', 'sha256'}；
+            status 为 created / updated / unchanged / error（error 时带 'error' 说明）
+
+        Raises:
+            ArchiveLimitException: 文件数量或总大小超出限制（已写入的文件保留）
+            PathTraversalException: tar 流包含非普通文件
+        """
+        results = list(run_ordered(self._dispatch, self._prepare(entries), self.workers))
+        if self.fsync:
+            for directory in self._dirs:
+                _fsync_dir(directory)
+        return results
+
+    def _prepare(self, entries: Iterable[UploadEntry]) -> Iterator[Any]:
+        """在读取线程中校验路径、创建目录；必须顺序写出的文件在这里直接写出"""
+        for name, src, mode, sequential in entries:
+            self.files += 1
+            if self.files > self.max_files:
+                raise ArchiveLimitException(_BATCH_LABEL, f"more than {self.max_files} files")
+            try:
+                target = self._target_path(name)
+                self._ensure_dir(target.parent)
+            except Exception as e:
+                yield _error(name, e)
+                continue
+            item = (name, src, mode, target)
+            yield self._upload_one(item) if sequential else item
+
+    def _dispatch(self, item: Any) -> Dict[str, Any]:
+        return item if isinstance(item, dict) else self._upload_one(item)
+
+    def _upload_one(self, item: Tuple[str, BinaryIO, int, Path]) -> Dict[str, Any]:
+        name, src, mode, target = item
+        tmp = temp_path(target)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp, 'wb') as dst:
+                while True:
+                    data = src.read(ARCHIVE_CHUNK_SIZE)
+                    if not data:
+                        break
+                    size += len(data)
+                    if size > self.max_file_size:
+                        raise FileSizeLimitException(name, size, self.max_file_size)
+                    with self._lock:
+                        self.total_size += len(data)
+                        total_size = self.total_size
+                    if total_size > self.max_total_size:
+                        raise ArchiveLimitException(_BATCH_LABEL, f"total size exceeds {self.max_total_size} bytes")
+                    digest.update(data)
+                    dst.write(data)
+                if self.fsync:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            sha256 = digest.hexdigest()
+
+            existed = target.is_file()
+            if existed and target.stat().st_size == size and hash_file(target) == sha256:
+                tmp.unlink()
+                return {'path': name, 'status': 'unchanged', 'size': size, 'sha256': sha256}
+            if not existed and mode & 0o111:
+                os.chmod(tmp, os.stat(tmp).st_mode | 0o111)
+            self.replace(target, tmp)
+            with self._lock:
+                self.written.append(target)
+            return {'path': name, 'status': 'updated' if existed else 'created', 'size': size, 'sha256': sha256}
+        except ArchiveLimitException:
+            raise
+        except Exception as e:
+            return _error(name, e)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _target_path(self, name: str) -> Path:
+        """校验相对路径并返回目标文件（只在读取线程中调用）"""
+        path = PurePosixPath(name.replace('\\', '/'))
+        if path.is_absolute() or not path.parts or any(part in ('.', '..') for part in path.parts):
+            raise PathTraversalException(name)
+        # 已存在的各级目录和目标本身不能是符号链接：创建目录和写入时会跟随链接写到存储根目录之外
+        current = self.dest
+        for part in path.parts:
+            current = current / part
+            if current not in self._dirs and is_symlink(current):
+                raise PathTraversalException(name)
+        return current
+
+    def _ensure_dir(self, directory: Path) -> None:
+        """创建目录并记录新建的目录（只在读取线程中调用）"""
+        if directory in self._dirs:
+            return
+        missing = []
+        parent = directory
+        while not parent.is_dir():
+            missing.append(parent)
+            parent = parent.parent
+        for path in reversed(missing):
+            path.mkdir(exist_ok=True)
+            self.created_dirs.append(path)
+            self._dirs.add(path.parent)
+        self._dirs.add(directory)
+
+
+def _error(name: str, error: Exception) -> Dict[str, Any]:
+    return {'path': name, 'status': 'error', 'error': str(error)}
+
+
+def _fsync_dir(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
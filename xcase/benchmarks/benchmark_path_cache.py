@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+路径校验性能测试脚本
+
+比较原 get_abs_path（每次两次 resolve()）与 PathValidator（词法快速路径 + LRU 缓存）的单次调用耗时；
+除 LRU 缓存命中外，PathValidator 的计时都包含符号链接检查（路径各级组成部分的 lstat）
+
+用法:
+    python xcase/benchmarks/benchmark_path_cache.py [--files 2000] [--rounds 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+# 设置 Django 环境（脚本位于 <app>/benchmarks/，把仓库根目录加入导入路径）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xadmin.settings')
+django.setup()
+
+from xcase.constants import BLOB_STORE_DIR_NAME, FORBIDDEN_FILE_PATTERNS
+from xcase.exceptions import PathTraversalException
+from xcase.path_cache import PathValidator
+
+
+def legacy_get_abs_path(storage_root: Path, relative_path: str) -> Path:
+    """原实现：检查禁止模式后对目标路径和存储根目录各调用一次 resolve()"""
+    relative_path = relative_path.lstrip('/')
+    for pattern in FORBIDDEN_FILE_PATTERNS:
+        if pattern in relative_path:
+            raise PathTraversalException(relative_path)
+    if relative_path.split('/', 1)[0] == BLOB_STORE_DIR_NAME:
+        raise PathTraversalException(relative_path)
+    abs_path = storage_root / relative_path
+    try:
+        abs_path.resolve().relative_to(storage_root.resolve())
+    except ValueError:
+        raise PathTraversalException(relative_path)
+    return abs_path
+
+
+def build_storage(root: Path, files: int) -> list:
+    """创建 space/case/dirNN/fileNNNN.txt，返回所有相对路径"""
+    paths = []
+    for i in range(files):
+        rel = f'space/case/dir{i % 50:02d}/file{i:05d}.txt'
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+        paths.append(f'/{rel}')
+    return paths
+
+
+def measure(label: str, func, paths: list, rounds: int, factory=None) -> float:
+    """factory 不为空时每轮调用它重新创建 func（冷缓存）"""
+    best = None
+    for _ in range(rounds):
+        if factory is not None:
+            func = factory()
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    per_call = best / len(paths) * 1e6
+    print(f"  {label:<36} {per_call:8.2f} µs/次")
+    return per_call
+
+
+def run(files: int, rounds: int) -> None:
+    print("=" * 80)
+    print(f"路径校验性能测试 ({files} 个路径, 取 {rounds} 轮最优)")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'caseeditor'
+        paths = build_storage(root, files)
+
+        legacy = measure('原实现（resolve）', lambda p: legacy_get_abs_path(root, p), paths, rounds)
+
+        # 不缓存任何结果：每次都检查禁止模式并 lstat 路径的每一级
+        uncached = PathValidator(root, max_size=0, scan_interval=0)
+        lexical = measure('词法 + 逐级 lstat（不缓存）', uncached.resolve, paths, rounds)
+
+        # 每轮使用新的校验器：目录检查结果在同一轮内复用，路径缓存全部未命中
+        cold = measure('冷缓存（目录检查结果复用）', None, paths, rounds,
+                       factory=lambda: PathValidator(root, max_size=files).resolve)
+
+        cached = PathValidator(root, max_size=files)
+        hit = measure('LRU 缓存命中', cached.resolve, paths, rounds)
+
+        os.symlink(root / 'space' / 'case' / 'dir00', root / 'space' / 'case' / 'alias')
+        symlinked = PathValidator(root, max_size=0)
+        fallback = measure('有符号链接时（resolve 校验）', symlinked.resolve, paths, rounds)
+
+        print("-" * 80)
+        print(f"  不缓存加速:       {legacy / lexical:6.1f}x")
+        print(f"  冷缓存加速:       {legacy / cold:6.1f}x")
+        print(f"  缓存命中加速:     {legacy / hit:6.1f}x")
+        print(f"  符号链接回退:     {legacy / fallback:6.1f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    run(args.files, args.rounds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+内容寻址的 Case 文件存储（可选）
+
+启用后（``XCASE_BLOB_STORE = True``），caseeditor 存储根目录下的隐藏目录 ``.blobs``
+按 SHA-256 保存每一份不同的文件内容：
+
+    .blobs/objects/ab/cdef0123...    内容为 sha256 = abcdef0123... 的文件
+    .blobs/objects/ab/cdef0123....x  内容相同的可执行文件（权限属于 inode，需单独保存）
+
+Case 目录中的文件是指向这些对象的硬链接，目录结构本身就是 Case 的清单（manifest）：
+
+- 相同内容在所有 Case 之间只占一份磁盘空间；
+- 复制 / fork Case 只需创建硬链接，不复制数据；
+- 上传的文件与现有文件内容相同时直接跳过，上传压缩包时只有新内容占用空间。
+
+对象文件（以及链接到它的 Case 文件）是只读的。FileManager 的所有写操作都先写临时文件
+再原子替换目标路径，从不原地修改，因此不会影响共享同一对象的其他 Case。
+链接数降为 1（只剩对象自身）的对象由 gc() 清理。
+
+Case 目录仍是普通的目录树，文件树、目录索引、下载和 casebrowser 的读取逻辑不受影响。
+"""
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from loguru import logger
+
+from .archive import run_ordered
+from .constants import ARCHIVE_WORKERS, BLOB_DIGEST_CACHE_SIZE
+
+
+# 是否启用内容寻址存储
+BLOB_STORE_ENABLED = getattr(settings, 'XCASE_BLOB_STORE', False)
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+_EXECUTABLE = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+_EXECUTABLE_SUFFIX = '.x'
+
+
+def temp_path(target: Path) -> Path:
+    """与 target 同目录（同一文件系统）的隐藏临时路径"""
+    return target.with_name(f".{target.name}.tmp-{uuid.uuid4().hex[:12]}")
+
+
+def replace_file(target: Path, data: bytes) -> None:
+    """
+    写临时文件后原子替换 target
+
+    target 是硬链接时替换只影响这一个路径，共享同一 inode 的其他路径保持不变。
+    """
+    tmp = temp_path(target)
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        if target.exists():
+            # 保留原文件权限（至少保证属主可写）
+            os.chmod(tmp, stat.S_IMODE(target.stat().st_mode) | stat.S_IWUSR)
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _is_executable(path: Path) -> bool:
+    try:
+        return bool(path.stat().st_mode & _EXECUTABLE)
+    except OSError:
+        return False
+
+
+def hash_file(path: Path) -> str:
+    """计算文件内容的 SHA-256"""
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class BlobStore:
+    """
+    硬链接实现的内容寻址存储
+
+    root 必须与 Case 目录位于同一文件系统（默认是存储根目录下的 .blobs）。
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self._digests: 'OrderedDict[tuple, str]' = OrderedDict()
+        self._digest_lock = threading.Lock()
+
+    def object_path(self, digest: str, executable: bool = False) -> Path:
+        suffix = _EXECUTABLE_SUFFIX if executable else ''
+        return self.objects / digest[:2] / f"{digest[2:]}{suffix}"
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def store_bytes(self, target: Path, data: bytes) -> bool:
+        """
+        把 data 写到 target（指向对应对象的硬链接），保留 target 原有的可执行权限
+
+        Returns:
+            内容有变化时返回 True；target 已经是同一对象时不做任何修改，返回 False
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        executable = _is_executable(target)
+        obj = self.object_path(digest, executable)
+        if self._is_link_of(target, obj):
+            return False
+        self._ensure_object(obj, data, executable)
+        try:
+            self._link(obj, target)
+        except FileNotFoundError:
+            # 对象恰好被 gc 删除，重新写入一次
+            self._ensure_object(obj, data, executable)
+            self._link(obj, target)
+        return True
+
+    def intern(self, path: Path) -> str:
+        """
+        把已有文件收入存储：内容已存在时用硬链接替换该文件，否则把该文件登记为新对象
+
+        Returns:
+            文件内容的 SHA-256
+        """
+        digest = hash_file(path)
+        executable = _is_executable(path)
+        obj = self.object_path(digest, executable)
+        if self._is_link_of(path, obj):
+            return digest
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(path, _READ_ONLY | (_EXECUTABLE if executable else 0))
+        try:
+            os.link(path, obj)
+        except FileExistsError:
+            # 内容已存在：释放 path 的数据，改为链接到已有对象
+            self._link(obj, path)
+        return digest
+
+    def intern_tree(self, root: Path, workers: int = ARCHIVE_WORKERS) -> int:
+        """
+        并发收入目录下的所有普通文件
+
+        Returns:
+            收入的文件数量
+        """
+        count = 0
+        for _ in run_ordered(self.intern, _iter_files(root), workers):
+            count += 1
+        return count
+
+    def link_copy(self, src: str, dst: str) -> None:
+        """shutil.copytree 的 copy_function：收入 src 后把 dst 链接到同一对象"""
+        src = Path(src)
+        obj = self.object_path(self.intern(src), _is_executable(src))
+        self._link(obj, Path(dst))
+
+    def _ensure_object(self, obj: Path, data: bytes, executable: bool) -> None:
+        if obj.exists():
+            return
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = temp_path(obj)
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp, _READ_ONLY | (_EXECUTABLE if executable else 0))
+            os.replace(tmp, obj)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _link(obj: Path, target: Path) -> None:
+        """把 target 原子替换为 obj 的硬链接"""
+        tmp = temp_path(target)
+        os.link(obj, tmp)
+        try:
+            os.replace(tmp, target)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _is_link_of(path: Path, obj: Path) -> bool:
+        try:
+            return os.path.samefile(path, obj)
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # 清单与清理
+    # ------------------------------------------------------------------
+
+    def manifest(self, root: Path) -> Dict[str, str]:
+        """
+        返回目录的清单 {相对路径: sha256}
+
+        只读：只遍历 root 下的文件，不收入尚未进入存储的文件，也不扫描对象目录。
+        """
+        return {path.relative_to(root).as_posix(): self.digest(path) for path in _iter_files(root)}
+
+    def digest(self, path: Path) -> str:
+        """
+        文件内容的 SHA-256
+
+        按 (设备, inode, 大小, mtime) 缓存：对象文件只读且从不原地修改，
+        已收入存储的文件只在第一次读取时计算。
+        """
+        st = path.stat()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._digest_lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+        digest = hash_file(path)
+        with self._digest_lock:
+            self._digests[key] = digest
+            while len(self._digests) > BLOB_DIGEST_CACHE_SIZE:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _iter_objects(self) -> Iterator[Path]:
+        if not self.objects.is_dir():
+            return
+        for prefix in self.objects.iterdir():
+            if prefix.is_dir():
+                for obj in prefix.iterdir():
+                    if not obj.name.startswith('.'):
+                        yield obj
+
+    def gc(self) -> Dict[str, int]:
+        """
+        删除不再被任何 Case 引用的对象（链接数为 1）
+
+        Returns:
+            {'objects': 剩余对象数量, 'removed': 删除数量, 'bytes': 释放的字节数}
+        """
+        kept = removed = freed = 0
+        for obj in self._iter_objects():
+            st = obj.stat()
+            if st.st_nlink > 1:
+                kept += 1
+                continue
+            obj.unlink()
+            removed += 1
+            freed += st.st_size
+        logger.info(f"Blob store gc: removed {removed} objects, freed {freed} bytes")
+        return {'objects': kept, 'removed': removed, 'bytes': freed}
+
+
+def _iter_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if path.is_file() and not path.is_symlink():
+                yield path
+
+
+def copy_tree(src: Path, dst: Path, store: Optional[BlobStore]) -> None:
+    """复制目录树：启用存储时创建硬链接，否则普通复制"""
+    copy_function = store.link_copy if store is not None else shutil.copy2
+    shutil.copytree(src, dst, copy_function=copy_function)
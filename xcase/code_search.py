@@ -0,0 +1,685 @@
+"""
+Case 文件内容搜索（trigram 倒排索引）
+
+索引保存在存储根目录下的 ``.search/index.sqlite3``：
+
+    docs(id, path, lang, size, mtime_ns)    已索引的文件（path 为相对存储根目录的路径）
+    trigrams(tri, doc)                       文件内容中出现的每个 3 字节序列 → 文件
+    meta(key, value)                         索引状态（built：全量建立已完成）
+
+查询时先从正则表达式中提取必须出现的字面量（含 ``|`` 分支），转换为 trigram 的
+AND / OR 组合，在索引中求交 / 并得到候选文件，再逐个读取候选文件用正则按行校验并返回匹配行。
+只有候选文件需要读取，查询耗时与候选数量相关，而不是与存储的总大小相关。
+
+正则由用户提交并在请求中执行，因此：
+
+- 没有可用字面量的正则（例如 ``\\w+``）会让所有文件成为候选，直接拒绝；
+- 嵌套的重复（例如 ``(a+)+``）可能导致指数级回溯，直接拒绝；每行只在开头
+  SEARCH_MAX_SCAN_LINE_LENGTH 个字符内匹配；
+- 候选文件数量、读取字节数和耗时分别受 SEARCH_MAX_CANDIDATES / SEARCH_MAX_SCAN_BYTES /
+  SEARCH_TIME_BUDGET 限制，超出后提前结束并返回 truncated。
+
+- trigram 按字节计算并把 ASCII 字母转为小写，忽略大小写的查询同样可以使用索引；
+- 二进制文件（开头包含 NUL）和超过 SEARCH_MAX_FILE_SIZE 的文件不索引；
+- 隐藏文件和目录（上传 / fork 的临时目录、原子写入的临时文件）不索引。
+
+FileManager 的写操作调用 note_changed / note_removed / note_renamed，由后台线程
+增量更新索引，不阻塞请求；``case_search`` 命令用于首次建立或全量校正索引。
+
+全量建立分批提交事务（每批 _BATCH_SIZE 个文件），完成后写入 meta 中的 built 标记：
+没有该标记时（首次使用、建立中途进程重启）在后台继续建立，已索引且未变化的文件直接跳过。
+全量建立持有 ``.search/build.lock`` 上的 flock，多个 worker 进程中只有一个执行。
+"""
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from re import _constants as _sre_constants, _parser as _sre_parser
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from loguru import logger
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    FCNTL_AVAILABLE = False
+
+from .constants import (
+    DEFAULT_ENCODING,
+    LANGUAGE_EXTENSION_MAP,
+    SEARCH_INDEX_DIR_NAME,
+    SEARCH_MAX_FILE_SIZE,
+    SEARCH_MAX_LITERAL_TRIGRAMS,
+    SEARCH_DEFAULT_RESULTS,
+    SEARCH_MAX_MATCHES_PER_FILE,
+    SEARCH_MAX_LINE_LENGTH,
+    SEARCH_MAX_SCAN_LINE_LENGTH,
+    SEARCH_MAX_CANDIDATES,
+    SEARCH_MAX_SCAN_BYTES,
+    SEARCH_TIME_BUDGET,
+)
+
+
+# 是否启用代码搜索索引
+CODE_SEARCH_ENABLED = getattr(settings, 'XCASE_CODE_SEARCH', True)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    lang TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri BLOB NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (tri, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_doc ON trigrams (doc);
+CREATE INDEX IF NOT EXISTS docs_lang ON docs (lang);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_BINARY_SAMPLE_SIZE = 8192
+_BATCH_SIZE = 500
+
+
+def trigrams(data: bytes) -> Set[bytes]:
+    """计算内容中出现的所有 trigram（ASCII 字母转为小写）"""
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def language_of(path: str) -> Optional[str]:
+    """根据扩展名返回语言（LANGUAGE_EXTENSION_MAP）"""
+    return LANGUAGE_EXTENSION_MAP.get(os.path.splitext(path)[1].lower())
+
+
+# ----------------------------------------------------------------------
+# 正则 → trigram 查询
+# ----------------------------------------------------------------------
+# 查询节点：('tri', bytes) | ('and', [节点]) | ('or', [节点])；None 表示没有约束
+
+_QUANTIFIER_RE = re.compile(r'\{(\d*)(?:,(\d*))?\}')
+
+
+def _literal_node(text: str, ascii_only: bool) -> Optional[tuple]:
+    data = text.encode(DEFAULT_ENCODING).lower()
+    tris = []
+    for i in range(len(data) - 2):
+        tri = data[i:i + 3]
+        # 忽略大小写时非 ASCII 字符的大小写无法按字节折叠，不使用包含它们的 trigram
+        if tri in tris or (ascii_only and max(tri) >= 0x80):
+            continue
+        tris.append(tri)
+    if not tris:
+        return None
+    if len(tris) > SEARCH_MAX_LITERAL_TRIGRAMS:
+        # 均匀选取一部分即可大幅缩小候选集合，其余由正则校验
+        step = len(tris) / SEARCH_MAX_LITERAL_TRIGRAMS
+        tris = [tris[int(i * step)] for i in range(SEARCH_MAX_LITERAL_TRIGRAMS)]
+    nodes = [('tri', t) for t in tris]
+    return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+
+def _split_top(pattern: str) -> List[str]:
+    """按顶层的 | 拆分分支（跳过转义、字符类和分组内部）"""
+    branches, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """返回字符类 [...] 之后的位置"""
+    j = i + 1
+    if j < len(pattern) and pattern[j] == '^':
+        j += 1
+    if j < len(pattern) and pattern[j] == ']':
+        j += 1
+    while j < len(pattern) and pattern[j] != ']':
+        j += 2 if pattern[j] == '\\' else 1
+    return j + 1
+
+
+def _match_paren(pattern: str, i: int) -> int:
+    """返回与 pattern[i] 处的 ( 匹配的 ) 之后的位置"""
+    depth, j = 0, i
+    while j < len(pattern):
+        c = pattern[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '[':
+            j = _skip_class(pattern, j)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return j
+
+
+def _read_quantifier(pattern: str, i: int) -> Tuple[Optional[int], int]:
+    """读取位置 i 处的量词，返回 (最少重复次数, 之后的位置)；没有量词时返回 (None, i)"""
+    if i >= len(pattern):
+        return None, i
+    c = pattern[i]
+    if c in '*?':
+        minimum, i = 0, i + 1
+    elif c == '+':
+        minimum, i = 1, i + 1
+    elif c == '{':
+        m = _QUANTIFIER_RE.match(pattern, i)
+        if not m or (not m.group(1) and m.group(2) is None):
+            return None, i
+        minimum, i = int(m.group(1) or 0), m.end()
+    else:
+        return None, i
+    # 非贪婪 / 占有量词后缀
+    if i < len(pattern) and pattern[i] in '?+':
+        i += 1
+    return minimum, i
+
+
+def _combine(kind: str, nodes: List[tuple]) -> Optional[tuple]:
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else (kind, nodes)
+
+
+def regex_query(pattern: str, ascii_only: bool = False) -> Optional[tuple]:
+    """
+    从正则表达式中提取匹配时必须出现的 trigram 组合
+
+    只做保守的提取：无法确定的部分（字符类、转义类、可选部分、环视等）视为没有约束，
+    结果只会放大候选集合，不会漏掉匹配。
+    """
+    branches = _split_top(pattern)
+    if len(branches) > 1:
+        nodes = [regex_query(branch, ascii_only) for branch in branches]
+        if any(node is None for node in nodes):
+            return None
+        return ('or', nodes)
+
+    parts: List[tuple] = []
+    run: List[str] = []
+
+    def flush():
+        if len(run) >= 3:
+            node = _literal_node(''.join(run), ascii_only)
+            if node is not None:
+                parts.append(node)
+        run.clear()
+
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            escaped = pattern[i + 1:i + 2]
+            i += 2
+            if not escaped or escaped.isalnum():
+                # \d \w \b \x41 等：不是单个确定的字符
+                flush()
+                _, i = _read_quantifier(pattern, i)
+                continue
+            char = escaped
+        elif c == '[':
+            flush()
+            i = _skip_class(pattern, i)
+            _, i = _read_quantifier(pattern, i)
+            continue
+        elif c == '(':
+            j = _match_paren(pattern, i)
+            inner = pattern[i + 1:j - 1]
+            flush()
+            minimum, i = _read_quantifier(pattern, j)
+            if inner.startswith('?'):
+                if inner.startswith('?:'):
+                    inner = inner[2:]
+                elif inner.startswith('?P<'):
+                    inner = inner[inner.find('>') + 1:]
+                else:
+                    # 环视、内联标志、注释等
+                    continue
+            if minimum is None or minimum > 0:
+                sub = regex_query(inner, ascii_only)
+                if sub is not None:
+                    parts.append(sub)
+            continue
+        elif c in '.^$|)':
+            flush()
+            i += 1
+            _, i = _read_quantifier(pattern, i)
+            continue
+        else:
+            char = c
+            i += 1
+
+        minimum, i = _read_quantifier(pattern, i)
+        if minimum is None:
+            run.append(char)
+        elif minimum == 0:
+            flush()
+        else:
+            run.append(char)
+            flush()
+    flush()
+    return _combine('and', parts)
+
+
+_REPEATS = (_sre_constants.MAX_REPEAT, _sre_constants.MIN_REPEAT)
+
+
+def has_nested_repeat(items, repeated: bool = False) -> bool:
+    """解析后的正则中是否有嵌套的重复（可重复的分组内还有可重复的部分，如 (a+)+、(a*b?)*）"""
+    for op, av in items:
+        if op in _REPEATS:
+            _, maximum, sub = av
+            if maximum > 1 and repeated:
+                return True
+            if has_nested_repeat(sub, repeated or maximum > 1):
+                return True
+        elif op == _sre_constants.SUBPATTERN:
+            if has_nested_repeat(av[-1], repeated):
+                return True
+        elif op == _sre_constants.BRANCH:
+            if any(has_nested_repeat(branch, repeated) for branch in av[1]):
+                return True
+        elif op in (_sre_constants.ASSERT, _sre_constants.ASSERT_NOT):
+            if has_nested_repeat(av[1], repeated):
+                return True
+    return False
+
+
+def _query_sql(node: tuple, params: List[Any]) -> str:
+    kind = node[0]
+    if kind == 'tri':
+        params.append(node[1])
+        return 'SELECT doc FROM trigrams WHERE tri = ?'
+    op = ' INTERSECT ' if kind == 'and' else ' UNION '
+    return op.join(f'SELECT doc FROM ({_query_sql(child, params)})' for child in node[1])
+
+
+# ----------------------------------------------------------------------
+# 索引
+# ----------------------------------------------------------------------
+
+def _is_hidden(rel_path: str) -> bool:
+    return any(part.startswith('.') for part in rel_path.split('/'))
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}/%'
+
+
+class CodeSearchIndex:
+    """存储根目录的 trigram 索引（写操作由后台线程串行执行）"""
+
+    def __init__(self, storage_root: Path):
+        self.storage_root = Path(storage_root)
+        self.db_path = self.storage_root / SEARCH_INDEX_DIR_NAME / 'index.sqlite3'
+        self._local = threading.local()
+        self._queue: 'queue.Queue[Optional[tuple]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # 增量更新（后台线程）
+    # ------------------------------------------------------------------
+
+    def note_changed(self, abs_path) -> None:
+        """文件或目录（递归）被创建 / 修改"""
+        self._enqueue(('changed', Path(abs_path)))
+
+    def note_removed(self, abs_path) -> None:
+        """文件或目录（递归）被删除"""
+        self._enqueue(('removed', Path(abs_path)))
+
+    def note_renamed(self, old_path, new_path) -> None:
+        self.note_removed(old_path)
+        self.note_changed(new_path)
+
+    def build_in_background(self) -> None:
+        """在后台线程中全量建立索引（其他进程正在建立或已建立完成时跳过）"""
+        self._enqueue(('build', self.storage_root))
+
+    @property
+    def built(self) -> bool:
+        """全量建立是否已完成"""
+        row = self._connect().execute("SELECT 1 FROM meta WHERE key = 'built'").fetchone()
+        return row is not None
+
+    def flush(self) -> None:
+        """等待已提交的更新全部写入索引"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """停止后台线程（已提交的更新会先处理完）"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _enqueue(self, item: tuple) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='xcase-code-search', daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+
+    def _worker(self) -> None:
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            # 把积压的更新合并到一个事务中
+            items = [item]
+            while len(items) < _BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            build = False
+            try:
+                with conn:
+                    for op, path in (i for i in items if i is not None):
+                        if op == 'changed':
+                            self._index_path(conn, path)
+                        elif op == 'removed':
+                            self._remove(conn, self._rel(path))
+                        else:
+                            build = True
+                # 全量建立自行分批提交，不放在增量更新的事务中
+                if build:
+                    self._build()
+            except Exception as e:
+                logger.error(f"Code search index update failed: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                break
+        conn.close()
+        self._local.conn = None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _rel(self, abs_path: Path) -> str:
+        return Path(abs_path).relative_to(self.storage_root).as_posix()
+
+    def _iter_files(self, root: Path) -> Iterator[Path]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for name in sorted(filenames):
+                if not name.startswith('.'):
+                    yield Path(dirpath) / name
+
+    def _index_path(self, conn: sqlite3.Connection, abs_path: Path) -> None:
+        if abs_path != self.storage_root and _is_hidden(self._rel(abs_path)):
+            return
+        if abs_path.is_dir():
+            for file_path in self._iter_files(abs_path):
+                self._index_file(conn, file_path)
+        else:
+            self._index_file(conn, abs_path)
+
+    def _index_file(self, conn: sqlite3.Connection, abs_path: Path) -> bool:
+        """索引单个文件，内容未变化（大小和 mtime 相同）时跳过；返回是否写入了索引"""
+        rel = self._rel(abs_path)
+        try:
+            st = abs_path.stat()
+        except FileNotFoundError:
+            self._remove(conn, rel)
+            return False
+        row = conn.execute('SELECT id, size, mtime_ns FROM docs WHERE path = ?', (rel,)).fetchone()
+        if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+            return False
+
+        data = None
+        if st.st_size <= SEARCH_MAX_FILE_SIZE:
+            with open(abs_path, 'rb') as f:
+                data = f.read()
+            if b'\0' in data[:_BINARY_SAMPLE_SIZE]:
+                data = None
+        if data is None:
+            self._remove(conn, rel)
+            return False
+
+        if row:
+            doc = row[0]
+            conn.execute('DELETE FROM trigrams WHERE doc = ?', (doc,))
+            conn.execute('UPDATE docs SET size = ?, mtime_ns = ? WHERE id = ?', (st.st_size, st.st_mtime_ns, doc))
+        else:
+            doc = conn.execute(
+                'INSERT INTO docs (path, lang, size, mtime_ns) VALUES (?, ?, ?, ?)',
+                (rel, language_of(rel), st.st_size, st.st_mtime_ns)
+            ).lastrowid
+        conn.executemany('INSERT INTO trigrams (tri, doc) VALUES (?, ?)', ((t, doc) for t in trigrams(data)))
+        return True
+
+    def _remove(self, conn: sqlite3.Connection, rel: str) -> None:
+        docs = 'SELECT id FROM docs WHERE path = ? OR path LIKE ? ESCAPE \'\\\''
+        params = (rel, _like_prefix(rel))
+        conn.execute(f'DELETE FROM trigrams WHERE doc IN ({docs})', params)
+        conn.execute(f'DELETE FROM docs WHERE id IN ({docs})', params)
+
+    @contextmanager
+    def _build_lock(self, blocking: bool = True) -> Iterator[bool]:
+        """全量建立的进程间互斥锁；非阻塞时锁已被占用返回 False"""
+        if not FCNTL_AVAILABLE:
+            yield True
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.db_path.parent / 'build.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def _build(self) -> None:
+        with self._build_lock(blocking=False) as acquired:
+            # 其他进程正在建立；或在等待期间已建立完成
+            if acquired and not self.built:
+                self._update()
+
+    def update(self) -> Dict[str, int]:
+        """
+        全量校正索引：索引新增和变化的文件，删除已不存在的文件（在调用线程中同步执行）
+
+        Returns:
+            {'files': 已索引文件数量, 'indexed': 本次写入数量, 'removed': 删除数量}
+        """
+        with self._build_lock():
+            return self._update()
+
+    def _update(self) -> Dict[str, int]:
+        conn = self._connect()
+        seen = set()
+        indexed = 0
+        files = self._iter_files(self.storage_root)
+        while True:
+            with conn:
+                batch = 0
+                for file_path in files:
+                    seen.add(self._rel(file_path))
+                    indexed += self._index_file(conn, file_path)
+                    batch += 1
+                    if batch >= _BATCH_SIZE:
+                        break
+                else:
+                    break
+
+        with conn:
+            stale = [path for (path,) in conn.execute('SELECT path FROM docs') if path not in seen]
+            for path in stale:
+                self._remove(conn, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('built', ?)", (str(int(time.time())),)
+            )
+        files_count = conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+        logger.info(f"Code search index updated: {indexed} indexed, {len(stale)} removed, {files_count} files")
+        return {'files': files_count, 'indexed': indexed, 'removed': len(stale)}
+
+    def rebuild(self) -> Dict[str, int]:
+        """删除索引后重新建立（在调用线程中同步执行）"""
+        self.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._build_lock():
+            for suffix in ('', '-wal', '-shm'):
+                Path(f'{self.db_path}{suffix}').unlink(missing_ok=True)
+            return self._update()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        pattern: str,
+        languages: Optional[List[str]] = None,
+        path_prefix: Optional[str] = None,
+        ignore_case: bool = False,
+        limit: int = SEARCH_DEFAULT_RESULTS
+    ) -> Dict[str, Any]:
+        """
+        按正则表达式搜索文件内容
+
+        Args:
+            pattern: Python 正则表达式（按行匹配，^ / $ 匹配行首行尾）
+            languages: 只搜索这些语言的文件（LANGUAGE_EXTENSION_MAP 中的值）
+            path_prefix: 只搜索该目录下的文件（如 'casespace/case'）
+            ignore_case: 忽略大小写
+            limit: 最多返回的文件数量
+
+        Returns:
+            {'results': [{'path', 'language', 'matches': [{'line', 'text'}]}],
+             'candidates': 候选文件数量,
+             'truncated': 是否因达到 limit 或候选数量 / 读取字节数 / 耗时上限提前结束}
+
+        Raises:
+            ValueError: 正则表达式无效、没有可用于索引的字面量或包含嵌套的重复
+        """
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        try:
+            regex = re.compile(pattern, flags)
+            parsed = _sre_parser.parse(pattern, flags)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression: {e}")
+        if has_nested_repeat(parsed):
+            raise ValueError("Nested repetition (e.g. '(a+)+') is not supported")
+
+        params: List[Any] = []
+        where = []
+        # 详细模式（re.X）下空白和注释不是字面量，不使用索引
+        node = None if regex.flags & re.VERBOSE else regex_query(pattern, bool(regex.flags & re.IGNORECASE))
+        if node is None:
+            raise ValueError("Pattern must contain a literal of at least 3 characters")
+        where.append(f'id IN ({_query_sql(node, params)})')
+        if languages:
+            where.append(f"lang IN ({', '.join('?' * len(languages))})")
+            params.extend(languages)
+        if path_prefix:
+            prefix = path_prefix.strip('/')
+            where.append("path LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(prefix))
+        sql = 'SELECT path, lang FROM docs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY path LIMIT ?'
+        params.append(SEARCH_MAX_CANDIDATES + 1)
+
+        candidates = self._connect().execute(sql, params).fetchall()
+        truncated = len(candidates) > SEARCH_MAX_CANDIDATES
+        del candidates[SEARCH_MAX_CANDIDATES:]
+        deadline = time.monotonic() + SEARCH_TIME_BUDGET
+        budget = SEARCH_MAX_SCAN_BYTES
+        results = []
+        for path, lang in candidates:
+            if budget <= 0 or time.monotonic() > deadline:
+                truncated = True
+                break
+            try:
+                data = (self.storage_root / path).read_bytes()
+            except OSError:
+                continue
+            budget -= len(data)
+            matches = self._match_lines(regex, data.decode(DEFAULT_ENCODING, errors='replace'), deadline)
+            if not matches:
+                continue
+            if len(results) >= limit:
+                truncated = True
+                break
+            results.append({'path': f'/{path}', 'language': lang, 'matches': matches})
+        return {'results': results, 'candidates': len(candidates), 'truncated': truncated}
+
+    @staticmethod
+    def _match_lines(regex: re.Pattern, text: str, deadline: float) -> List[Dict[str, Any]]:
+        """逐行匹配（每行只匹配开头 SEARCH_MAX_SCAN_LINE_LENGTH 个字符），超过 deadline 时停止"""
+        matches = []
+        for number, line in enumerate(text.split('\n'), start=1):
+            if regex.search(line[:SEARCH_MAX_SCAN_LINE_LENGTH]):
+                matches.append({'line': number, 'text': line[:SEARCH_MAX_LINE_LENGTH]})
+                if len(matches) >= SEARCH_MAX_MATCHES_PER_FILE:
+                    break
+            if number % 1000 == 0 and time.monotonic() > deadline:
+                break
+        return matches
@@ -1,10 +1,20 @@
 """
 常量定义模块
 """
+import os
 
 # 存储根目录名称
 STORAGE_ROOT_NAME = "caseeditor"
 
+# 内容寻址存储目录名称（位于存储根目录下，隐藏目录不会出现在 Casespace 列表中）
+BLOB_STORE_DIR_NAME = ".blobs"
+
+# 代码搜索索引目录名称（位于存储根目录下）
+SEARCH_INDEX_DIR_NAME = ".search"
+
+# Case 快照目录名称（位于存储根目录下）
+SNAPSHOT_DIR_NAME = ".snapshots"
+
 # 默认编码
 DEFAULT_ENCODING = 'utf-8'
 
@@ -12,7 +22,7 @@ DEFAULT_ENCODING = 'utf-8'
 FALLBACK_ENCODING = 'latin-1'
 
 # 支持的压缩包格式
-SUPPORTED_ARCHIVE_FORMATS = ['.tar.gz', '.tgz', '.zip']
+SUPPORTED_ARCHIVE_FORMATS = ['.tar.gz', '.tgz', '.tar.zst', '.tzst', '.zip']
 
 # 文件扩展名到编程语言的映射
 LANGUAGE_EXTENSION_MAP = {
@@ -50,12 +60,129 @@ LANGUAGE_EXTENSION_MAP = {
     '.php': 'php',
 }
 
+# 代码搜索：超过该大小的文件不建立索引
+SEARCH_MAX_FILE_SIZE = 4 * 1024 * 1024  # 4MB
+
+# 代码搜索：每个字面量最多使用的 trigram 数量（均匀选取，其余只在校验时匹配）
+SEARCH_MAX_LITERAL_TRIGRAMS = 16
+
+# 代码搜索：默认 / 最多返回的文件数量
+SEARCH_DEFAULT_RESULTS = 100
+SEARCH_MAX_RESULTS = 1000
+
+# 代码搜索：每个文件最多返回的匹配行数
+SEARCH_MAX_MATCHES_PER_FILE = 20
+
+# 代码搜索：返回的匹配行最大长度（字符）
+SEARCH_MAX_LINE_LENGTH = 300
+
+# 代码搜索：每行只在开头这么多字符内匹配（限制单次正则匹配的输入长度）
+SEARCH_MAX_SCAN_LINE_LENGTH = 4096
+
+# 代码搜索：单次查询最多校验的候选文件数量 / 读取的字节数 / 耗时（秒），超出后提前结束并返回 truncated
+SEARCH_MAX_CANDIDATES = 10000
+SEARCH_MAX_SCAN_BYTES = 256 * 1024 * 1024  # 256MB
+SEARCH_TIME_BUDGET = 5
+
 # 文件上传大小限制（字节）
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 
 # 压缩包上传大小限制（字节）
 MAX_ARCHIVE_SIZE = 500 * 1024 * 1024  # 500MB
 
+# 压缩包解压后的总大小限制（字节）
+MAX_EXTRACTED_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+
+# 压缩包内最多允许的成员数量
+MAX_ARCHIVE_MEMBERS = 50000
+
+# 解压大小与压缩大小的最大比例（压缩炸弹检测）
+MAX_COMPRESSION_RATIO = 200
+
+# 计算压缩比时压缩数据量的下限（字节），避免小文件误判
+COMPRESSION_RATIO_FLOOR = 1024 * 1024  # 1MB
+
+# 解压时的读写块大小（字节）
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# 并行解压 / 压缩的线程数
+ARCHIVE_WORKERS = min(8, os.cpu_count() or 1)
+
+# 超过该大小的成员不交给线程池（字节）：解压 tar 时在读取线程中直接写盘，
+# 打包下载时不预先压缩，在输出时边读边压缩
+ARCHIVE_INLINE_MEMBER_SIZE = 4 * 1024 * 1024  # 4MB
+
+# 并行压缩时单个成员的压缩结果超过该大小后落到临时文件（字节）
+ARCHIVE_SPOOL_SIZE = 8 * 1024 * 1024  # 8MB
+
+# 流式下载时读取文件 / 输出数据块的大小（字节）
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 已压缩的文件类型，打包下载时直接存储（ZIP_STORED）不再重新压缩
+COMPRESSED_FILE_EXTENSIONS = frozenset([
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.lz4',
+    '.jar', '.whl', '.apk',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp',
+    '.mp3', '.mp4', '.mkv', '.webm', '.avi', '.mov',
+])
+
+# 判断文件编码时读取的样本大小（字节）
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# 超过该大小的文件在 get_file_content 中只返回开头一块，其余部分分块读取（字节）
+MAX_INLINE_CONTENT_SIZE = 2 * 1024 * 1024  # 2MB
+
+# 分块读取时默认 / 最大的块大小（字节）
+FILE_CHUNK_SIZE = 256 * 1024
+MAX_FILE_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB
+
+# 按行读取时默认 / 最大的行数
+FILE_CHUNK_LINES = 1000
+MAX_FILE_CHUNK_LINES = 20000
+
+# 行索引检查点间隔（行），以及最多缓存行索引的文件数量
+LINE_INDEX_INTERVAL = 1000
+LINE_INDEX_CACHE_SIZE = 64
+
+# 文件树懒加载时每页返回的节点数量
+TREE_PAGE_SIZE = 200
+
+# 文件树懒加载单页最大节点数量
+MAX_TREE_PAGE_SIZE = 2000
+
+# 目录索引最多缓存的目录数量（超出后按 LRU 淘汰）
+FS_INDEX_MAX_DIRS = 4096
+
+# 内容寻址存储缓存的文件摘要数量（按 inode 缓存 SHA-256，超出后按 LRU 淘汰）
+BLOB_DIGEST_CACHE_SIZE = 100000
+
+# 目录索引缓存的最长有效期（秒），超过后即使目录 mtime 未变化也重新扫描
+FS_INDEX_REVALIDATE_TTL = 30
+
+# 每个 Case 最多保留的快照数量（超出后删除最旧的快照）
+MAX_CASE_SNAPSHOTS = 100
+
+# 已校验路径缓存的条目数量（超出后按 LRU 淘汰）
+PATH_CACHE_SIZE = 4096
+
+# 路径各级目录的符号链接检查结果（以及据此缓存的路径）的有效期（秒）
+PATH_SYMLINK_SCAN_INTERVAL = 10
+
+# 单次元数据对账最多清理的 CaseMetadata 行数（超出时中止，需 --force 确认）
+RECONCILE_MAX_PRUNE = 100
+
+# Case 查询表达式最多包含的节点数量（防止构造过大的 SQL）
+MAX_CASE_QUERY_NODES = 100
+
+# Case 查询支持的选项比较方式
+CASE_QUERY_OPTION_OPS = ('eq', 'ne', 'in', 'contains', 'exists')
+
+# 批量修改标签 / 选项支持的操作
+CASE_BULK_ACTIONS = ('addTag', 'deleteTag', 'setOption', 'deleteOption')
+
+# 批量修改一次最多涉及的 Case 数量
+MAX_BULK_CASES = 5000
+
 # 允许的文件类型（白名单）
 ALLOWED_FILE_EXTENSIONS = [
     # 文本文件
@@ -77,6 +77,15 @@ class FileSizeLimitException(XCaseException):
         self.max_size = max_size
 
 
+class RangeNotSatisfiableException(XCaseException):
+    """请求的字节区间无法满足异常"""
+    def __init__(self, path: str, size: int):
+        message = f"Requested range not satisfiable for '{path}' (size {size} bytes)"
+        super().__init__(message, code=416)
+        self.path = path
+        self.size = size
+
+
 class ArchiveExtractionException(XCaseException):
     """压缩包解压异常"""
     def __init__(self, filename: str, reason: str = ""):
@@ -87,6 +96,14 @@ class ArchiveExtractionException(XCaseException):
         self.filename = filename
 
 
+class ArchiveLimitException(XCaseException):
+    """压缩包超出解压限制异常（防止压缩炸弹）"""
+    def __init__(self, filename: str, reason: str):
+        message = f"Archive '{filename}' exceeds extraction limits - {reason}"
+        super().__init__(message, code=413)
+        self.filename = filename
+
+
 class DuplicateCaseException(XCaseException):
     """Case 已存在异常"""
     def __init__(self, casespace: str, case_name: str):
@@ -96,3 +113,30 @@ class DuplicateCaseException(XCaseException):
         self.case_name = case_name
 
 
+
+
+class StaleFileException(XCaseException):
+    """文件已被修改（保存基于的 etag 已过期）异常"""
+    def __init__(self, path: str, current_etag: str):
+        message = f"File '{path}' has been modified since it was loaded"
+        super().__init__(message, code=409)
+        self.path = path
+        self.current_etag = current_etag
+
+
+class SnapshotNotFoundException(XCaseException):
+    """Case 快照不存在异常"""
+    def __init__(self, casespace: str, case_name: str, snapshot_id: str):
+        message = f"Snapshot '{snapshot_id}' not found for case '{casespace}/{case_name}'"
+        super().__init__(message, code=404)
+        self.casespace = casespace
+        self.case_name = case_name
+        self.snapshot_id = snapshot_id
+
+
+class ReconcileAbortedException(XCaseException):
+    """元数据对账被中止异常（扫描结果不可信或清理数量超出上限）"""
+    def __init__(self, reason: str):
+        message = f"Case metadata reconcile aborted - {reason}"
+        super().__init__(message, code=409)
+        self.reason = reason
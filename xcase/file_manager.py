@@ -3,32 +3,53 @@
 
 提供用例文件的增删改查、上传下载、压缩解压等功能。
 """
+import io
 import os
 import shutil
-import tarfile
+import stat
+import uuid
 import zipfile
-import tempfile
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Union, BinaryIO
 from django.conf import settings
 from loguru import logger
 
 from .constants import (
     STORAGE_ROOT_NAME,
+    BLOB_STORE_DIR_NAME,
+    SNAPSHOT_DIR_NAME,
+    SEARCH_DEFAULT_RESULTS,
+    SEARCH_MAX_RESULTS,
     DEFAULT_ENCODING,
-    FALLBACK_ENCODING,
     LANGUAGE_EXTENSION_MAP,
-    SUPPORTED_ARCHIVE_FORMATS,
-    FORBIDDEN_FILE_PATTERNS,
+    TREE_PAGE_SIZE,
+    MAX_TREE_PAGE_SIZE,
+    DOWNLOAD_CHUNK_SIZE,
+    COMPRESSED_FILE_EXTENSIONS,
+    MAX_INLINE_CONTENT_SIZE,
+    FILE_CHUNK_SIZE,
+    FILE_CHUNK_LINES,
+    MAX_FILE_CHUNK_LINES,
 )
+from .archive import ArchiveExtractor, ZipStreamWriter, compress_files, detect_archive_format
+from .batch_upload import BatchUploader, UploadEntry
+from .blob_store import BLOB_STORE_ENABLED, BlobStore, copy_tree, hash_file, replace_file, temp_path
+from .fs_index import fs_index
+from .code_search import CODE_SEARCH_ENABLED, CodeSearchIndex
+from .path_cache import PathValidator
+from .snapshots import SnapshotStore
+from . import file_reader, file_patch
 from .exceptions import (
+    XCaseException,
     PathTraversalException,
     CaseNotFoundException,
     CasespaceNotFoundException,
+    RangeNotSatisfiableException,
     InvalidCaseNameException,
     FileOperationException,
     ArchiveExtractionException,
     DuplicateCaseException,
+    StaleFileException,
 )
 
 
@@ -38,6 +59,12 @@ class FileManager:
     def __init__(self):
         """初始化文件管理器，设置存储根目录"""
         self.storage_root = Path(settings.MEDIA_ROOT) / STORAGE_ROOT_NAME
+        self.blob_store_enabled = BLOB_STORE_ENABLED
+        self._blob_store: Optional[BlobStore] = None
+        self.code_search_enabled = CODE_SEARCH_ENABLED
+        self._search_index: Optional[CodeSearchIndex] = None
+        self._path_validator: Optional[PathValidator] = None
+        self._snapshot_store: Optional[SnapshotStore] = None
         self._ensure_storage_exists()
     
     def _ensure_storage_exists(self) -> None:
@@ -49,10 +76,83 @@ class FileManager:
             logger.error(f"Failed to create storage root: {e}")
             raise FileOperationException("create_directory", str(self.storage_root), str(e))
     
+    @property
+    def blob_store(self) -> Optional[BlobStore]:
+        """内容寻址存储（未启用时为 None）"""
+        if not self.blob_store_enabled:
+            return None
+        root = self.storage_root / BLOB_STORE_DIR_NAME
+        if self._blob_store is None or self._blob_store.root != root:
+            self._blob_store = BlobStore(root)
+        return self._blob_store
+    
+    @property
+    def snapshot_store(self) -> SnapshotStore:
+        """Case 快照存储"""
+        root = self.storage_root / SNAPSHOT_DIR_NAME
+        if self._snapshot_store is None or self._snapshot_store.root != root:
+            self._snapshot_store = SnapshotStore(root)
+        return self._snapshot_store
+    
+    @property
+    def path_validator(self) -> PathValidator:
+        """相对路径校验器（storage_root 变化时重建）"""
+        if self._path_validator is None or self._path_validator.storage_root != self.storage_root:
+            self._path_validator = PathValidator(self.storage_root)
+        return self._path_validator
+    
+    @property
+    def search_index(self) -> Optional[CodeSearchIndex]:
+        """文件内容搜索索引（未启用时为 None；首次使用且尚未建立完成时在后台建立）"""
+        if not self.code_search_enabled:
+            return None
+        if self._search_index is None or self._search_index.storage_root != self.storage_root:
+            if self._search_index is not None:
+                self._search_index.close()
+            index = CodeSearchIndex(self.storage_root)
+            if not index.built:
+                index.build_in_background()
+            self._search_index = index
+        return self._search_index
+    
+    def _note_changed(self, abs_path: Path) -> None:
+        """文件或目录被创建 / 修改：更新目录索引和搜索索引"""
+        fs_index.note_changed(abs_path)
+        index = self.search_index
+        if index is not None:
+            index.note_changed(abs_path)
+    
+    def _note_removed(self, abs_path: Path) -> None:
+        fs_index.note_removed(abs_path)
+        index = self.search_index
+        if index is not None:
+            index.note_removed(abs_path)
+    
+    def _note_renamed(self, old_abs: Path, new_abs: Path) -> None:
+        fs_index.note_renamed(old_abs, new_abs)
+        index = self.search_index
+        if index is not None:
+            index.note_renamed(old_abs, new_abs)
+    
+    def _write_file(self, abs_path: Path, data: bytes) -> bool:
+        """
+        写入文件内容（写临时文件后原子替换，不原地修改可能共享 inode 的文件）
+        
+        Returns:
+            内容有变化时返回 True；启用内容寻址存储且内容未变化时返回 False
+        """
+        store = self.blob_store
+        if store is not None:
+            return store.store_bytes(abs_path, data)
+        replace_file(abs_path, data)
+        return True
+    
     def get_abs_path(self, relative_path: str) -> Path:
         """
         将相对路径转换为绝对路径
         
+        校验结果有缓存，Casespace 中没有符号链接时不解析真实路径，见 path_cache 模块。
+        
         Args:
             relative_path: 从存储根目录开始的相对路径
             
@@ -62,23 +162,7 @@ class FileManager:
         Raises:
             PathTraversalException: 如果路径在存储根目录之外
         """
-        # 移除前导斜杠
-        relative_path = relative_path.lstrip('/')
-        
-        # 检查禁止的模式
-        for pattern in FORBIDDEN_FILE_PATTERNS:
-            if pattern in relative_path:
-                raise PathTraversalException(relative_path)
-        
-        abs_path = self.storage_root / relative_path
-        
-        # 安全检查：确保路径在存储根目录内
-        try:
-            abs_path.resolve().relative_to(self.storage_root.resolve())
-        except ValueError:
-            raise PathTraversalException(relative_path)
-        
-        return abs_path
+        return self.path_validator.resolve(relative_path)
     
     def get_relative_path(self, abs_path: Path) -> str:
         """
@@ -110,11 +194,11 @@ class FileManager:
                 logger.warning(f"Storage root does not exist: {self.storage_root}")
                 return casespaces
                 
-            for item in sorted(self.storage_root.iterdir(), key=lambda x: x.name.lower()):
-                if item.is_dir() and not item.name.startswith('.'):
+            for entry in fs_index.list_dir(self.storage_root):
+                if entry.is_dir:
                     casespaces.append({
-                        'name': item.name,
-                        'path': item.name
+                        'name': entry.name,
+                        'path': entry.name
                     })
             
             logger.debug(f"Found {len(casespaces)} casespaces")
@@ -147,11 +231,11 @@ class FileManager:
             return cases
         
         try:
-            for item in sorted(casespace_path.iterdir(), key=lambda x: x.name.lower()):
-                if item.is_dir() and not item.name.startswith('.'):
+            for entry in fs_index.list_dir(casespace_path):
+                if entry.is_dir:
                     cases.append({
-                        'name': item.name,
-                        'path': f"{casespace}/{item.name}"
+                        'name': entry.name,
+                        'path': f"{casespace}/{entry.name}"
                     })
             
             logger.debug(f"Found {len(cases)} cases in casespace '{casespace}'")
@@ -160,6 +244,18 @@ class FileManager:
         
         return cases
     
+    def _resolve_tree_root(
+        self,
+        root_path: str,
+        casespace: Optional[str],
+        case: Optional[str]
+    ) -> Path:
+        """将文件树请求的路径参数解析为绝对路径"""
+        # 如果提供了 casespace 和 case，调整根路径
+        if casespace and case:
+            root_path = f"/{casespace}/{case}{root_path}" if root_path != "/" else f"/{casespace}/{case}"
+        return self.get_abs_path(root_path)
+    
     def get_file_tree(
         self,
         root_path: str = "/",
@@ -167,7 +263,7 @@ class FileManager:
         case: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        获取文件树结构
+        获取文件树结构（递归返回完整子树）
         
         Args:
             root_path: 起始路径
@@ -177,11 +273,7 @@ class FileManager:
         Returns:
             文件节点字典列表
         """
-        # 如果提供了 casespace 和 case，调整根路径
-        if casespace and case:
-            root_path = f"/{casespace}/{case}{root_path}" if root_path != "/" else f"/{casespace}/{case}"
-        
-        abs_path = self.get_abs_path(root_path)
+        abs_path = self._resolve_tree_root(root_path, casespace, case)
         
         if not abs_path.exists():
             logger.warning(f"Path does not exist: {abs_path}")
@@ -195,40 +287,117 @@ class FileManager:
             }]
         
         # 这是一个目录
-        return self._get_children(abs_path)
+        return self._get_children(abs_path, self.get_relative_path(abs_path))
     
-    def _get_children(self, dir_path: Path) -> List[Dict[str, Any]]:
+    def get_file_tree_page(
+        self,
+        root_path: str = "/",
+        casespace: Optional[str] = None,
+        case: Optional[str] = None,
+        offset: int = 0,
+        limit: int = TREE_PAGE_SIZE
+    ) -> Dict[str, Any]:
+        """
+        懒加载文件树：只返回一层目录，支持分页
+        
+        目录节点带 childCount / hasChildren，前端展开时再按路径请求下一层。
+        
+        Args:
+            root_path: 目录路径
+            casespace: Casespace 名称（可选）
+            case: Case 名称（可选）
+            offset: 跳过的节点数量
+            limit: 返回的节点数量（不超过 MAX_TREE_PAGE_SIZE）
+            
+        Returns:
+            包含 path, total, offset, limit, hasMore, children 的字典
+            
+        Raises:
+            FileNotFoundError: 目录不存在
+            ValueError: 路径不是目录
+        """
+        abs_path = self._resolve_tree_root(root_path, casespace, case)
+        
+        if not abs_path.exists():
+            raise FileNotFoundError(f"Directory {root_path} not found")
+        
+        if not abs_path.is_dir():
+            raise ValueError(f"{root_path} is not a directory")
+        
+        offset = max(offset, 0)
+        limit = min(max(limit, 1), MAX_TREE_PAGE_SIZE)
+        rel_prefix = self.get_relative_path(abs_path).rstrip('/')
+        
+        entries = fs_index.list_dir(abs_path)
+        children = []
+        for entry in entries[offset:offset + limit]:
+            node = {
+                'path': f"{rel_prefix}/{entry.name}",
+                'name': entry.name,
+            }
+            if entry.is_dir:
+                child_count = self._count_children(abs_path / entry.name)
+                node['type'] = 'folder'
+                node['childCount'] = child_count
+                node['hasChildren'] = child_count > 0
+            else:
+                node['type'] = 'file'
+                node['size'] = self._file_size(abs_path / entry.name)
+            children.append(node)
+        
+        return {
+            'path': rel_prefix or '/',
+            'total': len(entries),
+            'offset': offset,
+            'limit': limit,
+            'hasMore': offset + len(children) < len(entries),
+            'children': children,
+        }
+    
+    @staticmethod
+    def _file_size(file_path: Path) -> int:
+        """实时获取文件大小（目录索引不缓存 stat 信息）"""
+        try:
+            return file_path.stat().st_size
+        except OSError:
+            return 0
+    
+    @staticmethod
+    def _count_children(dir_path: Path) -> int:
+        """统计目录下的非隐藏节点数量"""
+        try:
+            return len(fs_index.list_dir(dir_path))
+        except OSError:
+            return 0
+    
+    def _get_children(self, dir_path: Path, rel_prefix: str) -> List[Dict[str, Any]]:
         """
         递归获取目录的子节点
         
         Args:
             dir_path: 目录路径
+            rel_prefix: dir_path 对应的相对路径（避免逐项计算相对路径）
             
         Returns:
             子节点字典列表
         """
         children = []
+        rel_prefix = rel_prefix.rstrip('/')
         try:
-            # 目录优先排序，然后按名称排序
-            items = sorted(dir_path.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-            
-            for item in items:
-                if item.name.startswith('.'):
-                    continue  # 跳过隐藏文件
-                
-                rel_path = self.get_relative_path(item)
+            for entry in fs_index.list_dir(dir_path):
+                rel_path = f"{rel_prefix}/{entry.name}"
                 
-                if item.is_dir():
+                if entry.is_dir:
                     node = {
                         'path': rel_path,
-                        'name': item.name,
+                        'name': entry.name,
                         'type': 'folder',
-                        'children': self._get_children(item)
+                        'children': self._get_children(dir_path / entry.name, rel_path)
                     }
                 else:
                     node = {
                         'path': rel_path,
-                        'name': item.name,
+                        'name': entry.name,
                         'type': 'file'
                     }
                 
@@ -240,34 +409,48 @@ class FileManager:
         
         return children
     
+    def _get_file_abs(self, file_path: str) -> Path:
+        abs_path = self.get_abs_path(file_path)
+        
+        if not abs_path.exists():
+            raise FileNotFoundError(f"File {file_path} not found")
+        
+        if not abs_path.is_file():
+            raise ValueError(f"{file_path} is not a file")
+        
+        return abs_path
+    
     def get_file_content(self, file_path: str) -> Dict[str, Any]:
         """
         读取文件内容
         
+        编码根据文件开头的样本判断一次；超过 MAX_INLINE_CONTENT_SIZE 的文件只返回开头一块，
+        truncated 为 True，其余部分通过 get_file_chunk 分块读取。etag 是整个文件内容的 SHA-256，
+        保存时用于检测冲突；截断的文件不会整体保存，etag 为 None，避免每次打开都读完整个文件。
+        
         Args:
             file_path: 相对文件路径
             
         Returns:
-            包含 path, content, language 的字典
+            包含 path, content, language, encoding, size, truncated, etag 的字典
             
         Raises:
             FileNotFoundError: 文件不存在
             ValueError: 路径不是文件
         """
-        abs_path = self.get_abs_path(file_path)
-        
-        if not abs_path.exists():
-            raise FileNotFoundError(f"File {file_path} not found")
-        
-        if not abs_path.is_file():
-            raise ValueError(f"{file_path} is not a file")
+        abs_path = self._get_file_abs(file_path)
         
         try:
-            content = abs_path.read_text(encoding=DEFAULT_ENCODING)
-        except UnicodeDecodeError:
-            # 尝试使用备用编码
-            logger.debug(f"UTF-8 decode failed, trying {FALLBACK_ENCODING}")
-            content = abs_path.read_text(encoding=FALLBACK_ENCODING)
+            encoding = file_reader.detect_encoding(abs_path)
+            size = abs_path.stat().st_size
+            if size > MAX_INLINE_CONTENT_SIZE:
+                chunk = file_reader.read_chunk(abs_path, 0, MAX_INLINE_CONTENT_SIZE, encoding)
+                etag = None if not chunk['eof'] else hash_file(abs_path)
+            else:
+                data = abs_path.read_bytes()
+                chunk = file_reader.decode(data, encoding)
+                chunk['eof'] = True
+                etag = file_patch.etag_of(data)
         except Exception as e:
             logger.error(f"Error reading file {file_path}: {e}")
             raise FileOperationException("read", file_path, str(e))
@@ -276,41 +459,177 @@ class FileManager:
         
         return {
             'path': file_path,
-            'content': content,
-            'language': language
+            'content': chunk['content'],
+            'language': language,
+            'encoding': chunk['encoding'],
+            'size': size,
+            'truncated': not chunk['eof'],
+            'etag': etag
         }
     
-    def save_file(self, file_path: str, content: str) -> bool:
+    def get_file_chunk(
+        self,
+        file_path: str,
+        offset: int = 0,
+        length: int = FILE_CHUNK_SIZE,
+        start_line: Optional[int] = None,
+        line_count: int = FILE_CHUNK_LINES
+    ) -> Dict[str, Any]:
         """
-        保存文件内容
+        分块读取文件
+        
+        指定 start_line 时按行读取（行号从 1 开始），否则按字节偏移读取。
         
         Args:
             file_path: 相对文件路径
-            content: 文件内容
+            offset: 字节偏移
+            length: 读取的字节数（不超过 MAX_FILE_CHUNK_SIZE）
+            start_line: 起始行号
+            line_count: 读取的行数（不超过 MAX_FILE_CHUNK_LINES）
             
         Returns:
-            成功返回 True
+            包含 content, encoding, offset, nextOffset, size, eof 的字典；
+            按行读取时另含 startLine, lineCount, nextLine
             
         Raises:
             FileNotFoundError: 文件不存在
             ValueError: 路径不是文件
         """
-        abs_path = self.get_abs_path(file_path)
+        abs_path = self._get_file_abs(file_path)
         
-        if not abs_path.exists():
-            raise FileNotFoundError(f"File {file_path} not found")
+        try:
+            encoding = file_reader.detect_encoding(abs_path)
+            if start_line is not None:
+                chunk = file_reader.read_lines(abs_path, start_line, min(line_count, MAX_FILE_CHUNK_LINES), encoding)
+            else:
+                chunk = file_reader.read_chunk(abs_path, offset, length, encoding)
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {e}")
+            raise FileOperationException("read", file_path, str(e))
         
-        if not abs_path.is_file():
-            raise ValueError(f"{file_path} is not a file")
+        chunk['path'] = file_path
+        return chunk
+    
+    def open_file_range(self, file_path: str, range_header: Optional[str] = None) -> Dict[str, Any]:
+        """
+        按 HTTP Range 头准备原始文件下载
+        
+        Args:
+            file_path: 相对文件路径
+            range_header: Range 请求头（只支持单个区间，其余情况返回整个文件）
+            
+        Returns:
+            {'name', 'size', 'start', 'end', 'partial', 'stream'}，stream 为数据块生成器
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 路径不是文件
+            RangeNotSatisfiableException: 区间无法满足
+        """
+        abs_path = self._get_file_abs(file_path)
+        size = abs_path.stat().st_size
+        
+        try:
+            byte_range = file_reader.parse_range(range_header, size)
+        except ValueError:
+            raise RangeNotSatisfiableException(file_path, size)
+        
+        start, end = byte_range if byte_range else (0, size - 1)
+        return {
+            'name': abs_path.name,
+            'size': size,
+            'start': start,
+            'end': end,
+            'partial': byte_range is not None,
+            'stream': file_reader.iter_range(abs_path, start, end)
+        }
+    
+    def save_file(self, file_path: str, content: str, base_etag: Optional[str] = None) -> str:
+        """
+        保存文件内容
+        
+        Args:
+            file_path: 相对文件路径
+            content: 文件内容
+            base_etag: 加载文件时的 etag；指定时文件已被修改则拒绝保存
+            
+        Returns:
+            新内容的 etag
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 路径不是文件
+            StaleFileException: 文件内容与 base_etag 不一致
+        """
+        abs_path = self._get_file_abs(file_path)
+        data = content.encode(DEFAULT_ENCODING)
         
         try:
-            abs_path.write_text(content, encoding=DEFAULT_ENCODING)
+            with file_patch.locked(abs_path):
+                if base_etag is not None:
+                    current = hash_file(abs_path)
+                    if current != base_etag:
+                        raise StaleFileException(file_path, current)
+                if self._write_file(abs_path, data):
+                    self._note_changed(abs_path)
             logger.info(f"File saved successfully: {file_path}")
-            return True
+            return file_patch.etag_of(data)
+        except XCaseException:
+            raise
         except Exception as e:
             logger.error(f"Error saving file {file_path}: {e}")
             raise FileOperationException("save", file_path, str(e))
     
+    def patch_file(self, file_path: str, base_etag: str, hunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        增量保存：把行块应用到 base_etag 对应的文件内容上
+        
+        原文件逐行复制到同目录的临时文件并应用修改，校验通过后原子替换，不把文件读入内存。
+        插入的行使用文件原有的编码。
+        
+        Args:
+            file_path: 相对文件路径
+            base_etag: 加载文件时的 etag
+            hunks: 行块列表，见 file_patch 模块说明
+            
+        Returns:
+            {'path', 'etag', 'size'}
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 路径不是文件或行块无效
+            StaleFileException: 文件内容与 base_etag 不一致
+        """
+        abs_path = self._get_file_abs(file_path)
+        
+        try:
+            encoding = file_reader.detect_encoding(abs_path)
+            with file_patch.locked(abs_path):
+                tmp = temp_path(abs_path)
+                try:
+                    etag = file_patch.apply_patch(abs_path, tmp, hunks, base_etag, encoding, file_path)
+                    self._replace_with_temp(abs_path, tmp)
+                finally:
+                    tmp.unlink(missing_ok=True)
+            self._note_changed(abs_path)
+        except (XCaseException, ValueError):
+            raise
+        except Exception as e:
+            logger.error(f"Error patching file {file_path}: {e}")
+            raise FileOperationException("save", file_path, str(e))
+        
+        logger.info(f"File patched successfully: {file_path} ({len(hunks)} hunks)")
+        return {'path': file_path, 'etag': etag, 'size': abs_path.stat().st_size}
+    
+    def _replace_with_temp(self, abs_path: Path, tmp: Path) -> None:
+        """用写好的临时文件原子替换 abs_path（保留原文件权限，启用存储时先收入存储）"""
+        if abs_path.exists():
+            os.chmod(tmp, stat.S_IMODE(abs_path.stat().st_mode) | stat.S_IWUSR)
+        store = self.blob_store
+        if store is not None:
+            store.intern(tmp)
+        os.replace(tmp, abs_path)
+    
     def create_file(self, parent_path: str, name: str) -> Dict[str, Any]:
         """
         创建新文件
@@ -340,7 +659,8 @@ class FileManager:
             raise FileExistsError(f"File {name} already exists")
         
         try:
-            file_abs.write_text('', encoding=DEFAULT_ENCODING)
+            self._write_file(file_abs, b'')
+            self._note_changed(file_abs)
             logger.info(f"File created: {self.get_relative_path(file_abs)}")
         except Exception as e:
             logger.error(f"Error creating file {name}: {e}")
@@ -382,6 +702,7 @@ class FileManager:
         
         try:
             folder_abs.mkdir()
+            self._note_changed(folder_abs)
             logger.info(f"Folder created: {self.get_relative_path(folder_abs)}")
         except Exception as e:
             logger.error(f"Error creating folder {name}: {e}")
@@ -417,6 +738,7 @@ class FileManager:
                 shutil.rmtree(abs_path)
             else:
                 abs_path.unlink()
+            self._note_removed(abs_path)
             
             logger.info(f"Item deleted: {item_path}")
             return True
@@ -451,6 +773,11 @@ class FileManager:
         
         try:
             old_abs.rename(new_abs)
+            self._note_renamed(old_abs, new_abs)
+            # 重命名 Case 目录时快照随之移动
+            parts = old_abs.relative_to(self.storage_root).parts
+            if len(parts) == 2 and new_abs.is_dir():
+                self.snapshot_store.move(parts[0], parts[1], parts[0], new_name)
             logger.info(f"Item renamed: {old_path} -> {new_name}")
         except Exception as e:
             logger.error(f"Error renaming item {old_path}: {e}")
@@ -485,17 +812,69 @@ class FileManager:
             raise ValueError(f"{parent_path} is not a directory")
         
         uploaded_count = 0
+        unchanged_count = 0
         for file_item in files:
             try:
                 file_abs = parent_abs / file_item['name']
-                file_abs.write_text(file_item['content'], encoding=DEFAULT_ENCODING)
+                if self._write_file(file_abs, file_item['content'].encode(DEFAULT_ENCODING)):
+                    self._note_changed(file_abs)
+                else:
+                    unchanged_count += 1
                 uploaded_count += 1
             except Exception as e:
                 logger.error(f"Error uploading file {file_item['name']}: {e}")
         
-        logger.info(f"Uploaded {uploaded_count}/{len(files)} files to {parent_path}")
+        logger.info(f"Uploaded {uploaded_count}/{len(files)} files to {parent_path} ({unchanged_count} unchanged)")
         return uploaded_count
     
+    def upload_batch(self, parent_path: str, entries: Iterable[UploadEntry]) -> Dict[str, Any]:
+        """
+        批量上传二进制文件（multipart 或 tar 流，见 batch_upload 模块）
+        
+        线程池并发写盘，内容与已有文件相同的文件不做修改。单个文件失败不影响其他文件。
+        
+        Args:
+            parent_path: 目标目录（Casespace 内的目录）
+            entries: batch_upload.iter_multipart / iter_tar_stream 产出的文件
+            
+        Returns:
+            {'files': 每个文件的结果, 'created', 'updated', 'unchanged', 'failed'}
+            
+        Raises:
+            ValueError: 目标目录不存在或不是 Casespace 内的目录
+            ArchiveLimitException: 文件数量或总大小超出限制
+        """
+        parent_abs = self.get_abs_path(parent_path)
+        
+        if not parent_abs.is_dir():
+            raise ValueError(f"Parent directory {parent_path} not found")
+        
+        if parent_abs == self.storage_root:
+            raise ValueError("Files must be uploaded into a casespace")
+        
+        uploader = BatchUploader(parent_abs, self._replace_with_temp)
+        try:
+            results = uploader.upload(entries)
+        finally:
+            for path in uploader.created_dirs + uploader.written:
+                self._note_changed(path)
+        
+        stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'error': 0}
+        for result in results:
+            stats[result['status']] += 1
+        
+        logger.info(
+            f"Batch uploaded {len(results)} files to {parent_path}: {stats['created']} created, "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged, {stats['error']} failed"
+        )
+        return {
+            'files': results,
+            'created': stats['created'],
+            'updated': stats['updated'],
+            'unchanged': stats['unchanged'],
+            'failed': stats['error'],
+        }
+    
     def delete_case(self, casespace: str, case: str) -> bool:
         """
         删除整个 Case 目录
@@ -522,6 +901,7 @@ class FileManager:
         
         try:
             shutil.rmtree(case_abs)
+            self._note_removed(case_abs)
             logger.info(f"Case deleted: {casespace}/{case}")
             return True
         except Exception as e:
@@ -532,6 +912,8 @@ class FileManager:
         """
         将 Case 打包为 zip 归档
         
+        整个归档驻留内存，仅用于小 Case；API 下载使用 iter_case_zip 流式输出。
+        
         Args:
             casespace: Casespace 名称
             case: Case 名称
@@ -539,6 +921,34 @@ class FileManager:
         Returns:
             zip 文件的字节数据
             
+        Raises:
+            CaseNotFoundException: Case 不存在
+            ValueError: 路径无效
+        """
+        return b''.join(self.iter_case_zip(casespace, case))
+    
+    def iter_case_zip(
+        self,
+        casespace: str,
+        case: str,
+        store_compressed: bool = True,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """
+        边遍历目录边生成 zip 数据块
+        
+        路径检查在调用时立即完成；返回的生成器每次产出约 chunk_size 字节。
+        各文件由线程池并发压缩，在途成员数量有上限，内存占用与 Case 大小无关。
+        
+        Args:
+            casespace: Casespace 名称
+            case: Case 名称
+            store_compressed: 已压缩的文件（见 COMPRESSED_FILE_EXTENSIONS）直接存储，不再压缩
+            chunk_size: 读取文件和输出数据块的大小
+            
+        Returns:
+            zip 数据块生成器
+            
         Raises:
             CaseNotFoundException: Case 不存在
             ValueError: 路径无效
@@ -552,47 +962,60 @@ class FileManager:
         if not case_abs.is_dir():
             raise ValueError(f"{case_path} is not a directory")
         
-        # 创建临时 zip 文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-            tmp_path = tmp_file.name
-        
+        return self._generate_case_zip(case_abs, case_path, store_compressed, chunk_size)
+    
+    def _generate_case_zip(
+        self,
+        case_abs: Path,
+        case_path: str,
+        store_compressed: bool,
+        chunk_size: int
+    ) -> Iterator[bytes]:
+        def iter_files():
+            for root, dirs, files in os.walk(case_abs):
+                dirs.sort()
+                for file in sorted(files):
+                    file_path = Path(root) / file
+                    if store_compressed and file_path.suffix.lower() in COMPRESSED_FILE_EXTENSIONS:
+                        compress_type = zipfile.ZIP_STORED
+                    else:
+                        compress_type = zipfile.ZIP_DEFLATED
+                    yield file_path, file_path.relative_to(case_abs).as_posix(), compress_type
+        
+        sink = _ChunkSink()
         try:
-            # 创建 zip 归档
-            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(case_abs):
-                    for file in files:
-                        file_path = Path(root) / file
-                        arcname = file_path.relative_to(case_abs)
-                        zipf.write(file_path, arcname)
-            
-            # 读取 zip 文件
-            with open(tmp_path, 'rb') as f:
-                zip_data = f.read()
-            
-            logger.info(f"Case downloaded: {casespace}/{case}")
-            return zip_data
+            # 线程池并发读取、压缩文件，这里按目录顺序把结果写入不可 seek 的输出流
+            writer = ZipStreamWriter(sink)
+            for member in compress_files(iter_files(), chunk_size=chunk_size):
+                for _ in writer.add(member, chunk_size):
+                    if sink.size >= chunk_size:
+                        yield sink.take()
+            writer.close()
+            # 中央目录
+            if sink.size:
+                yield sink.take()
+            logger.info(f"Case downloaded: {case_path}")
         except Exception as e:
-            logger.error(f"Error downloading case {casespace}/{case}: {e}")
+            logger.error(f"Error downloading case {case_path}: {e}")
             raise FileOperationException("download_case", case_path, str(e))
-        finally:
-            # 清理临时文件
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
     
     def upload_case(
         self,
         casespace: str,
         case_name: str,
-        file_data: bytes,
+        file_data: Union[bytes, BinaryIO],
         filename: str
     ) -> bool:
         """
         上传并解压 Case 归档
         
+        直接从文件对象（如 Django 已落盘的上传文件）流式解压到 casespace 下的隐藏暂存目录，
+        解压过程中检查大小和压缩比限制，全部成功后原子重命名为 Case 目录。
+        
         Args:
             casespace: Casespace 名称
             case_name: 新 Case 名称
-            file_data: 归档文件字节数据
+            file_data: 归档文件对象（也接受字节数据）
             filename: 原始文件名（用于确定格式）
             
         Returns:
@@ -602,6 +1025,8 @@ class FileManager:
             InvalidCaseNameException: Case 名称无效
             DuplicateCaseException: Case 已存在
             ValueError: 不支持的文件格式
+            PathTraversalException: 归档成员路径不安全
+            ArchiveLimitException: 超出解压限制
             ArchiveExtractionException: 解压失败
         """
         # 验证 case 名称
@@ -614,60 +1039,244 @@ class FileManager:
         if case_abs.exists():
             raise DuplicateCaseException(casespace, case_name)
         
+        # 确定文件格式
+        detect_archive_format(filename)
+        
+        if isinstance(file_data, (bytes, bytearray)):
+            file_data = io.BytesIO(file_data)
+        
         # 确保 casespace 存在
         casespace_path = self.storage_root / casespace
         casespace_path.mkdir(parents=True, exist_ok=True)
+        fs_index.note_changed(casespace_path)
         
-        # 确定文件格式
-        is_tar_gz = filename.endswith('.tar.gz') or filename.endswith('.tgz')
-        is_zip = filename.endswith('.zip')
-        
-        if not (is_tar_gz or is_zip):
-            raise ValueError(f"Unsupported file format. Supported formats: {', '.join(SUPPORTED_ARCHIVE_FORMATS)}")
-        
-        # 创建临时文件用于解压
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            tmp_file.write(file_data)
-            tmp_path = tmp_file.name
+        # 暂存目录以 . 开头，不会出现在 Case 列表中；与目标目录同一文件系统，可原子重命名
+        staging = casespace_path / f".{case_name}.upload-{uuid.uuid4().hex[:12]}"
         
         try:
-            # 创建 case 目录
-            case_abs.mkdir(parents=True, exist_ok=True)
-            
-            # 解压归档
-            if is_tar_gz:
-                with tarfile.open(tmp_path, 'r:gz') as tar:
-                    # 安全检查：确保没有路径遍历
-                    for member in tar.getmembers():
-                        if member.name.startswith('/') or '..' in member.name:
-                            raise PathTraversalException(member.name)
-                    tar.extractall(path=case_abs)
-            else:  # is_zip
-                with zipfile.ZipFile(tmp_path, 'r') as zip_file:
-                    # 安全检查：确保没有路径遍历
-                    for name in zip_file.namelist():
-                        if name.startswith('/') or '..' in name:
-                            raise PathTraversalException(name)
-                    zip_file.extractall(path=case_abs)
-            
-            logger.info(f"Case uploaded: {casespace}/{case_name}")
-            return True
+            stats = ArchiveExtractor(file_data, filename, staging).extract()
+            
+            # 与已有内容相同的文件改为链接到已有对象，只有新内容占用空间
+            store = self.blob_store
+            if store is not None:
+                store.intern_tree(staging)
             
-        except (PathTraversalException, ValueError) as e:
-            # 清理 case 目录
             if case_abs.exists():
-                shutil.rmtree(case_abs)
+                raise DuplicateCaseException(casespace, case_name)
+            os.rename(staging, case_abs)
+            
+            self._note_changed(case_abs)
+            logger.info(f"Case uploaded: {casespace}/{case_name} ({stats['files']} files, {stats['bytes']} bytes)")
+            return True
+            
+        except (XCaseException, ValueError):
             raise
         except Exception as e:
-            # 清理 case 目录
-            if case_abs.exists():
-                shutil.rmtree(case_abs)
             logger.error(f"Error extracting archive: {e}")
             raise ArchiveExtractionException(filename, str(e))
         finally:
-            # 清理临时文件
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            # 清理暂存目录（成功时已被重命名）
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+    
+    def fork_case(
+        self,
+        casespace: str,
+        case: str,
+        new_case: str,
+        target_casespace: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        复制 Case
+        
+        启用内容寻址存储时新 Case 的文件是已有对象的硬链接，不复制数据；
+        否则普通复制。复制到暂存目录后原子重命名。
+        
+        Args:
+            casespace: 源 Casespace 名称
+            case: 源 Case 名称
+            new_case: 新 Case 名称
+            target_casespace: 目标 Casespace（默认与源相同）
+            
+        Returns:
+            {'casespace': 目标 Casespace, 'case': 新 Case 名称}
+            
+        Raises:
+            CaseNotFoundException: 源 Case 不存在
+            InvalidCaseNameException: 新 Case 名称无效
+            DuplicateCaseException: 新 Case 已存在
+            FileOperationException: 复制失败
+        """
+        target_casespace = target_casespace or casespace
+        if not new_case or '/' in new_case or '\\' in new_case or new_case.startswith('.'):
+            raise InvalidCaseNameException(new_case, "Contains invalid characters")
+        
+        src_abs = self.get_abs_path(f"/{casespace}/{case}")
+        if not src_abs.is_dir():
+            raise CaseNotFoundException(casespace, case)
+        
+        dst_abs = self.get_abs_path(f"/{target_casespace}/{new_case}")
+        if dst_abs.exists():
+            raise DuplicateCaseException(target_casespace, new_case)
+        
+        casespace_path = dst_abs.parent
+        casespace_path.mkdir(parents=True, exist_ok=True)
+        fs_index.note_changed(casespace_path)
+        staging = casespace_path / f".{new_case}.fork-{uuid.uuid4().hex[:12]}"
+        
+        try:
+            copy_tree(src_abs, staging, self.blob_store)
+            if dst_abs.exists():
+                raise DuplicateCaseException(target_casespace, new_case)
+            os.rename(staging, dst_abs)
+            self._note_changed(dst_abs)
+            logger.info(f"Case forked: {casespace}/{case} -> {target_casespace}/{new_case}")
+            return {'casespace': target_casespace, 'case': new_case}
+        except XCaseException:
+            raise
+        except Exception as e:
+            logger.error(f"Error forking case {casespace}/{case}: {e}")
+            raise FileOperationException("fork_case", f"/{casespace}/{case}", str(e))
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+    
+    def get_case_manifest(self, casespace: str, case: str) -> Dict[str, str]:
+        """
+        获取 Case 的清单 {相对路径: sha256}
+        
+        客户端可据此只上传内容有变化的文件。
+        
+        Raises:
+            CaseNotFoundException: Case 不存在
+        """
+        case_abs = self.get_abs_path(f"/{casespace}/{case}")
+        if not case_abs.is_dir():
+            raise CaseNotFoundException(casespace, case)
+        
+        store = self.blob_store
+        if store is not None:
+            return store.manifest(case_abs)
+        
+        manifest = {}
+        for root, dirs, files in os.walk(case_abs):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = Path(root) / file
+                manifest[file_path.relative_to(case_abs).as_posix()] = hash_file(file_path)
+        return manifest
+    
+    def _get_case_abs(self, casespace: str, case: str) -> Path:
+        return self.get_abs_path(f"/{casespace}/{case}")
+    
+    def create_snapshot(self, casespace: str, case: str, message: str = '') -> Dict[str, Any]:
+        """
+        为 Case 创建快照（硬链接，只复制目录结构，见 snapshots 模块）
+        
+        Returns:
+            快照信息 {id, message, created, files, bytes}
+            
+        Raises:
+            CaseNotFoundException: Case 不存在
+        """
+        case_abs = self._get_case_abs(casespace, case)
+        try:
+            return self.snapshot_store.create(casespace, case, case_abs, message)
+        except XCaseException:
+            raise
+        except Exception as e:
+            logger.error(f"Error creating snapshot of {casespace}/{case}: {e}")
+            raise FileOperationException("create_snapshot", f"/{casespace}/{case}", str(e))
+    
+    def list_snapshots(self, casespace: str, case: str) -> List[Dict[str, Any]]:
+        """获取 Case 的快照列表（从新到旧）"""
+        self._get_case_abs(casespace, case)
+        return self.snapshot_store.list_snapshots(casespace, case)
+    
+    def diff_snapshots(self, casespace: str, case: str, base: str, target: str = 'current') -> Dict[str, List[str]]:
+        """
+        比较两个快照，或快照与 Case 当前内容（target 为 'current'）
+        
+        Returns:
+            {'added', 'removed', 'modified'}
+            
+        Raises:
+            SnapshotNotFoundException: 快照不存在
+        """
+        return self.snapshot_store.diff(casespace, case, self._get_case_abs(casespace, case), base, target)
+    
+    def restore_snapshot(self, casespace: str, case: str, snapshot_id: str) -> Dict[str, Any]:
+        """
+        把 Case 恢复为快照的内容（恢复前自动为当前内容创建快照）
+        
+        Returns:
+            {'restored': 快照 ID, 'backup': 自动创建的快照信息（Case 不存在时为 None）}
+            
+        Raises:
+            SnapshotNotFoundException: 快照不存在
+        """
+        case_abs = self._get_case_abs(casespace, case)
+        try:
+            backup = self.snapshot_store.restore(casespace, case, case_abs, snapshot_id)
+        except XCaseException:
+            raise
+        except Exception as e:
+            logger.error(f"Error restoring snapshot {snapshot_id} of {casespace}/{case}: {e}")
+            raise FileOperationException("restore_snapshot", f"/{casespace}/{case}", str(e))
+        fs_index.note_changed(case_abs.parent)
+        self._note_removed(case_abs)
+        self._note_changed(case_abs)
+        return {'restored': snapshot_id, 'backup': backup}
+    
+    def delete_snapshot(self, casespace: str, case: str, snapshot_id: str) -> bool:
+        """
+        删除快照
+        
+        Raises:
+            SnapshotNotFoundException: 快照不存在
+        """
+        self._get_case_abs(casespace, case)
+        self.snapshot_store.delete(casespace, case, snapshot_id)
+        return True
+    
+    def search_code(
+        self,
+        pattern: str,
+        languages: Optional[List[str]] = None,
+        casespace: Optional[str] = None,
+        case: Optional[str] = None,
+        ignore_case: bool = False,
+        limit: int = SEARCH_DEFAULT_RESULTS
+    ) -> Dict[str, Any]:
+        """
+        按正则表达式搜索文件内容（基于 trigram 索引，见 code_search 模块）
+        
+        Args:
+            pattern: 正则表达式
+            languages: 只搜索这些语言的文件
+            casespace: 只搜索该 Casespace
+            case: 只搜索该 Case（需同时指定 casespace）
+            ignore_case: 忽略大小写
+            limit: 最多返回的文件数量（最大 SEARCH_MAX_RESULTS）
+            
+        Returns:
+            {'results', 'candidates', 'truncated'}
+            
+        Raises:
+            ValueError: 正则表达式无效或未启用搜索
+        """
+        index = self.search_index
+        if index is None:
+            raise ValueError("Code search is disabled")
+        
+        path_prefix = None
+        if casespace:
+            prefix_path = f"/{casespace}/{case}" if case else f"/{casespace}"
+            self.get_abs_path(prefix_path)
+            path_prefix = prefix_path
+        
+        limit = min(max(limit, 1), SEARCH_MAX_RESULTS)
+        return index.search(pattern, languages, path_prefix, ignore_case, limit)
     
     def _get_language_from_filename(self, filename: str) -> Optional[str]:
         """
@@ -683,6 +1292,29 @@ class FileManager:
         return LANGUAGE_EXTENSION_MAP.get(ext)
 
 
+class _ChunkSink(io.RawIOBase):
+    """zip 流的只写输出目标，累积写入的数据供生成器分块取走"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self.size = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
 # 创建全局 file_manager 实例
 file_manager = FileManager()
 
@@ -0,0 +1,151 @@
+"""
+增量保存
+
+编辑器保存时只提交修改的行块（hunk）和加载时的 etag，而不是整个文件：
+
+- etag 是文件内容的 SHA-256，get_file_content 随内容返回；
+- hunk 为 {'start': 起始行（0 起）, 'delete': 删除的行数, 'lines': 插入的行（含换行符）}，
+  行号均相对于原文件，多个 hunk 按 start 排序且不能重叠；
+- apply_patch 把原文件逐行复制到同目录的临时文件，复制过程中应用 hunk 并计算原文件的
+  SHA-256，与 etag 不一致时放弃（文件已被他人修改，返回 409）；一致时由调用方原子替换。
+
+整个过程不把文件读入内存；同一目录下的保存通过 locked() 串行化，校验和替换之间不会被其他保存插入。
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    FCNTL_AVAILABLE = False
+
+from .constants import DOWNLOAD_CHUNK_SIZE
+from .exceptions import StaleFileException
+
+
+_dir_locks: Dict[str, threading.Lock] = {}
+_dir_locks_lock = threading.Lock()
+
+
+def etag_of(data: bytes) -> str:
+    """计算内容的 etag"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@contextmanager
+def locked(abs_path: Path) -> Iterator[None]:
+    """
+    锁定文件所在目录，串行化同一目录下的保存
+
+    进程内使用线程锁；支持 fcntl 时另对目录加 flock，多个 worker 进程之间同样互斥。
+    锁在目录上而不是文件上：原子替换后文件是新的 inode，锁不会随旧文件失效。
+    """
+    directory = os.fspath(Path(abs_path).parent)
+    with _dir_locks_lock:
+        lock = _dir_locks.setdefault(directory, threading.Lock())
+    with lock:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+
+def _normalize_hunks(hunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    result = sorted(hunks, key=lambda h: h['start'])
+    end = 0
+    for hunk in result:
+        if hunk['start'] < 0 or hunk.get('delete', 0) < 0:
+            raise ValueError(f"Invalid hunk at line {hunk['start']}")
+        if hunk['start'] < end:
+            raise ValueError(f"Overlapping hunks at line {hunk['start']}")
+        end = hunk['start'] + hunk.get('delete', 0)
+    return result
+
+
+class _OutOfRange(Exception):
+    pass
+
+
+def apply_patch(
+    abs_path: Path,
+    tmp_path: Path,
+    hunks: List[Dict[str, Any]],
+    base_etag: str,
+    encoding: str,
+    label: str = ''
+) -> str:
+    """
+    把 hunks 应用到 abs_path，结果写入 tmp_path
+
+    Args:
+        abs_path: 原文件
+        tmp_path: 输出的临时文件（与原文件同目录）
+        hunks: 行块列表
+        base_etag: 客户端加载时的 etag
+        encoding: 插入行使用的编码
+        label: 异常信息中显示的路径
+
+    Returns:
+        新内容的 etag
+
+    Raises:
+        StaleFileException: 原文件内容与 base_etag 不一致
+        ValueError: hunk 无效或超出文件行数
+    """
+    hunks = _normalize_hunks(hunks)
+    base_hash = hashlib.sha256()
+    new_hash = hashlib.sha256()
+
+    with open(abs_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        def write(data: bytes) -> None:
+            dst.write(data)
+            new_hash.update(data)
+
+        def take_line() -> bytes:
+            line = src.readline()
+            if not line:
+                raise _OutOfRange()
+            base_hash.update(line)
+            return line
+
+        line_no = 0
+        error = None
+        try:
+            for hunk in hunks:
+                while line_no < hunk['start']:
+                    write(take_line())
+                    line_no += 1
+                for _ in range(hunk.get('delete', 0)):
+                    take_line()
+                    line_no += 1
+                for text in hunk.get('lines', []):
+                    write(text.encode(encoding))
+        except _OutOfRange:
+            error = ValueError(f"Patch exceeds the {line_no} lines of {label or abs_path.name}")
+
+        # 复制（或在出错时只读取）剩余部分，完成原文件的校验
+        while True:
+            block = src.read(DOWNLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            base_hash.update(block)
+            if error is None:
+                write(block)
+
+    current = base_hash.hexdigest()
+    # 文件已变化时优先报告冲突：hunk 超出范围往往也是因为文件被改短了
+    if current != base_etag:
+        raise StaleFileException(label or abs_path.name, current)
+    if error is not None:
+        raise error
+    return new_hash.hexdigest()
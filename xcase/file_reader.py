@@ -0,0 +1,239 @@
+"""
+大文件分块读取
+
+编辑器打开几百 MB 的日志时不再一次性读入整个文件：
+
+- detect_encoding 只读取文件开头的样本判断编码（UTF-8 或备用编码），每次请求只判断一次；
+- read_chunk 按字节偏移读取一块，UTF-8 时对齐到完整字符边界；
+- read_lines 按行号读取，行号到字节偏移的稀疏索引（每 LINE_INDEX_INTERVAL 行一个检查点）
+  按需构建并缓存，文件大小或 mtime 变化时失效；
+- iter_range 为 HTTP Range 下载按块产出指定字节区间。
+"""
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .constants import (
+    DEFAULT_ENCODING,
+    FALLBACK_ENCODING,
+    ENCODING_SAMPLE_SIZE,
+    MAX_FILE_CHUNK_SIZE,
+    LINE_INDEX_INTERVAL,
+    LINE_INDEX_CACHE_SIZE,
+    DOWNLOAD_CHUNK_SIZE,
+)
+
+
+_SCAN_BLOCK_SIZE = 1024 * 1024
+
+
+def detect_encoding(abs_path: Path) -> str:
+    """根据文件开头的样本判断编码"""
+    with open(abs_path, 'rb') as f:
+        sample = f.read(ENCODING_SAMPLE_SIZE)
+    try:
+        # 样本末尾可能截断多字节字符，使用增量解码器且不视为结束
+        codecs.getincrementaldecoder(DEFAULT_ENCODING)().decode(sample, final=False)
+        return DEFAULT_ENCODING
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def decode(data: bytes, encoding: str, final: bool = True) -> Dict[str, Any]:
+    """
+    解码一块数据
+
+    Returns:
+        {'content': 文本, 'encoding': 实际使用的编码, 'consumed': 已解码的字节数}
+        UTF-8 且 final 为 False 时，末尾不完整的字符不计入 consumed
+    """
+    if encoding == DEFAULT_ENCODING:
+        decoder = codecs.getincrementaldecoder(DEFAULT_ENCODING)()
+        try:
+            content = decoder.decode(data, final=final)
+            return {'content': content, 'encoding': encoding, 'consumed': len(data) - len(decoder.getstate()[0])}
+        except UnicodeDecodeError:
+            # 样本之后出现了非 UTF-8 内容，这一块按备用编码返回
+            pass
+    return {'content': data.decode(FALLBACK_ENCODING), 'encoding': FALLBACK_ENCODING, 'consumed': len(data)}
+
+
+def read_chunk(abs_path: Path, offset: int, length: int, encoding: str) -> Dict[str, Any]:
+    """
+    从字节偏移 offset 开始读取约 length 字节
+
+    UTF-8 时跳过开头的续字节、不返回末尾不完整的字符，nextOffset 指向下一块的起点。
+    """
+    # 至少 4 字节，保证每块至少包含一个完整的 UTF-8 字符
+    length = max(4, min(length, MAX_FILE_CHUNK_SIZE))
+    size = os.path.getsize(abs_path)
+    offset = max(0, min(offset, size))
+    with open(abs_path, 'rb') as f:
+        f.seek(offset)
+        # 多读 3 字节，补偿开头被跳过的续字节
+        data = f.read(length + 3)
+
+    start = 0
+    if encoding == DEFAULT_ENCODING and offset > 0:
+        while start < min(len(data), 3) and (data[start] & 0xC0) == 0x80:
+            start += 1
+    data = data[start:start + length]
+    eof = offset + start + len(data) >= size
+    result = decode(data, encoding, final=eof)
+    next_offset = offset + start + result['consumed']
+    return {
+        'content': result['content'],
+        'encoding': result['encoding'],
+        'offset': offset + start,
+        'nextOffset': next_offset,
+        'size': size,
+        'eof': next_offset >= size,
+    }
+
+
+class _LineIndex:
+    """行号到字节偏移的稀疏索引：checkpoints[k] 是第 k * LINE_INDEX_INTERVAL 行（0 起）的起始偏移"""
+
+    def __init__(self, size: int, mtime_ns: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.checkpoints: List[int] = [0]
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def checkpoint(self, f, index: int) -> int:
+        """返回不超过第 index 个检查点的最近检查点编号（必要时向后扫描文件）"""
+        interval = LINE_INDEX_INTERVAL
+        cps = self.checkpoints
+        while len(cps) <= index and not self.complete:
+            line = (len(cps) - 1) * interval
+            pos = cps[-1]
+            f.seek(pos)
+            while len(cps) <= index:
+                block = f.read(_SCAN_BLOCK_SIZE)
+                if not block:
+                    self.complete = True
+                    break
+                start = 0
+                while len(cps) <= index:
+                    need = len(cps) * interval - line
+                    found = block.count(b'\n', start)
+                    if found < need:
+                        line += found
+                        break
+                    for _ in range(need):
+                        start = block.index(b'\n', start) + 1
+                    line += need
+                    cps.append(pos + start)
+                pos += len(block)
+        return min(index, len(cps) - 1)
+
+
+_line_indexes: 'OrderedDict[str, _LineIndex]' = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _get_line_index(abs_path: Path) -> _LineIndex:
+    st = os.stat(abs_path)
+    key = os.fspath(abs_path)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is None or index.size != st.st_size or index.mtime_ns != st.st_mtime_ns:
+            index = _LineIndex(st.st_size, st.st_mtime_ns)
+            _line_indexes[key] = index
+        _line_indexes.move_to_end(key)
+        while len(_line_indexes) > LINE_INDEX_CACHE_SIZE:
+            _line_indexes.popitem(last=False)
+        return index
+
+
+def read_lines(abs_path: Path, start_line: int, line_count: int, encoding: str) -> Dict[str, Any]:
+    """
+    读取从 start_line（1 起）开始的 line_count 行
+
+    返回的内容不超过 MAX_FILE_CHUNK_SIZE 字节，超出时提前结束，nextLine 指向下一次请求的起始行。
+    """
+    start_line = max(1, start_line)
+    line_count = max(1, line_count)
+    index = _get_line_index(abs_path)
+    target = start_line - 1
+
+    with open(abs_path, 'rb') as f:
+        with index.lock:
+            k = index.checkpoint(f, target // LINE_INDEX_INTERVAL)
+            offset = index.checkpoints[k]
+        f.seek(offset)
+        line = k * LINE_INDEX_INTERVAL
+        while line < target and f.readline():
+            line += 1
+        offset = f.tell()
+
+        lines = []
+        total = 0
+        while len(lines) < line_count and total < MAX_FILE_CHUNK_SIZE:
+            data = f.readline(MAX_FILE_CHUNK_SIZE - total)
+            if not data:
+                break
+            lines.append(data)
+            total += len(data)
+        next_offset = f.tell()
+        eof = not f.read(1)
+
+    result = decode(b''.join(lines), encoding)
+    return {
+        'content': result['content'],
+        'encoding': result['encoding'],
+        'startLine': start_line,
+        'lineCount': len(lines),
+        'nextLine': start_line + len(lines),
+        'offset': offset,
+        'nextOffset': next_offset,
+        'size': index.size,
+        'eof': eof,
+    }
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    解析单区间的 HTTP Range 头
+
+    Returns:
+        (start, end)（均包含）；没有 Range 头或格式不支持时返回 None（返回完整文件）
+
+    Raises:
+        ValueError: 区间无法满足（应返回 416）
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            # 后缀区间：最后 N 个字节
+            start = max(0, size - int(last))
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} not satisfiable for size {size}")
+    return start, min(end, size - 1)
+
+
+def iter_range(abs_path: Path, start: int, end: int, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """按块产出 [start, end] 字节区间"""
+    remaining = end - start + 1
+    with open(abs_path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
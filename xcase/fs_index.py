@@ -0,0 +1,347 @@
+"""
+Casespace 目录索引
+
+在进程内缓存 caseeditor 存储目录的单层目录列表，Casespace / Case 列表和文件树查询
+直接从内存返回，避免每次请求都重新读取（可能挂载在网络存储上的）目录。
+
+缓存的有效性由以下方式保证：
+
+- 每次读取缓存前比较目录的 mtime，变化时重新扫描该目录；缓存超过
+  FS_INDEX_REVALIDATE_TTL 秒后也会重新扫描（mtime 精度不足或网络存储属性缓存导致
+  mtime 未及时变化时兜底）。
+- inotify 模式（Linux）下每个已缓存的目录另外注册一个 inotify watch，后台线程读取
+  事件并增量修补目录列表，本机的修改无需等待 mtime 变化即可见。inotify 不会报告其他
+  主机在网络存储上的修改，因此有 watch 的目录同样按 mtime / TTL 检查。
+
+缓存只保存节点名称和类型；文件大小等 stat 信息不随目录 mtime 变化（原地改写文件
+不会修改目录 mtime），由调用方在需要时实时获取。
+
+FileManager 的写操作（保存、创建、重命名、删除）会调用 note_* 方法增量更新索引。
+"""
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from loguru import logger
+
+from .constants import FS_INDEX_MAX_DIRS, FS_INDEX_REVALIDATE_TTL
+
+
+# 监听模式：auto（优先 inotify）、inotify、poll、off（不缓存）
+WATCH_MODE = getattr(settings, 'XCASE_FS_INDEX_MODE', 'auto')
+
+# inotify 常量（linux/inotify.h）
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# 只关心节点的增删和改名（缓存不保存文件大小，文件内容修改无需通知）
+WATCH_MASK = (IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class IndexEntry(NamedTuple):
+    """目录中的一个节点"""
+    name: str
+    is_dir: bool
+
+
+class _Listing:
+    """一个目录的缓存列表（entries 为不可变元组，修补时整体替换）"""
+    __slots__ = ('mtime_ns', 'scanned_at', 'generation', 'entries', 'wd')
+
+    def __init__(self, mtime_ns: int, entries: Tuple[IndexEntry, ...], wd: Optional[int]):
+        self.mtime_ns = mtime_ns
+        self.scanned_at = time.monotonic()
+        self.generation = 0
+        self.entries = entries
+        self.wd = wd
+
+
+def _sort_key(entry: IndexEntry):
+    # 与文件树一致：目录优先，然后按名称（忽略大小写）
+    return (not entry.is_dir, entry.name.lower(), entry.name)
+
+
+def _scan(path: str) -> Tuple[int, Tuple[IndexEntry, ...]]:
+    """读取一层目录，返回 (目录 mtime_ns, 排序后的节点)"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith('.'):
+                continue
+            entries.append(_make_entry(entry))
+    entries.sort(key=_sort_key)
+    return mtime_ns, tuple(entries)
+
+
+def _make_entry(entry: os.DirEntry) -> IndexEntry:
+    """由 DirEntry（类型信息无需额外 stat）构造节点"""
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    return IndexEntry(entry.name, is_dir)
+
+
+def _stat_entry(path: str) -> Optional[IndexEntry]:
+    """stat 单个路径构造节点，不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return IndexEntry(os.path.basename(path), (st.st_mode & 0o170000) == 0o040000)
+
+
+class _Inotify:
+    """基于 ctypes 的最小 inotify 封装"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """非阻塞读取已到达的事件，产出 (wd, mask, name)"""
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b'\0')
+                offset += length
+                yield wd, mask, os.fsdecode(name)
+
+
+class DirectoryIndex:
+    """进程内目录索引"""
+
+    def __init__(self, mode: str = WATCH_MODE, max_dirs: int = FS_INDEX_MAX_DIRS,
+                 ttl: float = FS_INDEX_REVALIDATE_TTL):
+        self.mode = mode
+        self.max_dirs = max_dirs
+        self.ttl = ttl
+        self._listings: 'OrderedDict[str, _Listing]' = OrderedDict()
+        self._watches: Dict[int, str] = {}
+        self._lock = threading.RLock()
+        self._inotify: Optional[_Inotify] = None
+        self._pid = None
+
+    # ------------------------------------------------------------------
+    # 启动
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        # gunicorn fork 之后在每个 worker 中重新初始化
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._listings.clear()
+            self._watches.clear()
+            self._inotify = None
+            if self.mode in ('auto', 'inotify'):
+                try:
+                    self._inotify = _Inotify()
+                    threading.Thread(target=self._watch_loop, args=(self._inotify,),
+                                     daemon=True, name='xcase-fs-index').start()
+                except (OSError, AttributeError) as e:
+                    logger.info(f"inotify unavailable, case index falls back to polling: {e}")
+            self._pid = os.getpid()
+
+    def _watch_loop(self, inotify: _Inotify) -> None:
+        while self._inotify is inotify:
+            try:
+                select.select([inotify.fd], [], [], 1.0)
+                with self._lock:
+                    self._drain()
+            except Exception as e:
+                logger.warning(f"Case index watcher error: {e}")
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def list_dir(self, path) -> Tuple[IndexEntry, ...]:
+        """
+        返回目录的非隐藏节点（目录优先、按名称排序）
+
+        Raises:
+            FileNotFoundError / NotADirectoryError / PermissionError: 同 os.scandir
+        """
+        path = os.fspath(path)
+        if self.mode == 'off':
+            return _scan(path)[1]
+
+        self._ensure_started()
+        with self._lock:
+            self._drain()
+            listing = self._listings.get(path)
+            if listing is not None:
+                # 有 watch 也检查 mtime：inotify 不报告其他主机在网络存储上的修改
+                if (self._mtime_ns(path) == listing.mtime_ns
+                        and time.monotonic() - listing.scanned_at < self.ttl):
+                    self._listings.move_to_end(path)
+                    return listing.entries
+                self._forget(path)
+
+            # 先注册 watch 再扫描：扫描期间到达的事件会在之后被修补到列表上
+            wd = self._watch(path)
+            try:
+                mtime_ns, entries = _scan(path)
+            except OSError:
+                self._unwatch(wd)
+                raise
+            self._store(path, mtime_ns, entries, wd)
+            return entries
+
+    def generation(self, path) -> int:
+        """目录列表的修改代数（未缓存时为 0）"""
+        listing = self._listings.get(os.fspath(path))
+        return listing.generation if listing else 0
+
+    @staticmethod
+    def _mtime_ns(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------------
+    # 缓存维护
+    # ------------------------------------------------------------------
+
+    def _watch(self, path: str) -> Optional[int]:
+        if self._inotify is None:
+            return None
+        try:
+            wd = self._inotify.add_watch(path)
+        except OSError as e:
+            # 例如 ENOSPC（max_user_watches 耗尽），该目录退化为 mtime 检查
+            if e.errno not in (errno.ENOSPC, errno.ENOENT, errno.ENOTDIR):
+                logger.debug(f"Failed to watch {path}: {e}")
+            return None
+        self._watches[wd] = path
+        return wd
+
+    def _unwatch(self, wd: Optional[int]) -> None:
+        if wd is not None and self._watches.pop(wd, None) is not None:
+            self._inotify.rm_watch(wd)
+
+    def _store(self, path: str, mtime_ns: int, entries: Tuple[IndexEntry, ...],
+               wd: Optional[int]) -> None:
+        self._listings[path] = _Listing(mtime_ns, entries, wd)
+        while len(self._listings) > self.max_dirs:
+            self._forget(next(iter(self._listings)))
+
+    def _forget(self, path: str) -> None:
+        listing = self._listings.pop(path, None)
+        if listing is not None:
+            self._unwatch(listing.wd)
+
+    def _forget_tree(self, path: str) -> None:
+        prefix = path.rstrip(os.sep) + os.sep
+        for cached in [p for p in self._listings if p == path or p.startswith(prefix)]:
+            self._forget(cached)
+
+    def _patch(self, parent: str, name: str, entry: Optional[IndexEntry]) -> None:
+        """在父目录列表中插入/替换（entry 不为空）或移除（entry 为空）一个节点"""
+        listing = self._listings.get(parent)
+        if listing is None or name.startswith('.'):
+            return
+        entries = [e for e in listing.entries if e.name != name]
+        if entry is not None:
+            bisect.insort(entries, entry, key=_sort_key)
+        listing.entries = tuple(entries)
+        listing.generation += 1
+        mtime_ns = self._mtime_ns(parent)
+        if mtime_ns is not None:
+            listing.mtime_ns = mtime_ns
+
+    def _drain(self) -> None:
+        """处理已到达的 inotify 事件"""
+        if self._inotify is None:
+            return
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("Case index inotify queue overflow, dropping cache")
+                for path in list(self._listings):
+                    self._forget(path)
+                continue
+            path = self._watches.get(wd)
+            if path is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                self._forget_tree(path)
+                continue
+            child = os.path.join(path, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._patch(path, name, None)
+                self._forget_tree(child)
+            else:
+                self._patch(path, name, _stat_entry(child))
+
+    # ------------------------------------------------------------------
+    # FileManager 写操作通知
+    # ------------------------------------------------------------------
+
+    def note_changed(self, path) -> None:
+        """新建或修改了 path（文件或目录）"""
+        path = os.fspath(path)
+        with self._lock:
+            self._patch(os.path.dirname(path), os.path.basename(path), _stat_entry(path))
+
+    def note_removed(self, path) -> None:
+        """删除了 path（目录时连同子树一起移出缓存）"""
+        path = os.fspath(path)
+        with self._lock:
+            self._patch(os.path.dirname(path), os.path.basename(path), None)
+            self._forget_tree(path)
+
+    def note_renamed(self, old_path, new_path) -> None:
+        """old_path 重命名为 new_path"""
+        self.note_removed(old_path)
+        self.note_changed(new_path)
+
+
+# 每个 worker 进程一份的全局索引实例
+fs_index = DirectoryIndex()
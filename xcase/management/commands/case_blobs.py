@@ -0,0 +1,38 @@
+"""
+Case 内容寻址存储维护 Management Command
+"""
+from django.core.management.base import BaseCommand, CommandError
+from xcase.file_manager import file_manager
+
+
+class Command(BaseCommand):
+    help = '维护 Case 内容寻址存储：收入已有文件（去重）、清理未引用的对象'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intern',
+            action='store_true',
+            help='把存储根目录下所有 Casespace 中的文件收入存储（相同内容改为硬链接）',
+        )
+        parser.add_argument(
+            '--gc',
+            action='store_true',
+            help='删除不再被任何 Case 引用的对象（建议在没有上传进行时执行）',
+        )
+
+    def handle(self, *args, **options):
+        store = file_manager.blob_store
+        if store is None:
+            raise CommandError('内容寻址存储未启用（settings.XCASE_BLOB_STORE = True）')
+
+        if options['intern']:
+            total = 0
+            for casespace in file_manager.get_casespaces():
+                total += store.intern_tree(file_manager.storage_root / casespace['name'])
+            self.stdout.write(self.style.SUCCESS(f"✅ 已收入 {total} 个文件"))
+
+        if options['gc']:
+            stats = store.gc()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ 已删除 {stats['removed']} 个对象，释放 {stats['bytes']} 字节，剩余 {stats['objects']} 个对象"
+            ))
@@ -0,0 +1,27 @@
+"""
+Case 文件内容搜索索引维护 Management Command
+"""
+from django.core.management.base import BaseCommand, CommandError
+from xcase.code_search import CODE_SEARCH_ENABLED, CodeSearchIndex
+from xcase.file_manager import file_manager
+
+
+class Command(BaseCommand):
+    help = '维护 Case 文件内容搜索索引：索引新增和变化的文件，清理已删除文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='删除现有索引后重新建立',
+        )
+
+    def handle(self, *args, **options):
+        if not CODE_SEARCH_ENABLED:
+            raise CommandError('文件内容搜索未启用（settings.XCASE_CODE_SEARCH = True）')
+
+        index = CodeSearchIndex(file_manager.storage_root)
+        stats = index.rebuild() if options['rebuild'] else index.update()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 已索引 {stats['files']} 个文件：本次写入 {stats['indexed']}，清理 {stats['removed']}"
+        ))
@@ -0,0 +1,52 @@
+"""
+Case 元数据对账 Management Command
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from xcase.file_manager import file_manager
+from xcase.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = '对账存储目录中的 Case 和 CaseMetadata：补齐新 Case、清理已删除 Case 的元数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计差异，不修改数据库',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='扫描不到任何 Case 或清理数量超过上限时仍然清理元数据',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='周期性执行的间隔秒数（默认 0：只执行一次）',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            try:
+                stats = reconcile(
+                    file_manager.storage_root, dry_run=options['dry_run'], force=options['force']
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {stats['cases']} 个 Case：新增 {stats['created']}，清理 {stats['pruned']}"
+                ))
+            except Exception as e:
+                if interval <= 0:
+                    raise
+                # 周期运行时单次失败（例如数据库暂时不可用）不退出
+                self.stderr.write(self.style.ERROR(f"❌ 对账失败: {e}"))
+            if interval <= 0:
+                break
+            time.sleep(interval)
+            # 长时间运行时丢弃已超时或失效的数据库连接
+            close_old_connections()
@@ -0,0 +1,362 @@
+"""
+Case 元数据批量解析与查询
+
+casebrowser 浏览一个 Casespace 时需要每个 Case 的 CaseMetadata 和标签。这里按 Casespace
+一次取出已有的元数据并预取标签，查询次数与 Case 数量无关。读接口不创建元数据：
+缺失的行由对账任务（xcase.reconcile）补齐，在此之前视为没有标签和选项的 Case。
+
+move_metadata / drop_metadata 在接口重命名、删除 Case 目录后同步更新元数据；对账任务只补齐和清理。
+
+bulk_mutate 在一个事务中把一组标签 / 选项操作应用到多个 Case：缺失的元数据行用一次
+bulk_create 补齐，新增用 bulk_create，修改选项用 bulk_update，删除每张表只执行一次 DELETE。
+
+query_cases 按标签 / 选项表达式筛选 Case，表达式编译为一条 SQL：每个叶子是一个
+EXISTS 子查询，走 case_tag (metadata, tag) 和 case_option (metadata, key) 上的唯一索引。
+
+表达式语法（JSON）：
+
+    {"tag": "性能测试"}                               有该标签
+    {"option": "os", "value": "Linux"}                选项等于某值（op 默认 eq）
+    {"option": "os", "op": "in", "value": [...]}      op 为 eq / ne / in / contains / exists
+    {"and": [expr, ...]}  {"or": [expr, ...]}  {"not": expr}
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .constants import MAX_CASE_QUERY_NODES, CASE_QUERY_OPTION_OPS, CASE_BULK_ACTIONS, MAX_BULK_CASES
+from .models import CaseMetadata, CaseTag, CaseOption
+
+
+CaseKey = Tuple[str, str]
+
+
+def _fetch_metadata(keys: List[CaseKey], prefetch: Sequence[str] = ()) -> Dict[CaseKey, CaseMetadata]:
+    wanted = set(keys)
+    casespaces = {casespace for casespace, _ in keys}
+    # 按 Casespace 过滤而不是 case_name__in：大 Casespace 下 IN 列表会超过数据库参数上限
+    queryset = CaseMetadata.objects.filter(casespace__in=casespaces).order_by()
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return {
+        (m.casespace, m.case_name): m
+        for m in queryset
+        if (m.casespace, m.case_name) in wanted
+    }
+
+
+def resolve_metadata(keys: Iterable[CaseKey], prefetch: Sequence[str] = ()) -> Dict[CaseKey, CaseMetadata]:
+    """
+    批量获取（必要时创建）(casespace, case_name) 对应的 CaseMetadata，供写操作使用
+
+    已有的元数据按 Casespace 一次查询，并通过 prefetch_related 预取 prefetch 中的关联
+    （如 'tags'、'options'）；缺失的行用 bulk_create(ignore_conflicts=True) 一次创建，
+    并发创建的冲突被忽略，随后重新读取以获得主键。
+
+    Args:
+        keys: (casespace, case_name) 列表
+        prefetch: 需要预取的关联名称
+
+    Returns:
+        {(casespace, case_name): CaseMetadata}
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    found = _fetch_metadata(keys, prefetch)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        CaseMetadata.objects.bulk_create(
+            [CaseMetadata(casespace=casespace, case_name=case_name) for casespace, case_name in missing],
+            ignore_conflicts=True
+        )
+        found = _fetch_metadata(keys, prefetch)
+    return found
+
+
+def get_cases_with_tags(casespace: str, case_names: List[str]) -> List[Dict]:
+    """
+    返回 Casespace 下各 Case 的标签列表（顺序与 case_names 一致，只读）
+
+    Returns:
+        [{'casespace', 'caseName', 'tags'}]
+    """
+    metadata = _fetch_metadata([(casespace, name) for name in case_names], prefetch=('tags',))
+    result = []
+    for name in case_names:
+        m = metadata.get((casespace, name))
+        # 预取的标签沿用 CaseTag 的默认排序（按标签名）
+        tags = [t.tag for t in m.tags.all()] if m is not None else []
+        result.append({'casespace': casespace, 'caseName': name, 'tags': tags})
+    return result
+
+
+def load_case_detail(casespace: str, case_name: str) -> Dict:
+    """
+    返回单个 Case 的标签和选项（只读，没有元数据时均为空）
+
+    Returns:
+        {'casespace', 'caseName', 'tags', 'options'}
+    """
+    metadata = (
+        CaseMetadata.objects
+        .filter(casespace=casespace, case_name=case_name)
+        .prefetch_related('tags', 'options')
+        .first()
+    )
+    tags, options = [], []
+    if metadata is not None:
+        tags = [t.tag for t in metadata.tags.all()]
+        options = [{'key': opt.key, 'value': opt.value} for opt in metadata.options.all()]
+    return {'casespace': casespace, 'caseName': case_name, 'tags': tags, 'options': options}
+
+
+def move_metadata(old: Tuple[str, ...], new: Tuple[str, ...]) -> int:
+    """
+    Case / Casespace 目录通过接口重命名后，把元数据移到新名称下（标签和选项随之保留）
+
+    old / new 为 (casespace,) 或 (casespace, case_name)。目标名称下残留的元数据
+    （目录已在文件系统外删除、尚未对账）先被删除，避免唯一约束冲突。
+
+    Returns:
+        移动的行数
+    """
+    with transaction.atomic():
+        if len(old) == 1:
+            CaseMetadata.objects.filter(casespace=new[0]).delete()
+            return CaseMetadata.objects.filter(casespace=old[0]).update(casespace=new[0])
+        CaseMetadata.objects.filter(casespace=new[0], case_name=new[1]).delete()
+        return CaseMetadata.objects.filter(casespace=old[0], case_name=old[1]).update(
+            casespace=new[0], case_name=new[1]
+        )
+
+
+def drop_metadata(casespace: str, case_name: Optional[str] = None) -> int:
+    """
+    Case / Casespace 目录通过接口删除后，删除其元数据（级联删除标签和选项）
+
+    之后以同名重新上传的 Case 从空白元数据开始。
+
+    Returns:
+        删除的 CaseMetadata 行数
+    """
+    queryset = CaseMetadata.objects.filter(casespace=casespace)
+    if case_name is not None:
+        queryset = queryset.filter(case_name=case_name)
+    return queryset.delete()[1].get(CaseMetadata._meta.label, 0)
+
+
+def _parse_operations(operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """把操作列表归并为 {'addTag': set, 'deleteTag': set, 'setOption': dict, 'deleteOption': set}"""
+    parsed = {'addTag': set(), 'deleteTag': set(), 'setOption': {}, 'deleteOption': set()}
+    for op in operations:
+        action = op.get('action')
+        if action not in CASE_BULK_ACTIONS:
+            raise ValueError(f"Unsupported action: {action}")
+        field = 'tag' if action.endswith('Tag') else 'key'
+        if not op.get(field):
+            raise ValueError(f"'{action}' requires '{field}'")
+        if action == 'setOption':
+            if op.get('value') is None:
+                raise ValueError(f"'setOption' requires 'value' for key '{op['key']}'")
+            parsed['setOption'][op['key']] = str(op['value'])
+        else:
+            parsed[action].add(op[field])
+
+    if parsed['addTag'] & parsed['deleteTag']:
+        raise ValueError(f"Tags both added and deleted: {sorted(parsed['addTag'] & parsed['deleteTag'])}")
+    if parsed['setOption'].keys() & parsed['deleteOption']:
+        raise ValueError(f"Options both set and deleted: {sorted(parsed['setOption'].keys() & parsed['deleteOption'])}")
+    return parsed
+
+
+def bulk_mutate(keys: Iterable[CaseKey], operations: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    在一个事务中把标签 / 选项操作应用到多个 Case
+
+    Args:
+        keys: (casespace, case_name) 列表，缺失的元数据会被创建
+        operations: [{'action': 'addTag' | 'deleteTag', 'tag'}
+                     | {'action': 'setOption', 'key', 'value'}
+                     | {'action': 'deleteOption', 'key'}]
+
+    Returns:
+        {'cases', 'tagsAdded', 'tagsDeleted', 'optionsCreated', 'optionsUpdated', 'optionsDeleted'}
+
+    Raises:
+        ValueError: 操作无效、互相冲突或 Case 数量超过 MAX_BULK_CASES
+    """
+    keys = list(dict.fromkeys(keys))
+    if len(keys) > MAX_BULK_CASES:
+        raise ValueError(f"Too many cases in one request ({len(keys)} > {MAX_BULK_CASES})")
+    ops = _parse_operations(operations)
+    stats = {'cases': len(keys), 'tagsAdded': 0, 'tagsDeleted': 0,
+             'optionsCreated': 0, 'optionsUpdated': 0, 'optionsDeleted': 0}
+    if not keys:
+        return stats
+
+    with transaction.atomic():
+        ids = [m.id for m in resolve_metadata(keys).values()]
+
+        if ops['deleteTag']:
+            stats['tagsDeleted'], _ = CaseTag.objects.filter(
+                metadata_id__in=ids, tag__in=ops['deleteTag']
+            ).delete()
+        if ops['deleteOption']:
+            stats['optionsDeleted'], _ = CaseOption.objects.filter(
+                metadata_id__in=ids, key__in=ops['deleteOption']
+            ).delete()
+
+        if ops['addTag']:
+            existing = set(CaseTag.objects.filter(
+                metadata_id__in=ids, tag__in=ops['addTag']
+            ).values_list('metadata_id', 'tag'))
+            new_tags = [
+                CaseTag(metadata_id=metadata_id, tag=tag)
+                for metadata_id in ids
+                for tag in sorted(ops['addTag'])
+                if (metadata_id, tag) not in existing
+            ]
+            CaseTag.objects.bulk_create(new_tags, ignore_conflicts=True)
+            stats['tagsAdded'] = len(new_tags)
+
+        if ops['setOption']:
+            values = ops['setOption']
+            current = {
+                (o.metadata_id, o.key): o
+                for o in CaseOption.objects.filter(metadata_id__in=ids, key__in=values.keys()).order_by()
+            }
+            # bulk_update 不会触发 auto_now，需要显式设置 update_time
+            now = timezone.now()
+            changed = []
+            for option in current.values():
+                if option.value != values[option.key]:
+                    option.value = values[option.key]
+                    option.update_time = now
+                    changed.append(option)
+            created = [
+                CaseOption(metadata_id=metadata_id, key=key, value=value)
+                for metadata_id in ids
+                for key, value in values.items()
+                if (metadata_id, key) not in current
+            ]
+            CaseOption.objects.bulk_update(changed, ['value', 'update_time'])
+            CaseOption.objects.bulk_create(created, ignore_conflicts=True)
+            stats['optionsUpdated'] = len(changed)
+            stats['optionsCreated'] = len(created)
+
+    return stats
+
+
+def build_case_filter(expr: Dict[str, Any]) -> Q:
+    """
+    把查询表达式编译为 CaseMetadata 上的 Q 对象
+
+    Raises:
+        ValueError: 表达式格式无效或节点过多
+    """
+    nodes = 0
+
+    def compile_node(node: Any) -> Q:
+        nonlocal nodes
+        nodes += 1
+        if nodes > MAX_CASE_QUERY_NODES:
+            raise ValueError(f"Query expression has more than {MAX_CASE_QUERY_NODES} nodes")
+        if not isinstance(node, dict) or len(node.keys() & {'tag', 'option', 'and', 'or', 'not'}) != 1:
+            raise ValueError(f"Invalid query expression: {node!r}")
+
+        if 'tag' in node:
+            return Q(Exists(CaseTag.objects.filter(metadata=OuterRef('pk'), tag=node['tag'])))
+        if 'option' in node:
+            return _compile_option(node)
+        if 'not' in node:
+            return ~compile_node(node['not'])
+
+        op = 'and' if 'and' in node else 'or'
+        children = node[op]
+        if not isinstance(children, list) or not children:
+            raise ValueError(f"'{op}' requires a non-empty list")
+        result = compile_node(children[0])
+        for child in children[1:]:
+            result = result & compile_node(child) if op == 'and' else result | compile_node(child)
+        return result
+
+    return compile_node(expr)
+
+
+def _compile_option(node: Dict[str, Any]) -> Q:
+    op = node.get('op', 'eq')
+    if op not in CASE_QUERY_OPTION_OPS:
+        raise ValueError(f"Unsupported option operator: {op}")
+    options = CaseOption.objects.filter(metadata=OuterRef('pk'), key=node['option'])
+    if op == 'exists':
+        return Q(Exists(options))
+
+    value = node.get('value')
+    if op == 'in':
+        if not isinstance(value, list):
+            raise ValueError("'in' requires a list value")
+        return Q(Exists(options.filter(value__in=[str(v) for v in value])))
+    if value is None:
+        raise ValueError(f"Option '{node['option']}' requires a value")
+    if op == 'contains':
+        return Q(Exists(options.filter(value__contains=str(value))))
+    matched = Q(Exists(options.filter(value=str(value))))
+    # ne：没有该选项的 Case 也算不等于
+    return ~matched if op == 'ne' else matched
+
+
+def _matches_empty(expr: Dict[str, Any]) -> bool:
+    """表达式对没有任何标签和选项的 Case 是否成立（表达式已通过 build_case_filter 校验）"""
+    if 'tag' in expr:
+        return False
+    if 'option' in expr:
+        return expr.get('op', 'eq') == 'ne'
+    if 'not' in expr:
+        return not _matches_empty(expr['not'])
+    if 'and' in expr:
+        return all(_matches_empty(child) for child in expr['and'])
+    return any(_matches_empty(child) for child in expr['or'])
+
+
+def query_cases(casespace: str, case_names: List[str], expr: Optional[Dict[str, Any]]) -> List[Dict]:
+    """
+    筛选 Casespace 下满足表达式的 Case（只读）
+
+    用一条 SQL 筛选已有元数据的 Case，标签随结果一起预取；尚未对账、没有元数据的 Case
+    按“没有标签和选项”判断是否满足表达式（例如 not 条件）。
+
+    Args:
+        casespace: Casespace 名称
+        case_names: 文件系统中存在的 Case（不在其中的元数据视为已删除的 Case）
+        expr: 查询表达式，为空时返回所有 Case
+
+    Returns:
+        [{'casespace', 'caseName', 'tags'}]，按 Case 名称排序
+
+    Raises:
+        ValueError: 表达式无效
+    """
+    condition = build_case_filter(expr) if expr else Q()
+    empty_matches = _matches_empty(expr) if expr else True
+
+    existing = set(case_names)
+    result = {}
+    for m in CaseMetadata.objects.filter(condition, casespace=casespace).order_by().prefetch_related('tags'):
+        if m.case_name in existing:
+            result[m.case_name] = [t.tag for t in m.tags.all()]
+
+    if empty_matches:
+        known = set(
+            CaseMetadata.objects.filter(casespace=casespace).values_list('case_name', flat=True)
+        )
+        for name in existing - known:
+            result[name] = []
+
+    return [
+        {'casespace': casespace, 'caseName': name, 'tags': result[name]}
+        for name in sorted(result)
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xcase', '0003_rename_case_metada_casesp_8b8e92_idx_case_metada_casespa_2e3c24_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casemetadata',
+            name='dir_inode',
+            field=models.BigIntegerField(blank=True, db_comment='Case目录的inode（对账时识别重命名）', null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xcase', '0004_casemetadata_dir_inode'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='casemetadata',
+            name='dir_inode',
+        ),
+    ]
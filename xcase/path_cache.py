@@ -0,0 +1,162 @@
+"""
+相对路径校验与缓存
+
+get_abs_path 原先每次调用都检查禁止模式，并对目标路径和存储根目录各调用一次 resolve()
+（逐级 lstat / readlink）。文件树和文件操作对每个节点都会调用它，这部分开销随节点数量线性增长。
+
+PathValidator 分两层：
+
+- 词法快速路径：去掉前导斜杠后检查禁止模式（``..`` 等）和保留目录（``.blobs`` / ``.search`` / ``.snapshots``），
+  直接拼接路径。不含 ``..`` 的相对路径在词法上必然位于存储根目录之内，只有符号链接能让它指向外部；
+- 符号链接检查：对路径自身的各级组成部分（Casespace、Case、各级子目录和目标本身）逐个 lstat，
+  开销与路径深度成正比，与 Casespace 的大小无关。目录的检查结果在 PATH_SYMLINK_SCAN_INTERVAL 秒内
+  有效，同一目录下的路径共用；路径中没有符号链接时不调用 resolve()，有符号链接时仍用 resolve()
+  校验真实路径，指向存储根目录之外的路径照样被拒绝。
+
+校验通过的结果按相对路径缓存在 LRU 中，条目带有存储代数（generation）和时间戳，
+与所依据的目录检查结果同时过期；invalidate() 增加代数，使全部缓存立即失效。
+
+FileManager 不会创建符号链接（上传的压缩包拒绝符号链接成员），符号链接只可能来自外部直接修改存储目录；
+外部新建符号链接后最多 PATH_SYMLINK_SCAN_INTERVAL 秒生效，需要立即生效时调用 invalidate()。
+"""
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple
+
+from .constants import (
+    BLOB_STORE_DIR_NAME,
+    SEARCH_INDEX_DIR_NAME,
+    SNAPSHOT_DIR_NAME,
+    FORBIDDEN_FILE_PATTERNS,
+    PATH_CACHE_SIZE,
+    PATH_SYMLINK_SCAN_INTERVAL,
+)
+from .exceptions import PathTraversalException
+
+
+# 不能通过相对路径访问的存储根目录下的目录
+RESERVED_DIR_NAMES = (BLOB_STORE_DIR_NAME, SEARCH_INDEX_DIR_NAME, SNAPSHOT_DIR_NAME)
+
+
+def is_symlink(path: Path) -> bool:
+    """path 本身是否为符号链接（不存在时为 False）"""
+    try:
+        return stat.S_ISLNK(os.lstat(path).st_mode)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+class PathValidator:
+    """存储根目录下相对路径的校验器（线程安全）"""
+
+    def __init__(
+        self,
+        storage_root: Path,
+        max_size: int = PATH_CACHE_SIZE,
+        scan_interval: float = PATH_SYMLINK_SCAN_INTERVAL
+    ):
+        self.storage_root = Path(storage_root)
+        self.max_size = max_size
+        self.scan_interval = scan_interval
+        self.generation = 0
+        self._real_root = self.storage_root.resolve()
+        self._cache: 'OrderedDict[str, Tuple[int, float, Path]]' = OrderedDict()
+        self._dirs: Dict[str, Tuple[int, float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """使所有缓存的路径和符号链接检查结果失效"""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+            self._dirs.clear()
+
+    def resolve(self, relative_path: str) -> Path:
+        """
+        将相对路径转换为存储根目录下的绝对路径
+
+        Raises:
+            PathTraversalException: 路径包含禁止的模式、指向保留目录或（经符号链接）位于存储根目录之外
+        """
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(relative_path)
+            if hit is not None and hit[0] == self.generation and now - hit[1] < self.scan_interval:
+                self._cache.move_to_end(relative_path)
+                return hit[2]
+            generation = self.generation
+
+        abs_path, checked_at = self._validate(relative_path, now)
+
+        with self._lock:
+            if generation == self.generation:
+                self._cache[relative_path] = (generation, checked_at, abs_path)
+                self._cache.move_to_end(relative_path)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return abs_path
+
+    def _validate(self, relative_path: str, now: float) -> Tuple[Path, float]:
+        """返回 (绝对路径, 所依据的最早的符号链接检查时间)"""
+        # 移除前导斜杠
+        rel = relative_path.lstrip('/')
+
+        # 检查禁止的模式
+        for pattern in FORBIDDEN_FILE_PATTERNS:
+            if pattern in rel:
+                raise PathTraversalException(rel)
+
+        # 内容寻址存储的对象只能通过 Case 中的链接访问，搜索索引和快照不对外暴露；
+        # 按第一个实际的路径组成部分判断，'./'、'//' 前缀不能绕过
+        parts = [part for part in rel.split('/') if part and part != '.']
+        casespace = parts[0] if parts else ''
+        if casespace in RESERVED_DIR_NAMES:
+            raise PathTraversalException(rel)
+
+        abs_path = self.storage_root / rel
+
+        if not casespace:
+            return abs_path, now
+
+        # 只有路径中存在符号链接时才需要解析真实路径，确认仍在存储根目录内
+        symlinks, checked_at = self._path_has_symlinks(rel, now)
+        if symlinks:
+            try:
+                abs_path.resolve().relative_to(self._real_root)
+            except ValueError:
+                raise PathTraversalException(rel)
+
+        return abs_path, checked_at
+
+    def _path_has_symlinks(self, rel: str, now: float) -> Tuple[bool, float]:
+        """返回 (路径的某一级是否为符号链接, 所依据的最早检查时间)"""
+        parts = [part for part in rel.split('/') if part and part != '.']
+        checked_at = now
+        for depth in range(1, len(parts)):
+            symlink, at = self._dir_is_symlink('/'.join(parts[:depth]), now)
+            checked_at = min(checked_at, at)
+            if symlink:
+                return True, checked_at
+        # 目标本身不缓存：路径缓存已按相对路径保存结果
+        return is_symlink(self.storage_root.joinpath(*parts)), checked_at
+
+    def _dir_is_symlink(self, rel_dir: str, now: float) -> Tuple[bool, float]:
+        """返回 (目录是否为符号链接, 检查时间)"""
+        with self._lock:
+            hit = self._dirs.get(rel_dir)
+            if hit is not None and hit[0] == self.generation and now - hit[1] < self.scan_interval:
+                return hit[2], hit[1]
+            generation = self.generation
+
+        result = is_symlink(self.storage_root / rel_dir)
+
+        with self._lock:
+            if generation == self.generation:
+                if len(self._dirs) >= self.max_size:
+                    self._dirs.clear()
+                self._dirs[rel_dir] = (generation, now, result)
+        return result, now
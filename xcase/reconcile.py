@@ -0,0 +1,122 @@
+"""
+文件系统与 CaseMetadata 对账
+
+CaseMetadata 以 (casespace, case_name) 标识 Case，而 Case 本身是存储根目录下的目录。
+通过接口重命名、删除 Case 时元数据随之更新（见 metadata.move_metadata / drop_metadata），
+上传、复制 Case 以及在接口之外对存储目录的改动只影响文件系统。对账任务批量比较两边：
+
+- 文件系统中有、数据库中没有的 Case：bulk_create 新行；
+- 数据库中有、文件系统中没有的行：整体删除（级联删除标签和选项）。
+
+对账不推断重命名：目录 inode 会在删除后被新目录复用，按 inode 匹配会让新上传的 Case
+继承已删除 Case 的标签和选项。在接口之外重命名的 Case 按删除旧 Case、新增新 Case 处理。
+
+每次对账只执行固定数量的查询（一次读取、一次删除、一次 bulk_create），
+读接口因此不需要再创建元数据。由 reconcile_case_metadata 命令单次或周期性执行。
+
+存储根目录不存在、某个 Casespace 无法列出时中止对账；存储未挂载（根目录为空）或单次清理超过
+RECONCILE_MAX_PRUNE 行时同样中止，除非指定 force，避免把所有元数据连同标签和选项一起删除。
+"""
+import os
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+from django.db import transaction
+from loguru import logger
+
+from .constants import RECONCILE_MAX_PRUNE
+from .exceptions import ReconcileAbortedException
+from .models import CaseMetadata
+
+
+CaseKey = Tuple[str, str]
+
+
+def scan_cases(storage_root: Path) -> Set[CaseKey]:
+    """
+    扫描存储根目录下的所有 Case 目录（跳过隐藏目录）
+
+    Returns:
+        {(casespace, case_name)}
+
+    Raises:
+        ReconcileAbortedException: 存储根目录不存在，或某个目录无法列出
+    """
+    cases = set()
+    if not storage_root.is_dir():
+        raise ReconcileAbortedException(f"storage root '{storage_root}' is not a directory")
+    try:
+        with os.scandir(storage_root) as casespaces:
+            for casespace in casespaces:
+                if casespace.name.startswith('.') or not casespace.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(casespace.path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.') or not entry.is_dir(follow_symlinks=False):
+                            continue
+                        cases.add((casespace.name, entry.name))
+    except OSError as e:
+        # 只扫描到部分 Case 时，其余 Case 的元数据会被误删
+        raise ReconcileAbortedException(f"failed to list {e.filename}: {e.strerror}") from e
+    return cases
+
+
+def reconcile(storage_root: Path, dry_run: bool = False, force: bool = False,
+              max_prune: int = RECONCILE_MAX_PRUNE) -> Dict[str, int]:
+    """
+    对账文件系统中的 Case 和 CaseMetadata
+
+    Args:
+        storage_root: caseeditor 存储根目录
+        dry_run: 只统计，不修改数据库
+        force: 扫描不到任何 Case 或清理行数超过 max_prune 时仍然执行
+        max_prune: 单次最多清理的行数
+
+    Returns:
+        {'cases', 'created', 'pruned'}
+
+    Raises:
+        ReconcileAbortedException: 扫描失败，或未指定 force 时扫描结果为空 / 清理行数超出上限
+    """
+    fs_cases = scan_cases(storage_root)
+
+    with transaction.atomic():
+        rows = list(
+            CaseMetadata.objects.order_by().select_for_update()
+            .only('id', 'casespace', 'case_name')
+        )
+        db_cases = {(row.casespace, row.case_name) for row in rows}
+
+        pruned = [row.id for row in rows if (row.casespace, row.case_name) not in fs_cases]
+        created = [
+            CaseMetadata(casespace=casespace, case_name=case_name)
+            for casespace, case_name in sorted(fs_cases - db_cases)
+        ]
+
+        stats = {
+            'cases': len(fs_cases),
+            'created': len(created),
+            'pruned': len(pruned),
+        }
+        if dry_run:
+            return stats
+
+        if pruned and not force:
+            if not fs_cases:
+                raise ReconcileAbortedException(
+                    f"no cases found under '{storage_root}' but {len(rows)} metadata rows exist "
+                    f"(storage not mounted?), use --force to prune them"
+                )
+            if len(pruned) > max_prune:
+                raise ReconcileAbortedException(
+                    f"{len(pruned)} metadata rows would be pruned (limit {max_prune}), "
+                    f"use --force to prune them"
+                )
+
+        if pruned:
+            CaseMetadata.objects.filter(id__in=pruned).delete()
+        if created:
+            CaseMetadata.objects.bulk_create(created, ignore_conflicts=True)
+
+    logger.info(f"Case metadata reconciled: {stats}")
+    return stats
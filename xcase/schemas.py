@@ -4,7 +4,7 @@ XCase API Schemas
 定义用例管理相关的 API 请求和响应 Schema。
 使用 Pydantic 的 ninja.Schema 进行数据验证。
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from ninja import Schema, Field
 
 
@@ -37,12 +37,31 @@ class FileContentSchema(Schema):
     path: str
     content: str
     language: Optional[str] = None
+    encoding: Optional[str] = None
+    size: Optional[int] = None
+    truncated: bool = False
+    etag: Optional[str] = None
 
 
 class SaveFileRequest(Schema):
     """保存文件请求"""
     path: str
     content: str
+    etag: Optional[str] = None
+
+
+class PatchHunk(Schema):
+    """增量保存的行块（行号从 0 开始，相对于原文件）"""
+    start: int
+    delete: int = 0
+    lines: List[str] = []
+
+
+class PatchFileRequest(Schema):
+    """增量保存文件请求"""
+    path: str
+    etag: str
+    hunks: List[PatchHunk]
 
 
 class CreateFileRequest(Schema):
@@ -75,6 +94,17 @@ class UploadFilesRequest(Schema):
     files: List[UploadFileItem]
 
 
+class ForkCaseRequest(Schema):
+    """复制 Case 请求"""
+    new_case: str = Field(..., alias='newCase')
+    target_casespace: Optional[str] = Field(None, alias='targetCasespace')
+
+
+class CreateSnapshotRequest(Schema):
+    """创建 Case 快照请求"""
+    message: Optional[str] = ''
+
+
 # ============================================================================
 # Case Browser Schemas
 # ============================================================================
@@ -100,6 +130,11 @@ class CaseDetailSchema(Schema):
     options: List[CaseOptionSchema]
 
 
+class CaseQueryRequest(Schema):
+    """Case 查询请求（按标签 / 选项表达式筛选，语法见 xcase.metadata）"""
+    where: Optional[Dict[str, Any]] = None
+
+
 # ============================================================================
 # Case Tag Management Schemas
 # ============================================================================
@@ -118,6 +153,30 @@ class DeleteTagRequest(Schema):
     tag: str
 
 
+# ============================================================================
+# Case Bulk Mutation Schemas
+# ============================================================================
+
+class CaseRef(Schema):
+    """Case 引用"""
+    casespace: str
+    case_name: str = Field(..., alias='caseName')
+
+
+class BulkCaseOperation(Schema):
+    """批量操作项：addTag / deleteTag（tag），setOption（key, value），deleteOption（key）"""
+    action: str
+    tag: Optional[str] = None
+    key: Optional[str] = None
+    value: Optional[str] = None
+
+
+class BulkCaseMutationRequest(Schema):
+    """批量修改标签 / 选项请求"""
+    cases: List[CaseRef]
+    operations: List[BulkCaseOperation]
+
+
 # ============================================================================
 # Case Option Management Schemas
 # ============================================================================
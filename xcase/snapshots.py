@@ -0,0 +1,226 @@
+"""
+Case 快照（硬链接写时复制）
+
+快照保存在存储根目录下的隐藏目录 ``.snapshots``：
+
+    .snapshots/<casespace>/<case>/<快照 ID>/meta.json   {id, message, created, files, bytes}
+    .snapshots/<casespace>/<case>/<快照 ID>/tree/       Case 目录树，文件是硬链接
+
+与 rsync ``--link-dest`` 相同，快照中的文件与 Case 中的文件共享 inode，创建快照只需建立目录
+和硬链接，耗时与文件数量有关而与文件大小无关。FileManager 的所有写操作都是写临时文件后原子替换
+（新的 inode），从不原地修改，因此之后的保存、重命名、删除都不会影响已有快照。
+
+- diff：同一 inode 的文件必然相同，只有 inode 不同且大小相同的文件才需要比较内容；
+- restore：先为当前内容自动创建一个快照，再把快照树硬链接到暂存目录并原子替换 Case 目录；
+- 符号链接不进入快照。外部工具原地修改 Case 文件时会同时修改快照中的同一文件。
+"""
+import filecmp
+import json
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .constants import MAX_CASE_SNAPSHOTS
+from .exceptions import CaseNotFoundException, SnapshotNotFoundException
+
+
+_SNAPSHOT_ID_RE = re.compile(r'^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$')
+_META_FILE = 'meta.json'
+_TREE_DIR = 'tree'
+
+# 快照 diff 中表示 Case 当前内容
+CURRENT = 'current'
+
+
+def _ignore_symlinks(directory: str, names: List[str]) -> List[str]:
+    return [name for name in names if os.path.islink(os.path.join(directory, name))]
+
+
+def link_tree(src: Path, dst: Path) -> None:
+    """把 src 目录树复制为 dst，文件为硬链接（跳过符号链接）"""
+    shutil.copytree(src, dst, copy_function=os.link, ignore=_ignore_symlinks)
+
+
+def _scan(root: Path) -> Dict[str, os.stat_result]:
+    """{相对路径: stat}（只包含普通文件）"""
+    result = {}
+    if not root.is_dir():
+        return result
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    result[Path(entry.path).relative_to(root).as_posix()] = entry.stat(follow_symlinks=False)
+    return result
+
+
+class SnapshotStore:
+    """
+    Case 快照存储
+
+    root 必须与 Case 目录位于同一文件系统（默认是存储根目录下的 .snapshots）。
+    """
+
+    def __init__(self, root: Path, max_snapshots: int = MAX_CASE_SNAPSHOTS):
+        self.root = Path(root)
+        self.max_snapshots = max_snapshots
+
+    def case_dir(self, casespace: str, case: str) -> Path:
+        return self.root / casespace / case
+
+    # ------------------------------------------------------------------
+    # 创建 / 列表 / 删除
+    # ------------------------------------------------------------------
+
+    def create(self, casespace: str, case: str, case_abs: Path, message: str = '') -> Dict[str, Any]:
+        """
+        为 Case 创建快照（超出 max_snapshots 时删除最旧的快照）
+
+        Returns:
+            快照信息 {id, message, created, files, bytes}
+        """
+        if not case_abs.is_dir():
+            raise CaseNotFoundException(casespace, case)
+
+        # ID 按字符串排序即按创建时间排序
+        now = datetime.now()
+        snapshot_id = f"{now:%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:4]}"
+        case_dir = self.case_dir(casespace, case)
+        case_dir.mkdir(parents=True, exist_ok=True)
+        staging = case_dir / f".{snapshot_id}.tmp"
+        try:
+            link_tree(case_abs, staging / _TREE_DIR)
+            files = _scan(staging / _TREE_DIR)
+            meta = {
+                'id': snapshot_id,
+                'message': message,
+                'created': now.isoformat(timespec='seconds'),
+                'files': len(files),
+                'bytes': sum(st.st_size for st in files.values()),
+            }
+            (staging / _META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+            os.rename(staging, case_dir / snapshot_id)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+        for old in self._ids(casespace, case)[:-self.max_snapshots or None]:
+            self.delete(casespace, case, old)
+
+        logger.info(f"Snapshot created: {casespace}/{case}@{snapshot_id} ({meta['files']} files)")
+        return meta
+
+    def list_snapshots(self, casespace: str, case: str) -> List[Dict[str, Any]]:
+        """Case 的所有快照（按创建时间从新到旧）"""
+        result = []
+        for snapshot_id in reversed(self._ids(casespace, case)):
+            try:
+                result.append(json.loads((self.case_dir(casespace, case) / snapshot_id / _META_FILE).read_text(encoding='utf-8')))
+            except (OSError, ValueError):
+                logger.warning(f"Broken snapshot metadata: {casespace}/{case}@{snapshot_id}")
+        return result
+
+    def delete(self, casespace: str, case: str, snapshot_id: str) -> None:
+        shutil.rmtree(self._snapshot_dir(casespace, case, snapshot_id))
+        logger.info(f"Snapshot deleted: {casespace}/{case}@{snapshot_id}")
+
+    def move(self, casespace: str, case: str, new_casespace: str, new_case: str) -> None:
+        """Case 重命名时快照随之移动"""
+        src = self.case_dir(casespace, case)
+        if not src.is_dir():
+            return
+        dst = self.case_dir(new_casespace, new_case)
+        if dst.exists():
+            # 目标名称下残留的快照（例如同名 Case 曾被删除）保留，不合并
+            logger.warning(f"Snapshots already exist for {new_casespace}/{new_case}, not moving {casespace}/{case}")
+            return
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(src, dst)
+
+    # ------------------------------------------------------------------
+    # diff / restore
+    # ------------------------------------------------------------------
+
+    def diff(self, casespace: str, case: str, case_abs: Path, base: str, target: str = CURRENT) -> Dict[str, List[str]]:
+        """
+        比较两个快照（或快照与当前内容，CURRENT）
+
+        Returns:
+            {'added': [...], 'removed': [...], 'modified': [...]}（相对 Case 目录的路径，已排序）
+        """
+        base_root = self._tree(casespace, case, case_abs, base)
+        target_root = self._tree(casespace, case, case_abs, target)
+        old, new = _scan(base_root), _scan(target_root)
+
+        modified = []
+        for rel in old.keys() & new.keys():
+            a, b = old[rel], new[rel]
+            if (a.st_dev, a.st_ino) == (b.st_dev, b.st_ino):
+                continue
+            if a.st_size != b.st_size or not filecmp.cmp(base_root / rel, target_root / rel, shallow=False):
+                modified.append(rel)
+        return {
+            'added': sorted(new.keys() - old.keys()),
+            'removed': sorted(old.keys() - new.keys()),
+            'modified': sorted(modified),
+        }
+
+    def restore(self, casespace: str, case: str, case_abs: Path, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        把 Case 恢复为快照的内容
+
+        恢复前为当前内容自动创建快照（Case 目录不存在时跳过）。
+
+        Returns:
+            恢复前自动创建的快照信息；Case 目录不存在时为 None
+        """
+        tree = self._snapshot_dir(casespace, case, snapshot_id) / _TREE_DIR
+        case_abs.parent.mkdir(parents=True, exist_ok=True)
+        token = uuid.uuid4().hex[:12]
+        staging = case_abs.with_name(f".{case_abs.name}.restore-{token}")
+        trash = case_abs.with_name(f".{case_abs.name}.trash-{token}")
+        backup = None
+        try:
+            # 先链接出快照树：自动快照超出数量限制时可能删除被恢复的快照
+            link_tree(tree, staging)
+            if case_abs.is_dir():
+                backup = self.create(casespace, case, case_abs, f"Before restoring {snapshot_id}")
+            if case_abs.exists():
+                os.rename(case_abs, trash)
+            os.rename(staging, case_abs)
+        finally:
+            for leftover in (staging, trash):
+                if leftover.exists():
+                    shutil.rmtree(leftover, ignore_errors=True)
+
+        logger.info(f"Snapshot restored: {casespace}/{case}@{snapshot_id}")
+        return backup
+
+    # ------------------------------------------------------------------
+
+    def _ids(self, casespace: str, case: str) -> List[str]:
+        case_dir = self.case_dir(casespace, case)
+        if not case_dir.is_dir():
+            return []
+        return sorted(entry.name for entry in case_dir.iterdir() if _SNAPSHOT_ID_RE.match(entry.name))
+
+    def _snapshot_dir(self, casespace: str, case: str, snapshot_id: str) -> Path:
+        path = self.case_dir(casespace, case) / snapshot_id
+        if not _SNAPSHOT_ID_RE.match(snapshot_id) or not path.is_dir():
+            raise SnapshotNotFoundException(casespace, case, snapshot_id)
+        return path
+
+    def _tree(self, casespace: str, case: str, case_abs: Path, snapshot_id: str) -> Path:
+        if snapshot_id == CURRENT:
+            return case_abs
+        return self._snapshot_dir(casespace, case, snapshot_id) / _TREE_DIR
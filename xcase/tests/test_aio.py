@@ -0,0 +1,70 @@
+"""
+异步接口测试
+
+测试 I/O 线程池卸载、异步流式迭代器，以及 ASGI 请求下的文件树和 zip 下载
+"""
+import io
+import threading
+import zipfile
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from xcase.aio import aiter_blocking, run_io
+
+
+@pytest.fixture
+def auth_headers(test_user):
+    from ninja_jwt.tokens import AccessToken
+
+    return {'Authorization': f'Bearer {AccessToken.for_user(test_user)}'}
+
+
+class TestRunIO:
+    """测试阻塞调用卸载"""
+
+    def test_runs_in_io_thread(self):
+        """阻塞调用不在事件循环线程中执行"""
+        assert async_to_sync(run_io)(lambda: threading.current_thread().name).startswith('xcase-io')
+
+    def test_aiter_blocking_closes(self):
+        """提前结束迭代时关闭原生成器"""
+        closed = []
+
+        def chunks():
+            try:
+                yield from (b'a', b'b', b'c')
+            finally:
+                closed.append(True)
+
+        async def take_first():
+            stream = aiter_blocking(chunks())
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        assert async_to_sync(take_first)() == b'a'
+        assert closed == [True]
+
+
+class TestASGIRequests:
+    """测试 ASGI 请求"""
+
+    def test_file_tree(self, auth_headers, temp_casespace):
+        """ASGI 下获取文件树"""
+        params = {'casespace': temp_casespace['casespace'], 'case': temp_casespace['case']}
+        response = async_to_sync(AsyncClient().get)('/case/caseeditor/files', params, headers=auth_headers)
+        assert [node['name'] for node in response.json()['data']] == ['test.py']
+
+    def test_download_streams_async(self, auth_headers, temp_casespace):
+        """ASGI 下 zip 下载使用异步迭代器逐块输出"""
+        url = f"/case/caseeditor/casespaces/{temp_casespace['casespace']}/cases/{temp_casespace['case']}/download"
+
+        async def download():
+            response = await AsyncClient().get(url, headers=auth_headers)
+            assert response.is_async
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        with zipfile.ZipFile(io.BytesIO(async_to_sync(download)())) as archive:
+            assert archive.read('test.py') == b'print("Hello, World!")'
@@ -70,6 +70,35 @@ class TestGetCasesMetadata:
         assert data['data'] == []
 
 
+    def test_get_cases_metadata_constant_queries(self, api_client, temp_casespace):
+        """测试元数据批量解析：查询次数与 case 数量无关"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        casespace = temp_casespace['casespace']
+        casespace_path = temp_casespace['storage_root'] / casespace
+        
+        def count_queries(case_count):
+            for i in range(case_count):
+                (casespace_path / f'bulk_{i:03d}').mkdir(exist_ok=True)
+                metadata, _ = CaseMetadata.objects.get_or_create(casespace=casespace, case_name=f'bulk_{i:03d}')
+                CaseTag.objects.get_or_create(metadata=metadata, tag='smoke')
+            with CaptureQueriesContext(connection) as ctx:
+                response = api_client.get(f'/casebrowser/casespaces/{casespace}/cases')
+            assert len(response.json()['data']) == case_count + 1
+            return len(ctx.captured_queries)
+        
+        few = count_queries(2)
+        assert count_queries(50) == few
+        
+        data = api_client.get(f'/casebrowser/casespaces/{casespace}/cases').json()['data']
+        tags = {item['caseName']: item['tags'] for item in data}
+        assert tags['bulk_001'] == ['smoke']
+        # 没有元数据的 case 返回空标签，且不会被创建
+        assert tags[temp_casespace['case']] == []
+        assert CaseMetadata.objects.filter(casespace=casespace).count() == 50
+
+
 @pytest.mark.casebrowser
 class TestGetCaseDetail:
     """测试获取单个 case 详情"""
@@ -113,7 +142,7 @@ class TestGetCaseDetail:
         assert returned_options == expected_options
     
     def test_get_case_detail_new_case(self, api_client, temp_casespace):
-        """测试获取新 case（自动创建元数据）"""
+        """测试获取新 case（尚无元数据）"""
         casespace = temp_casespace['casespace']
         new_case_name = 'new_test_case'
         
@@ -129,14 +158,76 @@ class TestGetCaseDetail:
         assert response.status_code == 200
         data = response.json()
         assert data['code'] == 200
+        assert data['data']['tags'] == []
+        assert data['data']['options'] == []
         
-        # 验证自动创建了元数据
-        assert CaseMetadata.objects.filter(
+        # 读接口不写数据库，元数据由对账任务创建
+        assert not CaseMetadata.objects.filter(
             casespace=casespace,
             case_name=new_case_name
         ).exists()
 
 
+@pytest.mark.casebrowser
+class TestQueryCases:
+    """测试按标签 / 选项表达式筛选 cases"""
+    
+    @pytest.fixture
+    def tagged_cases(self, temp_casespace):
+        """创建带不同标签和选项的 cases"""
+        casespace = temp_casespace['casespace']
+        cases = {
+            'perf_linux_p0': (['性能测试', 'smoke'], {'priority': 'P0', 'os': 'Linux'}),
+            'perf_win_p0': (['性能测试'], {'priority': 'P0', 'os': 'Windows'}),
+            'perf_linux_p1': (['性能测试'], {'priority': 'P1', 'os': 'Linux'}),
+            'func_linux_p0': (['功能测试'], {'priority': 'P0', 'os': 'Linux'}),
+        }
+        for name, (tags, options) in cases.items():
+            (temp_casespace['storage_root'] / casespace / name).mkdir()
+            metadata = CaseMetadata.objects.create(casespace=casespace, case_name=name)
+            for tag in tags:
+                CaseTag.objects.create(metadata=metadata, tag=tag)
+            for key, value in options.items():
+                CaseOption.objects.create(metadata=metadata, key=key, value=value)
+        return casespace
+    
+    def _query(self, api_client, casespace, where):
+        response = api_client.post(f'/casebrowser/casespaces/{casespace}/cases/query', json={'where': where})
+        return response.json()
+    
+    def _names(self, api_client, casespace, where):
+        return [item['caseName'] for item in self._query(api_client, casespace, where)['data']]
+    
+    def test_and_expression(self, api_client, tagged_cases):
+        """标签和选项同时满足"""
+        where = {'and': [
+            {'tag': '性能测试'},
+            {'option': 'priority', 'value': 'P0'},
+            {'option': 'os', 'value': 'Linux'},
+        ]}
+        assert self._names(api_client, tagged_cases, where) == ['perf_linux_p0']
+    
+    def test_or_and_not(self, api_client, tagged_cases):
+        """or / not 组合以及选项比较方式"""
+        where = {'or': [{'tag': 'smoke'}, {'tag': '功能测试'}]}
+        assert self._names(api_client, tagged_cases, where) == ['func_linux_p0', 'perf_linux_p0']
+        
+        where = {'and': [{'tag': '性能测试'}, {'not': {'option': 'os', 'value': 'Linux'}}]}
+        assert self._names(api_client, tagged_cases, where) == ['perf_win_p0']
+        
+        where = {'option': 'priority', 'op': 'in', 'value': ['P1', 'P2']}
+        assert self._names(api_client, tagged_cases, where) == ['perf_linux_p1']
+        
+        # 没有任何元数据的 case 也能匹配否定条件
+        where = {'not': {'option': 'priority', 'op': 'exists'}}
+        assert self._names(api_client, tagged_cases, where) == ['test_case']
+    
+    def test_invalid_expression(self, api_client, tagged_cases):
+        """无效表达式返回 400"""
+        assert self._query(api_client, tagged_cases, {'tag': 'a', 'or': []})['code'] == 400
+        assert self._query(api_client, tagged_cases, {'option': 'os', 'op': 'like', 'value': 'L'})['code'] == 400
+
+
 @pytest.mark.casebrowser
 class TestTagManagement:
     """测试标签管理功能"""
@@ -275,6 +366,66 @@ class TestTagManagement:
         assert 'Case 不存在' in data['data']
 
 
+@pytest.mark.casebrowser
+class TestBulkMutation:
+    """测试批量修改标签和选项"""
+    
+    def test_bulk_retag(self, api_client, sample_case_with_options):
+        """多个 case 一次完成增删标签、设置和删除选项"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        metadata = sample_case_with_options['metadata']
+        casespace = metadata.casespace
+        CaseTag.objects.create(metadata=metadata, tag='old')
+        cases = [{'casespace': casespace, 'caseName': metadata.case_name}]
+        cases += [{'casespace': casespace, 'caseName': f'bulk_{i:03d}'} for i in range(200)]
+        
+        payload = {
+            'cases': cases,
+            'operations': [
+                {'action': 'addTag', 'tag': 'nightly'},
+                {'action': 'deleteTag', 'tag': 'old'},
+                {'action': 'setOption', 'key': 'priority', 'value': 'P0'},
+                {'action': 'deleteOption', 'key': 'timeout'},
+            ]
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.post('/casebrowser/cases/bulk', json=payload)
+        assert len(ctx.captured_queries) < 30
+        
+        stats = response.json()['data']
+        assert stats['cases'] == 201
+        assert stats['tagsAdded'] == 201
+        assert stats['tagsDeleted'] == 1
+        assert stats['optionsCreated'] == 200
+        assert stats['optionsUpdated'] == 1
+        
+        assert CaseTag.objects.filter(metadata__casespace=casespace, tag='nightly').count() == 201
+        assert not CaseTag.objects.filter(metadata=metadata, tag='old').exists()
+        options = dict(CaseOption.objects.filter(metadata=metadata).values_list('key', 'value'))
+        assert options['priority'] == 'P0'
+        assert 'timeout' not in options
+        
+        # 重复执行不产生新的数据
+        stats = api_client.post('/casebrowser/cases/bulk', json=payload).json()['data']
+        assert stats['tagsAdded'] == 0
+        assert stats['optionsCreated'] == 0
+        assert stats['optionsUpdated'] == 0
+    
+    def test_bulk_invalid_operations(self, api_client, temp_casespace):
+        """无效或互相冲突的操作返回 400，不做任何修改"""
+        cases = [{'casespace': temp_casespace['casespace'], 'caseName': temp_casespace['case']}]
+        for operations in (
+            [{'action': 'renameTag', 'tag': 'a'}],
+            [{'action': 'addTag', 'tag': 'a'}, {'action': 'deleteTag', 'tag': 'a'}],
+            [{'action': 'setOption', 'key': 'a'}],
+        ):
+            response = api_client.post('/casebrowser/cases/bulk', json={'cases': cases, 'operations': operations})
+            assert response.json()['code'] == 400
+        assert not CaseMetadata.objects.filter(casespace=temp_casespace['casespace']).exists()
+
+
 @pytest.mark.casebrowser
 class TestOptionManagement:
     """测试选项管理功能"""
@@ -577,3 +728,115 @@ class TestCaseBrowserIntegration:
         final_options = {opt['key']: opt['value'] for opt in final_detail['options']}
         assert final_options['priority'] == 'critical'
 
+
+@pytest.mark.casebrowser
+class TestReconcile:
+    """测试文件系统与元数据对账"""
+    
+    def test_reconcile_create_prune(self, temp_casespace):
+        """补齐新 case、清理已删除 case；接口之外的重命名不继承标签"""
+        from django.core.management import call_command
+        from xcase.reconcile import reconcile
+        
+        storage_root = temp_casespace['storage_root']
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        (storage_root / casespace / 'other').mkdir()
+        CaseMetadata.objects.create(casespace=casespace, case_name='deleted_case')
+        
+        stats = reconcile(storage_root)
+        assert (stats['created'], stats['pruned']) == (2, 1)
+        metadata = CaseMetadata.objects.get(casespace=casespace, case_name=case)
+        CaseTag.objects.create(metadata=metadata, tag='smoke')
+        
+        # 直接在文件系统中改名：目录 inode 不变，但不据此推断重命名
+        (storage_root / 'moved').mkdir()
+        (storage_root / casespace / case).rename(storage_root / 'moved' / 'renamed_case')
+        assert reconcile(storage_root, dry_run=True) == {'cases': 2, 'created': 1, 'pruned': 1}
+        assert CaseMetadata.objects.filter(casespace=casespace, case_name=case).exists()
+        
+        call_command('reconcile_case_metadata')
+        assert not CaseTag.objects.filter(tag='smoke').exists()
+        renamed = CaseMetadata.objects.get(casespace='moved', case_name='renamed_case')
+        assert not renamed.tags.exists()
+        
+        assert reconcile(storage_root) == {'cases': 2, 'created': 0, 'pruned': 0}
+    
+    def test_rename_and_delete_through_api_update_metadata(self, api_client, temp_casespace):
+        """通过接口重命名 case / casespace 时标签随之保留，删除后同名新 case 不继承标签"""
+        storage_root = temp_casespace['storage_root']
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        metadata = CaseMetadata.objects.create(casespace=casespace, case_name=case)
+        CaseTag.objects.create(metadata=metadata, tag='smoke')
+        # 残留的目标名称元数据被替换
+        CaseMetadata.objects.create(casespace=casespace, case_name='renamed_case')
+        
+        response = api_client.put(
+            '/caseeditor/files/rename',
+            json={'oldPath': f'/{casespace}/{case}', 'newName': 'renamed_case'}
+        )
+        assert response.json()['code'] == 200
+        metadata.refresh_from_db()
+        assert (metadata.casespace, metadata.case_name) == (casespace, 'renamed_case')
+        
+        response = api_client.put(
+            '/caseeditor/files/rename', json={'oldPath': f'/{casespace}', 'newName': 'moved'}
+        )
+        assert response.json()['code'] == 200
+        metadata.refresh_from_db()
+        assert (metadata.casespace, metadata.case_name) == ('moved', 'renamed_case')
+        assert list(metadata.tags.values_list('tag', flat=True)) == ['smoke']
+        
+        response = api_client.delete('/caseeditor/casespaces/moved/cases/renamed_case')
+        assert response.json()['code'] == 200
+        assert not CaseMetadata.objects.exists()
+        assert not CaseTag.objects.exists()
+        
+        # 同名重新上传后对账得到空白元数据
+        (storage_root / 'moved' / 'renamed_case').mkdir()
+        from xcase.reconcile import reconcile
+        assert reconcile(storage_root)['created'] == 1
+        assert not CaseMetadata.objects.get(casespace='moved', case_name='renamed_case').tags.exists()
+        
+        response = api_client.delete('/caseeditor/files', params={'path': '/moved'})
+        assert response.json()['code'] == 200
+        assert not CaseMetadata.objects.exists()
+    
+    def test_reconcile_aborts_on_missing_or_empty_root(self, temp_casespace, tmp_path):
+        """存储根目录不存在或为空（未挂载）时不清理元数据，--force 时才清理"""
+        from django.core.management import call_command
+        from xcase.exceptions import ReconcileAbortedException
+        from xcase.reconcile import reconcile
+        
+        storage_root = temp_casespace['storage_root']
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        reconcile(storage_root)
+        metadata = CaseMetadata.objects.get(casespace=casespace, case_name=case)
+        CaseTag.objects.create(metadata=metadata, tag='smoke')
+        
+        with pytest.raises(ReconcileAbortedException):
+            reconcile(tmp_path / 'missing')
+        empty_root = tmp_path / 'empty'
+        empty_root.mkdir()
+        with pytest.raises(ReconcileAbortedException):
+            reconcile(empty_root)
+        assert reconcile(empty_root, dry_run=True)['pruned'] == 1
+        assert CaseTag.objects.filter(metadata=metadata).exists()
+        
+        assert reconcile(empty_root, force=True)['pruned'] == 1
+        assert not CaseMetadata.objects.exists()
+    
+    def test_reconcile_prune_limit(self, temp_casespace):
+        """单次清理超过上限时中止"""
+        from xcase.exceptions import ReconcileAbortedException
+        from xcase.reconcile import reconcile
+        
+        storage_root = temp_casespace['storage_root']
+        casespace = temp_casespace['casespace']
+        CaseMetadata.objects.bulk_create(
+            CaseMetadata(casespace=casespace, case_name=f'deleted_{i}') for i in range(3)
+        )
+        
+        with pytest.raises(ReconcileAbortedException):
+            reconcile(storage_root, max_prune=2)
+        assert CaseMetadata.objects.filter(case_name__startswith='deleted_').count() == 3
+        assert reconcile(storage_root, max_prune=3)['pruned'] == 3
@@ -217,6 +217,88 @@ class TestFileTreeManagement:
         assert response.status_code == 200
         data = response.json()
         assert data['code'] == 403  # 应该被拒绝
+    
+    def test_get_file_tree_lazy(self, api_client, temp_casespace):
+        """测试懒加载文件树只返回一层并带子节点数量"""
+        from xcase.file_manager import file_manager
+        
+        casespace = temp_casespace['casespace']
+        case = temp_casespace['case']
+        
+        subdir = file_manager.storage_root / casespace / case / 'dataset'
+        (subdir / 'nested').mkdir(parents=True)
+        (subdir / 'a.csv').write_text('1,2', encoding='utf-8')
+        (subdir / '.hidden').write_text('', encoding='utf-8')
+        
+        response = api_client.get(
+            '/caseeditor/files',
+            params={'casespace': casespace, 'case': case, 'path': '/', 'lazy': 'true'}
+        )
+        
+        data = response.json()
+        assert data['code'] == 200
+        page = data['data']
+        assert page['total'] == 2
+        assert page['hasMore'] is False
+        folder, file = page['children']
+        assert folder['name'] == 'dataset'
+        assert folder['type'] == 'folder'
+        assert folder['childCount'] == 2
+        assert folder['hasChildren'] is True
+        assert 'children' not in folder
+        assert file['path'] == f'/{casespace}/{case}/test.py'
+        assert file['size'] == len('print("Hello, World!")')
+    
+    def test_get_file_tree_lazy_paging(self, api_client, temp_casespace):
+        """测试懒加载文件树在大目录中分页"""
+        from xcase.file_manager import file_manager
+        
+        casespace = temp_casespace['casespace']
+        case = temp_casespace['case']
+        
+        bulk = file_manager.storage_root / casespace / case / 'bulk'
+        bulk.mkdir()
+        for i in range(25):
+            (bulk / f'f{i:03d}.txt').write_text('', encoding='utf-8')
+        
+        response = api_client.get(
+            '/caseeditor/files',
+            params={'casespace': casespace, 'case': case, 'path': '/bulk',
+                    'lazy': 'true', 'offset': 20, 'limit': 10}
+        )
+        
+        page = response.json()['data']
+        assert page['total'] == 25
+        assert [node['name'] for node in page['children']] == [f'f{i:03d}.txt' for i in range(20, 25)]
+        assert page['hasMore'] is False
+    
+    def test_get_file_tree_lazy_size_not_cached(self, api_client, temp_casespace):
+        """测试原地改写文件（目录 mtime 不变）后懒加载返回新的文件大小"""
+        from xcase.file_manager import file_manager
+        
+        casespace = temp_casespace['casespace']
+        case = temp_casespace['case']
+        params = {'casespace': casespace, 'case': case, 'path': '/', 'lazy': 'true'}
+        
+        target = file_manager.storage_root / casespace / case / 'log.txt'
+        target.write_text('a', encoding='utf-8')
+        api_client.get('/caseeditor/files', params=params)
+        with open(target, 'a', encoding='utf-8') as f:
+            f.write('bcd')
+        
+        page = api_client.get('/caseeditor/files', params=params).json()['data']
+        sizes = {node['name']: node.get('size') for node in page['children']}
+        assert sizes['log.txt'] == 4
+    
+    def test_get_file_tree_lazy_missing_directory(self, api_client, temp_casespace):
+        """测试懒加载不存在的目录返回 404"""
+        response = api_client.get(
+            '/caseeditor/files',
+            params={'casespace': temp_casespace['casespace'], 'case': temp_casespace['case'],
+                    'path': '/missing', 'lazy': 'true'}
+        )
+        
+        assert response.json()['code'] == 404
 
 
 @pytest.mark.caseeditor
@@ -553,9 +635,35 @@ class TestCaseArchiveOperations:
         
         # 验证返回的是有效的 zip 数据
         import zipfile
-        zip_data = BytesIO(response.content)
+        assert response.streaming
+        zip_data = BytesIO(b''.join(response.streaming_content))
         assert zipfile.is_zipfile(zip_data)
     
+    def test_download_case_streams_and_stores_compressed(self, api_client, temp_casespace):
+        """测试流式下载分块输出，已压缩文件不再重新压缩"""
+        import os
+        import zipfile
+        from xcase.file_manager import file_manager
+        
+        casespace = temp_casespace['casespace']
+        case = temp_casespace['case']
+        case_path = file_manager.storage_root / casespace / case
+        (case_path / 'data').mkdir()
+        (case_path / 'data' / 'log.txt').write_text('line\n' * 50000, encoding='utf-8')
+        (case_path / 'data' / 'blob.gz').write_bytes(os.urandom(200 * 1024))
+        
+        response = api_client.get(
+            f'/caseeditor/casespaces/{casespace}/cases/{case}/download'
+        )
+        
+        chunks = list(response.streaming_content)
+        assert len(chunks) > 1
+        with zipfile.ZipFile(BytesIO(b''.join(chunks))) as zf:
+            assert zf.testzip() is None
+            assert zf.getinfo('data/blob.gz').compress_type == zipfile.ZIP_STORED
+            assert zf.getinfo('data/log.txt').compress_type == zipfile.ZIP_DEFLATED
+            assert zf.read('test.py') == b'print("Hello, World!")'
+    
     def test_download_nonexistent_case(self, api_client, temp_casespace):
         """测试下载不存在的 case"""
         casespace = temp_casespace['casespace']
@@ -799,7 +907,7 @@ class TestCaseEditorIntegration:
         assert response.status_code == 200
         
         # 验证下载的 zip 文件
-        zip_data = BytesIO(response.content)
+        zip_data = BytesIO(b''.join(response.streaming_content))
         with zipfile.ZipFile(zip_data, 'r') as zf:
             assert 'README.md' in zf.namelist()
             content = zf.read('README.md').decode('utf-8')
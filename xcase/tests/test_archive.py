@@ -0,0 +1,201 @@
+"""
+Case 压缩包解压与压缩测试
+
+测试 ArchiveExtractor 的流式 / 并行解压、路径安全检查、压缩炸弹限制，
+并行压缩与 ZipStreamWriter 输出，以及 FileManager.upload_case 的暂存目录和原子重命名
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from xcase import archive
+from xcase.archive import ArchiveExtractor, CompressedMember, StreamedMember, ZipStreamWriter, compress_files
+from xcase.exceptions import ArchiveLimitException, PathTraversalException
+
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar_gz_bytes(members, symlink=None):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        if symlink:
+            info = tarfile.TarInfo(symlink[0])
+            info.type = tarfile.SYMTYPE
+            info.linkname = symlink[1]
+            tar.addfile(info)
+    return buffer.getvalue()
+
+
+class TestArchiveExtractor:
+    """测试解压器"""
+
+    def test_extract_zip_and_tar(self, tmp_path):
+        """zip 和 tar.gz 均可流式解压"""
+        members = {'a.txt': b'aaa', 'sub/b.py': b'print(1)'}
+        for filename, data in (('case.zip', _zip_bytes(members)), ('case.tar.gz', _tar_gz_bytes(members))):
+            dest = tmp_path / filename
+            stats = ArchiveExtractor(io.BytesIO(data), filename, dest).extract()
+            assert stats == {'files': 2, 'bytes': 11}
+            assert (dest / 'sub' / 'b.py').read_bytes() == b'print(1)'
+
+    @pytest.mark.parametrize('name', ['../evil.txt', '/etc/evil', 'a/../../evil'])
+    def test_reject_traversal(self, tmp_path, name):
+        """拒绝越出目标目录的成员路径"""
+        with pytest.raises(PathTraversalException):
+            ArchiveExtractor(io.BytesIO(_zip_bytes({name: b'x'})), 'case.zip', tmp_path / 'out').extract()
+
+    def test_reject_tar_symlink(self, tmp_path):
+        """拒绝 tar 中的符号链接"""
+        data = _tar_gz_bytes({'a.txt': b'a'}, symlink=('link', '/etc/passwd'))
+        with pytest.raises(PathTraversalException):
+            ArchiveExtractor(io.BytesIO(data), 'case.tgz', tmp_path / 'out').extract()
+
+    def test_reject_compression_bomb(self, tmp_path):
+        """解压数据量远超压缩数据量时中止"""
+        data = _tar_gz_bytes({'zeros.bin': b'\0' * (4 * 1024 * 1024)})
+        with pytest.raises(ArchiveLimitException):
+            ArchiveExtractor(io.BytesIO(data), 'case.tar.gz', tmp_path / 'out', max_ratio=2).extract()
+
+    @pytest.mark.parametrize('filename,build', [('case.zip', _zip_bytes), ('case.tgz', _tar_gz_bytes)])
+    def test_parallel_extract(self, tmp_path, filename, build):
+        """多线程解压结果与成员内容一致"""
+        members = {f'dir{i % 5}/file{i}.txt': f'content {i}'.encode() * (i + 1) for i in range(60)}
+        stats = ArchiveExtractor(io.BytesIO(build(members)), filename, tmp_path, workers=4).extract()
+        assert stats['files'] == 60
+        for name, data in members.items():
+            assert (tmp_path / name).read_bytes() == data
+
+    def test_parallel_extract_stops_on_limit(self, tmp_path):
+        """并行解压时任一成员超限即整体失败"""
+        members = {f'f{i}.txt': b'x' * (100 if i != 7 else 5000) for i in range(20)}
+        with pytest.raises(ArchiveLimitException):
+            ArchiveExtractor(io.BytesIO(_zip_bytes(members)), 'case.zip', tmp_path,
+                             max_member_size=1000, workers=4).extract()
+
+    @pytest.mark.skipif(not archive.ZSTD_AVAILABLE, reason='需要 zstandard')
+    def test_extract_tar_zst(self, tmp_path):
+        """解压 zstd 压缩的 tar 包"""
+        import zstandard
+        tar_buffer = io.BytesIO()
+        with tarfile.open(fileobj=tar_buffer, mode='w') as tar:
+            info = tarfile.TarInfo('a/b.txt')
+            info.size = 3
+            tar.addfile(info, io.BytesIO(b'zst'))
+        data = zstandard.ZstdCompressor().compress(tar_buffer.getvalue())
+        ArchiveExtractor(io.BytesIO(data), 'case.tar.zst', tmp_path).extract()
+        assert (tmp_path / 'a' / 'b.txt').read_bytes() == b'zst'
+
+    @pytest.mark.skipif(archive.ZSTD_AVAILABLE, reason='已安装 zstandard')
+    def test_tar_zst_requires_zstandard(self, tmp_path):
+        """未安装 zstandard 时拒绝 .tar.zst"""
+        with pytest.raises(ValueError):
+            ArchiveExtractor(io.BytesIO(b''), 'case.tar.zst', tmp_path)
+
+    def test_reject_large_member(self, tmp_path):
+        """单个成员超过大小限制时中止"""
+        data = _zip_bytes({'big.txt': b'x' * 2048})
+        with pytest.raises(ArchiveLimitException):
+            ArchiveExtractor(io.BytesIO(data), 'case.zip', tmp_path / 'out', max_member_size=1024).extract()
+
+
+class TestParallelCompress:
+    """测试并行压缩与 zip 流写出"""
+
+    def test_zip_stream_roundtrip(self, tmp_path):
+        """并行压缩的结果按顺序写出，可被 zipfile 正确读取"""
+        src = tmp_path / 'src'
+        src.mkdir()
+        files = []
+        for i in range(30):
+            path = src / f'文件{i}.txt' if i % 10 == 0 else src / f'f{i}.txt'
+            path.write_bytes(bytes([i]) * (i * 1000))
+            compress_type = zipfile.ZIP_STORED if i % 3 == 0 else zipfile.ZIP_DEFLATED
+            files.append((path, path.name, compress_type))
+
+        output = io.BytesIO()
+        writer = ZipStreamWriter(output)
+        for member in compress_files(files, workers=4, chunk_size=4096):
+            for _ in writer.add(member, chunk_size=4096):
+                pass
+        writer.close()
+
+        with zipfile.ZipFile(io.BytesIO(output.getvalue())) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == [name for _, name, _ in files]
+            for path, name, compress_type in files:
+                assert zf.getinfo(name).compress_type == compress_type
+                assert zf.read(name) == path.read_bytes()
+
+    def test_large_members_streamed_inline(self, tmp_path):
+        """大文件不预先压缩：写入时流式压缩，首块数据在读完文件前输出，数据描述符可被正确读取"""
+        small = tmp_path / 'small.txt'
+        small.write_bytes(b'small' * 100)
+        large = tmp_path / 'large.bin'
+        large.write_bytes(os.urandom(64 * 1024) + b'x' * (256 * 1024))
+        files = [(small, 'small.txt', zipfile.ZIP_DEFLATED),
+                 (large, 'large.bin', zipfile.ZIP_DEFLATED),
+                 (large, 'stored.bin', zipfile.ZIP_STORED)]
+
+        members = list(compress_files(files, workers=2, chunk_size=4096, inline_size=1024))
+        assert [type(m) for m in members] == [CompressedMember, StreamedMember, StreamedMember]
+
+        output = io.BytesIO()
+        writer = ZipStreamWriter(output)
+        offsets = list(writer.add(members[1], chunk_size=4096))
+        assert len(offsets) > 1 and offsets[0] < large.stat().st_size
+        for member in (members[0], members[2]):
+            for _ in writer.add(member, chunk_size=4096):
+                pass
+        writer.close()
+
+        with zipfile.ZipFile(io.BytesIO(output.getvalue())) as zf:
+            assert zf.testzip() is None
+            assert zf.read('large.bin') == zf.read('stored.bin') == large.read_bytes()
+            assert zf.read('small.txt') == small.read_bytes()
+
+    def test_empty_archive(self):
+        """没有成员时输出合法的空 zip"""
+        output = io.BytesIO()
+        ZipStreamWriter(output).close()
+        with zipfile.ZipFile(io.BytesIO(output.getvalue())) as zf:
+            assert zf.namelist() == []
+
+
+class TestUploadCaseStaging:
+    """测试 upload_case 的暂存与原子重命名"""
+
+    def test_upload_from_file_object(self, temp_casespace):
+        """从文件对象上传，成功后不留暂存目录"""
+        from xcase.file_manager import file_manager
+
+        casespace = temp_casespace['casespace']
+        file_manager.upload_case(casespace, 'from_stream', io.BytesIO(_zip_bytes({'x.txt': b'x'})), 'c.zip')
+
+        casespace_path = file_manager.storage_root / casespace
+        assert (casespace_path / 'from_stream' / 'x.txt').read_bytes() == b'x'
+        assert not [p for p in casespace_path.iterdir() if p.name.startswith('.')]
+
+    def test_failed_upload_leaves_nothing(self, temp_casespace):
+        """解压失败时既不创建 Case 也不留暂存目录"""
+        from xcase.file_manager import file_manager
+
+        casespace = temp_casespace['casespace']
+        data = _zip_bytes({'ok.txt': b'ok', '../evil.txt': b'x'})
+        with pytest.raises(PathTraversalException):
+            file_manager.upload_case(casespace, 'broken', io.BytesIO(data), 'c.zip')
+
+        casespace_path = file_manager.storage_root / casespace
+        assert sorted(p.name for p in casespace_path.iterdir()) == ['test_case']
@@ -0,0 +1,115 @@
+"""
+批量上传测试
+
+测试 tar 流 / multipart 批量上传的二进制内容、未变化文件跳过、逐文件状态和限制检查
+"""
+import io
+import os
+import tarfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import MULTIPART_CONTENT
+
+from xcase.batch_upload import BatchUploader, iter_tar_stream
+
+
+def _tar_bytes(members, mode='w'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755 if name.endswith('.sh') else 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _replace(target, tmp):
+    os.replace(tmp, target)
+
+
+class TestBatchUploader:
+    """测试 BatchUploader"""
+
+    def test_binary_and_unchanged(self, tmp_path):
+        """二进制内容原样写入，内容相同时不修改文件"""
+        payload = bytes(range(256)) * 100
+        members = {'bin/data.bin': payload, 'run.sh': b'echo hi\n'}
+
+        results = BatchUploader(tmp_path, _replace, workers=4).upload(iter_tar_stream(io.BytesIO(_tar_bytes(members))))
+        assert [r['status'] for r in results] == ['created', 'created']
+        assert (tmp_path / 'bin' / 'data.bin').read_bytes() == payload
+        assert os.access(tmp_path / 'run.sh', os.X_OK)
+
+        mtime = (tmp_path / 'bin' / 'data.bin').stat().st_mtime_ns
+        members['run.sh'] = b'echo changed\n'
+        results = BatchUploader(tmp_path, _replace).upload(iter_tar_stream(io.BytesIO(_tar_bytes(members, 'w:gz'))))
+        assert [r['status'] for r in results] == ['unchanged', 'updated']
+        assert (tmp_path / 'bin' / 'data.bin').stat().st_mtime_ns == mtime
+        assert not [p for p in tmp_path.rglob('.*')]
+
+    def test_per_file_errors(self, tmp_path):
+        """路径不安全或超过大小限制的文件单独失败，不影响其他文件"""
+        members = {'../escape.txt': b'x', 'big.txt': b'x' * 100, 'ok.txt': b'ok'}
+        uploader = BatchUploader(tmp_path, _replace, max_file_size=10)
+        results = uploader.upload(iter_tar_stream(io.BytesIO(_tar_bytes(members))))
+
+        assert [r['status'] for r in results] == ['error', 'error', 'created']
+        assert not (tmp_path.parent / 'escape.txt').exists()
+        assert not (tmp_path / 'big.txt').exists()
+        assert uploader.written == [tmp_path / 'ok.txt']
+
+    def test_symlink_components_rejected(self, tmp_path):
+        """路径经过 Case 中的符号链接（目录或目标文件）时拒绝写入，不写到链接指向的位置"""
+        dest = tmp_path / 'case'
+        outside = tmp_path / 'outside'
+        dest.mkdir()
+        outside.mkdir()
+        (outside / 'file.txt').write_bytes(b'old')
+        os.symlink(outside, dest / 'lnk')
+        os.symlink(outside / 'file.txt', dest / 'file_link.txt')
+
+        members = {'lnk/pwn': b'x', 'lnk/sub/pwn': b'x', 'file_link.txt': b'new', 'ok/a.txt': b'ok'}
+        results = BatchUploader(dest, _replace).upload(iter_tar_stream(io.BytesIO(_tar_bytes(members))))
+
+        assert [r['status'] for r in results] == ['error', 'error', 'error', 'created']
+        assert sorted(p.name for p in outside.iterdir()) == ['file.txt']
+        assert (outside / 'file.txt').read_bytes() == b'old'
+
+
+class TestBatchUploadAPI:
+    """测试批量上传接口"""
+
+    def test_tar_stream(self, api_client, client, temp_casespace):
+        """tar 流上传，返回逐文件状态"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        root = temp_casespace['storage_root'] / casespace / case
+        body = _tar_bytes({'test.py': b'print("Hello, World!")', 'img/logo.png': b'\x89PNG\0\xff'})
+
+        response = client.post(f'/case/caseeditor/files/upload-batch?path=/{casespace}/{case}',
+                               data=body, content_type='application/x-tar')
+        data = response.json()['data']
+        assert [f['status'] for f in data['files']] == ['unchanged', 'created']
+        assert (data['created'], data['unchanged'], data['failed']) == (1, 1, 0)
+        assert (root / 'img' / 'logo.png').read_bytes() == b'\x89PNG\0\xff'
+
+        tree = api_client.get('/caseeditor/files', {'casespace': casespace, 'case': case, 'lazy': 'true'}).json()['data']
+        assert 'img' in [node['name'] for node in tree['children']]
+
+    def test_multipart(self, api_client, client, temp_casespace):
+        """multipart 上传，paths 指定相对路径"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        root = temp_casespace['storage_root'] / casespace / case
+        files = [SimpleUploadedFile('a.bin', b'\0\1\2'), SimpleUploadedFile('b.txt', b'b')]
+
+        response = client.post(f'/case/caseeditor/files/upload-batch?path=/{casespace}/{case}',
+                               data={'files': files, 'paths': ['sub/a.bin', 'b.txt']},
+                               content_type=MULTIPART_CONTENT)
+        assert response.json()['data']['created'] == 2
+        assert (root / 'sub' / 'a.bin').read_bytes() == b'\0\1\2'
+
+    def test_storage_root_rejected(self, api_client, client, temp_casespace):
+        """不能直接上传到存储根目录"""
+        response = client.post('/case/caseeditor/files/upload-batch?path=/',
+                               data=_tar_bytes({'x.txt': b'x'}), content_type='application/x-tar')
+        assert response.json()['code'] == 400
@@ -0,0 +1,159 @@
+"""
+内容寻址存储测试
+
+测试 BlobStore 的跨 Case 去重、未变化文件检测、fork、清单和 gc，
+以及写操作不会修改共享同一对象的其他 Case
+"""
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from xcase.exceptions import PathTraversalException
+
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store_manager(temp_casespace, monkeypatch):
+    """启用内容寻址存储的 file_manager"""
+    from xcase.file_manager import file_manager
+
+    monkeypatch.setattr(file_manager, 'blob_store_enabled', True)
+    return file_manager
+
+
+def _ino(path):
+    return os.stat(path).st_ino
+
+
+class TestBlobStore:
+    """测试去重存储"""
+
+    def test_upload_files_dedup_and_unchanged(self, store_manager, temp_casespace):
+        """相同内容只存一份，重复上传不修改文件"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        root = temp_casespace['storage_root'] / casespace / case
+        files = [{'name': 'a.txt', 'content': 'same'}, {'name': 'b.txt', 'content': 'same'}]
+
+        assert store_manager.upload_files(f'/{casespace}/{case}', files) == 2
+        assert _ino(root / 'a.txt') == _ino(root / 'b.txt')
+
+        mtime = os.stat(root / 'a.txt').st_mtime_ns
+        assert store_manager._write_file(root / 'a.txt', b'same') is False
+        assert os.stat(root / 'a.txt').st_mtime_ns == mtime
+
+    def test_save_does_not_touch_shared_copies(self, store_manager, temp_casespace):
+        """保存一个文件不影响内容相同的其他文件"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        root = temp_casespace['storage_root'] / casespace / case
+        store_manager.upload_files(f'/{casespace}/{case}', [
+            {'name': 'a.txt', 'content': 'same'}, {'name': 'b.txt', 'content': 'same'}
+        ])
+
+        store_manager.save_file(f'/{casespace}/{case}/a.txt', 'changed')
+        assert (root / 'a.txt').read_text() == 'changed'
+        assert (root / 'b.txt').read_text() == 'same'
+
+    def test_fork_links_files(self, store_manager, temp_casespace):
+        """fork 的文件与源 Case 共享对象，修改 fork 不影响源 Case"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        storage_root = temp_casespace['storage_root']
+        result = store_manager.fork_case(casespace, case, 'forked')
+        assert result == {'casespace': casespace, 'case': 'forked'}
+
+        src, dst = storage_root / casespace / case / 'test.py', storage_root / casespace / 'forked' / 'test.py'
+        assert _ino(src) == _ino(dst)
+
+        store_manager.save_file(f'/{casespace}/forked/test.py', 'print(2)')
+        assert src.read_text() == 'print("Hello, World!")'
+
+    def test_upload_case_reuses_objects(self, store_manager, temp_casespace):
+        """重复上传相近的压缩包时只有新内容占用空间"""
+        casespace = temp_casespace['casespace']
+        root = temp_casespace['storage_root'] / casespace
+        store_manager.upload_case(casespace, 'v1', _zip_bytes({'x.txt': b'x' * 1000, 'y.txt': b'y'}), 'v1.zip')
+        store_manager.upload_case(casespace, 'v2', _zip_bytes({'x.txt': b'x' * 1000, 'y.txt': b'z'}), 'v2.zip')
+
+        assert _ino(root / 'v1' / 'x.txt') == _ino(root / 'v2' / 'x.txt')
+        assert _ino(root / 'v1' / 'y.txt') != _ino(root / 'v2' / 'y.txt')
+
+    def test_executable_bit_preserved(self, store_manager, temp_casespace):
+        """可执行文件与内容相同的普通文件分开保存"""
+        casespace = temp_casespace['casespace']
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+            for name, mode in (('run.sh', 0o755), ('copy.sh', 0o644)):
+                info = tarfile.TarInfo(name)
+                info.size, info.mode = 4, mode
+                tar.addfile(info, io.BytesIO(b'echo'))
+        store_manager.upload_case(casespace, 'scripts', buffer.getvalue(), 'scripts.tgz')
+
+        case_root = temp_casespace['storage_root'] / casespace / 'scripts'
+        assert os.stat(case_root / 'run.sh').st_mode & 0o111
+        assert not os.stat(case_root / 'copy.sh').st_mode & 0o111
+        assert _ino(case_root / 'run.sh') != _ino(case_root / 'copy.sh')
+
+    def test_manifest_and_gc(self, store_manager, temp_casespace):
+        """清单给出各文件的 SHA-256，删除 Case 后 gc 回收对象"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        manifest = store_manager.get_case_manifest(casespace, case)
+        assert manifest == {'test.py': hashlib.sha256(b'print("Hello, World!")').hexdigest()}
+
+        store = store_manager.blob_store
+        assert store.intern_tree(temp_casespace['storage_root'] / casespace / case) == 1
+        assert store.gc()['removed'] == 0
+        store_manager.delete_case(casespace, case)
+        assert store.gc() == {'objects': 0, 'removed': 1, 'bytes': 22}
+
+    def test_manifest_is_read_only(self, store_manager, temp_casespace, monkeypatch):
+        """清单不收入外部写入的文件，也不扫描对象目录；未变化的文件不重复计算摘要"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        external = temp_casespace['storage_root'] / casespace / case / 'external.txt'
+        external.write_bytes(b'external')
+        store = store_manager.blob_store
+        monkeypatch.setattr(store, '_iter_objects', lambda: pytest.fail('object store scanned'))
+
+        manifest = store_manager.get_case_manifest(casespace, case)
+        assert manifest['external.txt'] == hashlib.sha256(b'external').hexdigest()
+        assert os.stat(external).st_nlink == 1
+
+        from xcase import blob_store
+        monkeypatch.setattr(blob_store, 'hash_file', lambda path: pytest.fail('digest recomputed'))
+        assert store_manager.get_case_manifest(casespace, case) == manifest
+
+    def test_objects_not_addressable(self, store_manager):
+        """对象目录不能通过文件接口访问"""
+        with pytest.raises(PathTraversalException):
+            store_manager.get_abs_path('/.blobs/objects')
+
+
+class TestForkAPI:
+    """测试 fork 和清单接口"""
+
+    def test_fork_case(self, api_client, temp_casespace):
+        """复制 Case 到另一个 Casespace，目标已存在时返回 409"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        url = f'/caseeditor/casespaces/{casespace}/cases/{case}/fork'
+
+        response = api_client.post(url, json={'newCase': 'copy', 'targetCasespace': 'other'})
+        assert response.json()['data'] == {'casespace': 'other', 'case': 'copy'}
+        assert (temp_casespace['storage_root'] / 'other' / 'copy' / 'test.py').exists()
+
+        response = api_client.post(url, json={'newCase': 'copy', 'targetCasespace': 'other'})
+        assert response.json()['code'] == 409
+
+    def test_manifest(self, api_client, temp_casespace):
+        """未启用存储时清单按内容计算"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        response = api_client.get(f'/caseeditor/casespaces/{casespace}/cases/{case}/manifest')
+        assert list(response.json()['data']['files']) == ['test.py']
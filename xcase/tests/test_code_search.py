@@ -0,0 +1,228 @@
+"""
+文件内容搜索测试
+
+测试正则表达式的 trigram 提取、索引的增量更新，以及搜索接口的语言 / 范围过滤
+"""
+import pytest
+
+from xcase import code_search
+from xcase.code_search import CodeSearchIndex, regex_query
+
+
+def _tris(node):
+    """查询树中所有 trigram 字符串"""
+    if node is None:
+        return set()
+    if node[0] == 'tri':
+        return {node[1].decode()}
+    return set().union(*(_tris(child) for child in node[1]))
+
+
+@pytest.fixture
+def search_manager(temp_casespace):
+    """索引已建立的 file_manager"""
+    from xcase.file_manager import file_manager
+
+    index = file_manager.search_index
+    index.flush()
+    yield file_manager
+    index.flush()
+
+
+class TestRegexQuery:
+    """测试从正则表达式提取 trigram"""
+
+    def test_literal(self):
+        """字面量拆分为 trigram 的 AND，并转为小写"""
+        node = regex_query('Hello')
+        assert node[0] == 'and'
+        assert _tris(node) == {'hel', 'ell', 'llo'}
+
+    def test_alternation(self):
+        """顶层 | 转换为 OR，任一分支没有字面量时没有约束"""
+        node = regex_query('foo|bar')
+        assert node[0] == 'or'
+        assert _tris(node) == {'foo', 'bar'}
+        assert regex_query(r'foo|\w+') is None
+
+    @pytest.mark.parametrize('pattern,expected', [
+        (r'def\s+main', {'def', 'mai', 'ain'}),
+        (r'ab.cde', {'cde'}),
+        (r'abcd?', {'abc'}),
+        (r'(?:abc)+xyz', {'abc', 'xyz'}),
+        (r'(abc)?xyz', {'xyz'}),
+        (r'(?=abc)xyz', {'xyz'}),
+        (r'a\.bc', {'a.b', '.bc'}),
+        (r'[abc]def', {'def'}),
+        (r'x{2}yzw', {'yzw'}),
+    ])
+    def test_breaks(self, pattern, expected):
+        """转义类、任意字符、可选部分和环视不产生 trigram"""
+        assert _tris(regex_query(pattern)) == expected
+
+    def test_no_literals(self):
+        """没有足够长的字面量时不使用索引"""
+        assert regex_query(r'\w+') is None
+        assert regex_query('ab') is None
+
+    def test_long_literal_capped(self, monkeypatch):
+        """长字面量只选取部分 trigram"""
+        monkeypatch.setattr(code_search, 'SEARCH_MAX_LITERAL_TRIGRAMS', 4)
+        assert len(regex_query('abcdefghijklmnop')[1]) == 4
+
+
+class TestCodeSearchIndex:
+    """测试索引的建立和查询"""
+
+    def test_update_and_search(self, tmp_path):
+        """全量更新后查询只读取候选文件，删除的文件被清理"""
+        (tmp_path / 'space' / 'case').mkdir(parents=True)
+        (tmp_path / 'space' / 'case' / 'a.py').write_text('def main():\n    return 1\n', encoding='utf-8')
+        (tmp_path / 'space' / 'case' / 'b.yaml').write_text('name: main\n', encoding='utf-8')
+        (tmp_path / 'space' / 'case' / 'data.bin').write_bytes(b'\0main')
+        (tmp_path / 'space' / '.hidden').mkdir()
+        (tmp_path / 'space' / '.hidden' / 'c.py').write_text('def main(): pass\n', encoding='utf-8')
+
+        index = CodeSearchIndex(tmp_path)
+        assert index.update() == {'files': 2, 'indexed': 2, 'removed': 0}
+        assert index.update()['indexed'] == 0
+
+        result = index.search(r'def\s+main')
+        assert result['candidates'] == 1
+        assert result['results'] == [{
+            'path': '/space/case/a.py', 'language': 'python',
+            'matches': [{'line': 1, 'text': 'def main():'}]
+        }]
+        assert [r['path'] for r in index.search('MAIN', ignore_case=True)['results']] == [
+            '/space/case/a.py', '/space/case/b.yaml'
+        ]
+        assert index.search('MAIN')['results'] == []
+
+        (tmp_path / 'space' / 'case' / 'a.py').unlink()
+        assert index.update()['removed'] == 1
+        assert index.search('main')['candidates'] == 1
+
+    def test_invalid_regex(self, tmp_path):
+        """无效的正则表达式"""
+        with pytest.raises(ValueError):
+            CodeSearchIndex(tmp_path).search('(unclosed')
+
+    @pytest.mark.parametrize('pattern', ['.', r'\w+', '(main+)+$', r'(\w+\s?)*main'])
+    def test_unsafe_patterns_rejected(self, tmp_path, pattern):
+        """没有字面量（所有文件都是候选）或有嵌套重复（指数级回溯）的正则直接拒绝"""
+        with pytest.raises(ValueError):
+            CodeSearchIndex(tmp_path).search(pattern)
+
+    def test_scan_budget_truncates(self, tmp_path, monkeypatch):
+        """候选数量或读取字节数超出上限时提前结束并返回 truncated"""
+        (tmp_path / 'space' / 'case').mkdir(parents=True)
+        for i in range(3):
+            (tmp_path / 'space' / 'case' / f'{i}.py').write_text('value = 1\n', encoding='utf-8')
+        index = CodeSearchIndex(tmp_path)
+        index.update()
+        result = index.search('value')
+        assert (result['candidates'], len(result['results']), result['truncated']) == (3, 3, False)
+
+        monkeypatch.setattr(code_search, 'SEARCH_MAX_CANDIDATES', 2)
+        result = index.search('value')
+        assert (result['candidates'], len(result['results']), result['truncated']) == (2, 2, True)
+
+        monkeypatch.setattr(code_search, 'SEARCH_MAX_SCAN_BYTES', 1)
+        result = index.search('value')
+        assert (len(result['results']), result['truncated']) == (1, True)
+
+    def test_build_marker_and_resume(self, tmp_path, monkeypatch):
+        """全量建立分批提交，完成后写入标记；中途中断后继续建立时跳过已索引的文件"""
+        (tmp_path / 'space' / 'case').mkdir(parents=True)
+        for i in range(5):
+            (tmp_path / 'space' / 'case' / f'{i}.py').write_text(f'value = {i}\n', encoding='utf-8')
+        monkeypatch.setattr(code_search, '_BATCH_SIZE', 2)
+
+        index = CodeSearchIndex(tmp_path)
+        assert not index.built
+        calls = []
+        original = index._index_file
+
+        def interrupted(conn, path):
+            if len(calls) == 3:
+                raise RuntimeError('worker killed')
+            calls.append(path)
+            return original(conn, path)
+
+        monkeypatch.setattr(index, '_index_file', interrupted)
+        with pytest.raises(RuntimeError):
+            index.update()
+        assert not index.built
+        # 已提交的批次保留
+        assert index._connect().execute('SELECT COUNT(*) FROM docs').fetchone()[0] == 2
+
+        monkeypatch.setattr(index, '_index_file', original)
+        index.build_in_background()
+        index.flush()
+        assert index.built
+        assert index.search('value')['candidates'] == 5
+        assert index.update()['indexed'] == 0
+        index.close()
+
+    @pytest.mark.skipif(not code_search.FCNTL_AVAILABLE, reason='需要 fcntl')
+    def test_build_skipped_while_another_process_builds(self, tmp_path):
+        """其他进程持有建立锁时后台建立直接跳过"""
+        (tmp_path / 'space' / 'case').mkdir(parents=True)
+        (tmp_path / 'space' / 'case' / 'a.py').write_text('main\n', encoding='utf-8')
+        index = CodeSearchIndex(tmp_path)
+        other = CodeSearchIndex(tmp_path)
+        with other._build_lock() as acquired:
+            assert acquired
+            index.build_in_background()
+            index.flush()
+            assert not index.built
+        index.build_in_background()
+        index.flush()
+        assert index.built
+        index.close()
+
+
+class TestSearchAPI:
+    """测试搜索接口和写操作的增量更新"""
+
+    def test_save_updates_index(self, api_client, search_manager, temp_casespace):
+        """保存、重命名和删除后索引随之更新"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        path = f'/{casespace}/{case}/test.py'
+
+        data = api_client.get('/caseeditor/search', {'q': 'Hello, World'}).json()['data']
+        assert [r['path'] for r in data['results']] == [path]
+
+        api_client.post('/caseeditor/files/save', json={'path': path, 'content': 'print("changed")\n'})
+        search_manager.search_index.flush()
+        assert api_client.get('/caseeditor/search', {'q': 'Hello'}).json()['data']['results'] == []
+        assert api_client.get('/caseeditor/search', {'q': 'changed'}).json()['data']['candidates'] == 1
+
+        api_client.put('/caseeditor/files/rename', json={'oldPath': path, 'newName': 'moved.py'})
+        search_manager.search_index.flush()
+        data = api_client.get('/caseeditor/search', {'q': 'changed'}).json()['data']
+        assert [r['path'] for r in data['results']] == [f'/{casespace}/{case}/moved.py']
+
+        api_client.delete('/caseeditor/files', {'path': f'/{casespace}/{case}/moved.py'})
+        search_manager.search_index.flush()
+        assert api_client.get('/caseeditor/search', {'q': 'changed'}).json()['data']['candidates'] == 0
+
+    def test_language_and_scope_filter(self, api_client, search_manager, temp_casespace):
+        """按语言和 Case 过滤"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        search_manager.upload_files(f'/{casespace}/{case}', [
+            {'name': 'conf.yaml', 'content': 'print: yes\n'},
+            {'name': 'run.sh', 'content': 'print hello\n'},
+        ])
+        search_manager.search_index.flush()
+
+        data = api_client.get('/caseeditor/search', {'q': 'print', 'lang': 'python,yaml'}).json()['data']
+        assert sorted(r['language'] for r in data['results']) == ['python', 'yaml']
+
+        data = api_client.get('/caseeditor/search', {'q': 'print', 'casespace': casespace, 'case': 'other'}).json()
+        assert data['data']['results'] == []
+
+    def test_invalid_regex(self, api_client, search_manager):
+        """无效的正则表达式返回 400"""
+        response = api_client.get('/caseeditor/search', {'q': '(unclosed'})
+        assert response.json()['code'] == 400
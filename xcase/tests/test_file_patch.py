@@ -0,0 +1,111 @@
+"""
+增量保存测试
+
+测试行块应用、etag 校验（过期写入返回 409）、原子替换，以及增量保存和带 etag 的整体保存接口
+"""
+import hashlib
+import os
+
+import pytest
+
+from xcase import file_patch
+from xcase.exceptions import StaleFileException
+
+
+def _etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestApplyPatch:
+    """测试行块应用"""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / 'src.txt'
+        path.write_bytes(b'a\nb\nc\nd\n')
+        return path
+
+    def _apply(self, source, hunks, etag=None):
+        tmp = source.with_name('out.txt')
+        etag = etag or _etag(source.read_bytes())
+        new_etag = file_patch.apply_patch(source, tmp, hunks, etag, 'utf-8')
+        data = tmp.read_bytes()
+        assert new_etag == _etag(data)
+        return data
+
+    def test_replace_insert_delete(self, source):
+        """替换、插入和删除多个行块"""
+        data = self._apply(source, [
+            {'start': 3, 'delete': 1, 'lines': []},
+            {'start': 0, 'delete': 0, 'lines': ['前\n']},
+            {'start': 1, 'delete': 1, 'lines': ['B\n', 'B2\n']},
+        ])
+        assert data == '前\na\nB\nB2\nc\n'.encode('utf-8')
+
+    def test_append_at_end(self, source):
+        """在文件末尾追加"""
+        assert self._apply(source, [{'start': 4, 'delete': 0, 'lines': ['e']}]) == b'a\nb\nc\nd\ne'
+
+    def test_stale_etag(self, source):
+        """etag 不一致时拒绝，并给出当前 etag"""
+        with pytest.raises(StaleFileException) as exc_info:
+            self._apply(source, [{'start': 0, 'delete': 1, 'lines': []}], etag=_etag(b'old'))
+        assert exc_info.value.code == 409
+        assert exc_info.value.current_etag == _etag(source.read_bytes())
+
+    def test_invalid_hunks(self, source):
+        """重叠或超出文件行数的行块无效"""
+        with pytest.raises(ValueError):
+            self._apply(source, [{'start': 0, 'delete': 2, 'lines': []}, {'start': 1, 'delete': 0, 'lines': []}])
+        with pytest.raises(ValueError):
+            self._apply(source, [{'start': 3, 'delete': 5, 'lines': []}])
+
+
+class TestPatchAPI:
+    """测试增量保存接口"""
+
+    def _load(self, api_client, path):
+        return api_client.get('/caseeditor/files/content', {'path': path}).json()['data']
+
+    def test_patch_file(self, api_client, temp_casespace):
+        """应用行块后返回新 etag，文件被原子替换"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        rel_path = f'/{casespace}/{case}/test.py'
+        abs_path = temp_casespace['storage_root'] / casespace / case / 'test.py'
+        os.chmod(abs_path, 0o755)
+        inode = os.stat(abs_path).st_ino
+        loaded = self._load(api_client, rel_path)
+
+        response = api_client.post('/caseeditor/files/patch', json={
+            'path': rel_path,
+            'etag': loaded['etag'],
+            'hunks': [{'start': 0, 'delete': 1, 'lines': ['print(1)\n', 'print(2)\n']}],
+        })
+        data = response.json()['data']
+        assert abs_path.read_text() == 'print(1)\nprint(2)\n'
+        assert data['etag'] == self._load(api_client, rel_path)['etag']
+        assert os.stat(abs_path).st_ino != inode
+        assert os.stat(abs_path).st_mode & 0o111
+        assert [p.name for p in abs_path.parent.iterdir() if '.tmp-' in p.name] == []
+
+        # 仍使用旧 etag 的保存被拒绝
+        response = api_client.post('/caseeditor/files/patch', json={
+            'path': rel_path,
+            'etag': loaded['etag'],
+            'hunks': [{'start': 0, 'delete': 0, 'lines': ['# stale\n']}],
+        })
+        assert response.json()['code'] == 409
+        assert abs_path.read_text() == 'print(1)\nprint(2)\n'
+
+    def test_save_with_etag(self, api_client, temp_casespace):
+        """整体保存时指定 etag 同样检测冲突"""
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        rel_path = f'/{casespace}/{case}/test.py'
+        etag = self._load(api_client, rel_path)['etag']
+
+        response = api_client.post('/caseeditor/files/save', json={'path': rel_path, 'content': 'x = 1\n', 'etag': etag})
+        new_etag = response.json()['data']['etag']
+        assert new_etag == _etag(b'x = 1\n')
+
+        response = api_client.post('/caseeditor/files/save', json={'path': rel_path, 'content': 'x = 2\n', 'etag': etag})
+        assert response.json()['code'] == 409
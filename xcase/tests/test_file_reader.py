@@ -0,0 +1,125 @@
+"""
+大文件分块读取测试
+
+测试编码检测、按字节 / 按行分块读取、HTTP Range 解析，以及分块读取和原始下载接口
+"""
+import pytest
+
+from xcase import file_reader
+
+
+class TestChunkRead:
+    """测试分块读取"""
+
+    def test_detect_encoding(self, tmp_path):
+        """根据样本判断 UTF-8 或备用编码"""
+        utf8 = tmp_path / 'utf8.txt'
+        utf8.write_text('你好', encoding='utf-8')
+        binary = tmp_path / 'latin.bin'
+        binary.write_bytes(b'\xff\xfe\x00abc')
+        assert file_reader.detect_encoding(utf8) == 'utf-8'
+        assert file_reader.detect_encoding(binary) == 'latin-1'
+
+    def test_utf8_chunks_align_to_characters(self, tmp_path):
+        """按字节分块时不拆开多字节字符，拼接后与原文一致"""
+        text = '用例-case-日志\n' * 50
+        path = tmp_path / 'log.txt'
+        path.write_text(text, encoding='utf-8')
+
+        chunk = file_reader.read_chunk(path, 1, 4, 'utf-8')
+        assert chunk['offset'] == 3
+        assert chunk['content'] == '例-'
+
+        parts, offset = [], 0
+        while True:
+            chunk = file_reader.read_chunk(path, offset, 7, 'utf-8')
+            parts.append(chunk['content'])
+            offset = chunk['nextOffset']
+            if chunk['eof']:
+                break
+        assert ''.join(parts) == text
+
+    def test_read_lines_across_checkpoints(self, tmp_path, monkeypatch):
+        """按行读取跨越多个索引检查点，文件变化后索引失效"""
+        monkeypatch.setattr(file_reader, 'LINE_INDEX_INTERVAL', 7)
+        path = tmp_path / 'lines.txt'
+        path.write_text(''.join(f'line {i}\n' for i in range(1, 101)), encoding='utf-8')
+
+        chunk = file_reader.read_lines(path, 50, 10, 'utf-8')
+        assert chunk['content'].splitlines() == [f'line {i}' for i in range(50, 60)]
+        assert chunk['nextLine'] == 60
+        assert not chunk['eof']
+
+        chunk = file_reader.read_lines(path, 95, 10, 'utf-8')
+        assert chunk['lineCount'] == 6
+        assert chunk['eof']
+
+        path.write_text('first\nsecond\n', encoding='utf-8')
+        assert file_reader.read_lines(path, 2, 1, 'utf-8')['content'] == 'second\n'
+
+    @pytest.mark.parametrize('header,expected', [
+        (None, None),
+        ('bytes=0-9', (0, 9)),
+        ('bytes=90-', (90, 99)),
+        ('bytes=-10', (90, 99)),
+        ('bytes=95-200', (95, 99)),
+        ('bytes=0-1,5-6', None),
+        ('items=0-1', None),
+    ])
+    def test_parse_range(self, header, expected):
+        """解析单区间 Range 头"""
+        assert file_reader.parse_range(header, 100) == expected
+
+    def test_parse_range_unsatisfiable(self):
+        """起点超出文件大小时无法满足"""
+        with pytest.raises(ValueError):
+            file_reader.parse_range('bytes=100-', 100)
+
+
+class TestChunkAPI:
+    """测试分块读取和原始下载接口"""
+
+    @pytest.fixture
+    def big_file(self, temp_casespace):
+        casespace, case = temp_casespace['casespace'], temp_casespace['case']
+        path = temp_casespace['storage_root'] / casespace / case / 'big.log'
+        path.write_text(''.join(f'{i:05d}\n' for i in range(10000)), encoding='utf-8')
+        return f'/{casespace}/{case}/big.log', path
+
+    def test_large_file_content_truncated(self, api_client, big_file, monkeypatch):
+        """超过内联大小的文件只返回开头一块，不计算整个文件的 etag"""
+        from xcase import file_manager as file_manager_module
+        monkeypatch.setattr(file_manager_module, 'MAX_INLINE_CONTENT_SIZE', 1024)
+        monkeypatch.setattr(file_manager_module, 'hash_file', lambda path: pytest.fail('unexpected hash'))
+        rel_path, path = big_file
+
+        data = api_client.get('/caseeditor/files/content', {'path': rel_path}).json()['data']
+        assert data['truncated'] is True
+        assert data['size'] == path.stat().st_size
+        assert len(data['content']) == 1024
+        assert data['etag'] is None
+
+    def test_chunk_by_lines(self, api_client, big_file):
+        """按行读取接口"""
+        rel_path, _ = big_file
+        response = api_client.get('/caseeditor/files/chunk',
+                                  {'path': rel_path, 'start_line': 5001, 'line_count': 3})
+        data = response.json()['data']
+        assert data['content'] == '05000\n05001\n05002\n'
+        assert data['nextLine'] == 5004
+
+    def test_raw_range(self, api_client, big_file):
+        """Range 请求返回 206 和对应字节，无法满足时返回 416"""
+        rel_path, path = big_file
+        response = api_client.get('/caseeditor/files/raw', {'path': rel_path}, HTTP_RANGE='bytes=6-11')
+        assert response.status_code == 206
+        assert response['Content-Range'] == f'bytes 6-11/{path.stat().st_size}'
+        assert b''.join(response.streaming_content) == b'00001\n'
+
+        response = api_client.get('/caseeditor/files/raw', {'path': rel_path})
+        assert response.status_code == 200
+        assert response['Accept-Ranges'] == 'bytes'
+        assert b''.join(response.streaming_content) == path.read_bytes()
+
+        response = api_client.get('/caseeditor/files/raw', {'path': rel_path}, HTTP_RANGE='bytes=999999-')
+        assert response.status_code == 416
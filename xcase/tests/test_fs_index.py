@@ -0,0 +1,130 @@
+"""
+Casespace 目录索引测试
+
+测试 DirectoryIndex 的缓存命中、mtime / TTL / inotify 失效、增量修补和 LRU 淘汰
+"""
+import os
+
+import pytest
+
+from xcase.fs_index import DirectoryIndex, IndexEntry, _Inotify
+
+
+def _inotify_available():
+    try:
+        os.close(_Inotify().fd)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+@pytest.fixture
+def case_dir(tmp_path):
+    """创建包含文件和子目录的目录"""
+    (tmp_path / 'b.txt').write_text('bb', encoding='utf-8')
+    (tmp_path / 'A.py').write_text('a', encoding='utf-8')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / '.hidden').write_text('', encoding='utf-8')
+    return tmp_path
+
+
+class TestPollMode:
+    """测试 poll 模式（mtime 检查）"""
+
+    def test_listing_sorted_and_cached(self, case_dir):
+        """目录优先排序，未变化时直接返回缓存"""
+        index = DirectoryIndex(mode='poll')
+        entries = index.list_dir(case_dir)
+        assert entries == (
+            IndexEntry('sub', True),
+            IndexEntry('A.py', False),
+            IndexEntry('b.txt', False),
+        )
+        assert index.list_dir(case_dir) is entries
+
+    def test_external_change_detected_by_mtime(self, case_dir):
+        """绕过 FileManager 的修改通过目录 mtime 发现"""
+        index = DirectoryIndex(mode='poll')
+        index.list_dir(case_dir)
+        (case_dir / 'new.txt').write_text('', encoding='utf-8')
+        os.utime(case_dir, ns=(0, os.stat(case_dir).st_mtime_ns + 1))
+        assert 'new.txt' in [e.name for e in index.list_dir(case_dir)]
+
+    def test_ttl_expiry_rescans(self, case_dir, monkeypatch):
+        """mtime 未变化（精度不足、属性缓存）时，超过 TTL 后重新扫描"""
+        from xcase import fs_index
+
+        index = DirectoryIndex(mode='poll', ttl=30)
+        index.list_dir(case_dir)
+        mtime_ns = os.stat(case_dir).st_mtime_ns
+        (case_dir / 'new.txt').write_text('', encoding='utf-8')
+        os.utime(case_dir, ns=(mtime_ns, mtime_ns))
+        assert 'new.txt' not in [e.name for e in index.list_dir(case_dir)]
+
+        now = fs_index.time.monotonic()
+        monkeypatch.setattr(fs_index.time, 'monotonic', lambda: now + 31)
+        assert 'new.txt' in [e.name for e in index.list_dir(case_dir)]
+
+    def test_note_patches_without_rescan(self, case_dir, monkeypatch):
+        """写操作通知增量修补缓存列表"""
+        from xcase import fs_index
+
+        index = DirectoryIndex(mode='poll')
+        index.list_dir(case_dir)
+        monkeypatch.setattr(fs_index, '_scan', lambda path: pytest.fail('unexpected rescan'))
+
+        (case_dir / 'c.txt').write_text('ccc', encoding='utf-8')
+        index.note_changed(case_dir / 'c.txt')
+        (case_dir / 'sub').rename(case_dir / 'dir2')
+        index.note_renamed(case_dir / 'sub', case_dir / 'dir2')
+        (case_dir / 'A.py').unlink()
+        index.note_removed(case_dir / 'A.py')
+
+        assert index.generation(case_dir) == 4
+        assert [e.name for e in index.list_dir(case_dir)] == ['dir2', 'b.txt', 'c.txt']
+
+    def test_lru_eviction(self, case_dir):
+        """超过最大缓存目录数时淘汰最久未使用的目录"""
+        index = DirectoryIndex(mode='poll', max_dirs=1)
+        index.list_dir(case_dir)
+        index.list_dir(case_dir / 'sub')
+        assert index.generation(case_dir) == 0
+        assert list(index._listings) == [str(case_dir / 'sub')]
+
+
+@pytest.mark.skipif(not _inotify_available(), reason='需要 Linux inotify')
+class TestInotifyMode:
+    """测试 inotify 模式"""
+
+    def test_external_changes_visible_immediately(self, case_dir):
+        """外部创建、修改、删除在下一次查询时即可见"""
+        index = DirectoryIndex(mode='inotify')
+        index.list_dir(case_dir)
+        assert index._listings[str(case_dir)].wd is not None
+
+        (case_dir / 'new.txt').write_text('12345', encoding='utf-8')
+        (case_dir / 'b.txt').unlink()
+        entries = {e.name: e for e in index.list_dir(case_dir)}
+        assert entries['new.txt'] == IndexEntry('new.txt', False)
+        assert 'b.txt' not in entries
+
+    def test_watched_listing_revalidated_by_mtime(self, case_dir, monkeypatch):
+        """有 watch 的目录也检查 mtime：其他主机在网络存储上的修改不产生 inotify 事件"""
+        index = DirectoryIndex(mode='inotify')
+        index.list_dir(case_dir)
+        assert index._listings[str(case_dir)].wd is not None
+        monkeypatch.setattr(index, '_drain', lambda: None)
+
+        (case_dir / 'remote.txt').write_text('', encoding='utf-8')
+        os.utime(case_dir, ns=(0, os.stat(case_dir).st_mtime_ns + 1))
+        assert 'remote.txt' in [e.name for e in index.list_dir(case_dir)]
+
+    def test_removed_directory_dropped(self, case_dir):
+        """被删除的子目录从缓存中移除"""
+        index = DirectoryIndex(mode='inotify')
+        index.list_dir(case_dir)
+        index.list_dir(case_dir / 'sub')
+
+        (case_dir / 'sub').rmdir()
+        assert [e.name for e in index.list_dir(case_dir)] == ['A.py', 'b.txt']
+        assert str(case_dir / 'sub') not in index._listings
@@ -0,0 +1,115 @@
+"""
+路径校验缓存测试
+
+测试词法快速路径、路径中含符号链接时的真实路径校验、缓存失效和 LRU 淘汰
+"""
+import os
+
+import pytest
+
+from xcase.exceptions import PathTraversalException
+from xcase.path_cache import PathValidator, is_symlink
+
+
+@pytest.fixture
+def storage(tmp_path):
+    root = tmp_path / 'storage'
+    (root / 'space' / 'case').mkdir(parents=True)
+    (root / 'space' / 'case' / 'a.txt').write_text('a', encoding='utf-8')
+    (tmp_path / 'outside').mkdir()
+    return root
+
+
+class TestPathValidator:
+    """测试 PathValidator"""
+
+    @pytest.mark.parametrize('path', [
+        '/../etc/passwd', '/space/../../x', '/space/a~', '/.blobs/objects', '.search',
+        '/./.snapshots', './/.blobs', '/.//.search/index.sqlite3', '/space/../.search',
+    ])
+    def test_rejected(self, storage, path):
+        """禁止的模式和保留目录"""
+        with pytest.raises(PathTraversalException):
+            PathValidator(storage).resolve(path)
+
+    def test_lexical_path_cached(self, storage, monkeypatch):
+        """没有符号链接时不解析真实路径，重复调用命中缓存"""
+        validator = PathValidator(storage)
+        monkeypatch.setattr('pathlib.Path.resolve', lambda self, strict=False: pytest.fail('resolve called'))
+
+        assert validator.resolve('/space/case/a.txt') == storage / 'space' / 'case' / 'a.txt'
+        assert validator.resolve('/space/case/a.txt') is validator.resolve('/space/case/a.txt')
+        assert validator.resolve('/') == storage
+
+    def test_symlink_escape_rejected(self, storage):
+        """路径经过指向外部的符号链接时仍然拒绝，同一目录下的其他路径不受影响"""
+        validator = PathValidator(storage)
+        assert validator.resolve('/space/case/a.txt')
+
+        os.symlink(storage.parent / 'outside', storage / 'space' / 'case' / 'link')
+        validator.invalidate()
+        assert is_symlink(storage / 'space' / 'case' / 'link')
+        assert validator.resolve('/space/case/a.txt') == storage / 'space' / 'case' / 'a.txt'
+        with pytest.raises(PathTraversalException):
+            validator.resolve('/space/case/link/secret')
+
+        # Casespace 本身是符号链接
+        os.symlink(storage.parent / 'outside', storage / 'linked')
+        with pytest.raises(PathTraversalException):
+            validator.resolve('/linked/x')
+
+    def test_scan_expires(self, storage):
+        """检查结果过期后重新检查符号链接"""
+        validator = PathValidator(storage, scan_interval=0)
+        assert validator.resolve('/space/case/link/secret')
+
+        os.symlink(storage.parent / 'outside', storage / 'space' / 'case' / 'link')
+        with pytest.raises(PathTraversalException):
+            validator.resolve('/space/case/link/secret')
+
+    def test_checks_only_path_components(self, storage, monkeypatch):
+        """缓存未命中时只 lstat 路径自身的各级组成部分，不遍历 Casespace"""
+        (storage / 'space' / 'big').mkdir()
+        for i in range(50):
+            (storage / 'space' / 'big' / f'{i}.txt').write_text('', encoding='utf-8')
+        validator = PathValidator(storage)
+        monkeypatch.setattr(os, 'scandir', lambda *args: pytest.fail('scandir called'))
+        checked = []
+        lstat = os.lstat
+        monkeypatch.setattr(os, 'lstat', lambda path: checked.append(os.fspath(path)) or lstat(path))
+
+        validator.resolve('/space/case/a.txt')
+        assert [os.path.relpath(p, storage) for p in checked] == ['space', 'space/case', 'space/case/a.txt']
+        # 同一目录下的其他路径复用目录的检查结果
+        checked.clear()
+        validator.resolve('/space/case/b.txt')
+        assert [os.path.relpath(p, storage) for p in checked] == ['space/case/b.txt']
+
+    def test_lru_eviction(self, storage):
+        """缓存条目数量有上限"""
+        validator = PathValidator(storage, max_size=2)
+        for name in ('a', 'b', 'c'):
+            validator.resolve(f'/space/{name}')
+        assert list(validator._cache) == ['/space/b', '/space/c']
+
+    def test_file_manager_uses_validator(self, temp_casespace):
+        """storage_root 变化时重建校验器"""
+        from xcase.file_manager import file_manager
+
+        validator = file_manager.path_validator
+        assert validator.storage_root == temp_casespace['storage_root']
+        assert file_manager.path_validator is validator
+        with pytest.raises(PathTraversalException):
+            file_manager.get_abs_path('/.search/index.sqlite3')
+
+    def test_reserved_dirs_not_reachable_through_file_api(self, temp_casespace):
+        """'./' 前缀不能绕过保留目录检查列出或删除快照"""
+        from xcase.file_manager import file_manager
+
+        snapshots = temp_casespace['storage_root'] / '.snapshots'
+        snapshots.mkdir(exist_ok=True)
+        with pytest.raises(PathTraversalException):
+            file_manager.get_file_tree('/./.snapshots')
+        with pytest.raises(PathTraversalException):
+            file_manager.delete_item('/./.snapshots')
+        assert snapshots.is_dir()
@@ -0,0 +1,109 @@
+"""
+Case 快照测试
+
+测试硬链接快照、保存后快照不变、diff、恢复（含自动快照）、重命名时移动快照和接口
+"""
+import pytest
+
+from xcase.exceptions import SnapshotNotFoundException
+from xcase.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def case_files(temp_casespace):
+    from xcase.file_manager import file_manager
+
+    casespace, case = temp_casespace['casespace'], temp_casespace['case']
+    root = temp_casespace['storage_root'] / casespace / case
+    (root / 'lib').mkdir()
+    (root / 'lib' / 'util.py').write_text('x = 1\n', encoding='utf-8')
+    return file_manager, casespace, case, root
+
+
+class TestSnapshotStore:
+    """测试 SnapshotStore"""
+
+    def test_hardlinks_and_prune(self, tmp_path):
+        """快照文件与 Case 文件共享 inode，超出数量限制时删除最旧的快照"""
+        case_abs = tmp_path / 'case'
+        case_abs.mkdir()
+        (case_abs / 'a.bin').write_bytes(b'\0' * 1024)
+        store = SnapshotStore(tmp_path / '.snapshots', max_snapshots=2)
+
+        ids = [store.create('cs', 'case', case_abs)['id'] for _ in range(3)]
+        snapshot_file = store.case_dir('cs', 'case') / ids[-1] / 'tree' / 'a.bin'
+        assert snapshot_file.stat().st_ino == (case_abs / 'a.bin').stat().st_ino
+        assert [s['id'] for s in store.list_snapshots('cs', 'case')] == ids[:0:-1]
+
+    def test_invalid_id(self, tmp_path):
+        """快照 ID 不合法或不存在"""
+        store = SnapshotStore(tmp_path)
+        for snapshot_id in ('../x', '20260101-000000-000000-abcd'):
+            with pytest.raises(SnapshotNotFoundException):
+                store.delete('cs', 'case', snapshot_id)
+
+
+class TestFileManagerSnapshots:
+    """测试 FileManager 的快照操作"""
+
+    def test_save_does_not_change_snapshot(self, case_files):
+        """保存后快照内容不变，diff 报告变化"""
+        file_manager, casespace, case, root = case_files
+        snapshot = file_manager.create_snapshot(casespace, case, 'v1')
+        assert (snapshot['message'], snapshot['files']) == ('v1', 2)
+
+        file_manager.save_file(f'/{casespace}/{case}/test.py', 'print("changed")')
+        file_manager.delete_item(f'/{casespace}/{case}/lib/util.py')
+        (root / 'new.txt').write_text('new', encoding='utf-8')
+
+        tree = file_manager.snapshot_store.case_dir(casespace, case) / snapshot['id'] / 'tree'
+        assert (tree / 'test.py').read_text(encoding='utf-8') == 'print("Hello, World!")'
+        assert file_manager.diff_snapshots(casespace, case, snapshot['id']) == {
+            'added': ['new.txt'], 'removed': ['lib/util.py'], 'modified': ['test.py'],
+        }
+
+    def test_restore(self, case_files):
+        """恢复到快照，恢复前的内容保存为自动快照"""
+        file_manager, casespace, case, root = case_files
+        snapshot = file_manager.create_snapshot(casespace, case)
+        file_manager.save_file(f'/{casespace}/{case}/test.py', 'print("changed")')
+
+        result = file_manager.restore_snapshot(casespace, case, snapshot['id'])
+        assert (root / 'test.py').read_text(encoding='utf-8') == 'print("Hello, World!")'
+        assert (root / 'lib' / 'util.py').exists()
+
+        backup = result['backup']['id']
+        assert file_manager.diff_snapshots(casespace, case, snapshot['id'], backup)['modified'] == ['test.py']
+        assert [s['id'] for s in file_manager.list_snapshots(casespace, case)] == [backup, snapshot['id']]
+
+    def test_rename_moves_snapshots(self, case_files):
+        """重命名 Case 时快照随之移动"""
+        file_manager, casespace, case, root = case_files
+        snapshot = file_manager.create_snapshot(casespace, case)
+
+        file_manager.rename_item(f'/{casespace}/{case}', 'renamed')
+        assert [s['id'] for s in file_manager.list_snapshots(casespace, 'renamed')] == [snapshot['id']]
+        assert not file_manager.snapshot_store.case_dir(casespace, case).exists()
+
+
+class TestSnapshotAPI:
+    """测试快照接口"""
+
+    def test_snapshot_lifecycle(self, api_client, temp_casespace):
+        """创建、列表、比较、恢复、删除"""
+        base = f"/caseeditor/casespaces/{temp_casespace['casespace']}/cases/{temp_casespace['case']}/snapshots"
+
+        snapshot = api_client.post(base, json={'message': 'first'}).json()['data']
+        assert [s['id'] for s in api_client.get(base).json()['data']] == [snapshot['id']]
+
+        diff = api_client.get(f'{base}/diff', {'base': snapshot['id']}).json()['data']
+        assert diff == {'added': [], 'removed': [], 'modified': []}
+
+        assert api_client.post(f"{base}/{snapshot['id']}/restore").json()['data']['restored'] == snapshot['id']
+        assert api_client.delete(f"{base}/{snapshot['id']}").json()['data'] is True
+        assert api_client.post(f"{base}/{snapshot['id']}/restore").json()['code'] == 404
+
+    def test_unknown_case(self, api_client, temp_casespace):
+        """Case 不存在时返回 404"""
+        response = api_client.post(f"/caseeditor/casespaces/{temp_casespace['casespace']}/cases/missing/snapshots", json={})
+        assert response.json()['code'] == 404
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+YAML 验证性能测试脚本
+
+比较原 YamlValidator（先扁平化为字典，再对每条规则用正则 / startswith 扫描全部扁平化键）
+与编译规则的单次遍历（yaml_check.validator.RULES）在大型测试计划上的耗时，
+以及原递归扁平化与 iter_flat_items 的耗时
+
+测试计划按 yaml_test_plan/templates/standard.yaml 的结构生成，每台机器一项 hardware.machines
+和一项 environment.machines.<hostname>.configurations
+
+用法:
+    python yaml_check/benchmarks/benchmark_yaml_validate.py [--machines 10000] [--rounds 3]
+"""
+
+import argparse
+import copy
+import os
+import re
+import sys
+import time
+from ipaddress import AddressValueError, IPv4Address
+from pathlib import Path
+
+import django
+
+# 设置 Django 环境（脚本位于 <app>/benchmarks/，把仓库根目录加入导入路径）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xadmin.settings')
+django.setup()
+
+from yaml_check.config import CAN_BE_EMPTY_KEYS, REQUIRED_ROOT_KEYS, VALUE_TYPE_CONFIG
+from yaml_check.rule_engine import is_empty, iter_flat_items
+from yaml_check.validator import RULES, TYPE_MAP, YamlHelper, YamlValidator
+
+
+def legacy_flatten(data, parent_key=''):
+    """原 _flatten_json：递归构建中间字典"""
+    items = []
+    if isinstance(data, dict):
+        for k, v in data.items():
+            new_key = f"{parent_key}.{k}" if parent_key else k
+            if isinstance(v, (dict, list)):
+                items.extend(legacy_flatten(v, new_key).items())
+            else:
+                items.append((new_key, v))
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            new_key = f"{parent_key}.{i}" if parent_key else str(i)
+            if isinstance(item, (dict, list)):
+                items.extend(legacy_flatten(item, new_key).items())
+            else:
+                items.append((new_key, item))
+    else:
+        items.append((parent_key, data))
+    return dict(items)
+
+
+def legacy_validate(data):
+    """原实现的检查逻辑（去掉日志）：扁平化后 E001 / E002 / E101 各扫描一遍，返回第一个错误码"""
+    flat = legacy_flatten(data)
+
+    for key in REQUIRED_ROOT_KEYS:
+        if '[]' in key or '*' in key:
+            pattern = key.replace('[]', r'\.\d+').replace('*', r'[^.]+')
+            regex_exact = re.compile(f'^{pattern}$')
+            regex_prefix = re.compile(f'^{pattern}\\.')
+            exists = bool([k for k in flat if regex_exact.match(k)] or [k for k in flat if regex_prefix.match(k)])
+        elif '.' in key:
+            exists = key in flat or any(k.startswith(key + '.') for k in flat)
+            if not exists:
+                exists = YamlHelper.get_nested_value(data, key) is not None
+        else:
+            exists = any(k == key or k.startswith(key + '.') for k in flat)
+            if not exists:
+                exists = YamlHelper.has_key(data, key)
+        if not exists:
+            return 'E001'
+
+    for key, value in flat.items():
+        if key in CAN_BE_EMPTY_KEYS or ('.' in key and key.split('.')[-1] in CAN_BE_EMPTY_KEYS):
+            continue
+        if is_empty(value):
+            return 'E002'
+
+    for config_key, expected_type in VALUE_TYPE_CONFIG.items():
+        matched = [
+            (k, v) for k, v in flat.items()
+            if k == config_key or ('.' in k and k.rsplit('.', 1)[-1] == config_key)
+        ]
+        for _, value in matched:
+            if value is None:
+                continue
+            if expected_type == 'IPv4':
+                try:
+                    IPv4Address(value)
+                except (AddressValueError, ValueError, TypeError):
+                    return 'E101'
+            elif YamlHelper.get_value_type(value) not in TYPE_MAP.get(expected_type, [expected_type]):
+                return 'E101'
+    return None
+
+
+def build_plan(machines: int) -> dict:
+    """生成包含指定数量机器的合法测试计划"""
+    configuration = {
+        'config_id': 1,
+        'os': {'id': 5, 'family': 'RHEL', 'version': 8.8},
+        'deployment_method': 'bare_metal',
+        'kernel': {'kernel_version': 'realtime'},
+        'test_type': 'Benchmark',
+        'execution_case_list': ['3DMark_default_test', 'FP64_Performance', 'FP32_Performance'],
+    }
+    plan = {
+        'metadata': {
+            'generated': '2025-11-17T06:01:57.767Z',
+            'version': 2.0,
+            'description': 'TPGen Test Plan Configuration (Multi-Configuration Mode)',
+        },
+        'hardware': {'machines': []},
+        'environment': {'machines': {}},
+    }
+    for i in range(machines):
+        hostname = f'gpu-test-node-{i:05d}'
+        plan['hardware']['machines'].append({
+            'id': i,
+            'hostname': hostname,
+            'productName': 'navi31',
+            'asicName': 'Navi31 GFX1100',
+            'ipAddress': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            'gpuModel': 'RX 7900 XT',
+        })
+        plan['environment']['machines'][hostname] = {'configurations': [copy.deepcopy(configuration)]}
+    return plan
+
+
+def measure(label: str, func, plan: dict, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(plan)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<36} {best * 1000:10.1f} ms")
+    return best
+
+
+def run(machines: int, rounds: int) -> None:
+    print("=" * 80)
+    print(f"YAML 验证性能测试 ({machines} 台机器, 取 {rounds} 轮最优)")
+    print("=" * 80)
+
+    plan = build_plan(machines)
+    # 错误出现在最后一台机器上
+    broken = copy.deepcopy(plan)
+    last = broken['hardware']['machines'][-1]
+    last['ipAddress'] = '10.0.0.256'
+
+    assert legacy_validate(plan) is None and not RULES.validate(plan)
+    assert legacy_validate(broken) == RULES.validate(broken)[0].code == 'E101'
+
+    print("扁平化:")
+    legacy = measure('原 _flatten_json（递归构建中间字典）', legacy_flatten, plan, rounds)
+    streaming = measure('iter_flat_items（显式栈）', lambda data: dict(iter_flat_items(data)), plan, rounds)
+    print(f"  加速: {legacy / streaming:6.1f}x")
+    print("-" * 80)
+
+    for title, data in (('合法计划', plan), ('最后一台机器 IP 非法', broken)):
+        print(f"{title}:")
+        legacy = measure('原实现（扁平化 + 逐规则扫描）', legacy_validate, data, rounds)
+        single = measure('编译规则单次遍历', RULES.validate, data, rounds)
+        measure('YamlValidator.validate', YamlValidator().validate, data, rounds)
+        print(f"  单次遍历加速: {legacy / single:6.1f}x")
+        print("-" * 80)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--machines', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    run(args.machines, args.rounds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
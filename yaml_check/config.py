@@ -58,3 +58,7 @@ VALUE_RANGE_CONFIG = {
     # 'hardware.cpu': [],
 }
 
+
+# 收集全部错误模式（collectAll）的报告上限：错误总数 / 每条规则的错误数
+MAX_REPORTED_ERRORS = 200
+MAX_REPORTED_ERRORS_PER_RULE = 20
@@ -4,6 +4,9 @@ YAML 行号查找工具
 """
 
 import re
+
+import yaml
+
 from .logger import yaml_check_logger
 
 class YamlLineFinder:
@@ -175,4 +178,60 @@ class YamlLineFinder:
             else:
                 yaml += f'{spaces}{key}: {value}\n'
         
-        return yaml
\ No newline at end of file
+        return yaml
+
+class YamlLineIndex:
+    """
+    按文档路径查找行号：YAML 文本只解析一次（节点树带位置信息），之后每次查找只沿路径走一遍，
+    用于一次报告多个错误时给每个错误定位行号
+
+    文本无法解析时（例如前端 jsToYaml 生成的文本不是合法 YAML）回退到 YamlLineFinder 逐行查找
+    """
+
+    def __init__(self, yaml_text):
+        self.yaml_text = yaml_text
+        self._mappings = {}
+        try:
+            self.root = yaml.compose(yaml_text, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        except yaml.YAMLError as e:
+            yaml_check_logger.warning(f"YAML 文本解析失败，逐行查找行号: {e}")
+            self.root = None
+
+    def _mapping(self, node):
+        """映射节点的 {键: (键节点, 值节点)}，同一节点只构建一次"""
+        mapping = self._mappings.get(id(node))
+        if mapping is None:
+            mapping = self._mappings[id(node)] = {
+                str(key_node.value): (key_node, value_node) for key_node, value_node in node.value
+            }
+        return mapping
+
+    def find_line_number(self, path):
+        """
+        查找路径所在的行号（从 1 开始）
+
+        参数：
+        - path: 路径段序列，如 ('hardware', 'machines', 0, 'id')
+
+        返回：
+        - 路径完整存在时为该键所在行；只存在前缀时为最深一级已存在的键所在行；都不存在返回 -1
+        """
+        if self.root is None:
+            key_path = '.'.join(str(segment) for segment in path if not isinstance(segment, int))
+            return YamlLineFinder.find_key_line_number(self.yaml_text, key_path)
+
+        node = self.root
+        line_number = -1
+        for segment in path:
+            if isinstance(node, yaml.MappingNode):
+                entry = self._mapping(node).get(str(segment))
+                if entry is None:
+                    break
+                key_node, node = entry
+                line_number = key_node.start_mark.line + 1
+            elif isinstance(node, yaml.SequenceNode) and isinstance(segment, int) and segment < len(node.value):
+                node = node.value[segment]
+                line_number = node.start_mark.line + 1
+            else:
+                break
+        return line_number
@@ -0,0 +1,459 @@
+"""
+YAML 验证规则引擎
+
+三处验证入口（yaml_check 的 YamlValidator、xadmin_auth 的 validate_yaml_full、
+yaml_test_plan 的上传验证）原先各自对每条规则重新遍历文档：逐个必需键用正则扫描全部扁平化键，
+逐个类型配置再扫描一遍，规则数量乘以字段数量。
+
+compile_rules 把 REQUIRED_ROOT_KEYS / CAN_BE_EMPTY_KEYS / VALUE_TYPE_CONFIG / VALUE_RANGE_CONFIG
+（以及必须非空的键列表）一次编译成按路径段匹配的前缀树（自动机）：
+
+- 普通段精确匹配键名或数组下标，``[]`` 匹配任意数组下标，``*`` 匹配任意键名或下标；
+- 遍历文档时维护当前路径对应的一组自动机状态，每个节点只做一次字典查找，
+  到达终止状态时检查挂在上面的规则；
+- 按键名后缀匹配的规则（CAN_BE_EMPTY_KEYS、VALUE_TYPE_CONFIG 中不含点号的键）放在按名称索引的表中。
+
+RuleSet.validate 只遍历文档一次，返回所有违反的规则，按错误码（E001 → E002 → E101 → E102）、
+规则在配置中的顺序和文档顺序排序，第一项即原逐条检查方式返回的错误；
+group_violations 按规则分组并限制报告数量，用于一次报告全部错误。
+
+两种语义（mode）对应原有的两套验证器：
+
+- MODE_FLAT：yaml_check 的扁平化语义。只有标量叶子（含 None）参与检查，
+  所有叶子都不能为空（CAN_BE_EMPTY_KEYS 除外），类型和后缀规则只作用于叶子；
+  含 ``[]`` / ``*`` 的必需键要求匹配节点下至少有一个叶子，带点号的必需键要求节点存在，
+  不带点号的必需键可以出现在任意深度（只经过对象）；
+- MODE_NESTED：xadmin_auth 的点号路径语义。路径只经过对象，值为 None 视为不存在，
+  只有 non_empty_keys 中的键不能为空（空数组 / 空对象也算空），类型和范围规则作用于任意值。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+MODE_FLAT = 'flat'
+MODE_NESTED = 'nested'
+
+# 错误码的报告顺序
+ERROR_ORDER = ('E001', 'E002', 'E101', 'E102')
+
+# 类型检查函数：(期望类型, 值) -> 不符合时返回实际类型的描述，符合时返回 None
+TypeChecker = Callable[[str, Any], Optional[str]]
+
+PathSegment = Union[str, int]
+
+
+def is_empty(value: Any) -> bool:
+    """None、空白字符串、空数组、空对象视为空"""
+    if value is None:
+        return True
+    if isinstance(value, str) and value.strip() == '':
+        return True
+    if isinstance(value, (list, dict)) and len(value) == 0:
+        return True
+    return False
+
+
+def flat_key(path: Sequence[PathSegment]) -> str:
+    """路径转换为扁平化键，如 ('hardware', 'machines', 0, 'id') -> hardware.machines.0.id"""
+    return '.'.join(str(segment) for segment in path)
+
+
+def friendly_key(path: Sequence[PathSegment]) -> str:
+    """去掉数组下标的路径，如 hardware.machines.id"""
+    return '.'.join(str(segment) for segment in path if not isinstance(segment, int))
+
+
+def _flat_children(node: Any) -> Iterator[Tuple[Any, Any]]:
+    if isinstance(node, dict):
+        return iter(node.items())
+    return zip(map(str, range(len(node))), node)
+
+
+def iter_flat_items(data: Any, parent_key: Any = '') -> Iterator[Tuple[Any, Any]]:
+    """
+    按文档顺序逐个产出 (扁平化键, 标量值)，键和顺序与原 _flatten_json 一致
+
+    用显式栈代替递归，不创建中间字典；空对象 / 空数组不产出任何项。
+    """
+    if not isinstance(data, (dict, list)):
+        yield parent_key, data
+        return
+    stack = [(parent_key, _flat_children(data))]
+    while stack:
+        prefix, children = stack[-1]
+        for key, value in children:
+            key = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, (dict, list)):
+                stack.append((key, _flat_children(value)))
+                break
+            yield key, value
+        else:
+            stack.pop()
+
+
+@dataclass
+class Violation:
+    """违反的规则"""
+    code: str
+    # 配置中的键（E001 / E002 缺失时即为报告的键）；MODE_FLAT 的 E002 为去掉数组下标的路径
+    rule: str
+    # 文档中的路径；必需键缺失时为空
+    path: Tuple[PathSegment, ...] = ()
+    value: Any = None
+    # E101 为期望类型，E102 为允许的值列表
+    expected: Any = None
+    # E101 的实际类型
+    actual: Optional[str] = None
+    # 排序键：(错误码顺序, 规则顺序, 文档顺序)
+    order: Tuple[int, int, int] = field(default=(0, 0, 0), repr=False, compare=False)
+
+    @property
+    def key(self) -> str:
+        """扁平化键（路径为空时为规则键）"""
+        return flat_key(self.path) if self.path else self.rule
+
+
+@dataclass
+class ViolationGroup:
+    """同一错误码、同一规则的错误"""
+    code: str
+    rule: str
+    # 该规则的错误总数（含超出上限未报告的）
+    count: int = 0
+    violations: List[Violation] = field(default_factory=list)
+
+
+def group_violations(violations: Iterable[Violation], max_errors: int, max_per_rule: int) -> List[ViolationGroup]:
+    """
+    按 (错误码, 规则) 分组，保持 RuleSet.validate 的顺序
+
+    每组最多保留 max_per_rule 项，所有组合计最多保留 max_errors 项；count 仍统计全部错误。
+    """
+    groups: Dict[Tuple[str, str], ViolationGroup] = {}
+    reported = 0
+    for violation in violations:
+        group = groups.get((violation.code, violation.rule))
+        if group is None:
+            group = groups[(violation.code, violation.rule)] = ViolationGroup(violation.code, violation.rule)
+        group.count += 1
+        if reported < max_errors and len(group.violations) < max_per_rule:
+            group.violations.append(violation)
+            reported += 1
+    return list(groups.values())
+
+
+class _State:
+    """自动机状态（前缀树节点）"""
+    __slots__ = (
+        'children', 'any_key', 'any_index', 'wildcards', 'required', 'required_direct', 'required_leaf',
+        'required_all', 'exempt', 'types', 'ranges', 'non_empty',
+    )
+
+    def __init__(self):
+        self.children: Dict[str, '_State'] = {}
+        self.any_key: Optional['_State'] = None
+        self.any_index: Optional['_State'] = None
+        # (对象子节点的通配转移, 数组元素的通配转移)，由 finalize 计算
+        self.wildcards: Tuple[Tuple['_State', ...], Tuple['_State', ...]] = ((), ())
+        # [(规则顺序, 是否要求子树中有叶子)]
+        self.required: List[Tuple[int, bool]] = []
+        # 由 finalize 从 required 拆分：节点存在即满足 / 子树中有叶子才满足 / 全部
+        self.required_direct: Tuple[int, ...] = ()
+        self.required_leaf: Tuple[int, ...] = ()
+        self.required_all: Tuple[int, ...] = ()
+        self.exempt = False
+        self.types: List[Tuple[int, str, str]] = []
+        self.ranges: List[Tuple[int, str, Sequence[Any]]] = []
+        self.non_empty: List[int] = []
+
+    def step(self, segment: PathSegment, in_list: bool) -> Sequence['_State']:
+        """子节点对应的状态：精确匹配、``[]``（仅数组下标）、``*``"""
+        exact = self.children.get(segment if type(segment) is str else str(segment)) if self.children else None
+        wildcards = self.wildcards[in_list]
+        if exact is None:
+            return wildcards
+        return (exact,) + wildcards
+
+    def finalize(self) -> None:
+        """编译完成后预先计算通配符转移（对象子节点 / 数组元素）和必需键索引"""
+        self.required_direct = tuple(index for index, needs_leaf in self.required if not needs_leaf)
+        self.required_leaf = tuple(index for index, needs_leaf in self.required if needs_leaf)
+        self.required_all = self.required_direct + self.required_leaf
+        any_key = (self.any_key,) if self.any_key is not None else ()
+        any_index = (self.any_index,) if self.any_index is not None else ()
+        self.wildcards = (any_key, any_index + any_key)
+        for child in self.children.values():
+            child.finalize()
+        for child in (self.any_key, self.any_index):
+            if child is not None:
+                child.finalize()
+
+
+class RuleSet:
+    """编译后的规则集合，可在多个请求之间共享（只读）"""
+
+    def __init__(self, mode: str, type_checker: TypeChecker):
+        self.mode = mode
+        self.type_checker = type_checker
+        self.root = _State()
+        self.required_keys: List[str] = []
+        self.non_empty_keys: List[str] = []
+        # MODE_FLAT：按键名（路径最后一段）索引的规则
+        self.exempt_names: set = set()
+        self.type_names: Dict[str, List[Tuple[int, str, str]]] = {}
+        # MODE_FLAT：可出现在任意深度（只经过对象）的必需键
+        self.anywhere: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # 编译
+    # ------------------------------------------------------------------
+
+    def _state_for(self, pattern: str) -> _State:
+        state = self.root
+        for part in pattern.split('.'):
+            wildcard_index = part.endswith('[]')
+            name = part[:-2] if wildcard_index else part
+            if name == '*':
+                if state.any_key is None:
+                    state.any_key = _State()
+                state = state.any_key
+            elif name:
+                state = state.children.setdefault(name, _State())
+            if wildcard_index:
+                if state.any_index is None:
+                    state.any_index = _State()
+                state = state.any_index
+        return state
+
+    # ------------------------------------------------------------------
+    # 验证
+    # ------------------------------------------------------------------
+
+    def validate(self, data: Any, codes: Optional[Iterable[str]] = None) -> List[Violation]:
+        """
+        遍历一次文档，返回违反的规则（已排序）
+
+        参数:
+            data: 解析后的 YAML 文档
+            codes: 只检查这些错误码（默认全部）
+        """
+        codes = set(codes or ERROR_ORDER)
+        walk = _Walk(self, codes)
+        walk.run(data)
+
+        violations = walk.violations
+        if 'E001' in codes:
+            for index, key in enumerate(self.required_keys):
+                if index not in walk.satisfied:
+                    violations.append(Violation('E001', key, order=(0, index, 0)))
+        if 'E002' in codes:
+            for index, key in enumerate(self.non_empty_keys):
+                if index not in walk.seen_non_empty:
+                    violations.append(Violation('E002', key, order=(1, index, 0)))
+
+        violations.sort(key=lambda v: v.order)
+        return violations
+
+
+class _Walk:
+    """
+    一次遍历的状态
+
+    只对容器递归，标量叶子在父节点的循环中直接检查；不构建扁平化字典，
+    路径以列表维护，只有产生错误时才转换为元组。
+    """
+
+    def __init__(self, rules: RuleSet, codes: set):
+        self.rules = rules
+        self.flat = rules.mode == MODE_FLAT
+        self.check_required = 'E001' in codes
+        self.check_empty = 'E002' in codes
+        self.check_types = 'E101' in codes
+        self.check_ranges = 'E102' in codes
+        self.satisfied: set = set()
+        self.seen_non_empty: set = set()
+        self.violations: List[Violation] = []
+        self.seq = 0
+
+    def run(self, data: Any) -> None:
+        """从根节点开始遍历"""
+        root = self.rules.root
+        self.seq += 1
+        if not isinstance(data, (dict, list)):
+            if self.flat:
+                self._check_leaf(data, (root,), [], self.seq)
+            else:
+                self._check_node(data, (root,), [], self.seq)
+            return
+        if self.flat:
+            if self.check_required:
+                self.satisfied.update(root.required_direct)
+        else:
+            self._check_node(data, (root,), [], self.seq)
+        if self.visit(data, (root,), [], False) and self.check_required:
+            self.satisfied.update(root.required_leaf)
+
+    def visit(self, node: Any, states: Sequence[_State], path: List[PathSegment], under_list: bool) -> bool:
+        """访问容器的子节点，返回子树中是否有标量叶子"""
+        flat = self.flat
+        in_list = isinstance(node, list)
+        if in_list and not flat:
+            # 点号路径不经过数组
+            return False
+        check_required = self.check_required
+        satisfied = self.satisfied
+        anywhere = self.rules.anywhere if flat and not in_list and not under_list and check_required else None
+        child_under_list = under_list or in_list
+        has_leaf = False
+
+        for key, child in (enumerate(node) if in_list else node.items()):
+            self.seq += 1
+            if anywhere:
+                index = anywhere.get(key)
+                if index is not None:
+                    satisfied.add(index)
+            if len(states) == 1:
+                next_states = states[0].step(key, in_list)
+            else:
+                next_states = tuple(nxt for state in states for nxt in state.step(key, in_list))
+
+            path.append(key)
+            if not isinstance(child, (dict, list)):
+                has_leaf = True
+                if flat:
+                    self._check_leaf(child, next_states, path, self.seq)
+                elif next_states:
+                    self._check_node(child, next_states, path, self.seq)
+            elif flat:
+                if check_required:
+                    for state in next_states:
+                        if state.required_direct:
+                            satisfied.update(state.required_direct)
+                if self.visit(child, next_states, path, child_under_list):
+                    has_leaf = True
+                    if check_required:
+                        for state in next_states:
+                            if state.required_leaf:
+                                satisfied.update(state.required_leaf)
+            elif next_states:
+                self._check_node(child, next_states, path, self.seq)
+                self.visit(child, next_states, path, child_under_list)
+            path.pop()
+        return has_leaf
+
+    def _check_node(self, value: Any, states: Sequence[_State], path: List[PathSegment], seq: int) -> None:
+        """MODE_NESTED：必需键、类型、范围和非空检查，作用于任意值"""
+        for state in states:
+            if self.check_required and value is not None:
+                self.satisfied.update(state.required_direct)
+            if value is not None and (state.types or state.ranges):
+                self._check_value(value, state, path, seq)
+            if self.check_empty:
+                for index in state.non_empty:
+                    self.seen_non_empty.add(index)
+                    if is_empty(value):
+                        self.violations.append(Violation(
+                            'E002', self.rules.non_empty_keys[index], tuple(path), value, order=(1, index, seq)
+                        ))
+
+    def _check_leaf(self, value: Any, states: Sequence[_State], path: List[PathSegment], seq: int) -> None:
+        """MODE_FLAT：标量叶子的必需键、非空、类型和范围检查"""
+        rules = self.rules
+
+        if self.check_required:
+            for state in states:
+                if state.required_all:
+                    self.satisfied.update(state.required_all)
+
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if self.check_empty:
+                name = str(path[-1]) if path else ''
+                if name not in rules.exempt_names and not any(state.exempt for state in states):
+                    self.violations.append(Violation('E002', friendly_key(path), tuple(path), value, order=(1, 0, seq)))
+            if value is None:
+                return
+
+        for state in states:
+            if state.types or state.ranges:
+                self._check_value(value, state, path, seq)
+
+        if self.check_types and rules.type_names:
+            name = path[-1] if path else ''
+            type_rules = rules.type_names.get(name if type(name) is str else str(name))
+            if type_rules:
+                matched = {index for state in states for index, _, _ in state.types}
+                for index, key, expected in type_rules:
+                    if index not in matched:
+                        self._check_type(index, key, expected, value, path, seq)
+
+    def _check_value(self, value: Any, state: _State, path: List[PathSegment], seq: int) -> None:
+        """挂在状态上的完整路径类型 / 范围规则"""
+        if self.check_types:
+            for index, key, expected in state.types:
+                self._check_type(index, key, expected, value, path, seq)
+        if self.check_ranges:
+            for index, key, allowed in state.ranges:
+                if value not in allowed:
+                    self.violations.append(Violation(
+                        'E102', key, tuple(path), value, allowed, order=(3, index, seq)
+                    ))
+
+    def _check_type(self, index: int, key: str, expected: str, value: Any, path: List[PathSegment], seq: int) -> None:
+        actual = self.rules.type_checker(expected, value)
+        if actual is not None:
+            self.violations.append(Violation(
+                'E101', key, tuple(path), value, expected, actual, order=(2, index, seq)
+            ))
+
+
+def compile_rules(
+    required_keys: Sequence[str] = (),
+    can_be_empty_keys: Sequence[str] = (),
+    value_types: Optional[Dict[str, str]] = None,
+    value_ranges: Optional[Dict[str, Sequence[Any]]] = None,
+    non_empty_keys: Sequence[str] = (),
+    type_checker: Optional[TypeChecker] = None,
+    mode: str = MODE_FLAT,
+) -> RuleSet:
+    """
+    把规则配置编译为 RuleSet（模块加载时编译一次）
+
+    参数:
+        required_keys: E001 必需键，支持 ``[]`` 和 ``*``
+        can_be_empty_keys: MODE_FLAT 下允许为空的键（完整路径或键名）
+        value_types: E101 {键: 期望类型}；MODE_FLAT 下不含点号的键按键名匹配
+        value_ranges: E102 {键: 允许的值}
+        non_empty_keys: MODE_NESTED 下必须非空的键
+        type_checker: 类型检查函数，(期望类型, 值) -> 实际类型描述或 None
+        mode: MODE_FLAT 或 MODE_NESTED
+    """
+    if mode not in (MODE_FLAT, MODE_NESTED):
+        raise ValueError(f"Unknown rule mode: {mode}")
+    rules = RuleSet(mode, type_checker or (lambda expected, value: None))
+
+    for index, key in enumerate(required_keys):
+        rules.required_keys.append(key)
+        if mode == MODE_FLAT and '.' not in key and '[]' not in key and '*' not in key:
+            rules.anywhere[key] = index
+            continue
+        needs_leaf = mode == MODE_FLAT and ('[]' in key or '*' in key)
+        rules._state_for(key).required.append((index, needs_leaf))
+
+    for key in can_be_empty_keys:
+        rules.exempt_names.add(key)
+        rules._state_for(key).exempt = True
+
+    for index, (key, expected) in enumerate((value_types or {}).items()):
+        if mode == MODE_FLAT and '.' not in key:
+            rules.type_names.setdefault(key, []).append((index, key, expected))
+        rules._state_for(key).types.append((index, key, expected))
+
+    for index, (key, allowed) in enumerate((value_ranges or {}).items()):
+        rules._state_for(key).ranges.append((index, key, allowed))
+
+    for index, key in enumerate(non_empty_keys):
+        rules.non_empty_keys.append(key)
+        rules._state_for(key).non_empty.append(index)
+
+    rules.root.finalize()
+    return rules
@@ -4,7 +4,7 @@
 """
 
 import pytest
-from yaml_check.line_finder import YamlLineFinder
+from yaml_check.line_finder import YamlLineFinder, YamlLineIndex
 
 
 class TestFindKeyLineNumber:
@@ -190,3 +190,27 @@ def test_extract_key_parametrized(error_msg, expected_key):
     key = YamlLineFinder.extract_key_from_error(error_msg)
     assert key == expected_key
 
+
+
+class TestYamlLineIndex:
+    """按文档路径查找行号测试类"""
+
+    yaml_text = "hardware:\n  machines:\n    - id: 1\n      hostname: a\n    - id: 2\n      hostname: b\n"
+
+    def test_exact_path(self):
+        """测试数组下标精确定位"""
+        index = YamlLineIndex(self.yaml_text)
+        assert index.find_line_number(('hardware', 'machines', 1, 'hostname')) == 6
+        assert index.find_line_number(('hardware', 'machines', 0)) == 3
+
+    def test_missing_key_uses_deepest_prefix(self):
+        """测试缺少的键返回最深一级已存在的键所在行"""
+        index = YamlLineIndex(self.yaml_text)
+        assert index.find_line_number(('hardware', 'cpu')) == 1
+        assert index.find_line_number(('metadata',)) == -1
+
+    def test_unparsable_text_falls_back(self):
+        """测试无法解析的文本回退到逐行查找"""
+        index = YamlLineIndex("hardware:\n  cpu: [x\n")
+        assert index.root is None
+        assert index.find_line_number(('hardware',)) == 1
@@ -0,0 +1,144 @@
+"""
+测试 yaml_check.rule_engine 模块
+验证规则编译、通配符匹配、两种语义和错误排序
+"""
+
+import pytest
+
+from yaml_check.rule_engine import MODE_FLAT, MODE_NESTED, compile_rules, iter_flat_items
+from yaml_check.validator import check_value_type
+
+
+@pytest.fixture
+def machines_doc():
+    """包含数组和动态键名的文档"""
+    return {
+        'metadata': {'version': '1.0'},
+        'hardware': {'machines': [{'id': 1, 'hostname': 'a'}, {'id': 2, 'hostname': 'b'}]},
+        'environment': {'machines': {'node-01': {'configurations': [{'os': {'id': 8}}]}}},
+    }
+
+
+class TestFlatMode:
+    """扁平化语义（yaml_check）测试类"""
+
+    def test_valid_document(self, machines_doc):
+        """测试合法文档没有错误"""
+        rules = compile_rules(
+            ['metadata.version', 'hardware.machines[].id', 'environment.machines.*.configurations[].os.id'],
+            value_types={'id': 'int'},
+            type_checker=check_value_type,
+        )
+        assert rules.validate(machines_doc) == []
+
+    def test_array_wildcard_needs_leaf(self, machines_doc):
+        """测试 [] 必需键要求至少一个数组元素包含该字段"""
+        rules = compile_rules(['hardware.machines[].ipAddress'])
+        violations = rules.validate(machines_doc)
+        assert [(v.code, v.rule) for v in violations] == [('E001', 'hardware.machines[].ipAddress')]
+
+    def test_name_rule_matches_any_depth(self, machines_doc):
+        """测试不带点号的类型规则按键名匹配任意深度的叶子"""
+        machines_doc['environment']['machines']['node-01']['configurations'][0]['os']['id'] = 'x'
+        rules = compile_rules(value_types={'id': 'int'}, type_checker=check_value_type)
+        violations = rules.validate(machines_doc)
+        assert [v.key for v in violations] == ['environment.machines.node-01.configurations.0.os.id']
+        assert violations[0].actual == 'string'
+
+    def test_empty_leaf_and_exemption(self, machines_doc):
+        """测试所有叶子不能为空，CAN_BE_EMPTY_KEYS 中的键名除外"""
+        machines_doc['metadata']['version'] = ''
+        machines_doc['hardware']['machines'][1]['hostname'] = None
+        violations = compile_rules().validate(machines_doc)
+        assert [v.key for v in violations] == ['metadata.version', 'hardware.machines.1.hostname']
+        assert compile_rules(can_be_empty_keys=['version', 'hostname']).validate(machines_doc) == []
+
+    def test_errors_sorted_by_code_then_rule(self, machines_doc):
+        """测试错误按错误码、规则顺序排序，第一项即逐条检查时的第一个错误"""
+        machines_doc['metadata']['version'] = 2
+        machines_doc['hardware']['machines'][0]['hostname'] = ''
+        rules = compile_rules(
+            ['metadata.missing', 'hardware.missing'],
+            value_types={'metadata.version': 'string'},
+            type_checker=check_value_type,
+        )
+        violations = rules.validate(machines_doc)
+        assert [(v.code, v.rule) for v in violations] == [
+            ('E001', 'metadata.missing'),
+            ('E001', 'hardware.missing'),
+            ('E002', 'hardware.machines.hostname'),
+            ('E101', 'metadata.version'),
+        ]
+        assert [v.code for v in rules.validate(machines_doc, codes=('E101',))] == ['E101']
+
+
+class TestNestedMode:
+    """点号路径语义（xadmin_auth）测试类"""
+
+    def test_none_counts_as_missing(self):
+        """测试值为 None 视为缺失"""
+        rules = compile_rules(['hardware.cpu'], mode=MODE_NESTED)
+        assert [v.code for v in rules.validate({'hardware': {'cpu': None}})] == ['E001']
+        assert rules.validate({'hardware': {'cpu': 'EPYC'}}) == []
+
+    def test_paths_do_not_enter_lists(self):
+        """测试点号路径不经过数组"""
+        rules = compile_rules(['hardware.cpu'], mode=MODE_NESTED)
+        assert [v.code for v in rules.validate({'hardware': [{'cpu': 'EPYC'}]})] == ['E001']
+
+    def test_non_empty_and_ranges_apply_to_containers(self):
+        """测试非空和白名单规则作用于任意值"""
+        rules = compile_rules(
+            non_empty_keys=['test_suites'],
+            value_ranges={'hardware.cpu': ['EPYC']},
+            mode=MODE_NESTED,
+        )
+        violations = rules.validate({'test_suites': [], 'hardware': {'cpu': ['EPYC']}})
+        assert [(v.code, v.rule) for v in violations] == [('E002', 'test_suites'), ('E102', 'hardware.cpu')]
+
+
+def test_unknown_mode():
+    """测试未知语义"""
+    with pytest.raises(ValueError):
+        compile_rules(mode='regex')
+
+
+def test_single_traversal(machines_doc):
+    """测试每个节点只访问一次"""
+    visits = []
+
+    class CountingDict(dict):
+        def items(self):
+            visits.append(id(self))
+            return super().items()
+
+    def wrap(value):
+        if isinstance(value, dict):
+            return CountingDict((k, wrap(v)) for k, v in value.items())
+        if isinstance(value, list):
+            return [wrap(v) for v in value]
+        return value
+
+    rules = compile_rules(
+        ['metadata.version', 'hardware.machines[].id', 'environment.machines.*.configurations[].os.id'],
+        value_types={'id': 'int', 'hostname': 'string'},
+        type_checker=check_value_type,
+        mode=MODE_FLAT,
+    )
+    rules.validate(wrap(machines_doc))
+    assert visits and len(visits) == len(set(visits))
+
+
+def test_iter_flat_items(machines_doc):
+    """测试逐项产出扁平化键，顺序与 _flatten_json 一致，空容器不产出"""
+    machines_doc['hardware']['tags'] = []
+    items = iter_flat_items(machines_doc)
+    assert next(items) == ('metadata.version', '1.0')
+    assert list(items) == [
+        ('hardware.machines.0.id', 1),
+        ('hardware.machines.0.hostname', 'a'),
+        ('hardware.machines.1.id', 2),
+        ('hardware.machines.1.hostname', 'b'),
+        ('environment.machines.node-01.configurations.0.os.id', 8),
+    ]
+    assert list(iter_flat_items('x', 'root')) == [('root', 'x')]
@@ -4,6 +4,7 @@
 """
 
 import pytest
+import yaml
 from yaml_check.validator import YamlValidator, YamlHelper
 
 
@@ -603,3 +604,95 @@ def test_document_new_flattening_behavior():
     print("   - 所有嵌套字段（包括数组内）都会被验证")
     print("="*80 + "\n")
 
+
+
+# ==================== 收集全部错误模式 ====================
+
+STANDARD_PLAN_TEXT = """\
+metadata:
+  generated: 2025-11-17T06:01:57.767Z
+  version: 2.0
+  description: Test Plan
+hardware:
+  machines:
+    - id: 1
+      hostname: node-01
+      productName: navi31
+      asicName: Navi31 GFX1100
+      ipAddress: 192.168.1.101
+      gpuModel: RX 7900 XT
+    - id: 2
+      hostname: node-02
+      productName: navi31
+      asicName: Navi31 GFX1100
+      ipAddress: 192.168.1.102
+      gpuModel: RX 7900 XT
+environment:
+  machines:
+    node-01:
+      configurations:
+        - config_id: 1
+          os:
+            id: 5
+            family: RHEL
+            version: 8.8
+          deployment_method: bare_metal
+          kernel:
+            kernel_version: realtime
+          test_type: Benchmark
+          execution_case_list:
+            - FP64_Performance
+"""
+
+
+@pytest.fixture
+def broken_plan_text():
+    """多处错误：两个非法 IP、一个空主机名、缺少 metadata.description"""
+    return (
+        STANDARD_PLAN_TEXT
+        .replace('192.168.1.101', '192.168.1.301')
+        .replace('192.168.1.102', '192.168.1.302')
+        .replace('hostname: node-02', "hostname: ''")
+        .replace('  description: Test Plan\n', '')
+    )
+
+
+class TestCollectAll:
+    """收集全部错误模式测试类"""
+
+    def test_standard_plan_passes(self):
+        """测试合法计划"""
+        result = YamlValidator().validate(yaml.safe_load(STANDARD_PLAN_TEXT), collect_all=True)
+        assert result == {'success': True, 'errorCount': 0, 'truncated': False, 'errorGroups': []}
+
+    def test_all_errors_grouped_with_lines(self, broken_plan_text):
+        """测试一次返回全部错误，按规则分组并带行号"""
+        result = YamlValidator().validate(yaml.safe_load(broken_plan_text), collect_all=True, yaml_text=broken_plan_text)
+
+        # 第一个错误与逐条检查模式相同
+        assert result['error']['code'] == 'E001'
+        assert result['errorCount'] == 4
+        assert result['truncated'] is False
+        assert [(g['code'], g['rule'], g['count']) for g in result['errorGroups']] == [
+            ('E001', 'metadata.description', 1),
+            ('E002', 'hardware.machines.hostname', 1),
+            ('E101', 'ipAddress', 2),
+        ]
+        lines = broken_plan_text.split('\n')
+        ip_errors = result['errorGroups'][2]['errors']
+        assert [e['key'] for e in ip_errors] == ['hardware.machines.0.ipAddress', 'hardware.machines.1.ipAddress']
+        assert [lines[e['lineNumber'] - 1].strip() for e in ip_errors] == [
+            'ipAddress: 192.168.1.301', 'ipAddress: 192.168.1.302'
+        ]
+        # 缺少的键定位到父级
+        assert lines[result['errorGroups'][0]['errors'][0]['lineNumber'] - 1] == 'metadata:'
+
+    def test_errors_capped_per_rule(self, monkeypatch, broken_plan_text):
+        """测试每条规则的错误数量上限"""
+        from yaml_check import validator as validator_module
+        monkeypatch.setattr(validator_module, 'MAX_REPORTED_ERRORS_PER_RULE', 1)
+        result = YamlValidator().validate(yaml.safe_load(broken_plan_text), collect_all=True)
+        ip_group = result['errorGroups'][2]
+        assert ip_group['count'] == 2 and len(ip_group['errors']) == 1
+        assert result['truncated'] is True
+        assert 'lineNumber' not in ip_group['errors'][0]
@@ -2,7 +2,6 @@
 
 from .logger import yaml_check_logger
 from ipaddress import IPv4Address, AddressValueError
-import re
 
 class YamlHelper:
     @staticmethod
@@ -68,7 +67,44 @@ from .config import (
     REQUIRED_ROOT_KEYS,
     CAN_BE_EMPTY_KEYS,
     VALUE_TYPE_CONFIG,
-    VALUE_RANGE_CONFIG
+    VALUE_RANGE_CONFIG,
+    MAX_REPORTED_ERRORS,
+    MAX_REPORTED_ERRORS_PER_RULE
+)
+from .line_finder import YamlLineIndex
+from .rule_engine import compile_rules, group_violations, iter_flat_items
+
+
+# 类型映射
+TYPE_MAP = {
+    'string': ['string'],
+    'int': ['int'],
+    # 'number': ['int', 'number'],
+    'boolean': ['boolean'],
+    'array': ['array'],
+    'object': ['object']
+}
+
+
+def check_value_type(expected_type, value):
+    """E101 类型检查：符合时返回 None，否则返回实际类型（IPv4 为 'invalid IP'）"""
+    if expected_type == 'IPv4':
+        try:
+            IPv4Address(value)
+        except (AddressValueError, ValueError, TypeError):
+            return 'invalid IP'
+        return None
+    actual_type = YamlHelper.get_value_type(value)
+    return None if actual_type in TYPE_MAP.get(expected_type, [expected_type]) else actual_type
+
+
+# 规则只在模块加载时编译一次
+RULES = compile_rules(
+    REQUIRED_ROOT_KEYS,
+    CAN_BE_EMPTY_KEYS,
+    VALUE_TYPE_CONFIG,
+    VALUE_RANGE_CONFIG,
+    type_checker=check_value_type,
 )
 
 class YamlValidator:
@@ -81,7 +117,10 @@ class YamlValidator:
     
     def _flatten_json(self, data, parent_key=''):
         """
-        递归扁平化 JSON 数据（支持数组递归展开）
+        扁平化 JSON 数据（支持数组递归展开）
+        
+        验证本身不再需要扁平化字典（见 rule_engine）；需要逐项处理时可直接使用
+        rule_engine.iter_flat_items，不必先构建整个字典
         
         更新说明：
         - 现在支持递归展开数组内部的对象
@@ -112,35 +151,7 @@ class YamlValidator:
         返回:
             dict: 扁平化后的字典，键为点号分隔的路径
         """
-        items = []
-        
-        if isinstance(data, dict):
-            # 处理字典：递归展开每个键值对
-            for k, v in data.items():
-                new_key = f"{parent_key}.{k}" if parent_key else k
-                if isinstance(v, (dict, list)):
-                    # 递归处理嵌套的字典和列表
-                    items.extend(self._flatten_json(v, new_key).items())
-                else:
-                    # 基础类型直接添加
-                    items.append((new_key, v))
-        
-        elif isinstance(data, list):
-            # 处理列表：为每个元素添加索引
-            for i, item in enumerate(data):
-                new_key = f"{parent_key}.{i}" if parent_key else str(i)
-                if isinstance(item, (dict, list)):
-                    # 递归处理列表中的复杂对象
-                    items.extend(self._flatten_json(item, new_key).items())
-                else:
-                    # 基础类型直接添加
-                    items.append((new_key, item))
-        
-        else:
-            # 基础类型（字符串、数字等）
-            items.append((parent_key, data))
-        
-        return dict(items)
+        return dict(iter_flat_items(data, parent_key))
     
     def _format_error_path(self, flat_key, value=None):
         """
@@ -175,6 +186,54 @@ class YamlValidator:
         else:
             return cleaned_path
     
+    def _first_error(self, code):
+        """用编译后的规则检查 self.original_data 中的一类错误，返回第一个错误（原各 validate_* 方法的返回格式）"""
+        violations = RULES.validate(self.original_data, codes=(code,))
+        if not violations:
+            return {'valid': True, 'error_code': '0', 'error_message': 'OK'}
+        return self._violation_result(violations[0])
+    
+    def _violation_result(self, violation, log=True):
+        """把 Violation 转换为 {'valid': False, 'error_code', 'error_message', ...}；log=False 时不逐条记录日志"""
+        code = violation.code
+        result = {'valid': False, 'error_code': code}
+        
+        if code == 'E001':
+            if log:
+                yaml_check_logger.warning(f"E001: 缺少必需键 [{violation.rule}]")
+            result['error_message'] = f'Unsupported: missing mandatory key [{violation.rule}]'
+        elif code == 'E002':
+            if log:
+                yaml_check_logger.warning(f"E002: 字段 [{violation.key}] 值为空: {violation.value}")
+            result['error_message'] = f'Unsupported: empty value for [{violation.key}]'
+        elif code == 'E101':
+            # 格式化错误路径：移除数组索引，添加实际值
+            friendly_path = self._format_error_path(violation.key, violation.value)
+            if violation.expected == 'IPv4':
+                if log:
+                    yaml_check_logger.warning(f"E101: 字段 [{friendly_path}] IPv4 验证失败")
+                result['error_message'] = f'Unsupported: value type error for [{friendly_path}]. Expected IPv4, got invalid IP'
+            else:
+                if log:
+                    yaml_check_logger.warning(
+                        f"E101: 字段 [{friendly_path}] 类型错误，期望 {violation.expected}，实际 {violation.actual}"
+                    )
+                result['error_message'] = (
+                    f'Unsupported: value type error for [{friendly_path}]. '
+                    f'Expected {violation.expected}, got {violation.actual}'
+                )
+            result['original_key'] = violation.key  # 保留原始键路径用于查找行号
+            result['friendly_key'] = friendly_path  # 友好的键路径用于显示
+        else:
+            if log:
+                yaml_check_logger.warning(f"E102: 字段 [{violation.key}] 值 '{violation.value}' 不在白名单中")
+            allowed = ", ".join(map(str, violation.expected))
+            result['error_message'] = (
+                f'Unsupported: invalid value range for [{violation.key}]. '
+                f'Value "{violation.value}" is not in whitelist [{allowed}]'
+            )
+        return result
+    
     def validate_required_root_keys(self):
         """
         E001: 验证必需的根键
@@ -184,293 +243,89 @@ class YamlValidator:
         - 数组元素：'hardware.machines[].id' - [] 匹配任意数组索引（0, 1, 2...）
         - 通配符：'environment.machines.*.configurations' - * 匹配任意字符串
         """
-        yaml_check_logger.debug(f"开始 E001 验证：检查必需键 {REQUIRED_ROOT_KEYS}")
-        
-        for key in REQUIRED_ROOT_KEYS:
-            exists = False
-            
-            # 检查键是否包含特殊语法
-            if '[]' in key or '*' in key:
-                # 将配置中的模式转换为正则表达式
-                # [] 匹配数字索引，* 匹配任意字符串
-                pattern = key.replace('[]', r'\.\d+')  # [] -> .\d+
-                pattern = pattern.replace('*', r'[^.]+')  # * -> [^.]+（匹配除点号外的任意字符）
-                
-                yaml_check_logger.debug(f"检查模式键 [{key}]")
-                
-                # 方式1：精确匹配（键本身存在）
-                regex_exact = re.compile(f'^{pattern}$')
-                matching_keys = [k for k in self.flattened_data.keys() if regex_exact.match(k)]
-                
-                # 方式2：前缀匹配（键是容器，如数组或对象，有子键）
-                regex_prefix = re.compile(f'^{pattern}\\.')
-                prefix_keys = [k for k in self.flattened_data.keys() if regex_prefix.match(k)]
-                
-                if matching_keys or prefix_keys:
-                    exists = True
-                    if matching_keys:
-                        yaml_check_logger.debug(f"  精确匹配: 找到 {len(matching_keys)} 个，如: {matching_keys[:3]}")
-                    if prefix_keys:
-                        yaml_check_logger.debug(f"  前缀匹配: 找到 {len(prefix_keys)} 个，如: {prefix_keys[:3]}")
-                else:
-                    yaml_check_logger.debug(f"  未找到匹配项")
-                    
-            elif '.' in key:
-                # 普通嵌套键，直接查找
-                exists = key in self.flattened_data
-                if not exists:
-                    # 如果键本身不存在，检查是否有以该键开头的子键（表示该键是容器）
-                    exists = any(k.startswith(key + '.') for k in self.flattened_data.keys())
-                if not exists:
-                    # 如果扁平化数据中没有，也检查原始数据
-                    value = self.helper.get_nested_value(self.original_data, key)
-                    exists = value is not None
-            else:
-                # 顶层键，检查扁平化数据中是否有以该键开头的项
-                exists = any(k == key or k.startswith(key + '.') for k in self.flattened_data.keys())
-                if not exists:
-                    # 如果扁平化数据中没有，也检查原始数据
-                    exists = self.helper.has_key(self.original_data, key)
-            
-            if not exists:
-                yaml_check_logger.warning(f"E001: 缺少必需键 [{key}]")
-                return {
-                    'valid': False,
-                    'error_code': 'E001',
-                    'error_message': f'Unsupported: missing mandatory key [{key}]'
-                }
-        
-        yaml_check_logger.info("✅ E001 验证通过：所有必需键存在")
-        return {'valid': True, 'error_code': '0', 'error_message': 'OK'}
+        return self._first_error('E001')
     
     def validate_mandatory_non_empty_keys(self):
         """
-        E002: 验证不能为空的键
-        直接从 self.flattened_data 检查所有字段是否为空
+        E002: 验证不能为空的键（所有叶子字段）
         
-        支持 CAN_BE_EMPTY_KEYS 配置：
-        - 如果字段在 CAN_BE_EMPTY_KEYS 中，允许为空
-        - 支持完整路径匹配或键名后缀匹配
+        CAN_BE_EMPTY_KEYS 中的字段允许为空，支持完整路径匹配或键名后缀匹配
         """
-        import json
-        from datetime import datetime
-        
-        yaml_check_logger.debug("开始 E002 验证：检查空值")
-        yaml_check_logger.debug(f"允许为空的键: {CAN_BE_EMPTY_KEYS}")
-        
-        # 调试模式开关（生产环境设为 False）
-        DEBUG_MODE = False
-        
-        # 调试模式：输出和保存数据
-        if DEBUG_MODE:
-            formatted_data = json.dumps(self.original_data, indent=2, ensure_ascii=False)
-            yaml_check_logger.debug("=" * 60)
-            yaml_check_logger.debug("开始验证 yaml_data")
-            yaml_check_logger.debug(f"yaml_data:\n{formatted_data}")
-            yaml_check_logger.debug("=" * 60)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"/tmp/yaml_data_{timestamp}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(formatted_data)
-            yaml_check_logger.debug(f"✅ yaml_data 已保存到: {filename}")
-        
-        yaml_check_logger.debug(f"扁平化后共 {len(self.flattened_data)} 个字段")
-        
-        if DEBUG_MODE:
-            yaml_check_logger.debug("扁平化后的数据:")
-            for key, value in self.flattened_data.items():
-                yaml_check_logger.debug(f"  {key}: {value} (type: {type(value).__name__})")
-        
-        # 检查所有字段是否为空
-        for key, value in self.flattened_data.items():
-            # 检查是否在允许为空的键列表中
-            # 支持两种匹配方式：
-            # 1. 完整路径匹配：key 完全匹配 CAN_BE_EMPTY_KEYS 中的某项
-            # 2. 后缀匹配：key 的最后一个点后面的部分匹配 CAN_BE_EMPTY_KEYS 中的某项
-            is_allowed_empty = False
-            
-            # 方式1：完整匹配
-            if key in CAN_BE_EMPTY_KEYS:
-                is_allowed_empty = True
-                yaml_check_logger.debug(f"字段 [{key}] 在允许为空列表中（完整匹配），跳过验证")
-            
-            # 方式2：后缀匹配（取最后一个点后面的部分）
-            if not is_allowed_empty and '.' in key:
-                key_suffix = key.split('.')[-1]
-                if key_suffix in CAN_BE_EMPTY_KEYS:
-                    is_allowed_empty = True
-                    yaml_check_logger.debug(f"字段 [{key}] 的后缀 [{key_suffix}] 在允许为空列表中（后缀匹配），跳过验证")
-            
-            # 如果允许为空，跳过此字段的验证
-            if is_allowed_empty:
-                continue
-            
-            # 字段不存在
-            if value is None:
-                yaml_check_logger.warning(f"E002: 字段 [{key}] 不存在")
-                return {
-                    'valid': False,
-                    'error_code': 'E002',
-                    'error_message': f'Unsupported: empty value for [{key}]'
-                }
-            
-            # 字段值为空（空字符串、空数组等）
-            if self.helper.is_empty(value):
-                yaml_check_logger.warning(f"E002: 字段 [{key}] 值为空: {value}")
-                return {
-                    'valid': False,
-                    'error_code': 'E002',
-                    'error_message': f'Unsupported: empty value for [{key}]'
-                }
-        
-        yaml_check_logger.info("✅ E002 验证通过：所有字段非空（或允许为空）")
-        return {'valid': True, 'error_code': '0', 'error_message': 'OK'}
+        return self._first_error('E002')
     
-
-
-
-
-
-    # # E101: 值类型配置
-    # VALUE_TYPE_CONFIG = {
-    #     'id': 'int',
-    #     'order': 'int',
-    #     'ipAddress': 'IPv4',
-    # }
-    # 其中VALUE_TYPE_CONFIG 中的key值是扁平化后的数据中的key值，如果不是扁平化后的数据中的key值的话，就是
-    # 扁平化后的数据中的key值的最后1个点后面的值
-    # int 值可以用python内建类型验证  但是IPv4类型需要借助标准库：# 使用标准库处理 IP from ipaddress import IPv4Address   验证IP地址是否为IPv4地址  
-# 根据上述的介绍  请重新修改优化下validate_value_types(self): 函数
-
     def validate_value_types(self):
         """
-        E101: 验证值类型 - 直接从 self.flattened_data 获取值
-        
-        支持两种 key 匹配方式：
-        1. 完整匹配：VALUE_TYPE_CONFIG 中的 key 与 flattened_data 中的 key 完全匹配
-        2. 后缀匹配：VALUE_TYPE_CONFIG 中的 key 与 flattened_data 中 key 的最后一个点后面的值匹配
+        E101: 验证值类型
         
-        支持的类型：
-        - Python 内建类型：int, number, string, boolean, array, object
-        - IPv4：使用 ipaddress 库验证
+        VALUE_TYPE_CONFIG 的 key 与扁平化键完整匹配，或与扁平化键最后一个点后面的部分匹配；
+        支持 int, number, string, boolean, array, object 和 IPv4
         """
-
-        
-        yaml_check_logger.debug("开始 E101 验证：检查值类型")
-        
-        for config_key, expected_type in VALUE_TYPE_CONFIG.items():
-            yaml_check_logger.debug(f"检查配置项：{config_key} -> {expected_type}")
-            
-            # 查找匹配的字段
-            matched_items = []
-            
-            for flat_key, value in self.flattened_data.items():
-                # 方式1：完整匹配
-                if flat_key == config_key:
-                    matched_items.append((flat_key, value))
-                    yaml_check_logger.debug(f"  完整匹配: {flat_key}")
-                # 方式2：后缀匹配（最后一个点后面的值）
-                elif '.' in flat_key:
-                    last_part = flat_key.rsplit('.', 1)[-1]
-                    if last_part == config_key:
-                        matched_items.append((flat_key, value))
-                        yaml_check_logger.debug(f"  后缀匹配: {flat_key} (后缀: {last_part})")
-            
-            # 如果没有匹配项，跳过
-            if not matched_items:
-                yaml_check_logger.debug(f"  未找到匹配字段，跳过")
-                continue
-            
-            # 验证所有匹配项
-            for flat_key, value in matched_items:
-                yaml_check_logger.debug(f"  验证字段: {flat_key} = {value} (期望类型: {expected_type})")
-                
-                # 跳过 None 值
-                if value is None:
-                    yaml_check_logger.debug(f"    值为 None，跳过")
-                    continue
-                
-                # 特殊类型：IPv4
-                if expected_type == 'IPv4':
-                    try:
-                        IPv4Address(value)
-                        yaml_check_logger.debug(f"    ✅ IPv4 验证通过: {value}")
-                    except (AddressValueError, ValueError, TypeError) as e:
-                        # 格式化错误路径：移除数组索引，添加实际值
-                        friendly_path = self._format_error_path(flat_key, value)
-                        
-                        yaml_check_logger.warning(f"E101: 字段 [{friendly_path}] IPv4 验证失败 - {str(e)}")
-                        return {
-                            'valid': False,
-                            'error_code': 'E101',
-                            'error_message': f'Unsupported: value type error for [{friendly_path}]. Expected IPv4, got invalid IP',
-                            'original_key': flat_key,  # 保留原始键路径用于查找行号
-                            'friendly_key': friendly_path  # 友好的键路径用于显示
-                        }
-                    continue
-                
-                # 获取实际类型
-                actual_type = self.helper.get_value_type(value)
-                
-                # 类型映射
-                type_map = {
-                    'string': ['string'],
-                    'int': ['int'],
-                    # 'number': ['int', 'number'],
-                    'boolean': ['boolean'],
-                    'array': ['array'],
-                    'object': ['object']
-                }
-                
-                valid_types = type_map.get(expected_type, [expected_type])
-                
-                if actual_type not in valid_types:
-                    # 格式化错误路径：移除数组索引，添加实际值
-                    friendly_path = self._format_error_path(flat_key, value)
-                    
-                    yaml_check_logger.warning(
-                        f"E101: 字段 [{friendly_path}] 类型错误，期望 {expected_type}，实际 {actual_type}"
-                    )
-                    return {
-                        'valid': False,
-                        'error_code': 'E101',
-                        'error_message': f'Unsupported: value type error for [{friendly_path}]. Expected {expected_type}, got {actual_type}',
-                        'original_key': flat_key,  # 保留原始键路径用于查找行号
-                        'friendly_key': friendly_path  # 友好的键路径用于显示
-                    }
-                
-                yaml_check_logger.debug(f"    ✅ 类型验证通过: {actual_type} in {valid_types}")
-        
-        yaml_check_logger.info("✅ E101 验证通过：所有字段类型正确")
-        return {'valid': True, 'error_code': '0', 'error_message': 'OK'}
+        return self._first_error('E101')
     
     def validate_value_ranges(self):
-        """E102: 验证值范围（白名单） - 直接从 self.flattened_data 获取值"""
-        yaml_check_logger.debug("开始 E102 验证：检查值范围")
+        """E102: 验证值范围（白名单）"""
+        return self._first_error('E102')
+    
+    def _collect_errors(self, violations, yaml_text=None):
+        """
+        收集全部错误模式：按规则分组并限制数量，提供 yaml_text 时为每个错误定位行号
         
-        for key, allowed_values in VALUE_RANGE_CONFIG.items():
-            # 从扁平化数据中获取值
-            value = self.flattened_data.get(key)
-            
-            if value is None:
+        返回:
+            {'errorCount': 错误总数, 'truncated': 是否有未报告的错误,
+             'errorGroups': [{'code', 'rule', 'count', 'errors': [{'code', 'message', 'key', 'lineNumber'}]}]}
+        """
+        line_index = YamlLineIndex(yaml_text) if yaml_text else None
+        groups = []
+        reported = 0
+        for group in group_violations(violations, MAX_REPORTED_ERRORS, MAX_REPORTED_ERRORS_PER_RULE):
+            if not group.violations:
+                # 超出总数上限的规则不再列出，只计入 errorCount
                 continue
-            
-            if value not in allowed_values:
-                yaml_check_logger.warning(f"E102: 字段 [{key}] 值 '{value}' 不在白名单中")
-                return {
-                    'valid': False,
-                    'error_code': 'E102',
-                    'error_message': f'Unsupported: invalid value range for [{key}]. Value "{value}" is not in whitelist [{", ".join(allowed_values)}]'
-                }
-        
-        yaml_check_logger.info("✅ E102 验证通过：值范围合法")
-        return {'valid': True, 'error_code': '0', 'error_message': 'OK'}
+            errors = []
+            for violation in group.violations:
+                result = self._violation_result(violation, log=False)
+                error = {'code': violation.code, 'message': result['error_message'], 'key': violation.key}
+                if line_index is not None:
+                    # 必需键缺失时定位到配置路径中最深一级已存在的键
+                    path = violation.path or self._rule_prefix(violation.rule)
+                    line_number = line_index.find_line_number(path)
+                    if line_number != -1:
+                        error['lineNumber'] = line_number
+                errors.append(error)
+            reported += len(errors)
+            groups.append({'code': group.code, 'rule': group.rule, 'count': group.count, 'errors': errors})
+        
+        yaml_check_logger.warning(
+            f"共 {len(violations)} 个错误，报告 {len(groups)} 条规则的 {reported} 个错误"
+        )
+        return {
+            'errorCount': len(violations),
+            'truncated': reported < len(violations),
+            'errorGroups': groups
+        }
+    
+    @staticmethod
+    def _rule_prefix(rule):
+        """规则键中第一个通配符之前的路径，如 hardware.machines[].id -> ('hardware', 'machines')"""
+        prefix = []
+        for part in rule.split('.'):
+            if part == '*':
+                break
+            if part.endswith('[]'):
+                prefix.append(part[:-2])
+                break
+            prefix.append(part)
+        return tuple(prefix)
     
-    def validate(self, yaml_data):
+    def validate(self, yaml_data, collect_all=False, yaml_text=None):
         """
         主验证函数
         对应 check_yaml.ts 的 compatibility_analysis
+        
+        参数:
+            yaml_data: 解析后的 YAML 数据
+            collect_all: 为 True 时除第一个错误（error）外，还返回按规则分组的全部错误（见 _collect_errors）
+            yaml_text: 原始 YAML 文本，collect_all 时用于定位每个错误的行号（可选）
         """
         try:
             yaml_check_logger.info("========== 开始 YAML 验证流程 ==========")
@@ -486,36 +341,11 @@ class YamlValidator:
                     }
                 }
             
-            # 保存原始数据和扁平化数据
+            # 编译后的规则只遍历一次文档，按 E001 → E002 → E101 → E102 的顺序排序，第一个即 error
             self.original_data = yaml_data
-            self.flattened_data = self._flatten_json(yaml_data)
-            yaml_check_logger.debug(f"数据扁平化完成，共 {len(self.flattened_data)} 个字段")
-            
-            # E001: 验证必需的根键
-            result = self.validate_required_root_keys()
-            if not result['valid']:
-                return {
-                    'success': False,
-                    'error': {
-                        'code': result['error_code'],
-                        'message': result['error_message']
-                    }
-                }
-            
-            # E002: 验证不能为空的键
-            result = self.validate_mandatory_non_empty_keys()
-            if not result['valid']:
-                return {
-                    'success': False,
-                    'error': {
-                        'code': result['error_code'],
-                        'message': result['error_message']
-                    }
-                }
-            
-            # E101: 验证值类型
-            result = self.validate_value_types()
-            if not result['valid']:
+            violations = RULES.validate(yaml_data)
+            if violations:
+                result = self._violation_result(violations[0])
                 error_info = {
                     'code': result['error_code'],
                     'message': result['error_message']
@@ -525,24 +355,18 @@ class YamlValidator:
                     error_info['original_key'] = result['original_key']
                 if 'friendly_key' in result:
                     error_info['friendly_key'] = result['friendly_key']
-                return {
+                response = {
                     'success': False,
                     'error': error_info
                 }
-            
-            # E102: 验证值范围
-            result = self.validate_value_ranges()
-            if not result['valid']:
-                return {
-                    'success': False,
-                    'error': {
-                        'code': result['error_code'],
-                        'message': result['error_message']
-                    }
-                }
+                if collect_all:
+                    response.update(self._collect_errors(violations, yaml_text))
+                return response
             
             # 所有验证通过
             yaml_check_logger.success("========== ✅ 所有验证通过 ==========")
+            if collect_all:
+                return {'success': True, 'errorCount': 0, 'truncated': False, 'errorGroups': []}
             return {'success': True}
             
         except Exception as e:
@@ -20,7 +20,9 @@ def validate_yaml(request: HttpRequest):
             "metadata": {...},
             "hardware": {...},
             ...
-        }
+        },
+        "yamlText": "...",     // 可选，原始 YAML 文本，用于查找行号
+        "collectAll": true     // 可选，一次返回全部错误（按规则分组，有数量上限）
     }
     
     响应：
@@ -34,7 +36,18 @@ def validate_yaml(request: HttpRequest):
                 "message": "...",
                 "key": "hardware.cpu",
                 "lineNumber": 5
-            }
+            },
+            // 仅 collectAll 时返回
+            "errorCount": 37,
+            "truncated": false,
+            "errorGroups": [
+                {
+                    "code": "E101",
+                    "rule": "ipAddress",
+                    "count": 2,
+                    "errors": [{"code": "E101", "message": "...", "key": "hardware.machines.0.ipAddress", "lineNumber": 12}]
+                }
+            ]
         }
     }
     """
@@ -45,6 +58,7 @@ def validate_yaml(request: HttpRequest):
         body = json.loads(request.body)
         yaml_data = body.get('yamlData')
         yaml_text = body.get('yamlText')  # 前端传递的原始 YAML 文本（可选）
+        collect_all = bool(body.get('collectAll'))  # 一次返回全部错误（可选）
         
         if not yaml_data:
             yaml_check_logger.warning("请求体中缺少 yamlData")
@@ -56,7 +70,15 @@ def validate_yaml(request: HttpRequest):
         
         # 创建验证器并验证
         validator = YamlValidator()
-        result = validator.validate(yaml_data)
+        if collect_all:
+            # 与单个错误的行号查找一致：没有原始文本时使用后端生成的 YAML 文本
+            result = validator.validate(
+                yaml_data,
+                collect_all=True,
+                yaml_text=yaml_text or YamlLineFinder.js_to_yaml(yaml_data).rstrip()
+            )
+        else:
+            result = validator.validate(yaml_data)
         
         yaml_check_logger.info(f"验证完成，结果: {'成功' if result.get('success') else '失败'}")
         
@@ -32,11 +32,11 @@ def upload_yaml(request, file: UploadedFile = File(...)):
         content = file.read().decode('utf-8')
         
         # 严格验证
-        validation_result = validate_yaml_full(content)
+        is_valid, errors = validate_yaml_full(content)
         
-        if not validation_result['valid']:
-            error_message = validation_result['error_message']
-            line_number = validation_result.get('line_number')
+        if not is_valid:
+            error_message = errors[0]['message']
+            line_number = errors[0].get('line')
             
             if line_number:
                 display_message = f"Line {line_number} [ERROR]\n{error_message}"
@@ -47,7 +47,7 @@ def upload_yaml(request, file: UploadedFile = File(...)):
                 'code': 400,
                 'message': 'YAML Validation Failed',
                 'data': {
-                    'error_code': validation_result.get('error_code'),
+                    'error_code': errors[0].get('code', 'SYNTAX_ERROR'),
                     'error_message': display_message,
                     'line_number': line_number
                 }
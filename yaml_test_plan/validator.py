@@ -5,6 +5,8 @@ Smart YAML Validator - Detects common YAML syntax errors
 import yaml
 from typing import Dict, List, Any, Tuple
 
+from yaml_check.validator import YamlValidator
+
 try:
     from yamllint import linter
     from yamllint.config import YamlLintConfig
@@ -239,6 +241,66 @@ rules:
     return (len(unique_errors) == 0, unique_errors)
 
 
-# Alias for compatibility
-validate_yaml_full = validate_yaml_syntax
+def validate_yaml_compatibility(yaml_content: str) -> List[Dict[str, Any]]:
+    """
+    Compatibility validation with the shared compiled rule set (E001/E002/E101/E102)
+    
+    The document is walked once by yaml_check's rule engine and every error is
+    reported, grouped by rule (E001 -> E002 -> E101 -> E102) and capped as in the
+    yaml_check collectAll mode. Line numbers come from a single parse of the text.
+    
+    Returns:
+        Error list in the same format as validate_yaml_syntax, with extra 'code' and 'rule'
+    """
+    try:
+        yaml_data = yaml.safe_load(yaml_content)
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        return [{
+            'line': mark.line + 1 if mark else 1,
+            'column': mark.column + 1 if mark else 1,
+            'message': f"syntax error: {getattr(e, 'problem', None) or e}"
+        }]
+    
+    result = YamlValidator().validate(yaml_data, collect_all=True, yaml_text=yaml_content)
+    if result['success']:
+        return []
+    
+    if 'errorGroups' not in result:
+        # Not a mapping (E000) or an unexpected failure (E999)
+        error = result['error']
+        return [{
+            'line': 1,
+            'column': 1,
+            'code': error['code'],
+            'message': f"{error['code']} {error['message']}"
+        }]
+    
+    return [
+        {
+            'line': error.get('lineNumber', 1),
+            'column': 1,
+            'code': error['code'],
+            'rule': group['rule'],
+            'message': f"{error['code']} {error['message']}"
+        }
+        for group in result['errorGroups']
+        for error in group['errors']
+    ]
+
+
+def validate_yaml_full(yaml_content: str) -> Tuple[bool, List[Dict[str, Any]]]:
+    """
+    Syntax validation followed by compatibility validation
+    
+    Compatibility rules only run when the syntax is valid.
+    
+    Returns:
+        Tuple of (is_valid, error_list)
+    """
+    is_valid, errors = validate_yaml_syntax(yaml_content)
+    if not is_valid:
+        return is_valid, errors
+    errors = validate_yaml_compatibility(yaml_content)
+    return (len(errors) == 0, errors)
 